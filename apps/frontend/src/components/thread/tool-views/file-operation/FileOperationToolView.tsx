@@ -60,6 +60,7 @@ import {
   splitContentIntoLines,
   generateLineDiff,
   calculateDiffStats,
+  getFileEditHashes,
   type FileOperation,
   type OperationConfig,
   type LineDiff,
@@ -76,6 +77,8 @@ import { PresentationSlideSkeleton } from '../presentation-tools/PresentationSli
 import { usePresentationViewerStore } from '@/stores/presentation-viewer-store';
 import { useKortixComputerStore } from '@/stores/kortix-computer-store';
 import { useSmoothStream } from '@/lib/streaming';
+import { useParams } from 'next/navigation';
+import { useFileEditVersions } from '@/hooks/threads';
 
 const UnifiedDiffView: React.FC<{ lineDiff: LineDiff[]; fileName?: string }> = ({ lineDiff, fileName }) => (
   <div className="font-mono text-[13px] leading-relaxed">
@@ -235,6 +238,14 @@ export function FileOperationToolView({
 
   const operation = getOperationType(name, args);
   const isStrReplace = operation === 'str-replace';
+
+  // Edit results reference the full file before/after by hash; fetch them once the call completes
+  const params = useParams();
+  const threadId = (params?.threadId as string) || messages?.find((m: any) => m?.thread_id)?.thread_id;
+  const { originalSha256, updatedSha256 } = useMemo(() => getFileEditHashes(output), [output]);
+  const { data: fileEditVersions } = useFileEditVersions(threadId, originalSha256, updatedSha256, {
+    enabled: !isStreaming && (isStrReplace || operation === 'edit'),
+  });
   const configs = getOperationConfigs();
   const config = configs[operation];
   const Icon = config.icon;
@@ -661,8 +672,16 @@ export function FileOperationToolView({
       }
     }
 
+    if (fileEditVersions && (isStrReplace || operation === 'edit')) {
+      oldStr = oldStr || fileEditVersions.original_content || null;
+      newStr = newStr || fileEditVersions.updated_content || null;
+      if (fileEditVersions.updated_content) {
+        fileContent = fileEditVersions.updated_content;
+      }
+    }
+
     return { filePath, fileContent, oldStr, newStr };
-  }, [args, output, isStreaming, streamingSource, operation, isStrReplace, rawFileContents, rawCodeEdit, smoothFileContents, smoothCodeEdit]);
+  }, [args, output, isStreaming, streamingSource, operation, isStrReplace, rawFileContents, rawCodeEdit, smoothFileContents, smoothCodeEdit, fileEditVersions]);
 
   const { filePath, fileContent, oldStr, newStr } = extractedContent;
   
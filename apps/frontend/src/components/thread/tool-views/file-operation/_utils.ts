@@ -223,6 +223,21 @@ const parseOutput = (output: any) => {
     return output;
   };
 
+/**
+ * Content hashes of an edit_file / str_replace result. The tool output carries a
+ * diff plus these hashes; the full versions come from useFileEditVersions.
+ */
+export const getFileEditHashes = (output: any): { originalSha256: string | null; updatedSha256: string | null } => {
+  const parsed = parseOutput(output);
+  if (!parsed || typeof parsed !== 'object') {
+    return { originalSha256: null, updatedSha256: null };
+  }
+  return {
+    originalSha256: parsed.original_sha256 ?? null,
+    updatedSha256: parsed.updated_sha256 ?? null,
+  };
+};
+
 export const extractFileEditData = (
   toolCall: { arguments?: Record<string, any> },
   toolResult?: { output?: any; success?: boolean },
@@ -233,6 +248,8 @@ export const extractFileEditData = (
   filePath: string | null;
   originalContent: string | null;
   updatedContent: string | null;
+  originalSha256: string | null;
+  updatedSha256: string | null;
   actualIsSuccess: boolean;
   actualToolTimestamp?: string;
   actualAssistantTimestamp?: string;
@@ -252,6 +269,7 @@ export const extractFileEditData = (
     if (typeof output === 'object' && output !== null) {
       // Structured output from metadata
       filePath = filePath || output.file_path || output.target_file || null;
+      // Older results inline both versions; newer ones only reference them by hash
       originalContent = output.original_content ?? null;
       updatedContent = output.updated_content ?? output.file_content ?? output.content ?? null;
       
@@ -270,6 +288,7 @@ export const extractFileEditData = (
     filePath,
     originalContent,
     updatedContent,
+    ...getFileEditHashes(output),
     actualIsSuccess,
     actualToolTimestamp: toolTimestamp,
     actualAssistantTimestamp: assistantTimestamp,
@@ -19,6 +19,9 @@ export { useUpdateProjectMutation, useUpdateProject, useDeleteProject } from './
 // Messages - re-export from messages folder
 export { useMessagesQuery, useAddUserMessageMutation } from '../messages';
 
+// File edit versions (full contents behind edit tool diffs)
+export { useFileEditVersions } from './use-file-edit-versions';
+
 // Agent runs
 export { useAgentRunsQuery, useStartAgentMutation, useStopAgentMutation } from './use-agent-run';
 
@@ -7,6 +7,8 @@ export const threadKeys = {
   projects: () => ['projects', 'list'] as const, // For useProjects hook
   publicProjects: () => ['public-projects'] as const,
   agentRuns: (threadId: string) => ['thread', threadId, 'agent-runs'] as const,
+  fileEdits: (threadId: string, originalSha256?: string | null, updatedSha256?: string | null) =>
+    ['thread', threadId, 'file-edits', originalSha256 ?? null, updatedSha256 ?? null] as const,
   byProject: (projectId: string) => ['project', projectId, 'threads'] as const,
 } as const;
 
@@ -0,0 +1,24 @@
+import { useQuery } from '@tanstack/react-query';
+import { threadKeys } from './keys';
+import { getFileEditVersions, type FileEditVersions } from '@/lib/api/threads';
+
+/**
+ * Full file contents before/after an edit_file / str_replace call.
+ * Versions are addressed by content hash, so they never change once fetched.
+ */
+export const useFileEditVersions = (
+  threadId: string | undefined,
+  originalSha256?: string | null,
+  updatedSha256?: string | null,
+  options?: { enabled?: boolean },
+) => {
+  return useQuery<FileEditVersions>({
+    queryKey: threadKeys.fileEdits(threadId || '', originalSha256, updatedSha256),
+    queryFn: () => getFileEditVersions(threadId!, originalSha256, updatedSha256),
+    enabled: !!threadId && !!(originalSha256 || updatedSha256) && options?.enabled !== false,
+    staleTime: Infinity,
+    gcTime: 10 * 60 * 1000,
+    retry: 1,
+    refetchOnWindowFocus: false,
+  });
+};
@@ -420,6 +420,35 @@ export const getThread = async (threadId: string): Promise<Thread> => {
   }
 };
 
+export type FileEditVersions = {
+  original_content: string | null;
+  updated_content: string | null;
+};
+
+// Full file before/after an edit; edit tool results only carry their sha256 hashes
+export const getFileEditVersions = async (
+  threadId: string,
+  originalSha256?: string | null,
+  updatedSha256?: string | null,
+): Promise<FileEditVersions> => {
+  const params = new URLSearchParams();
+  if (originalSha256) params.append('original', originalSha256);
+  if (updatedSha256) params.append('updated', updatedSha256);
+
+  const response = await backendApi.get<FileEditVersions>(
+    `/threads/${threadId}/file-edits?${params.toString()}`,
+    { showErrors: false },
+  );
+
+  if (response.error) {
+    const error = new Error(response.error.message || 'Failed to fetch file versions');
+    (error as any).status = response.error.status;
+    throw error;
+  }
+
+  return response.data || { original_content: null, updated_content: null };
+};
+
 // Create a new thread (creates both project and thread - legacy endpoint for backwards compatibility)
 export const createThread = async (projectId?: string): Promise<Thread> => {
   const supabase = createClient();
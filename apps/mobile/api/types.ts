@@ -44,6 +44,12 @@ export interface Thread {
   project?: Project; // Nested project data (always included from API)
 }
 
+/** Full file before/after an edit; edit tool results only reference them by sha256 */
+export interface FileEditVersions {
+  original_content: string | null;
+  updated_content: string | null;
+}
+
 export interface AgentRun {
   id: string;
   thread_id: string;
@@ -43,6 +43,7 @@ import * as Clipboard from 'expo-clipboard';
 import * as Haptics from 'expo-haptics';
 import { PresentationSlideCard } from '../presentation-tool/PresentationSlideCard';
 import { log } from '@/lib/logger';
+import { useFileEditVersions } from '@/lib/chat/hooks';
 
 // Helper functions for presentation slide detection
 function isPresentationSlideFile(filepath: string): boolean {
@@ -94,6 +95,8 @@ export function FileOperationToolView({
   isStreaming = false,
   project,
   streamingText,
+  toolMessage,
+  assistantMessage,
 }: ToolViewProps) {
   const { openFileInComputer } = useKortixComputerStore();
   const [isCopyingContent, setIsCopyingContent] = useState(false);
@@ -132,6 +135,16 @@ export function FileOperationToolView({
 
   const operation = getOperationType(name);
   const isStrReplace = operation === 'str-replace';
+
+  // Edit results reference the full file before/after by hash; fetch them once the call completes
+  const parsedOutput = typeof output === 'string' ? (() => { try { return JSON.parse(output); } catch { return null; } })() : output;
+  const { data: fileEditVersions } = useFileEditVersions(
+    toolMessage?.thread_id || assistantMessage?.thread_id,
+    parsedOutput?.original_sha256,
+    parsedOutput?.updated_sha256,
+    { enabled: !isStreaming && (isStrReplace || operation === 'edit') }
+  );
+
   const configs = getOperationConfigs();
   const config = configs[operation];
   const OperationIcon = config.icon;
@@ -293,6 +306,11 @@ export function FileOperationToolView({
     }
   }
 
+  // Older results inlined the updated file; newer ones are resolved through useFileEditVersions
+  if (fileEditVersions?.updated_content && !(isStrReplace && newStr)) {
+    fileContent = fileEditVersions.updated_content;
+  }
+
   // Final fallback: For str-replace operations, use newStr as fileContent if we don't have fileContent yet
   if (isStrReplace && !fileContent && newStr) {
     fileContent = newStr;
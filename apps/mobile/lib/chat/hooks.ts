@@ -22,6 +22,7 @@ import type {
   SendMessageInput,
   UnifiedAgentStartResponse,
   ActiveAgentRun,
+  FileEditVersions,
 } from '@/api/types';
 
 // ============================================================================
@@ -36,6 +37,8 @@ export const chatKeys = {
   runs: (threadId: string) => [...chatKeys.thread(threadId), 'runs'] as const,
   run: (threadId: string, runId: string) => [...chatKeys.runs(threadId), runId] as const,
   activeRuns: () => [...chatKeys.all, 'active-runs'] as const,
+  fileEdits: (threadId: string, originalSha256?: string | null, updatedSha256?: string | null) =>
+    [...chatKeys.thread(threadId), 'file-edits', originalSha256 ?? null, updatedSha256 ?? null] as const,
 };
 
 // ============================================================================
@@ -204,6 +207,35 @@ export function useMessages(
   });
 }
 
+/**
+ * Full file contents before/after an edit_file / str_replace call. Edit tool
+ * results carry a diff and the content hashes; versions never change once fetched.
+ */
+export function useFileEditVersions(
+  threadId: string | undefined,
+  originalSha256?: string | null,
+  updatedSha256?: string | null,
+  options?: Omit<UseQueryOptions<FileEditVersions, Error>, 'queryKey' | 'queryFn'>
+) {
+  return useQuery({
+    queryKey: chatKeys.fileEdits(threadId || '', originalSha256, updatedSha256),
+    queryFn: async () => {
+      const headers = await getAuthHeaders();
+      const params = new URLSearchParams();
+      if (originalSha256) params.append('original', originalSha256);
+      if (updatedSha256) params.append('updated', updatedSha256);
+
+      const res = await fetch(`${API_URL}/threads/${threadId}/file-edits?${params.toString()}`, { headers });
+      if (!res.ok) throw new Error(`Failed to fetch file versions: ${res.status}`);
+      return res.json();
+    },
+    enabled: !!threadId && !!(originalSha256 || updatedSha256),
+    staleTime: Infinity,
+    retry: 1,
+    ...options,
+  });
+}
+
 export function useAddMessage(
   options?: UseMutationOptions<Message, Error, { threadId: string; message: string }>
 ) {
@@ -24,6 +24,7 @@ export {
   useDeleteThread,
   useShareThread,
   useMessages,
+  useFileEditVersions,
   useSendMessage,
   useAgentRuns,
   useAgentRun,
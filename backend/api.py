@@ -68,6 +68,7 @@ MAX_CONCURRENT_IPS = 25
 _worker_metrics_task = None
 _memory_watchdog_task = None
 _stream_cleanup_task = None
+_usage_settlement_task = None
 
 # Graceful shutdown flag for health checks
 # When True, health check will return unhealthy to stop receiving traffic
@@ -75,7 +76,7 @@ _is_shutting_down = False
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global _worker_metrics_task, _memory_watchdog_task, _stream_cleanup_task, _is_shutting_down
+    global _worker_metrics_task, _memory_watchdog_task, _stream_cleanup_task, _usage_settlement_task, _is_shutting_down
     env_mode = config.ENV_MODE.value if config.ENV_MODE else "unknown"
     logger.debug(f"Starting up FastAPI application with instance ID: {instance_id} in {env_mode} mode")
     try:
@@ -99,6 +100,10 @@ async def lifespan(app: FastAPI):
         try:
             await redis.initialize_async()
             logger.debug("Redis connection initialized successfully")
+            
+            # L1 runtime cache stays disabled until this pub/sub listener is connected
+            from core.cache.runtime_cache import start_cache_invalidation_listener
+            start_cache_invalidation_listener()
         except Exception as e:
             logger.error(f"Failed to initialize Redis connection: {e}")
             # Continue without Redis - the application will handle Redis failures gracefully
@@ -132,6 +137,11 @@ async def lifespan(app: FastAPI):
         # Start memory watchdog for observability
         _memory_watchdog_task = asyncio.create_task(_memory_watchdog())
         
+        # Start usage ledger settlement (batched credit deductions for LLM usage)
+        if config.USAGE_LEDGER_ENABLED and config.ENV_MODE != EnvMode.LOCAL:
+            from core.billing.credits.usage_ledger import usage_ledger
+            _usage_settlement_task = asyncio.create_task(usage_ledger.run_settlement_worker(consumer=instance_id))
+        
         yield
 
         # Shutdown sequence: Set flag first so health checks fail
@@ -202,6 +212,37 @@ async def lifespan(app: FastAPI):
             except asyncio.CancelledError:
                 pass
         
+        # Stop usage settlement and settle what this instance has already read
+        if _usage_settlement_task is not None:
+            _usage_settlement_task.cancel()
+            try:
+                await _usage_settlement_task
+            except asyncio.CancelledError:
+                pass
+            try:
+                from core.billing.credits.usage_ledger import usage_ledger
+                await usage_ledger.drain(consumer=instance_id)
+            except Exception as e:
+                logger.error(f"Error settling usage ledger on shutdown: {e}")
+        
+        try:
+            from core.cache.runtime_cache import stop_cache_invalidation_listener
+            await stop_cache_invalidation_listener()
+        except Exception as e:
+            logger.error(f"Error stopping cache invalidation listener: {e}")
+        
+        try:
+            from core.tools.utils.mcp_session_pool import mcp_session_pool
+            await mcp_session_pool.close_all()
+        except Exception as e:
+            logger.error(f"Error closing MCP sessions: {e}")
+        
+        try:
+            from core.utils.fast_parse import get_parse_engine
+            get_parse_engine().shutdown()
+        except Exception as e:
+            logger.error(f"Error shutting down parse engine: {e}")
+        
         try:
             logger.debug("Closing Redis connection")
             await redis.close()
@@ -454,6 +495,57 @@ async def redis_health_endpoint():
             }
         )
 
+@api_router.get("/debug/cache", summary="Runtime Cache Statistics", operation_id="runtime_cache_stats", tags=["system"])
+async def runtime_cache_stats_endpoint():
+    """
+    Get runtime cache statistics for this instance.
+    
+    Returns:
+        - l1: in-process LRU state (enabled only while the invalidation listener is connected)
+        - namespaces: per-namespace L1/L2 hits, misses and hit ratios
+        - message_history: incremental message history cache reuse
+        - embeddings: embedding batch sizes and cache hit rates per provider/model
+        - memory_index: in-process memory retrieval index usage
+        - mcp_sessions: pooled MCP client sessions and per-server latency
+        - mcp_schemas: whole-server MCP tool list cache
+        - fast_parse: parse worker pool and content-hash result cache
+        - tool_scheduler: per-tool queue and run times for scheduled tool calls
+        - usage_ledger: recorded and settled LLM usage entries
+        - message_persister: write-behind message inserts, coalesced updates and flushes
+        - prompt_segments: memoized system prompt segments
+        - llm_router: per-deployment TTFT, errors, hedges and fallbacks
+        - tool_results: shared search/scrape tool result cache per upstream
+    """
+    from core.cache.runtime_cache import get_runtime_cache_stats
+    from core.memory.embedding_service import get_embedding_stats
+    from core.memory.vector_index import memory_vector_index
+    from core.tools.utils.mcp_session_pool import mcp_session_pool
+    from core.jit.mcp_schema_cache import mcp_server_schema_cache
+    from core.utils.fast_parse import get_parse_engine
+    from core.agentpress.tool_scheduler import tool_scheduler_stats
+    from core.billing.credits.usage_ledger import usage_ledger
+    from core.agentpress.message_persister import message_persister_stats
+    from core.agentpress.prompt_segments import prompt_segment_cache
+    from core.services.llm_router import llm_router
+    from core.cache.tool_result_cache import tool_result_cache
+    
+    return {
+        **get_runtime_cache_stats(),
+        "embeddings": get_embedding_stats(),
+        "memory_index": memory_vector_index.get_stats(),
+        "mcp_sessions": mcp_session_pool.get_stats(),
+        "mcp_schemas": mcp_server_schema_cache.get_stats(),
+        "fast_parse": get_parse_engine().get_stats(),
+        "tool_scheduler": tool_scheduler_stats.get_stats(),
+        "usage_ledger": usage_ledger.get_stats(),
+        "message_persister": message_persister_stats.get_stats(),
+        "prompt_segments": prompt_segment_cache.get_stats(),
+        "llm_router": llm_router.get_stats(),
+        "tool_results": tool_result_cache.get_stats(),
+        "instance_id": instance_id,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
 @api_router.get("/health-docker", summary="Docker Health Check", operation_id="health_check_docker", tags=["system"])
 async def health_check_docker():
     logger.debug("Health docker check endpoint called")
@@ -0,0 +1,281 @@
+"""
+Budgeted compaction planning for ContextManager.compress_messages.
+
+Compression used to run tier after tier (old tool outputs, user messages,
+assistant messages, secondary passes, omission), re-counting the whole thread
+after each one and recursing when the result was still too large. The planner
+estimates every message once and then picks one action per message:
+
+- keep: unchanged
+- truncate: cut to a prefix (old user/assistant text) or the middle removed
+  (recent messages too large on their own)
+- stub: content replaced by a compressed marker pointing at expand-message
+- omit: the message's whole tool-call group is dropped
+
+Actions are taken in a fixed order of increasing information loss - the same
+order the tiers used - and the planner stops as soon as the estimate fits the
+budget, so a thread that is slightly over target loses only its oldest tool
+outputs. When omitting the next whole group would overshoot the budget, its
+messages are stubbed instead, so the result lands close to the target.
+
+A message cap (the middle-out limit applied after compression) is planned
+first, so no tokens are spent compacting messages that are dropped anyway.
+
+Costs come from an uncalibrated estimate and are scaled by the measured total,
+so the plan is deterministic for a given input and exact count - it does not
+depend on what the process counted before. It is applied in one pass.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+KEEP = "keep"
+TRUNCATE = "truncate"
+STUB = "stub"
+OMIT = "omit"
+
+TRUNCATE_CHARS = 3000
+STUB_MIN_TOKENS = 500
+MIN_GROUPS_TO_KEEP = 5
+MAX_MESSAGE_CHARS = 100000
+
+
+@dataclass
+class PlannedAction:
+    index: int
+    action: str
+    tokens_before: int
+    tokens_after: int
+    content: Any = None  # replacement content for truncate/stub
+
+
+@dataclass
+class CompactionPlan:
+    actions: List[PlannedAction]
+    budget: int
+    tokens_before: int
+    tokens_after: int
+    fixed_tokens: int = 0
+    groups_omitted: int = 0
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def fits(self) -> bool:
+        return self.tokens_after <= self.budget
+
+    def describe(self) -> List[Tuple[int, str, int, int]]:
+        """(index, action, tokens_before, tokens_after) for every message that changes."""
+        return [(a.index, a.action, a.tokens_before, a.tokens_after) for a in self.actions if a.action != KEEP]
+
+    def apply(self, messages: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Build the compacted list in one pass. Returns (kept messages, omitted messages)."""
+        result: List[Dict[str, Any]] = []
+        omitted: List[Dict[str, Any]] = []
+        for msg, planned in zip(messages, self.actions):
+            if planned.action == KEEP:
+                result.append(msg)
+            elif planned.action == OMIT:
+                omitted.append(msg)
+            else:
+                # Copy and only replace content - tool_call_id, tool_calls, name etc. stay intact
+                compacted = msg.copy()
+                compacted['content'] = planned.content
+                result.append(compacted)
+        return result, omitted
+
+
+class CompactionPlanner:
+    """Chooses one compression action per message to bring a thread under a token budget."""
+
+    def __init__(
+        self,
+        context_manager,
+        cost_fn: Callable[[Dict[str, Any]], int],
+        keep_recent_tool_outputs: int = 5,
+        keep_recent_user_messages: int = 10,
+        keep_recent_assistant_messages: int = 10,
+        stub_min_tokens: int = STUB_MIN_TOKENS,
+        truncate_chars: int = TRUNCATE_CHARS,
+        min_groups_to_keep: int = MIN_GROUPS_TO_KEEP,
+        max_messages: Optional[int] = None
+    ):
+        """
+        Args:
+            context_manager: ContextManager providing the tool-call structure helpers
+            cost_fn: Token cost of one message (ContextManager uses the calibrated offline estimate)
+            keep_recent_*: Most recent messages of each kind that are never truncated or stubbed
+            stub_min_tokens: Old user/assistant messages below this are not worth stubbing
+            truncate_chars: Prefix kept when truncating old user/assistant text
+            min_groups_to_keep: Tool-call groups that omission always leaves in place
+            max_messages: Most messages the result may keep (whole groups are omitted, middle-out)
+        """
+        self.context_manager = context_manager
+        self.cost_fn = cost_fn
+        self.keep_recent_tool_outputs = keep_recent_tool_outputs
+        self.keep_recent_user_messages = keep_recent_user_messages
+        self.keep_recent_assistant_messages = keep_recent_assistant_messages
+        self.stub_min_tokens = stub_min_tokens
+        self.truncate_chars = truncate_chars
+        self.min_groups_to_keep = min_groups_to_keep
+        self.max_messages = max_messages
+
+    def plan(
+        self,
+        messages: List[Dict[str, Any]],
+        target_tokens: int,
+        fixed_tokens: int = 0,
+        measured_total: Optional[int] = None
+    ) -> CompactionPlan:
+        """Plan the compaction of `messages` down to `target_tokens`.
+
+        Args:
+            messages: Conversation messages (tool call pairing already valid)
+            target_tokens: Budget for fixed_tokens plus the messages
+            fixed_tokens: Cost of content that cannot be compressed (system prompt)
+            measured_total: Exact count of the same input, if known. The budget is
+                scaled by estimate/measured so estimation error does not leave the
+                result over target.
+        """
+        costs = [self.cost_fn(m) if isinstance(m, dict) else 0 for m in messages]
+        actions = [PlannedAction(i, KEEP, cost, cost) for i, cost in enumerate(costs)]
+        estimated_total = fixed_tokens + sum(costs)
+
+        budget = target_tokens
+        if measured_total and estimated_total:
+            budget = int(target_tokens * estimated_total / measured_total)
+
+        state = {"total": estimated_total, "kept": len(messages)}
+        omission_order = self._omission_order(messages)
+        groups_omitted = 0
+
+        def omit(group: List[int]) -> None:
+            for i in group:
+                state["total"] -= actions[i].tokens_after
+                actions[i].action, actions[i].tokens_after, actions[i].content = OMIT, 0, None
+            state["kept"] -= len(group)
+
+        # 0. Over the message cap: drop middle groups first (middle-out would drop them anyway)
+        if self.max_messages is not None:
+            for group in omission_order:
+                if state["kept"] <= self.max_messages:
+                    break
+                omit(group)
+                groups_omitted += 1
+
+        def replace(index: int, action: str, content: Any) -> None:
+            if state["total"] <= budget:
+                return
+            planned = actions[index]
+            if planned.action == OMIT:
+                return
+            new_cost = self.cost_fn({**messages[index], 'content': content})
+            if new_cost >= planned.tokens_after:
+                return
+            state["total"] -= planned.tokens_after - new_cost
+            planned.action, planned.tokens_after, planned.content = action, new_cost, content
+
+        if state["total"] > budget:
+            tool_positions, user_positions, assistant_positions = self._positions(messages)
+            old_tools = tool_positions[:max(0, len(tool_positions) - self.keep_recent_tool_outputs)]
+            old_users = user_positions[:max(0, len(user_positions) - self.keep_recent_user_messages)]
+            old_assistants = assistant_positions[:max(0, len(assistant_positions) - self.keep_recent_assistant_messages)]
+
+            # 1. Old tool outputs -> stub
+            for i in old_tools:
+                replace(i, STUB, self._tool_stub(messages[i]))
+
+            # 2./3. Old user, then assistant text -> prefix
+            for positions in (old_users, old_assistants):
+                for i in positions:
+                    content = messages[i].get('content')
+                    if isinstance(content, str) and len(content) > self.truncate_chars:
+                        replace(i, TRUNCATE, content[:self.truncate_chars] + "... (truncated)")
+
+            # 4. Old user/assistant messages still large -> stub (oldest first)
+            for i in sorted(old_users + old_assistants):
+                message_id = messages[i].get('message_id')
+                if message_id and actions[i].tokens_after > self.stub_min_tokens:
+                    replace(i, STUB, f"[Content compressed]\n\nmessage_id \"{message_id}\"\nUse expand-message tool to see contents")
+
+            # 5. Recent messages too large on their own -> middle removed
+            old = set(old_tools) | set(old_users) | set(old_assistants)
+            max_chars = min(target_tokens * 2, MAX_MESSAGE_CHARS)
+            for i, msg in enumerate(messages):
+                if i in old or not isinstance(msg, dict):
+                    continue
+                content = msg.get('content')
+                if isinstance(content, (str, dict)):
+                    truncated = self.context_manager.safe_truncate(content, max_chars)
+                    if truncated is not content:
+                        replace(i, TRUNCATE, truncated)
+
+        # 6. Whole tool-call groups, middle-out
+        if state["total"] > budget:
+            for group in omission_order:
+                if state["total"] <= budget:
+                    break
+                if actions[group[0]].action == OMIT:
+                    continue
+                group_tokens = sum(actions[i].tokens_after for i in group)
+                if state["total"] - group_tokens < budget:
+                    # Omitting the whole group overshoots: stub its largest messages instead
+                    for i in sorted(group, key=lambda i: (-actions[i].tokens_after, i)):
+                        if messages[i].get('message_id'):
+                            replace(i, STUB, self._omitted_stub(messages[i]))
+                    if state["total"] <= budget:
+                        break
+                omit(group)
+                groups_omitted += 1
+
+        counts: Dict[str, int] = {}
+        for planned in actions:
+            counts[planned.action] = counts.get(planned.action, 0) + 1
+
+        return CompactionPlan(
+            actions=actions,
+            budget=budget,
+            tokens_before=estimated_total,
+            tokens_after=state["total"],
+            fixed_tokens=fixed_tokens,
+            groups_omitted=groups_omitted,
+            counts=counts,
+        )
+
+    def _positions(self, messages: List[Dict[str, Any]]) -> Tuple[List[int], List[int], List[int]]:
+        tool_positions, user_positions, assistant_positions = [], [], []
+        for i, msg in enumerate(messages):
+            if not isinstance(msg, dict):
+                continue
+            if self.context_manager.is_tool_result_message(msg):
+                tool_positions.append(i)
+            elif msg.get('role') == 'user':
+                user_positions.append(i)
+            elif msg.get('role') == 'assistant':
+                assistant_positions.append(i)
+        return tool_positions, user_positions, assistant_positions
+
+    @staticmethod
+    def _tool_stub(msg: Dict[str, Any]) -> str:
+        message_id = msg.get('message_id', 'unknown')
+        return f"[Tool output compressed for token management] message_id: \"{message_id}\". Use expand-message tool to view full output."
+
+    @staticmethod
+    def _omitted_stub(msg: Dict[str, Any]) -> str:
+        return f"[Message omitted for context management. message_id: \"{msg['message_id']}\". Use expand-message tool to view full content.]"
+
+    def _omission_order(self, messages: List[Dict[str, Any]]) -> List[List[int]]:
+        """Message indices per omittable group, closest to the middle of the thread first.
+
+        The first group (the task) and the most recent min_groups_to_keep - 1 groups are never omitted.
+        """
+        index_of = {id(msg): i for i, msg in enumerate(messages)}
+        groups = [
+            [index_of[id(msg)] for msg in group]
+            for group in self.context_manager.group_messages_by_tool_calls(messages)
+        ]
+        if len(groups) <= self.min_groups_to_keep:
+            return []
+        candidates = list(range(1, len(groups) - (self.min_groups_to_keep - 1)))
+        middle = (len(groups) - 1) / 2
+        candidates.sort(key=lambda g: (abs(g - middle), g))
+        return [groups[g] for g in candidates]
@@ -16,6 +16,8 @@ from core.services.supabase import DBConnection
 from core.utils.logger import logger
 from core.ai_models import model_manager
 from core.agentpress.prompt_caching import apply_anthropic_caching_strategy, supports_prompt_caching
+from core.agentpress.token_accounting import TokenAccountant, token_accountant
+from core.agentpress.compaction_planner import CompactionPlan, CompactionPlanner, STUB_MIN_TOKENS
 
 DEFAULT_TOKEN_THRESHOLD = 120000
 
@@ -52,14 +54,17 @@ def _get_bedrock_client_singleton():
 class ContextManager:
     """Manages thread context including token counting and summarization."""
     
-    def __init__(self, token_threshold: int = DEFAULT_TOKEN_THRESHOLD, db=None):
+    def __init__(self, token_threshold: int = DEFAULT_TOKEN_THRESHOLD, db=None, accountant: Optional[TokenAccountant] = None):
         """Initialize the ContextManager.
         
         Args:
             token_threshold: Token count threshold to trigger summarization
             db: Optional DBConnection instance to reuse (avoids creating new ones)
+            accountant: Token counter/estimator to use (defaults to the process-wide one,
+                whose calibration is shared by every thread in the worker)
         """
         self.db = db if db is not None else DBConnection()
+        self.accountant = accountant if accountant is not None else token_accountant
         self.token_threshold = token_threshold
         # Tool output management
         self.keep_recent_tool_outputs = 5  # Number of recent tool outputs to preserve
@@ -67,6 +72,9 @@ class ContextManager:
         self.compression_target_ratio = 0.6  # Compress to 60% of max tokens (hysteresis)
         self.keep_recent_user_messages = 10  # Number of recent user messages to keep uncompressed
         self.keep_recent_assistant_messages = 10  # Number of recent assistant messages to keep uncompressed
+        self.max_messages = 320  # Middle-out message cap applied after compression
+        # Thread being compressed (set by compress_messages) - used for DB writes and cache invalidation
+        self.thread_id: Optional[str] = None
 
     def _get_anthropic_client(self):
         """Get the singleton Anthropic client."""
@@ -98,6 +106,13 @@ class ContextManager:
         
         if saved_count > 0:
             logger.info(f"💾 Compression save: {saved_count} messages saved")
+            if self.thread_id:
+                # Only the cached suffix starting at the first rewritten message is stale
+                from core.cache.runtime_cache import invalidate_message_history_suffix
+                await invalidate_message_history_suffix(
+                    self.thread_id,
+                    message_ids=[m['message_id'] for m in compressed_messages if m.get('message_id')]
+                )
         
         return saved_count
     
@@ -110,7 +125,9 @@ class ContextManager:
         
         For Anthropic/Claude models: Uses Anthropic's official tokenizer
         For Bedrock models: Uses Bedrock's count_tokens API
-        For other models: Uses LiteLLM's token_counter
+        For other models: Uses LiteLLM's token_counter (per-message, cached by content hash)
+        
+        Every exact count also calibrates the offline estimator (see estimate_tokens).
         
         IMPORTANT: By default, applies caching transformation before counting to match
         the actual token count that will be sent to the API.
@@ -175,7 +192,11 @@ class ContextManager:
                     if system_content:
                         count_params['system'] = system_content
                     
-                    result = client.messages.count_tokens(**count_params)
+                    # Sync SDK call - keep it off the event loop
+                    result = await asyncio.to_thread(client.messages.count_tokens, **count_params)
+                    self.accountant.observe_exact(
+                        model, ([system_to_count] if system_to_count else []) + messages_to_count, result.input_tokens
+                    )
                     return result.input_tokens
             except Exception as e:
                 logger.debug(f"Anthropic token counting failed, falling back to LiteLLM: {e}")
@@ -250,20 +271,33 @@ class ContextManager:
                         input_to_count['system'] = clean_content_for_bedrock(system_to_count.get('content'))
                     
                     # Call Bedrock count_tokens API
-                    response = bedrock_client.count_tokens(
+                    response = await asyncio.to_thread(
+                        bedrock_client.count_tokens,
                         modelId=bedrock_model_id,
                         input={'converse': input_to_count}
                     )
-                    
+                    self.accountant.observe_exact(
+                        model, ([system_to_count] if system_to_count else []) + messages_to_count, response['inputTokens']
+                    )
                     return response['inputTokens']
             except Exception as e:
                 logger.debug(f"Bedrock token counting failed, falling back to LiteLLM: {e}")
         
-        # Fallback to LiteLLM token_counter (wrap in thread pool - CPU-heavy tiktoken operation)
+        # Fallback to LiteLLM token_counter - only messages not counted before hit the tokenizer
         if system_to_count:
-            return await asyncio.to_thread(token_counter, model=model, messages=[system_to_count] + messages_to_count)
+            return await self.accountant.count_messages_exact([system_to_count] + messages_to_count, model)
         else:
-            return await asyncio.to_thread(token_counter, model=model, messages=messages_to_count)
+            return await self.accountant.count_messages_exact(messages_to_count, model)
+
+    def estimate_tokens(self, model: str, messages: List[Dict[str, Any]], system_prompt: Optional[Dict[str, Any]] = None) -> int:
+        """Offline token estimate (no tokenizer or network call), calibrated against count_tokens.
+        
+        Used for compression decisions; cache_control markers are ignored, so there is
+        no need to apply the caching transformation first.
+        """
+        if system_prompt:
+            return self.accountant.estimate_messages([system_prompt] + messages, model)
+        return self.accountant.estimate_messages(messages, model)
 
     async def estimate_token_usage(self, prompt_messages: List[Dict[str, Any]], completion_content: str, model: str) -> Dict[str, Any]:
         """
@@ -1096,7 +1130,7 @@ class ContextManager:
         This allows prompt caching (applied later) to produce cache hits on identical compressed content.
         """
         if uncompressed_total_token_count is None:
-            uncompressed_total_token_count = await self.count_tokens(llm_model, messages)
+            uncompressed_total_token_count = self.estimate_tokens(llm_model, messages)
 
         max_tokens_value = max_tokens or (100 * 1000)
 
@@ -1107,7 +1141,7 @@ class ContextManager:
                     continue  # Skip non-dict messages
                 if self.is_tool_result_message(msg):  # Only compress ToolResult messages
                     _i += 1  # Count the number of ToolResult messages
-                    msg_token_count = token_counter(messages=[msg])  # Count the number of tokens in the message
+                    msg_token_count = self.accountant.estimate_message(msg, llm_model)  # Estimated tokens in the message
                     if msg_token_count > token_threshold:  # If the message is too long
                         if _i > self.keep_recent_tool_outputs:  # If this is not one of the most recent N ToolResult messages
                             message_id = msg.get('message_id')  # Get the message_id
@@ -1126,7 +1160,7 @@ class ContextManager:
         This allows prompt caching (applied later) to produce cache hits on identical compressed content.
         """
         if uncompressed_total_token_count is None:
-            uncompressed_total_token_count = await self.count_tokens(llm_model, messages)
+            uncompressed_total_token_count = self.estimate_tokens(llm_model, messages)
 
         max_tokens_value = max_tokens or (100 * 1000)
 
@@ -1137,7 +1171,7 @@ class ContextManager:
                     continue  # Skip non-dict messages
                 if msg.get('role') == 'user':  # Only compress User messages
                     _i += 1  # Count the number of User messages
-                    msg_token_count = token_counter(messages=[msg])  # Count the number of tokens in the message
+                    msg_token_count = self.accountant.estimate_message(msg, llm_model)  # Estimated tokens in the message
                     if msg_token_count > token_threshold:  # If the message is too long
                         if _i > self.keep_recent_user_messages:  # If this is not one of the most recent N User messages
                             message_id = msg.get('message_id')  # Get the message_id
@@ -1157,7 +1191,7 @@ class ContextManager:
         This allows prompt caching (applied later) to produce cache hits on identical compressed content.
         """
         if uncompressed_total_token_count is None:
-            uncompressed_total_token_count = await self.count_tokens(llm_model, messages)
+            uncompressed_total_token_count = self.estimate_tokens(llm_model, messages)
 
         max_tokens_value = max_tokens or (100 * 1000)
         
@@ -1168,7 +1202,7 @@ class ContextManager:
                     continue  # Skip non-dict messages
                 if msg.get('role') == 'assistant':  # Only compress Assistant messages
                     _i += 1  # Count the number of Assistant messages
-                    msg_token_count = token_counter(messages=[msg])  # Count the number of tokens in the message
+                    msg_token_count = self.accountant.estimate_message(msg, llm_model)  # Estimated tokens in the message
                     if msg_token_count > token_threshold:  # If the message is too long
                         if _i > self.keep_recent_assistant_messages:  # If this is not one of the most recent N Assistant messages
                             message_id = msg.get('message_id')  # Get the message_id
@@ -1212,9 +1246,17 @@ class ContextManager:
     async def compress_messages(self, messages: List[Dict[str, Any]], llm_model: str, max_tokens: Optional[int] = 41000, token_threshold: int = 4096, max_iterations: int = 5, actual_total_tokens: Optional[int] = None, system_prompt: Optional[Dict[str, Any]] = None, thread_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Compress the messages WITHOUT applying caching during iterations.
         
+        Per-message costs are estimated once and a CompactionPlanner picks one action per
+        message (keep, truncate, stub, omit) to reach the target; the plan is applied in a
+        single pass. max_iterations > 0 allows one re-plan if the exact count of the result
+        is still over the limit.
+        
         Caching should be applied ONCE at the end by the caller, not during compression.
         Compressed messages are saved to the database for future reads.
         """
+        if thread_id:
+            self.thread_id = thread_id
+        
         # Capture original content for messages with message_id (for tracking compression)
         original_content_map: Dict[str, Any] = {}
         for msg in messages:
@@ -1249,6 +1291,9 @@ class ContextManager:
             # Count conversation + system prompt WITH caching (to match API reality)
             uncompressed_total_token_count = await self.count_tokens(llm_model, result, system_prompt, apply_caching=True)
             logger.info(f"Initial token count (with caching): {uncompressed_total_token_count}")
+        
+        # Planning uses the offline estimate scaled to the measured count; the result
+        # is checked with one exact count once the plan is applied.
 
         # Calculate target tokens (hysteresis: compress to 60% of max to avoid repeated compressions)
         target_tokens = int(max_tokens * self.compression_target_ratio)
@@ -1257,88 +1302,26 @@ class ContextManager:
         # Check if we're already under threshold - no compression needed!
         if uncompressed_total_token_count <= max_tokens:
             logger.info(f"✅ Token count ({uncompressed_total_token_count}) under threshold ({max_tokens}), skipping compression")
-            return await self.middle_out_messages(result)
+            return await self.middle_out_messages(result, max_messages=self.max_messages)
         
-        # PRIMARY STRATEGY: Remove old tool outputs if over threshold
-        if uncompressed_total_token_count > max_tokens:
-            logger.info(f"Context over limit ({uncompressed_total_token_count} > {max_tokens}), starting tiered compression...")
-            
-            # Tier 1: Compress old tool outputs in-memory
-            result = self.remove_old_tool_outputs(result, keep_last_n=self.keep_recent_tool_outputs)
-            
-            # Recalculate WITH caching
-            current_token_count = await self.count_tokens(llm_model, result, system_prompt, apply_caching=True)
-            
-            logger.info(f"After tool compression: {uncompressed_total_token_count} -> {current_token_count} tokens")
-            
-            # Tier 2: Compress user messages if still above target
-            if current_token_count > target_tokens:
-                logger.info(f"Still above target ({current_token_count} > {target_tokens}), compressing user messages...")
-                
-                # Compress in-memory for this request
-                result = self.compress_user_messages_in_memory(result, keep_last_n=self.keep_recent_user_messages)
-                
-                # Recalculate with in-memory compressed messages WITH caching
-                current_token_count = await self.count_tokens(llm_model, result, system_prompt, apply_caching=True)
-                logger.info(f"After user compression: {current_token_count} tokens")
-            
-            # Tier 3: Compress assistant messages if still above target
-            if current_token_count > target_tokens:
-                logger.info(f"Still above target ({current_token_count} > {target_tokens}), compressing assistant messages...")
-                
-                # Compress in-memory for this request
-                result = self.compress_assistant_messages_in_memory(result, keep_last_n=self.keep_recent_assistant_messages)
-                
-                # Recalculate with in-memory compressed messages WITH caching
-                current_token_count = await self.count_tokens(llm_model, result, system_prompt, apply_caching=True)
-                logger.info(f"After assistant compression: {current_token_count} tokens")
-            
-            logger.info(f"Tiered compression complete: {uncompressed_total_token_count} -> {current_token_count} tokens (target: {target_tokens})")
-            uncompressed_total_token_count = current_token_count
-
-        # SECONDARY STRATEGY: Apply compression to remaining messages if still above target
-        # Use target_tokens as threshold to ensure we reach hysteresis goal
-        if uncompressed_total_token_count > target_tokens:
-            logger.info(f"Applying secondary compression to reach target ({uncompressed_total_token_count} > {target_tokens})")
-            # Use lower token_threshold (500) to compress more messages, including smaller ones
-            aggressive_threshold = 500  
-            result = await self.compress_tool_result_messages(result, llm_model, target_tokens, aggressive_threshold, uncompressed_total_token_count)
-            result = await self.compress_user_messages(result, llm_model, target_tokens, aggressive_threshold, uncompressed_total_token_count)
-            result = await self.compress_assistant_messages(result, llm_model, target_tokens, aggressive_threshold, uncompressed_total_token_count)
-        else:
-            # Still run with original max_tokens in case there's any remaining content to compress
-            result = await self.compress_tool_result_messages(result, llm_model, max_tokens, token_threshold, uncompressed_total_token_count)
-            result = await self.compress_user_messages(result, llm_model, max_tokens, token_threshold, uncompressed_total_token_count)
-            result = await self.compress_assistant_messages(result, llm_model, max_tokens, token_threshold, uncompressed_total_token_count)
-
-        # Recalculate WITH caching (to match API reality)
-        compressed_total = await self.count_tokens(llm_model, result, system_prompt, apply_caching=True)
+        logger.info(f"Context over limit ({uncompressed_total_token_count} > {max_tokens}), planning compaction...")
         
-        if compressed_total != uncompressed_total_token_count:
-            logger.info(f"Context compression: {uncompressed_total_token_count} -> {compressed_total} tokens (saved {uncompressed_total_token_count - compressed_total})")
-        else:
-            logger.info(f"Context compression: {compressed_total} tokens (no compression needed, under threshold)")
-
-        # Recurse if still too large
-        if max_iterations <= 0:
-            logger.warning(f"Max iterations reached, omitting messages to target ({target_tokens})")
-            result = await self.compress_messages_by_omitting_messages(result, llm_model, target_tokens, system_prompt=system_prompt)
-            compressed_total = await self.count_tokens(llm_model, result, system_prompt, apply_caching=True)
-            # Fall through to last_usage update
-        elif compressed_total > max_tokens:
+        is_valid, orphaned_ids, unanswered_ids = self.validate_tool_call_pairing(result)
+        if not is_valid:
+            logger.warning(f"⚠️ Input to compress_messages has pairing issues (orphaned: {len(orphaned_ids)}, unanswered: {len(unanswered_ids)}) - repairing first")
+            result = self.repair_tool_call_pairing(result)
+        
+        # One plan over per-message estimates, applied in one pass, checked with one exact count
+        result, compressed_total = await self._compact_with_plan(
+            result, llm_model, target_tokens, uncompressed_total_token_count, system_prompt, token_threshold
+        )
+        
+        if compressed_total > max_tokens and max_iterations > 0:
+            # The estimate undershot the real count - plan again against the measured total
             logger.warning(f"Further compression needed: {compressed_total} > {max_tokens}")
-            # Recursive call - will handle its own last_usage update
-            return await self.compress_messages(
-                result, llm_model, max_tokens, 
-                token_threshold // 2, max_iterations - 1, 
-                compressed_total, system_prompt, thread_id=thread_id
+            result, compressed_total = await self._compact_with_plan(
+                result, llm_model, target_tokens, compressed_total, system_prompt, token_threshold
             )
-        elif compressed_total > target_tokens:
-            # Still over target but under max_tokens - use omit_messages to reach target
-            logger.info(f"Secondary compression didn't reach target ({compressed_total} > {target_tokens}). Using message omission to reach target.")
-            result = await self.compress_messages_by_omitting_messages(result, llm_model, target_tokens, system_prompt=system_prompt)
-            compressed_total = await self.count_tokens(llm_model, result, system_prompt, apply_caching=True)
-            logger.info(f"After message omission to target: {compressed_total} tokens")
 
         logger.info(f"✨ Final compression complete: {compressed_total} tokens (target: {target_tokens}, max: {max_tokens})")
         
@@ -1367,8 +1350,112 @@ class ContextManager:
             except Exception as e:
                 logger.warning(f"Failed to save compressed messages: {e}")
         
-        return await self.middle_out_messages(result)
+        return await self.middle_out_messages(result, max_messages=self.max_messages)
     
+    def plan_compaction(
+        self,
+        messages: List[Dict[str, Any]],
+        llm_model: str,
+        target_tokens: int,
+        system_prompt: Optional[Dict[str, Any]] = None,
+        measured_total: Optional[int] = None,
+        token_threshold: int = STUB_MIN_TOKENS
+    ) -> CompactionPlan:
+        """Plan the compaction of messages to target_tokens without applying it.
+        
+        Args:
+            messages: Conversation messages (tool call pairing valid)
+            llm_model: Model being compacted for
+            target_tokens: Token budget including the system prompt
+            system_prompt: Optional system prompt (counted, never compressed)
+            measured_total: Exact count of the same input, if known
+            token_threshold: Old user/assistant messages above this many tokens may be stubbed
+        
+        Messages are priced with the uncalibrated estimate and the budget is scaled by
+        measured_total, so the plan does not depend on earlier counts in this process.
+        """
+        planner = CompactionPlanner(
+            self,
+            cost_fn=self.accountant.estimate_message_uncalibrated,
+            keep_recent_tool_outputs=self.keep_recent_tool_outputs,
+            keep_recent_user_messages=self.keep_recent_user_messages,
+            keep_recent_assistant_messages=self.keep_recent_assistant_messages,
+            stub_min_tokens=min(token_threshold, STUB_MIN_TOKENS),
+            max_messages=self.max_messages
+        )
+        system_tokens = self.accountant.estimate_message_uncalibrated(system_prompt) if system_prompt else 0
+        return planner.plan(messages, target_tokens, fixed_tokens=system_tokens, measured_total=measured_total)
+
+    async def _compact_with_plan(
+        self,
+        messages: List[Dict[str, Any]],
+        llm_model: str,
+        target_tokens: int,
+        measured_total: int,
+        system_prompt: Optional[Dict[str, Any]],
+        token_threshold: int
+    ) -> tuple[List[Dict[str, Any]], int]:
+        """Plan, apply and exactly count one compaction. Returns (messages, exact token count)."""
+        plan = self.plan_compaction(messages, llm_model, target_tokens, system_prompt, measured_total, token_threshold)
+        logger.info(f"Compaction plan: {plan.counts} ({plan.groups_omitted} groups omitted), "
+                    f"estimate {plan.tokens_before} -> {plan.tokens_after} (budget {plan.budget})")
+        
+        result, omitted = plan.apply(messages)
+        if omitted:
+            is_valid, orphaned_ids, unanswered_ids = self.validate_tool_call_pairing(result)
+            if not is_valid:
+                logger.warning(f"⚠️ Post-compaction validation found pairing issues (orphaned: {len(orphaned_ids)}, unanswered: {len(unanswered_ids)}) - repairing")
+                result = self.repair_tool_call_pairing(result)
+            await self._save_omitted_messages(omitted)
+        
+        compressed_total = await self.count_tokens(llm_model, result, system_prompt, apply_caching=True)
+        logger.info(f"Context compression: {measured_total} -> {compressed_total} tokens (saved {measured_total - compressed_total})")
+        return result, compressed_total
+
+    async def _save_omitted_messages(self, omitted_messages: List[Dict[str, Any]]) -> None:
+        """Save omitted messages with placeholder content so they're read as omitted next time."""
+        omitted_to_save: List[Dict[str, Any]] = []
+        for msg in omitted_messages:
+            message_id = msg.get('message_id')
+            if message_id:
+                # Create placeholder content preserving message structure
+                placeholder_msg = {
+                    'role': msg.get('role', 'user'),
+                    'content': f"[Message omitted for context management. message_id: \"{message_id}\". Use expand-message tool to view full content.]"
+                }
+                # Preserve tool_call_id for tool messages
+                if msg.get('tool_call_id'):
+                    placeholder_msg['tool_call_id'] = msg['tool_call_id']
+                # Preserve tool_calls for assistant messages (critical for pairing validation)
+                if msg.get('tool_calls'):
+                    placeholder_msg['tool_calls'] = msg['tool_calls']
+                
+                omitted_to_save.append({
+                    'message_id': message_id,
+                    'compressed_content': json.dumps(placeholder_msg),
+                    'is_omission': True  # Mark as omission so it can override compression
+                })
+        
+        if not omitted_to_save:
+            return
+        
+        try:
+            await self.save_compressed_messages(omitted_to_save)
+            
+            # Also mark any tool results belonging to omitted assistant messages
+            omitted_tool_call_ids = [
+                tc.get('id')
+                for msg in omitted_messages if msg.get('tool_calls')
+                for tc in msg['tool_calls'] if tc.get('id')
+            ]
+            if omitted_tool_call_ids and self.thread_id:
+                from core.threads import repo as threads_repo
+                marked_count = await threads_repo.mark_tool_results_as_omitted(self.thread_id, omitted_tool_call_ids)
+                if marked_count > 0:
+                    logger.info(f"📝 Also marked {marked_count} orphaned tool results as omitted")
+        except Exception as e:
+            logger.warning(f"Failed to save omitted messages: {e}")
+
     async def compress_messages_by_omitting_messages(
             self, 
             messages: List[Dict[str, Any]], 
@@ -1397,8 +1484,8 @@ class ContextManager:
         result = messages
         result = self.remove_meta_messages(result)
 
-        # Early exit if no compression needed - WITH caching
-        initial_token_count = await self.count_tokens(llm_model, result, system_prompt, apply_caching=True)
+        # Early exit if no compression needed (offline estimate)
+        initial_token_count = self.estimate_tokens(llm_model, result, system_prompt)
         
         max_allowed_tokens = max_tokens or (100 * 1000)
         
@@ -1459,57 +1546,12 @@ class ContextManager:
             # Flatten groups back to messages for token counting
             conversation_messages = self.flatten_message_groups(message_groups)
             
-            # Recalculate token count WITH caching
-            current_token_count = await self.count_tokens(llm_model, conversation_messages, system_message, apply_caching=True)
+            # Re-estimate per iteration (offline); the final count below is exact
+            current_token_count = self.estimate_tokens(llm_model, conversation_messages, system_message)
 
         # Save omitted messages with placeholder content so they're read as compressed next time
         if all_omitted_messages:
-            omitted_to_save: List[Dict[str, Any]] = []
-            for msg in all_omitted_messages:
-                message_id = msg.get('message_id')
-                if message_id:
-                    # Create placeholder content preserving message structure
-                    placeholder_msg = {
-                        'role': msg.get('role', 'user'),
-                        'content': f"[Message omitted for context management. message_id: \"{message_id}\". Use expand-message tool to view full content.]"
-                    }
-                    # Preserve tool_call_id for tool messages
-                    if msg.get('tool_call_id'):
-                        placeholder_msg['tool_call_id'] = msg['tool_call_id']
-                    # Preserve tool_calls for assistant messages (critical for pairing validation)
-                    if msg.get('tool_calls'):
-                        placeholder_msg['tool_calls'] = msg['tool_calls']
-                    
-                    omitted_to_save.append({
-                        'message_id': message_id,
-                        'compressed_content': json.dumps(placeholder_msg),
-                        'is_omission': True  # Mark as omission so it can override compression
-                    })
-            
-            if omitted_to_save:
-                try:
-                    await self.save_compressed_messages(omitted_to_save)
-                    
-                    # Also mark any tool results belonging to omitted assistant messages
-                    # This handles the case where tool results were compressed separately
-                    omitted_tool_call_ids = []
-                    for msg in all_omitted_messages:
-                        if msg.get('tool_calls'):
-                            for tc in msg['tool_calls']:
-                                tc_id = tc.get('id')
-                                if tc_id:
-                                    omitted_tool_call_ids.append(tc_id)
-                    
-                    if omitted_tool_call_ids and self.thread_id:
-                        from core.threads import repo as threads_repo
-                        marked_count = await threads_repo.mark_tool_results_as_omitted(
-                            self.thread_id, 
-                            omitted_tool_call_ids
-                        )
-                        if marked_count > 0:
-                            logger.info(f"📝 Also marked {marked_count} orphaned tool results as omitted")
-                except Exception as e:
-                    logger.warning(f"Failed to save omitted messages: {e}")
+            await self._save_omitted_messages(all_omitted_messages)
 
         # Flatten final groups to messages
         final_messages = self.flatten_message_groups(message_groups)
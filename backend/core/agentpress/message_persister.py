@@ -0,0 +1,315 @@
+"""
+Write-behind persistence for messages written while a turn streams.
+
+During a streamed turn every finished tool used to rewrite the whole partial
+assistant message (accumulated content plus all tool calls) and insert its tool
+result row, each as its own DB write under the thread lock. Now both are queued
+here and written together:
+
+- updates are coalesced per message_id - only the latest content/metadata of a
+  row is written, however many tools finished in the window
+- new rows (tool results) get a client-side message_id and created_at and are
+  written in one multi-row INSERT ... ON CONFLICT (message_id) DO NOTHING
+
+A flush runs FLUSH_DELAY_SECONDS after the first queued write, and the response
+processor flushes explicitly at turn end and before anything that needs the rows
+in the DB (history reads, the final assistant update, image contexts). A failed
+flush keeps its writes queued for the next one; re-sent inserts are no-ops.
+Retries back off exponentially (capped at MAX_RETRY_DELAY_SECONDS); after
+MAX_FLUSH_FAILURES consecutive failures the persister stops retrying on its own,
+sets `error`, and explicit flushes raise it so the run fails instead of silently
+streaming on with unsaved rows.
+
+Ordering. Like insert_message, queued rows take created_at from this process's
+clock when queued, not from the database when written, so the message_id and
+created_at handed to the client are final; only the row itself appears later (up
+to FLUSH_DELAY_SECONDS, longer while retrying). Readers in this run flush first;
+anything else that looks a queued id up (e.g. a status row's
+linked_tool_result_message_id) may briefly not find it. Within a run, queued rows
+get strictly increasing created_at, later than every row passed to track(), so a
+tool result never sorts before the assistant message that called it, even if the
+clock steps back.
+
+A queued row commits long after its created_at, so the message history cache's
+overlap window (MESSAGE_HISTORY_OVERLAP) does not cover it. Instead every flush
+attempt, failed or not, invalidates each thread's cached history from the
+earliest created_at it wrote (or may have written), after the write, and readers
+that raced it cannot store what they read.
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from core.utils.logger import logger
+
+FLUSH_DELAY_SECONDS = 2.0
+MAX_FLUSH_FAILURES = 5
+MAX_RETRY_DELAY_SECONDS = 30.0
+
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    # Rows from the DB layer may carry created_at as an ISO string
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+class MessagePersistenceError(Exception):
+    """Queued message writes could not be persisted after repeated flushes."""
+    pass
+
+
+class MessagePersisterStats:
+    """Process-wide write-behind counters."""
+
+    def __init__(self):
+        self._stats = {
+            "queued_inserts": 0,
+            "queued_updates": 0,
+            "coalesced_updates": 0,
+            "flushes": 0,
+            "rows_inserted": 0,
+            "rows_updated": 0,
+            "failed_flushes": 0,
+            "abandoned_retries": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    def incr(self, key: str, amount: int = 1):
+        self._stats[key] += amount
+
+    def set_last_flush(self, seconds: float):
+        self._stats["last_flush_ms"] = round(seconds * 1000, 1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self._stats)
+
+
+message_persister_stats = MessagePersisterStats()
+
+
+class MessagePersister:
+    """Buffers message inserts and in-place updates for one agent run."""
+
+    def __init__(self, flush_delay: float = FLUSH_DELAY_SECONDS):
+        self.flush_delay = flush_delay
+        self._inserts: Dict[str, Dict[str, Any]] = {}
+        self._updates: Dict[str, Dict[str, Any]] = {}
+        # Latest known state of rows that may still be updated (placeholder assistant messages)
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._failures = 0  # consecutive failed flushes
+        self.error: Optional[MessagePersistenceError] = None
+        self._last_created_at: Optional[datetime] = None
+
+    def _next_created_at(self) -> datetime:
+        now = datetime.now(timezone.utc)
+        if self._last_created_at is not None and now <= self._last_created_at:
+            now = self._last_created_at + timedelta(microseconds=1)
+        self._last_created_at = now
+        return now
+
+    def track(self, message: Optional[Dict[str, Any]]) -> None:
+        """Remember a row written elsewhere so later updates can return its full state."""
+        if message and message.get("message_id"):
+            self._rows[str(message["message_id"])] = dict(message)
+            created_at = _as_datetime(message.get("created_at"))
+            if created_at is not None and (self._last_created_at is None or created_at > self._last_created_at):
+                self._last_created_at = created_at
+
+    def insert(
+        self,
+        thread_id: str,
+        type: str,
+        content: Any,
+        is_llm_message: bool = False,
+        metadata: Optional[Dict[str, Any]] = None,
+        agent_id: Optional[str] = None,
+        agent_version_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Queue a new message row. Returns the row as it will read once flushed (see Ordering above)."""
+        now = self._next_created_at()
+        row = {
+            "message_id": str(uuid.uuid4()),
+            "thread_id": thread_id,
+            "type": type,
+            "content": content,
+            "is_llm_message": is_llm_message,
+            "metadata": metadata or {},
+            "agent_id": agent_id,
+            "agent_version_id": agent_version_id,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self._inserts[row["message_id"]] = row
+        message_persister_stats.incr("queued_inserts")
+        self._schedule_flush()
+        return dict(row)
+
+    def update(
+        self,
+        message_id: str,
+        thread_id: str,
+        content: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Queue a content (and metadata) rewrite, replacing any queued one for the row."""
+        message_id = str(message_id)
+        now = datetime.now(timezone.utc)
+        row = self._rows.get(message_id) or {"message_id": message_id, "thread_id": thread_id}
+        row = {**row, "content": content, "updated_at": now}
+        if metadata is not None:
+            row["metadata"] = metadata
+        self._rows[message_id] = row
+
+        pending_insert = self._inserts.get(message_id)
+        if pending_insert is not None:
+            # Not written yet - the insert carries the new state
+            pending_insert["content"] = content
+            if metadata is not None:
+                pending_insert["metadata"] = metadata
+            message_persister_stats.incr("coalesced_updates")
+        else:
+            if message_id in self._updates:
+                message_persister_stats.incr("coalesced_updates")
+            self._updates[message_id] = {
+                "thread_id": thread_id,
+                "content": content,
+                "metadata": metadata,
+                "created_at": row.get("created_at"),
+            }
+            message_persister_stats.incr("queued_updates")
+            self._schedule_flush()
+        return dict(row)
+
+    def discard_update(self, message_id: str) -> None:
+        """Drop a queued update that the caller is about to supersede with a direct write."""
+        message_id = str(message_id)
+        if self._updates.pop(message_id, None) is not None:
+            message_persister_stats.incr("coalesced_updates")
+        self._rows.pop(message_id, None)
+
+    def mark_llm_visible(self, message_ids: List[str]) -> List[str]:
+        """Flag queued rows is_llm_message=True before they are written.
+
+        Returns the ids that are not queued (already written), which still need an UPDATE.
+        """
+        already_written = []
+        for message_id in message_ids:
+            pending_insert = self._inserts.get(str(message_id))
+            if pending_insert is not None:
+                pending_insert["is_llm_message"] = True
+            else:
+                already_written.append(message_id)
+        return already_written
+
+    def has_pending(self) -> bool:
+        return bool(self._inserts or self._updates)
+
+    def _schedule_flush(self) -> None:
+        if self.error is not None:
+            # Retries gave up; only an explicit flush tries again
+            return
+        if self._flush_task is None or self._flush_task.done():
+            delay = min(self.flush_delay * 2 ** self._failures, max(self.flush_delay, MAX_RETRY_DELAY_SECONDS))
+            self._flush_task = asyncio.create_task(self._flush_after_delay(delay))
+
+    async def _flush_after_delay(self, delay: float) -> None:
+        try:
+            await asyncio.sleep(delay)
+            # Writes queued during the flush (or kept after a failure) get a new timer
+            self._flush_task = None
+            await self._flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[MESSAGE_PERSISTER] Delayed flush failed: {e}")
+
+    async def flush(self) -> None:
+        """Write everything queued so far: one batched INSERT plus one UPDATE per updated row.
+
+        Raises MessagePersistenceError once MAX_FLUSH_FAILURES consecutive flushes
+        have failed (the writes stay queued).
+        """
+        await self._flush()
+        if self.error is not None:
+            raise self.error
+
+    async def _flush(self) -> None:
+        from core.threads import repo as threads_repo
+        from core.cache.runtime_cache import invalidate_message_history_suffix
+
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            # An explicit flush makes the pending timer redundant
+            self._flush_task.cancel()
+            self._flush_task = None
+
+        async with self._flush_lock:
+            if not self.has_pending():
+                return
+            inserts, self._inserts = self._inserts, {}
+            updates, self._updates = self._updates, {}
+            start = time.monotonic()
+            failed = False
+            # thread_id -> (attempted message ids, earliest created_at)
+            written: Dict[str, List[Any]] = {}
+
+            def note_written(thread_id: str, message_id: str, created_at: Any):
+                created_at = _as_datetime(created_at)
+                ids, since = written.setdefault(thread_id, [[], None])
+                ids.append(message_id)
+                if created_at is not None and (since is None or created_at < since):
+                    written[thread_id][1] = created_at
+
+            if inserts:
+                # A failed insert may still have committed, so its rows are invalidated too
+                for row in inserts.values():
+                    note_written(row["thread_id"], row["message_id"], row["created_at"])
+                try:
+                    inserted = await threads_repo.insert_messages_batch(list(inserts.values()))
+                    message_persister_stats.incr("rows_inserted", inserted)
+                except Exception as e:
+                    failed = True
+                    logger.error(f"[MESSAGE_PERSISTER] Batch insert of {len(inserts)} messages failed, keeping them queued: {e}")
+                    for message_id, row in inserts.items():
+                        self._inserts.setdefault(message_id, row)
+
+            for message_id, pending in updates.items():
+                note_written(pending["thread_id"], message_id, pending["created_at"])
+                try:
+                    await threads_repo.update_message_content(message_id, pending["content"], pending["metadata"])
+                    message_persister_stats.incr("rows_updated")
+                except Exception as e:
+                    failed = True
+                    logger.error(f"[MESSAGE_PERSISTER] Update of message {message_id} failed, keeping it queued: {e}")
+                    # A newer update queued meanwhile wins
+                    self._updates.setdefault(message_id, pending)
+
+            for thread_id, (message_ids, since) in written.items():
+                try:
+                    await invalidate_message_history_suffix(thread_id, message_ids=message_ids, since=since)
+                except Exception as e:
+                    logger.warning(f"[MESSAGE_PERSISTER] History invalidation for {thread_id} failed: {e}")
+
+            message_persister_stats.incr("flushes")
+            message_persister_stats.set_last_flush(time.monotonic() - start)
+            if failed:
+                message_persister_stats.incr("failed_flushes")
+                self._failures += 1
+                if self._failures >= MAX_FLUSH_FAILURES and self.error is None:
+                    message_persister_stats.incr("abandoned_retries")
+                    self.error = MessagePersistenceError(
+                        f"Could not save {len(self._inserts)} messages and {len(self._updates)} message updates "
+                        f"after {self._failures} attempts"
+                    )
+                    logger.error(f"[MESSAGE_PERSISTER] Giving up automatic retries: {self.error}")
+                self._schedule_flush()
+            else:
+                self._failures = 0
+                self.error = None
+            logger.debug(f"[MESSAGE_PERSISTER] Flushed {len(inserts)} inserts and {len(updates)} updates "
+                         f"in {(time.monotonic() - start) * 1000:.1f}ms")
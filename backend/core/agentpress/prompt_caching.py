@@ -17,13 +17,14 @@ Dynamic Thresholds (scales with conversation length):
 - Enforces bounds: min 1024 tokens, max 15% of context
 
 Technical Features:
-- Accurate token counting using LiteLLM's model-specific tokenizers
+- Cached, calibrated token estimates (core/agentpress/token_accounting.py)
 - Strategic 4-block distribution with automatic cache management
 - Fixed-size chunks prevent cache invalidation
 - Cost-benefit analysis for optimal caching strategy
 
 Cache Strategy:
-1. Block 1: System prompt (cached if ≥1024 tokens)
+1. Block 1: System prompt (cached if ≥1024 tokens); a segmented prompt is
+   cached up to the end of its stable prefix (see prompt_segments.py)
 2. Blocks 2-4: Adaptive conversation chunks with automatic management
 3. Early aggressive caching for quick wins
 4. Late conservative caching to preserve blocks
@@ -37,6 +38,7 @@ Based on Anthropic documentation and mathematical optimization (Sept 2025).
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
 from core.utils.logger import logger
+from core.agentpress.prompt_segments import CACHE_BREAKPOINTS_KEY, split_at_breakpoints
 
 
 async def get_stored_threshold(thread_id: str, model: str, client=None) -> Optional[Dict[str, Any]]:
@@ -139,24 +141,18 @@ def estimate_token_count(text: str, model: str = "claude-3-5-sonnet-20240620") -
         return int(word_count * 1.3)
 
 def get_message_token_count(message: Dict[str, Any], model: str = "claude-3-5-sonnet-20240620") -> int:
-    """Get estimated token count for a message, including base64 image data."""
-    content = message.get('content', '')
-    if isinstance(content, list):
-        total_tokens = 0
-        for item in content:
-            if isinstance(item, dict):
-                if item.get('type') == 'text':
-                    total_tokens += estimate_token_count(item.get('text', ''), model)
-                elif item.get('type') == 'image_url':
-                    # Count image_url tokens - base64 data is very token-heavy
-                    image_url = item.get('image_url', {}).get('url', '')
-                    total_tokens += estimate_token_count(image_url, model)
-        return total_tokens
-    return estimate_token_count(str(content), model)
+    """Get estimated token count for a message, including base64 image data.
+    
+    Uses the calibrated offline estimator (cached per message content hash), so
+    threshold and chunking decisions never call a tokenizer.
+    """
+    from core.agentpress.token_accounting import token_accountant
+    return token_accountant.estimate_message(message, model)
 
 def get_messages_token_count(messages: List[Dict[str, Any]], model: str = "claude-3-5-sonnet-20240620") -> int:
     """Get total token count for a list of messages."""
-    return sum(get_message_token_count(msg, model) for msg in messages)
+    from core.agentpress.token_accounting import token_accountant
+    return token_accountant.estimate_messages(messages, model)
 
 def calculate_optimal_cache_threshold(
     context_window: int, 
@@ -353,9 +349,8 @@ async def apply_anthropic_caching_strategy(
     # Calculate mathematically optimized cache threshold
     if cache_threshold_tokens is None or should_recalculate:
         # Include system prompt tokens in calculation for accurate density (like compression does)
-        # Use token_counter on combined messages to match compression's calculation method
-        from litellm import token_counter
-        total_tokens = token_counter(model=model_name, messages=[working_system_prompt] + conversation_messages) if conversation_messages else 0
+        # Same calibrated offline estimate compression decisions use - no tokenizer pass
+        total_tokens = get_messages_token_count([working_system_prompt] + conversation_messages, model_name) if conversation_messages else 0
         
         cache_threshold_tokens = calculate_optimal_cache_threshold(
             context_window_tokens, 
@@ -389,7 +384,20 @@ async def apply_anthropic_caching_strategy(
         system_prompt_tokens = get_message_token_count(working_system_prompt, model_name)
         logger.debug(f"Calculated system prompt tokens: {system_prompt_tokens}")
     
-    if system_prompt_tokens >= 1024:  # Anthropic's minimum cacheable size
+    system_parts = split_at_breakpoints(working_system_prompt)
+    stable_prefix_tokens = get_message_token_count({'role': 'system', 'content': system_parts[0]}, model_name) if system_parts else 0
+    
+    if system_parts and stable_prefix_tokens >= 1024:
+        # Segmented prompt: break after the stable prefix so a new date or user
+        # (the volatile tail) still reads the prefix from cache
+        cached_system = {k: v for k, v in working_system_prompt.items() if k != CACHE_BREAKPOINTS_KEY}
+        cached_system['content'] = [
+            {"type": "text", "text": system_parts[0], "cache_control": {"type": "ephemeral"}}
+        ] + [{"type": "text", "text": part} for part in system_parts[1:]]
+        prepared_messages.append(cached_system)
+        logger.info(f"🔥 Block 1: Cached system prompt stable prefix ({stable_prefix_tokens} of {system_prompt_tokens} tokens)")
+        blocks_used = 1
+    elif system_prompt_tokens >= 1024:  # Anthropic's minimum cacheable size
         cached_system = add_cache_control(working_system_prompt)
         prepared_messages.append(cached_system)
         logger.info(f"🔥 Block 1: Cached system prompt ({system_prompt_tokens} tokens)")
@@ -0,0 +1,164 @@
+"""
+Segmented system prompt assembly.
+
+The system prompt is built from named segments (core prompt and tool guides,
+MCP tool info, XML tool instructions, knowledge base, user context, date/time).
+Each segment is either stable - identical for every run of the same agent
+version, tool set, MCP config and KB - or volatile (per user, per day). Stable
+segments always come first, so the prefix up to the last stable segment is
+byte-identical across runs and users and can be served from Anthropic's prompt
+cache even when the date or the user changes.
+
+Segments are memoized in-process by a content fingerprint of their inputs, so
+rebuilding a segment whose inputs are unchanged is a dict lookup.
+
+The system message carries the end offset of the stable prefix under
+`cache_breakpoints`; apply_anthropic_caching_strategy splits the content there
+and puts the cache breakpoint on the stable block. The key is internal and
+stripped before the LLM call.
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+CACHE_BREAKPOINTS_KEY = "cache_breakpoints"
+MAX_CACHED_SEGMENTS = 512
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable digest of a segment's inputs."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+@dataclass
+class PromptSegment:
+    name: str
+    text: str
+    volatile: bool = False
+
+
+class SegmentedPrompt:
+    """Ordered prompt segments; stable ones are kept ahead of volatile ones."""
+
+    def __init__(self, segments: Optional[List[PromptSegment]] = None):
+        self.segments: List[PromptSegment] = []
+        for segment in segments or []:
+            self.add(segment)
+
+    def add(self, segment: PromptSegment) -> None:
+        if not segment.text:
+            return
+        if segment.volatile:
+            self.segments.append(segment)
+            return
+        # Stable segments go before the first volatile one
+        position = next((i for i, s in enumerate(self.segments) if s.volatile), len(self.segments))
+        self.segments.insert(position, segment)
+
+    @property
+    def text(self) -> str:
+        return "".join(segment.text for segment in self.segments)
+
+    @property
+    def stable_prefix(self) -> str:
+        return "".join(segment.text for segment in self.segments if not segment.volatile)
+
+    def boundaries(self) -> List[int]:
+        """End offset of every segment in `text`."""
+        offsets, position = [], 0
+        for segment in self.segments:
+            position += len(segment.text)
+            offsets.append(position)
+        return offsets
+
+    def to_message(self) -> Dict[str, Any]:
+        """System message with the stable prefix end as its cache breakpoint."""
+        message: Dict[str, Any] = {"role": "system", "content": self.text}
+        stable_end = len(self.stable_prefix)
+        if 0 < stable_end < len(message["content"]):
+            message[CACHE_BREAKPOINTS_KEY] = [stable_end]
+        return message
+
+    def describe(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": s.name, "chars": len(s.text), "volatile": s.volatile}
+            for s in self.segments
+        ]
+
+
+def split_at_breakpoints(message: Dict[str, Any]) -> Optional[List[str]]:
+    """Content of a segmented system message cut at its breakpoints, or None if it has none."""
+    content = message.get("content")
+    breakpoints = message.get(CACHE_BREAKPOINTS_KEY)
+    if not isinstance(content, str) or not breakpoints:
+        return None
+    parts, start = [], 0
+    for offset in sorted(set(breakpoints)):
+        if start < offset < len(content):
+            parts.append(content[start:offset])
+            start = offset
+    parts.append(content[start:])
+    return parts if len(parts) > 1 else None
+
+
+class PromptSegmentCache:
+    """In-process LRU of built segment text, keyed by (segment name, fingerprint)."""
+
+    def __init__(self, max_entries: int = MAX_CACHED_SEGMENTS):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "build_ms": 0.0}
+
+    def _lookup(self, key: str) -> Optional[str]:
+        text = self._entries.get(key)
+        if text is not None:
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        return text
+
+    def _store(self, key: str, text: str, started: float) -> None:
+        self._stats["misses"] += 1
+        self._stats["build_ms"] += (time.perf_counter() - started) * 1000
+        self._entries[key] = text
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get_or_build(self, name: str, key: str, build: Callable[[], str]) -> str:
+        cache_key = f"{name}:{key}"
+        text = self._lookup(cache_key)
+        if text is None:
+            started = time.perf_counter()
+            text = build() or ""
+            self._store(cache_key, text, started)
+        return text
+
+    async def aget_or_build(self, name: str, key: str, build: Callable[[], Any]) -> str:
+        """Like get_or_build for an async builder (`build()` returns an awaitable)."""
+        cache_key = f"{name}:{key}"
+        text = self._lookup(cache_key)
+        if text is None:
+            started = time.perf_counter()
+            text = (await build()) or ""
+            self._store(cache_key, text, started)
+        return text
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "build_ms": round(self._stats["build_ms"], 1),
+            "entries": len(self._entries),
+            "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+prompt_segment_cache = PromptSegmentCache()
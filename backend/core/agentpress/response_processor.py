@@ -23,10 +23,13 @@ from core.utils.config import config as global_config
 from core.agentpress.tool import ToolResult
 from core.agentpress.tool_registry import ToolRegistry
 from core.agentpress.xml_tool_parser import (
+    StreamingXMLToolCallParser,
     extract_xml_chunks,
-    parse_xml_tool_calls_with_ids
+    parse_xml_tool_calls_with_ids,
+    xml_tool_call_to_dict
 )
 from core.utils.tool_output_streaming import set_current_tool_call_id
+from core.cache.tool_result_cache import begin_tool_cache_report, tool_cache_report
 from core.agentpress.native_tool_parser import (
     extract_tool_call_chunk_data,
     is_tool_call_complete,
@@ -36,6 +39,8 @@ from core.agentpress.native_tool_parser import (
     convert_buffer_to_metadata_tool_calls
 )
 from core.agentpress.error_processor import ErrorProcessor
+from core.agentpress.tool_scheduler import ToolScheduler
+from core.agentpress.message_persister import MessagePersister
 from langfuse.client import StatefulTraceClient
 from core.services.langfuse import langfuse
 from core.utils.json_helpers import (
@@ -141,6 +146,12 @@ class ResponseProcessor:
         self._thread_locks: Dict[str, asyncio.Lock] = {}
         self._locks_lock = asyncio.Lock()  # Lock for managing the thread_locks dict itself
 
+        # Admits concurrent tool calls under per-tool/per-resource budgets and file conflict rules
+        self._tool_scheduler = ToolScheduler(tool_registry)
+
+        # Coalesces partial assistant updates and batches tool result inserts within a turn
+        self._message_persister = MessagePersister()
+
     async def _get_thread_lock(self, thread_id: str) -> asyncio.Lock:
         """Get or create a lock for the specified thread.
         
@@ -161,6 +172,18 @@ class ResponseProcessor:
                     self._thread_locks[thread_id] = asyncio.Lock()
         return self._thread_locks[thread_id]
 
+    async def _invalidate_history_suffix(self, thread_id: str, message_ids: List[str], since: Any = None) -> None:
+        """Drop the cached message history suffix touched by an in-place message write.
+        
+        Args:
+            thread_id: The thread ID
+            message_ids: IDs of the rows that were updated or deleted
+            since: created_at of the earliest affected row, if known - rows created after
+                the cached high-water mark need no invalidation
+        """
+        from core.cache.runtime_cache import invalidate_message_history_suffix
+        await invalidate_message_history_suffix(thread_id, message_ids=message_ids, since=since)
+
     def _log_frontend_message(self, message: Dict[str, Any], debug_file: Optional[Path] = None):
         """Log a message being sent to the frontend to a debug file.
         
@@ -523,8 +546,10 @@ class ResponseProcessor:
         accumulated_content = ""
         accumulated_reasoning_content = ""  # Accumulate reasoning content separately
         tool_calls_buffer = {}
-        current_xml_content = ""
-        xml_chunks_buffer = []
+        # Incremental XML parser: each content chunk is scanned once, calls are emitted as their </invoke> closes
+        xml_parser = StreamingXMLToolCallParser() if config.xml_tool_calling else None
+        pending_xml_tool_calls = []  # XMLToolCall objects parsed but not yet assigned IDs
+        streamed_xml_tool_calls = []  # Tool call dicts (with IDs) in stream order
         pending_tool_executions = []
         yielded_tool_indices = set() # Stores indices of tools whose *status* has been yielded
         executed_native_tool_indices = set() # Track which native tool call indices have been executed
@@ -547,6 +572,7 @@ class ResponseProcessor:
         
         # Track streaming tool results and partial assistant messages
         streaming_tool_result_ids = []  # Track tool result message IDs for batch update after streaming
+        streaming_tool_results_since = None  # created_at of the first streaming tool result (for cache invalidation)
         partial_assistant_message_id = None  # Track partial assistant message ID for updates
         tool_results_buffer = []  # Buffer for tool results that need final processing
         
@@ -718,7 +744,11 @@ class ResponseProcessor:
                     logger.info(f"Cancellation signal received for thread {thread_id} - stopping LLM stream processing")
                     finish_reason = "cancelled"
                     break
-                
+
+                # Queued tool results / partial updates could not be saved: fail the run
+                if self._message_persister.error is not None:
+                    raise self._message_persister.error
+
                 chunk_count += 1
                 
                 # Track timing
@@ -830,7 +860,8 @@ class ResponseProcessor:
                         if isinstance(chunk_content, list):
                             chunk_content = ''.join(str(item) for item in chunk_content)
                         accumulated_content += chunk_content
-                        current_xml_content += chunk_content
+                        if xml_parser:
+                            pending_xml_tool_calls.extend(xml_parser.feed(chunk_content))
 
                         # Yield content chunk IMMEDIATELY - no datetime call, use pre-built metadata
                         # This is the hot path - every microsecond counts!
@@ -873,19 +904,19 @@ class ResponseProcessor:
 
                         # --- Process XML Tool Calls (if enabled) ---
                         if config.xml_tool_calling:
-                            xml_chunks = extract_xml_chunks(current_xml_content)
-                            for xml_chunk in xml_chunks:
-                                current_xml_content = current_xml_content.replace(xml_chunk, "", 1)
-                                xml_chunks_buffer.append(xml_chunk)
-                                # Parse ALL tool calls from this chunk (can be multiple <invoke> tags)
+                            if pending_xml_tool_calls:
+                                # Assign IDs to calls the parser has completed since the last drain
                                 current_assistant_id = last_assistant_message_object['message_id'] if last_assistant_message_object else None
-                                parsed_tool_calls = parse_xml_tool_calls_with_ids(xml_chunk, current_assistant_id, xml_tool_call_count)
+                                parsed_tool_calls = []
+                                for xml_tool_call in pending_xml_tool_calls:
+                                    parsed_tool_calls.append(xml_tool_call_to_dict(xml_tool_call, current_assistant_id, xml_tool_call_count))
+                                    xml_tool_call_count += 1
+                                pending_xml_tool_calls.clear()
+                                streamed_xml_tool_calls.extend(parsed_tool_calls)
                                 
                                 # Convert parsed XML tool calls to unified format
                                 for tool_call in parsed_tool_calls:
-                                    xml_tool_call_count += 1
                                     # Track XML tool call with its ID for metadata storage
-                                    # parse_xml_tool_calls_with_ids already generates IDs, so use that
                                     xml_tool_call_data = {
                                         "tool_call_id": tool_call.get("id"),
                                         "function_name": tool_call.get("function_name"),
@@ -936,7 +967,7 @@ class ResponseProcessor:
                                             yield formatted
                                         yielded_tool_indices.add(tool_index) # Mark status as yielded
 
-                                        execution_task = asyncio.create_task(self._execute_tool(tool_call))
+                                        execution_task = self._tool_scheduler.submit(tool_call, self._execute_tool)
                                         pending_tool_executions.append({
                                             "task": execution_task, "tool_call": tool_call,
                                             "tool_index": tool_index, "context": context
@@ -1023,7 +1054,7 @@ class ResponseProcessor:
                                     yield formatted
                                 yielded_tool_indices.add(tool_index) # Mark status as yielded
 
-                                execution_task = asyncio.create_task(self._execute_tool(tool_call_data))
+                                execution_task = self._tool_scheduler.submit(tool_call_data, self._execute_tool)
                                 pending_tool_executions.append({
                                     "task": execution_task, "tool_call": tool_call_data,
                                     "tool_index": tool_index, "context": context
@@ -1060,6 +1091,8 @@ class ResponseProcessor:
                                         # Track tool result message ID for later batch update (saved with is_llm_message=False)
                                         if saved_result and saved_result.get('message_id'):
                                             streaming_tool_result_ids.append(saved_result['message_id'])
+                                            if streaming_tool_results_since is None:
+                                                streaming_tool_results_since = saved_result.get('created_at')
                                             logger.debug(f"Tracked streaming tool result {saved_result['message_id']} for batch update (currently hidden from LLM)")
                                         
                                         execution["saved"] = True  # Mark as saved to avoid duplicate saves
@@ -1292,7 +1325,7 @@ class ResponseProcessor:
             # 2. We have content OR tool calls
             # 3. Either NOT auto-continuing OR we have tool calls (always save tool calls)
             has_native_tool_calls = config.native_tool_calling and len(tool_calls_buffer) > 0
-            has_xml_tool_calls = config.xml_tool_calling and xml_tool_call_count > 0
+            has_xml_tool_calls = config.xml_tool_calling and (xml_tool_call_count > 0 or len(pending_xml_tool_calls) > 0)
             has_any_tool_calls = has_native_tool_calls or has_xml_tool_calls
             
             # Save if: (not auto-continuing) OR (has tool calls - always save these)
@@ -1366,11 +1399,17 @@ class ResponseProcessor:
                     from core.threads import repo as threads_repo
                     # Store placeholder message_id for cleanup if update fails
                     placeholder_message_id = last_assistant_message_object['message_id']
+                    placeholder_created_at = last_assistant_message_object.get('created_at')
+                    # The final content supersedes queued partial updates; queued tool results are
+                    # written first so the fallback below sees them
+                    self._message_persister.discard_update(placeholder_message_id)
+                    await self._message_persister.flush()
                     # Update the existing placeholder message with final content and metadata
                     try:
                         updated_msg = await threads_repo.update_message_content(
                             placeholder_message_id, message_data, assistant_metadata
                         )
+                        await self._invalidate_history_suffix(thread_id, [placeholder_message_id], since=placeholder_created_at)
                         
                         if updated_msg:
                             last_assistant_message_object = updated_msg
@@ -1411,6 +1450,7 @@ class ResponseProcessor:
                                     
                                     # Delete the orphaned placeholder message
                                     await threads_repo.delete_message_by_id(placeholder_message_id, thread_id)
+                                    await self._invalidate_history_suffix(thread_id, [placeholder_message_id], since=placeholder_created_at)
                                     logger.info(f"Deleted orphaned placeholder message {placeholder_message_id} after failed update")
                                     self.trace.event(
                                         name="deleted_orphaned_placeholder_message",
@@ -1450,6 +1490,7 @@ class ResponseProcessor:
                                 
                                 # Delete the orphaned placeholder message
                                 await threads_repo.delete_message_by_id(placeholder_message_id, thread_id)
+                                await self._invalidate_history_suffix(thread_id, [placeholder_message_id], since=placeholder_created_at)
                                 logger.info(f"Deleted orphaned placeholder message {placeholder_message_id} after failed update")
                                 self.trace.event(
                                     name="deleted_orphaned_placeholder_message",
@@ -1502,27 +1543,25 @@ class ResponseProcessor:
                  # Gather XML tool calls from buffer
                 parsed_xml_data = []
                 if config.xml_tool_calling:
-                    # Reparse remaining content just in case (should be empty if processed correctly)
-                    xml_chunks = extract_xml_chunks(current_xml_content)
-                    xml_chunks_buffer.extend(xml_chunks)
-
-                    for chunk in xml_chunks_buffer:
-                         # Parse ALL tool calls from this chunk (can be multiple <invoke> tags)
-                         current_assistant_id_for_parsing = last_assistant_message_object['message_id'] if last_assistant_message_object else None
-                         parsed_tool_calls = parse_xml_tool_calls_with_ids(chunk, current_assistant_id_for_parsing, xml_tool_call_count)
-                         for tool_call in parsed_tool_calls:
-                             # Track XML tool call with its ID for metadata storage (if not already tracked)
-                             tool_call_id = tool_call.get("id")
-                             if tool_call_id and not any(tc.get("tool_call_id") == tool_call_id for tc in xml_tool_calls_with_ids):
-                                 xml_tool_calls_with_ids.append({
-                                     "tool_call_id": tool_call_id,
-                                     "function_name": tool_call.get("function_name"),
-                                     "arguments": tool_call.get("arguments")
-                                 })
-                             # Avoid adding if already processed during streaming
-                             if not any(exec['tool_call'] == tool_call for exec in pending_tool_executions):
-                                 final_tool_calls_to_process.append(tool_call)
-                                 parsed_xml_data.append({'tool_call': tool_call})
+                    # Drain calls the parser completed but the stream loop didn't pick up yet
+                    current_assistant_id_for_parsing = last_assistant_message_object['message_id'] if last_assistant_message_object else None
+                    for xml_tool_call in pending_xml_tool_calls:
+                        tool_call = xml_tool_call_to_dict(xml_tool_call, current_assistant_id_for_parsing, xml_tool_call_count)
+                        xml_tool_call_count += 1
+                        streamed_xml_tool_calls.append(tool_call)
+                        xml_tool_calls_with_ids.append({
+                            "tool_call_id": tool_call.get("id"),
+                            "function_name": tool_call.get("function_name"),
+                            "arguments": tool_call.get("arguments")
+                        })
+                    pending_xml_tool_calls.clear()
+
+                    executed_xml_ids = {exec['tool_call'].get('id') for exec in pending_tool_executions}
+                    for tool_call in streamed_xml_tool_calls:
+                        # Avoid adding if already processed during streaming
+                        if tool_call.get('id') not in executed_xml_ids:
+                            final_tool_calls_to_process.append(tool_call)
+                            parsed_xml_data.append({'tool_call': tool_call})
 
 
                 all_tool_data_map = {} # tool_index -> {'tool_call': ...}
@@ -1597,7 +1636,8 @@ class ResponseProcessor:
                         # Save the tool result message to DB using _add_tool_result
                         saved_tool_result_object = await self._add_tool_result(
                             thread_id, tool_call, result,
-                            context.assistant_message_id
+                            context.assistant_message_id,
+                            write_behind=True
                         )
                         
                         # Collect deferred image context for later saving (after ALL tool_results)
@@ -1625,16 +1665,22 @@ class ResponseProcessor:
                              logger.error(f"Failed to save tool result for index {tool_idx}, not yielding result message.")
                              self.trace.event(name="failed_to_save_tool_result_for_index", level="ERROR", status_message=(f"Failed to save tool result for index {tool_idx}, not yielding result message."))
 
+            # --- Flush write-behind tool results ---
+            # Streaming tool results still queued are written visible to the LLM by this flush;
+            # only those an earlier flush already wrote hidden need the batch update below
+            written_tool_result_ids = self._message_persister.mark_llm_visible(streaming_tool_result_ids)
+            await self._message_persister.flush()
+
             # --- Batch-update streaming tool results to make them visible to LLM ---
             # After all tools complete, update tool results saved during streaming (with is_llm_message=False)
             # to is_llm_message=True so they become visible to the LLM in the next call
-            if streaming_tool_result_ids and config.execute_tools:
+            if written_tool_result_ids and config.execute_tools:
                 try:
-                    logger.debug(f"Batch updating {len(streaming_tool_result_ids)} streaming tool results to is_llm_message=True")
+                    logger.debug(f"Batch updating {len(written_tool_result_ids)} streaming tool results to is_llm_message=True")
                     self.trace.event(
                         name="batch_update_streaming_tool_results",
                         level="DEFAULT",
-                        status_message=(f"Batch updating {len(streaming_tool_result_ids)} streaming tool results to make them visible to LLM")
+                        status_message=(f"Batch updating {len(written_tool_result_ids)} streaming tool results to make them visible to LLM")
                     )
                     
                     # Acquire thread lock to prevent race conditions with concurrent tool result saves
@@ -1642,11 +1688,14 @@ class ResponseProcessor:
                     thread_lock = await self._get_thread_lock(thread_id)
                     async with thread_lock:
                         updated_count = await threads_repo.update_messages_is_llm_message(
-                            streaming_tool_result_ids, is_llm_message=True
+                            written_tool_result_ids, is_llm_message=True
                         )
+                    await self._invalidate_history_suffix(
+                        thread_id, written_tool_result_ids, since=streaming_tool_results_since
+                    )
                     
                     if updated_count > 0:
-                        logger.info(f"✅ Successfully batch-updated {updated_count}/{len(streaming_tool_result_ids)} streaming tool results to is_llm_message=True")
+                        logger.info(f"✅ Successfully batch-updated {updated_count}/{len(written_tool_result_ids)} streaming tool results to is_llm_message=True")
                         self.trace.event(
                             name="batch_update_streaming_tool_results_success",
                             level="DEFAULT",
@@ -1655,7 +1704,7 @@ class ResponseProcessor:
                         
                         # Log batch update in DB write logs
                         if hasattr(self, '_log_db_write'):
-                            for msg_id in streaming_tool_result_ids:
+                            for msg_id in written_tool_result_ids:
                                 # Create a log entry for the batch update
                                 update_log_data = {
                                     'message_id': msg_id,
@@ -1671,7 +1720,7 @@ class ResponseProcessor:
                         # Log failed batch update attempt
                         if hasattr(self, '_log_db_write'):
                             failed_log_data = {
-                                'message_ids': streaming_tool_result_ids,
+                                'message_ids': written_tool_result_ids,
                                 'thread_id': thread_id,
                                 '_batch_update_failed': True,
                                 '_note': 'Batch update returned no data - tool results may remain hidden from LLM'
@@ -1897,7 +1946,13 @@ class ResponseProcessor:
                                 task.cancel()
                             except Exception as cancel_err:
                                 logger.warning(f"Error cancelling tool execution task: {cancel_err}")
-                
+
+                # Write tool results and partial assistant updates still queued (stop, error paths)
+                try:
+                    await self._message_persister.flush()
+                except Exception as flush_err:
+                    logger.error(f"Error flushing queued message writes: {flush_err}")
+
                 # Try to close the LLM response generator if it supports aclose()
                 # This helps stop the underlying HTTP connection from continuing
                 if hasattr(llm_response, 'aclose'):
@@ -2014,6 +2069,10 @@ class ResponseProcessor:
                                 await threads_repo.update_message_content(
                                     last_assistant_message_object['message_id'], updated_content
                                 )
+                            await self._invalidate_history_suffix(
+                                thread_id, [last_assistant_message_object['message_id']],
+                                since=last_assistant_message_object.get('created_at')
+                            )
                             
                             logger.info(f"✅ Removed {len(tool_call_ids)} orphaned tool_calls from message {last_assistant_message_object['message_id']}: {tool_call_ids}")
                 except Exception as cleanup_e:
@@ -2396,6 +2455,7 @@ class ResponseProcessor:
             tool_call_id = tool_call.get("tool_call_id", tool_call.get("id", ""))
             if tool_call_id:
                 set_current_tool_call_id(tool_call_id)
+            begin_tool_cache_report()
             
             function_name = tool_call["function_name"]
             arguments = tool_call["arguments"]
@@ -2556,6 +2616,10 @@ class ResponseProcessor:
                     logger.error(f"❌ Tool returned invalid result type: {type(result)}")
                     result = ToolResult(success=False, output=f"Tool returned invalid result type: {type(result)}")
 
+            cache_report = tool_cache_report()
+            if cache_report:
+                result.metadata["tool_cache"] = cache_report
+
             span.end(status_message="tool_executed", output=str(result))
             return result
 
@@ -2780,8 +2844,8 @@ class ResponseProcessor:
     async def _execute_tools_in_parallel(self, tool_calls: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], ToolResult]]:
         """Execute tool calls in parallel and return results.
 
-        This method executes all tool calls simultaneously using asyncio.gather, which
-        can significantly improve performance when executing multiple independent tools.
+        Calls go through the tool scheduler: independent calls run concurrently, within
+        per-tool and per-resource budgets, while conflicting file operations keep call order.
 
         Args:
             tool_calls: List of tool calls to execute
@@ -2799,12 +2863,12 @@ class ResponseProcessor:
             logger.debug(f"📋 Tool calls data: {tool_calls}")
             self.trace.event(name="executing_tools_in_parallel", level="DEFAULT", status_message=(f"Executing {len(tool_calls)} tools in parallel: {tool_names}"))
 
-            # Create tasks for all tool calls
-            logger.debug("🛠️ Creating async tasks for parallel execution")
+            # Submit all tool calls to the scheduler
+            logger.debug("🛠️ Submitting tool calls to the scheduler")
             tasks = []
             for i, tool_call in enumerate(tool_calls):
-                logger.debug(f"📋 Creating task {i+1} for tool: {tool_call.get('function_name', 'unknown')}")
-                task = self._execute_tool(tool_call)
+                logger.debug(f"📋 Submitting task {i+1} for tool: {tool_call.get('function_name', 'unknown')}")
+                task = self._tool_scheduler.submit(tool_call, self._execute_tool)
                 tasks.append(task)
 
             logger.debug(f"✅ Created {len(tasks)} tasks for parallel execution")
@@ -2944,28 +3008,21 @@ class ResponseProcessor:
             if unified_tool_calls:
                 assistant_metadata["tool_calls"] = unified_tool_calls
             
-            # Acquire thread lock to prevent race conditions when multiple tools complete simultaneously
-            thread_lock = await self._get_thread_lock(thread_id)
-            
             # If partial_assistant_message_id exists, UPDATE the existing message
             if partial_assistant_message_id:
-                from core.threads import repo as threads_repo
-                async with thread_lock:
-                    updated_message = await threads_repo.update_message_content(
-                        partial_assistant_message_id, message_data, assistant_metadata
-                    )
-                    
-                    if updated_message:
-                        logger.debug(f"Updated partial assistant message {partial_assistant_message_id} with {len(unified_tool_calls)} tool calls")
-                        # Log DB write for assistant message update
-                        if hasattr(self, '_log_db_write') and updated_message:
-                            self._log_db_write("update", "assistant", updated_message, is_update=True)
-                        return updated_message
-                    else:
-                        logger.warning(f"Failed to update partial assistant message {partial_assistant_message_id}")
-                        return None
+                # Write-behind: coalesced with other updates of this message, written on the next flush
+                updated_message = self._message_persister.update(
+                    partial_assistant_message_id, thread_id, message_data, assistant_metadata
+                )
+                logger.debug(f"Queued update of partial assistant message {partial_assistant_message_id} with {len(unified_tool_calls)} tool calls")
+                # Log DB write for assistant message update
+                if hasattr(self, '_log_db_write'):
+                    self._log_db_write("update", "assistant", updated_message, is_update=True)
+                return updated_message
             else:
                 # CREATE a new message
+                # Acquire thread lock to prevent race conditions when multiple tools complete simultaneously
+                thread_lock = await self._get_thread_lock(thread_id)
                 async with thread_lock:
                     message_obj = await self._add_message_with_agent_info(
                         thread_id=thread_id,
@@ -2975,6 +3032,7 @@ class ResponseProcessor:
                         metadata=assistant_metadata
                     )
                     if message_obj:
+                        self._message_persister.track(message_obj)
                         logger.debug(f"Created partial assistant message {message_obj.get('message_id')} with {len(unified_tool_calls)} tool calls")
                         # Log DB write for assistant message creation
                         if hasattr(self, '_log_db_write'):
@@ -3041,7 +3099,8 @@ class ResponseProcessor:
                 tool_call=tool_call,
                 result=result,
                 assistant_message_id=assistant_message_id,
-                is_llm_message=False  # Hidden from LLM until all tools complete
+                is_llm_message=False,  # Hidden from LLM until all tools complete
+                write_behind=True  # Batched with the turn's other tool results
             )
             
             if saved_tool_result_object:
@@ -3074,7 +3133,8 @@ class ResponseProcessor:
         tool_call: Dict[str, Any], 
         result: ToolResult,
         assistant_message_id: Optional[str] = None,
-        is_llm_message: bool = True
+        is_llm_message: bool = True,
+        write_behind: bool = False
     ) -> Optional[Dict[str, Any]]: # Return the full message object
         """Add a tool result to the conversation thread based on the tool type.
         
@@ -3092,6 +3152,8 @@ class ResponseProcessor:
             assistant_message_id: ID of the assistant message that generated this tool call
             is_llm_message: Whether this message should be visible to the LLM (default True).
                            Set to False during streaming to prevent partial results from being visible.
+            write_behind: Queue the row in the message persister instead of inserting it now.
+                         It is written with the other tool results of the turn on the next flush.
         
         Returns:
             The full saved message object or None if save failed
@@ -3113,6 +3175,10 @@ class ResponseProcessor:
                 logger.debug(f"Storing tool_call_id {tool_call_id} in tool result metadata for matching")
             # ---
             
+            # Execution details reported by the tool (e.g. tool result cache hits)
+            if getattr(result, 'metadata', None):
+                metadata.update(result.metadata)
+            
             # Determine tool call format DETERMINISTICALLY from global config
             # The config settings are the single source of truth - no inference needed
             # AGENT_NATIVE_TOOL_CALLING=True means ALL tool calls are native format
@@ -3183,16 +3249,25 @@ class ResponseProcessor:
                 # Add as a tool message to the conversation history
                 # This makes the result visible to the LLM in the next turn (but can be hidden from UI)
                 # Note: is_llm_message may be False during streaming to prevent partial results from being visible
-                # Acquire thread lock to prevent race conditions when multiple tools complete simultaneously
-                thread_lock = await self._get_thread_lock(thread_id)
-                async with thread_lock:
-                    message_obj = await self.add_message(
+                if write_behind:
+                    message_obj = self._message_persister.insert(
                         thread_id=thread_id,
-                        type="tool",  # Special type for tool responses
-                        content=tool_message,  # Entire tool_message dict goes in content
+                        type="tool",
+                        content=tool_message,
                         is_llm_message=is_llm_message,
                         metadata=metadata
                     )
+                else:
+                    # Acquire thread lock to prevent race conditions when multiple tools complete simultaneously
+                    thread_lock = await self._get_thread_lock(thread_id)
+                    async with thread_lock:
+                        message_obj = await self.add_message(
+                            thread_id=thread_id,
+                            type="tool",  # Special type for tool responses
+                            content=tool_message,  # Entire tool_message dict goes in content
+                            is_llm_message=is_llm_message,
+                            metadata=metadata
+                        )
                 
                 # Log DB write for tool result (outside lock to avoid blocking)
                 if hasattr(self, '_log_db_write') and message_obj:
@@ -3243,16 +3318,25 @@ class ResponseProcessor:
             # Add as a tool message to the conversation history
             # XML tool calls use role="user" with only content field
             # Note: is_llm_message may be False during streaming to prevent partial results from being visible
-            # Acquire thread lock to prevent race conditions when multiple tools complete simultaneously
-            thread_lock = await self._get_thread_lock(thread_id)
-            async with thread_lock:
-                message_obj = await self.add_message(
+            if write_behind:
+                message_obj = self._message_persister.insert(
                     thread_id=thread_id,
-                    type="tool",  # Special type for tool responses
-                    content=tool_message,  # role="user" with only content
+                    type="tool",
+                    content=tool_message,
                     is_llm_message=is_llm_message,
                     metadata=metadata
                 )
+            else:
+                # Acquire thread lock to prevent race conditions when multiple tools complete simultaneously
+                thread_lock = await self._get_thread_lock(thread_id)
+                async with thread_lock:
+                    message_obj = await self.add_message(
+                        thread_id=thread_id,
+                        type="tool",  # Special type for tool responses
+                        content=tool_message,  # role="user" with only content
+                        is_llm_message=is_llm_message,
+                        metadata=metadata
+                    )
             
             # Log DB write for tool result (outside lock to avoid blocking)
             if hasattr(self, '_log_db_write') and message_obj:
@@ -3580,7 +3664,8 @@ class ResponseProcessor:
                         
                         # Add tool result to conversation thread
                         saved_tool_result_object = await self._add_tool_result(
-                            thread_id, tool_call, result, assistant_message_id
+                            thread_id, tool_call, result, assistant_message_id,
+                            write_behind=True
                         )
                         
                         # Collect deferred image context for later saving (after ALL tool_results)
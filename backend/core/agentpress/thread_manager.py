@@ -21,7 +21,7 @@ from langfuse.client import StatefulGenerationClient, StatefulTraceClient
 from core.services.langfuse import langfuse
 from datetime import datetime, timezone
 from core.billing.credits.integration import billing_integration
-from litellm.utils import token_counter
+from core.agentpress.token_accounting import token_accountant
 import litellm
 
 ToolChoice = Literal["auto", "required", "none"]
@@ -158,14 +158,8 @@ class ThreadManager:
             )
             
             if saved_message and 'message_id' in saved_message:
-                # Invalidate message history cache when new message is added
-                if is_llm_message:
-                    try:
-                        from core.cache.runtime_cache import invalidate_message_history_cache
-                        await invalidate_message_history_cache(thread_id)
-                    except Exception as e:
-                        logger.debug(f"Failed to invalidate message history cache: {e}")
-                
+                # No message history invalidation needed: new rows land past the cached
+                # high-water mark and are picked up by the next incremental fetch.
                 if type == "llm_response_end" and isinstance(content, dict):
                     await self._handle_billing(thread_id, content, saved_message)
                 
@@ -235,7 +229,9 @@ class ThreadManager:
                     cache_creation_tokens=cache_creation_tokens
                 )
                 
-                if deduct_result.get('success'):
+                if deduct_result.get('deferred'):
+                    logger.debug(f"Recorded ${deduct_result.get('cost', 0):.6f} in usage ledger")
+                elif deduct_result.get('success'):
                     logger.debug(f"Successfully deducted ${deduct_result.get('cost', 0):.6f}")
                 else:
                     logger.error(f"Failed to deduct credits: {deduct_result}")
@@ -300,30 +296,80 @@ class ThreadManager:
         
         return message
 
+    def _parse_llm_message_row(self, item: Dict[str, Any], lightweight: bool = False) -> Optional[Dict[str, Any]]:
+        """Turn a messages row into an LLM message dict (None if it should be skipped)."""
+        content = item['content']
+        metadata = item.get('metadata', {})
+        # Rows from iter_llm_messages arrive with compressed_content already swapped in
+        is_compressed = bool(item.get('is_compressed'))
+        
+        if not lightweight and isinstance(metadata, dict) and metadata.get('compressed'):
+            compressed_content = metadata.get('compressed_content')
+            if compressed_content:
+                content = compressed_content
+                is_compressed = True
+        
+        # Parse content and add message_id
+        if isinstance(content, str):
+            try:
+                parsed_item = json.loads(content)
+                parsed_item['message_id'] = item['message_id']
+                
+                # Skip empty user messages (defensive filter for legacy data)
+                if parsed_item.get('role') == 'user':
+                    msg_content = parsed_item.get('content', '')
+                    if isinstance(msg_content, str) and not msg_content.strip():
+                        logger.warning(f"Skipping empty user message {item['message_id']} from LLM context")
+                        return None
+                
+                # Validate and normalize tool_calls for assistant messages
+                if parsed_item.get('role') == 'assistant' and parsed_item.get('tool_calls'):
+                    parsed_item = self._validate_tool_calls_in_message(parsed_item)
+                
+                return parsed_item
+            except json.JSONDecodeError:
+                if is_compressed:
+                    return {
+                        'role': 'user',
+                        'content': content,
+                        'message_id': item['message_id']
+                    }
+                logger.error(f"Failed to parse message: {content[:100]}")
+                return None
+        elif isinstance(content, dict):
+            content['message_id'] = item['message_id']
+            
+            if content.get('role') == 'user':
+                msg_content = content.get('content', '')
+                if isinstance(msg_content, str) and not msg_content.strip():
+                    logger.warning(f"Skipping empty user message {item['message_id']} from LLM context")
+                    return None
+            
+            if content.get('role') == 'assistant' and content.get('tool_calls'):
+                content = self._validate_tool_calls_in_message(content)
+            
+            return content
+        else:
+            logger.warning(f"Unexpected content type: {type(content)}, attempting to use as-is")
+            return {
+                'role': 'user',
+                'content': str(content),
+                'message_id': item['message_id']
+            }
+
     async def get_llm_messages(self, thread_id: str, lightweight: bool = False) -> List[Dict[str, Any]]:
         """
         Get messages for a thread.
         
+        Full reads go through the incremental message history cache: the cached
+        prefix is extended with only the rows newer than its high-water mark.
+        
         Args:
             thread_id: Thread ID to get messages for
             lightweight: If True, fetch only recent messages with minimal payload (for bootstrap)
         """
         logger.debug(f"Getting messages for thread {thread_id} (lightweight={lightweight})")
         
-        # Check cache first (only for non-lightweight mode)
-        if not lightweight:
-            from core.cache.runtime_cache import get_cached_message_history
-            cached = await get_cached_message_history(thread_id)
-            if cached is not None:
-                logger.debug(f"⏱️ [TIMING] Message history: cache hit ({len(cached)} messages)")
-                # Validate and normalize tool_calls in cached messages
-                validated_cached = []
-                for msg in cached:
-                    if msg.get('role') == 'assistant' and msg.get('tool_calls'):
-                        msg = self._validate_tool_calls_in_message(msg)
-                    validated_cached.append(msg)
-                return validated_cached
-        
         from core.threads import repo as threads_repo
         import asyncio
         import time as _time
@@ -331,8 +377,6 @@ class ThreadManager:
         MESSAGE_QUERY_TIMEOUT = 10.0
         
         try:
-            all_messages = []
-            
             if lightweight:
                 logger.info(f"📊 Starting lightweight message fetch for thread {thread_id}")
                 t0 = _time.time()
@@ -342,96 +386,67 @@ class ThreadManager:
                 )
                 elapsed = (_time.time() - t0) * 1000
                 logger.info(f"📊 Lightweight message fetch completed: {elapsed:.0f}ms, {len(all_messages)} messages")
-            else:
-                batch_size = 1000
-                offset = 0
                 
-                while True:
-                    logger.info(f"📊 Starting message fetch (offset={offset}) for thread {thread_id}")
-                    t0 = _time.time()
-                    batch = await asyncio.wait_for(
-                        threads_repo.get_llm_messages_paginated(thread_id, offset=offset, batch_size=batch_size),
-                        timeout=MESSAGE_QUERY_TIMEOUT
-                    )
-                    elapsed = (_time.time() - t0) * 1000
-                    logger.info(f"📊 Message fetch (offset={offset}) completed: {elapsed:.0f}ms, {len(batch)} messages")
-                    
-                    if not batch:
-                        break
-                        
-                    all_messages.extend(batch)
-                    if len(batch) < batch_size:
-                        break
-                    offset += batch_size
-
-            if not all_messages:
-                return []
-
-            messages = []
-            for item in all_messages:
-                content = item['content']
-                metadata = item.get('metadata', {})
-                is_compressed = False
-                
-                if not lightweight and isinstance(metadata, dict) and metadata.get('compressed'):
-                    compressed_content = metadata.get('compressed_content')
-                    if compressed_content:
-                        content = compressed_content
-                        is_compressed = True
-                
-                # Parse content and add message_id
-                if isinstance(content, str):
-                    try:
-                        parsed_item = json.loads(content)
-                        parsed_item['message_id'] = item['message_id']
-                        
-                        # Skip empty user messages (defensive filter for legacy data)
-                        if parsed_item.get('role') == 'user':
-                            msg_content = parsed_item.get('content', '')
-                            if isinstance(msg_content, str) and not msg_content.strip():
-                                logger.warning(f"Skipping empty user message {item['message_id']} from LLM context")
-                                continue
-                        
-                        # Validate and normalize tool_calls for assistant messages
-                        if parsed_item.get('role') == 'assistant' and parsed_item.get('tool_calls'):
-                            parsed_item = self._validate_tool_calls_in_message(parsed_item)
-                        
-                        messages.append(parsed_item)
-                    except json.JSONDecodeError:
-                        if is_compressed:
-                            messages.append({
-                                'role': 'user',
-                                'content': content,
-                                'message_id': item['message_id']
-                            })
-                        else:
-                            logger.error(f"Failed to parse message: {content[:100]}")
-                elif isinstance(content, dict):
-                    content['message_id'] = item['message_id']
-                    
-                    if content.get('role') == 'user':
-                        msg_content = content.get('content', '')
-                        if isinstance(msg_content, str) and not msg_content.strip():
-                            logger.warning(f"Skipping empty user message {item['message_id']} from LLM context")
-                            continue
-                    
-                    if content.get('role') == 'assistant' and content.get('tool_calls'):
-                        content = self._validate_tool_calls_in_message(content)
-                    
-                    messages.append(content)
-                else:
-                    logger.warning(f"Unexpected content type: {type(content)}, attempting to use as-is")
-                    messages.append({
-                        'role': 'user',
-                        'content': str(content),
-                        'message_id': item['message_id']
-                    })
-
-            # Cache the result (only for non-lightweight mode)
-            if not lightweight:
-                from core.cache.runtime_cache import set_cached_message_history
-                await set_cached_message_history(thread_id, messages)
-
+                messages = []
+                for item in all_messages:
+                    parsed = self._parse_llm_message_row(item, lightweight=True)
+                    if parsed is not None:
+                        messages.append(parsed)
+                return messages
+            
+            from core.cache.runtime_cache import (
+                get_cached_message_history,
+                set_cached_message_history,
+                split_message_history_window,
+                record_message_history_lookup,
+            )
+            
+            cached, generation = await get_cached_message_history(thread_id)
+            if cached is not None and cached.get('cursor'):
+                # Refetch the overlap window below the mark - rows that committed late land there
+                messages, created_at, after = split_message_history_window(cached)
+                window_ids = [str(m.get('message_id')) for m in cached['messages'][len(messages):]]
+                cursor = cached['cursor']
+            else:
+                cached = None
+                messages, created_at, after, window_ids, cursor = [], [], None, [], None
+            
+            fetched_ids = []
+            t0 = _time.time()
+            
+            async for item in threads_repo.iter_llm_messages(
+                thread_id,
+                after_created_at=after['created_at'] if after else None,
+                after_message_id=after['message_id'] if after else None,
+                batch_size=1000,
+                batch_timeout=MESSAGE_QUERY_TIMEOUT
+            ):
+                parsed = self._parse_llm_message_row(item)
+                if parsed is not None:
+                    messages.append(parsed)
+                    created_at.append(item.get('created_at'))
+                    fetched_ids.append(str(item['message_id']))
+                cursor = {'created_at': item.get('created_at'), 'message_id': item['message_id']}
+            
+            elapsed = (_time.time() - t0) * 1000
+            logger.debug(f"📊 Message fetch (after={after['created_at'] if after else None}) completed: {elapsed:.0f}ms, {len(fetched_ids)} messages")
+            
+            changed = fetched_ids != window_ids
+            if cached is None:
+                outcome = 'miss'
+            elif changed:
+                outcome = 'partial_hit'
+            else:
+                outcome = 'hit'
+            record_message_history_lookup(outcome)
+            logger.debug(f"⏱️ [TIMING] Message history: {outcome} ({len(messages)} messages, {len(fetched_ids) - len(window_ids)} new)")
+            
+            if cursor and changed:
+                await set_cached_message_history(
+                    thread_id, messages, created_at, cursor, generation,
+                    built_at=cached['built_at'] if cached else None
+                )
+            
             return messages
 
         except asyncio.TimeoutError:
@@ -627,7 +642,6 @@ class ThreadManager:
             
             if ENABLE_PROMPT_CACHING:
                 try:
-                    from litellm.utils import token_counter
                     from core.threads import repo as threads_repo
                     import time as _time
                     
@@ -696,10 +710,8 @@ class ThreadManager:
                                     logger.debug(f"✅ Auto-continue: no tool result tokens in state")
                                 auto_continue_state['tool_result_tokens'] = 0
                             elif latest_user_message_content:
-                                new_msg_tokens = await asyncio.to_thread(
-                                    token_counter,
-                                    model=llm_model, 
-                                    messages=[{"role": "user", "content": latest_user_message_content}]
+                                new_msg_tokens = await token_accountant.count_messages_exact(
+                                    [{"role": "user", "content": latest_user_message_content}], llm_model
                                 )
                                 logger.debug(f"First turn: counting {new_msg_tokens} tokens from latest_user_message_content")
                             else:
@@ -719,21 +731,17 @@ class ThreadManager:
                                     else:
                                         new_msg_content = latest_msg_content
                                     if new_msg_content:
-                                        new_msg_tokens = await asyncio.to_thread(
-                                            token_counter,
-                                            model=llm_model, 
-                                            messages=[{"role": "user", "content": new_msg_content}]
+                                        new_msg_tokens = await token_accountant.count_messages_exact(
+                                            [{"role": "user", "content": new_msg_content}], llm_model
                                         )
                                         logger.debug(f"First turn (DB fallback): counting {new_msg_tokens} tokens from DB query")
                             
                             # Count memory context tokens (only on first turn - auto-continue already has it in last_total_tokens)
                             memory_context_tokens = 0
                             if not is_auto_continue and self._memory_context:
-                                # Wrap token_counter in thread pool (CPU-heavy tiktoken operation)
-                                memory_context_tokens = await asyncio.to_thread(
-                                    token_counter,
-                                    model=llm_model,
-                                    messages=[self._memory_context]
+                                # Cached by content hash - the same memory block is only tokenized once
+                                memory_context_tokens = await token_accountant.count_messages_exact(
+                                    [self._memory_context], llm_model
                                 )
                                 logger.debug(f"📝 Memory context: {memory_context_tokens} tokens")
                             
@@ -937,9 +945,9 @@ class ThreadManager:
                         marked_count = await threads_repo.mark_tool_results_as_omitted(thread_id, orphaned_ids)
                         if marked_count > 0:
                             logger.info(f"✅ Persisted orphan repair: marked {marked_count} orphaned tool results as omitted in DB")
-                            # Invalidate message cache so next fetch gets clean data
-                            from core.cache.runtime_cache import invalidate_message_history_cache
-                            await invalidate_message_history_cache(thread_id)
+                            # Drop the cached suffix from the first affected message so next fetch gets clean data
+                            from core.cache.runtime_cache import invalidate_message_history_suffix
+                            await invalidate_message_history_suffix(thread_id, tool_call_ids=orphaned_ids)
                     except Exception as e:
                         logger.warning(f"Failed to persist orphan repair to DB: {e}")
 
@@ -976,8 +984,8 @@ class ThreadManager:
                         updated_count = await threads_repo.remove_tool_calls_from_assistants(thread_id, out_of_order_ids)
                         if marked_count > 0 or updated_count > 0:
                             logger.info(f"✅ Persisted ordering repair: marked {marked_count} tool results as omitted, updated {updated_count} assistants")
-                            from core.cache.runtime_cache import invalidate_message_history_cache
-                            await invalidate_message_history_cache(thread_id)
+                            from core.cache.runtime_cache import invalidate_message_history_suffix
+                            await invalidate_message_history_suffix(thread_id, tool_call_ids=out_of_order_ids)
                     except Exception as e:
                         logger.warning(f"Failed to persist ordering repair to DB: {e}")
 
@@ -988,8 +996,8 @@ class ThreadManager:
 
             logger.debug(f"⏱️ [TIMING] Pre-send validation: {(time.time() - validation_start) * 1000:.1f}ms")
             
-            # Wrap token_counter in thread pool (CPU-heavy tiktoken operation)
-            actual_tokens = await asyncio.to_thread(token_counter, model=llm_model, messages=prepared_messages)
+            # Per-message exact counts cached by content hash: only new messages are tokenized
+            actual_tokens = await token_accountant.count_messages_exact(prepared_messages, llm_model)
             if estimated_total_tokens is not None:
                 token_diff = actual_tokens - estimated_total_tokens
                 diff_pct = (token_diff / estimated_total_tokens * 100) if estimated_total_tokens > 0 else 0
@@ -1037,8 +1045,8 @@ class ThreadManager:
                     prepared_messages = validate_cache_blocks(prepared_messages, llm_model)
                 else:
                     prepared_messages = [system_prompt] + messages_with_context
-                # Recount tokens (wrap in thread pool - CPU-heavy tiktoken operation)
-                actual_tokens = await asyncio.to_thread(token_counter, model=llm_model, messages=prepared_messages)
+                # Recount tokens (compressed messages are new content, everything else is cached)
+                actual_tokens = await token_accountant.count_messages_exact(prepared_messages, llm_model)
                 estimated_total_tokens = actual_tokens
                 logger.info(f"📤 POST-COMPRESSION: {len(prepared_messages)} messages, {actual_tokens} tokens")
             
@@ -1175,18 +1183,14 @@ class ThreadManager:
                         # Track tool result tokens for fast check in next iteration
                         if chunk.get('type') == 'tool':
                             try:
-                                from litellm.utils import token_counter
                                 content = chunk.get('content', {})
                                 if isinstance(content, str):
                                     content = json.loads(content)
                                 # Extract the actual content string for token counting
                                 content_str = content.get('content', '') if isinstance(content, dict) else str(content)
                                 if content_str:
-                                    # Wrap token_counter in thread pool (CPU-heavy tiktoken operation)
-                                    tool_tokens = await asyncio.to_thread(
-                                        token_counter,
-                                        model=llm_model,
-                                        messages=[{"role": "tool", "content": content_str}]
+                                    tool_tokens = await token_accountant.count_messages_exact(
+                                        [{"role": "tool", "content": content_str}], llm_model
                                     )
                                     auto_continue_state['tool_result_tokens'] = auto_continue_state.get('tool_result_tokens', 0) + tool_tokens
                                     logger.debug(f"🔧 Tracked {tool_tokens} tool result tokens (total: {auto_continue_state['tool_result_tokens']})")
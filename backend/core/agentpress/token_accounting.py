@@ -0,0 +1,326 @@
+"""
+Token accounting for AgentPress threads.
+
+Two counting modes share one content-hash-keyed cache of per-message counts:
+
+- estimate: dependency-free heuristic, scaled by a per-model calibration factor
+  learned from exact counts. Used for compression and caching-threshold decisions,
+  so those never pay for a network or tokenizer call. Compaction planning uses the
+  uncalibrated estimate and scales it by an exact count it is given instead.
+- exact: LiteLLM's tokenizer, one message at a time. Counts are cached in-process and
+  in Redis (token_count:v1:*), so a thread total only tokenizes messages it has not
+  seen before - every other message is a hash lookup.
+
+Fingerprints ignore cache_control markers, so a message counts the same before and
+after apply_anthropic_caching_strategy. They are remembered per message object while
+its content is the same string, so re-estimating a thread doesn't re-hash it.
+
+Calibration is learned per process. Code that must not depend on what else the
+process counted (tests, compaction planning) uses its own TokenAccountant or the
+uncalibrated estimate; reset() clears the shared one.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.utils.logger import logger
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
+
+TOKEN_CACHE_MAX_ENTRIES = 50_000
+FINGERPRINT_CACHE_MAX_ENTRIES = 10_000  # message objects whose fingerprint is remembered
+TOKEN_COUNT_REDIS_TTL = 86400  # 1 day - counts for a given content hash never change
+TOKEN_COUNT_KEY_PREFIX = "token_count:v1"
+
+# Fixed per-message framing (role, separators) added on top of the content estimate
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Calibration: exponential moving average of exact/estimate, only from sizeable samples
+CALIBRATION_ALPHA = 0.2
+CALIBRATION_MIN_TOKENS = 200
+CALIBRATION_BOUNDS = (0.5, 3.0)
+
+_LETTER_RUN_RE = re.compile(r"[A-Za-z]+")
+_DIGIT_RE = re.compile(r"\d")
+_SYMBOL_RE = re.compile(r"[^\sA-Za-z\d]")
+_NEWLINE_RUN_RE = re.compile(r"\n+")
+
+
+def estimate_text_tokens(text: str) -> int:
+    """
+    Uncalibrated offline token estimate for a piece of text.
+
+    Approximates BPE tokenizers: most words are one token (long ones split every
+    ~8 chars), digits group in threes, punctuation and non-ASCII characters are
+    roughly one token each, and newline runs count once.
+    """
+    if not text:
+        return 0
+
+    words = _LETTER_RUN_RE.findall(text)
+    tokens = len(words) + sum(len(w) // 8 for w in words if len(w) > 8)
+    tokens += (len(_DIGIT_RE.findall(text)) + 2) // 3
+    tokens += len(_SYMBOL_RE.findall(text))
+    tokens += len(_NEWLINE_RUN_RE.findall(text))
+    return tokens
+
+
+def _strip_cache_control(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_strip_cache_control(item) for item in value]
+    if isinstance(value, dict) and 'cache_control' in value:
+        return {k: v for k, v in value.items() if k != 'cache_control'}
+    return value
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    """Everything in a message that reaches the tokenizer, flattened to text."""
+    content = message.get('content', '')
+    parts: List[str] = []
+    if isinstance(content, list):
+        for item in content:
+            if not isinstance(item, dict):
+                parts.append(str(item))
+            elif item.get('type') == 'text':
+                parts.append(item.get('text', ''))
+            elif item.get('type') == 'image_url':
+                # base64 data URLs are token-heavy when sent as text
+                parts.append((item.get('image_url') or {}).get('url', ''))
+    elif content is not None:
+        parts.append(content if isinstance(content, str) else str(content))
+
+    if message.get('tool_calls'):
+        parts.append(json.dumps(message['tool_calls'], default=str))
+    return "\n".join(parts)
+
+
+def message_fingerprint(message: Dict[str, Any]) -> str:
+    """Stable content hash of the parts of a message that affect its token count."""
+    canonical = {
+        'role': message.get('role'),
+        'content': _strip_cache_control(message.get('content')),
+        'tool_calls': message.get('tool_calls'),
+        'tool_call_id': message.get('tool_call_id'),
+        'name': message.get('name'),
+    }
+    if _HAS_ORJSON:
+        payload = orjson.dumps(canonical, option=orjson.OPT_SORT_KEYS, default=str)
+    else:
+        payload = json.dumps(canonical, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def _model_family(model: str) -> str:
+    """Cache namespace for a tokenizer - provider prefixes don't change tokenization."""
+    return (model or "default").split('/')[-1].lower()
+
+
+class TokenAccountant:
+    """Per-message token counts with caching, estimation and calibration."""
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES, max_fingerprints: int = FINGERPRINT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.max_fingerprints = max_fingerprints
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all counts, fingerprints and calibration."""
+        # (mode, model_family, fingerprint) -> tokens; estimate entries hold the raw estimate
+        self._counts: "OrderedDict[Tuple[str, str, str], int]" = OrderedDict()
+        # id(message) -> (message, content, tool_calls, framing, fingerprint); holding the objects keeps their ids unique
+        self._fingerprints: "OrderedDict[int, Tuple[Any, ...]]" = OrderedDict()
+        self._calibration: Dict[str, float] = {}
+        self._stats = {
+            'fingerprint_hits': 0,
+            'estimate_hits': 0,
+            'estimate_misses': 0,
+            'exact_hits': 0,
+            'exact_redis_hits': 0,
+            'exact_misses': 0,
+            'calibration_samples': 0,
+        }
+
+    # ---------- cache ----------
+
+    def _get(self, key: Tuple[str, str, str]) -> Optional[int]:
+        value = self._counts.get(key)
+        if value is not None:
+            self._counts.move_to_end(key)
+        return value
+
+    def _put(self, key: Tuple[str, str, str], value: int) -> None:
+        self._counts[key] = value
+        self._counts.move_to_end(key)
+        while len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+
+    def _fingerprint(self, message: Dict[str, Any]) -> str:
+        """message_fingerprint, remembered per message object while its content is the same string."""
+        content = message.get('content')
+        if not isinstance(content, str):
+            # Block lists can be edited in place - always hash them
+            return message_fingerprint(message)
+        tool_calls = message.get('tool_calls')
+        framing = (message.get('role'), message.get('tool_call_id'), message.get('name'))
+        key = id(message)
+        cached = self._fingerprints.get(key)
+        if cached is not None and cached[0] is message and cached[1] is content and cached[2] is tool_calls and cached[3] == framing:
+            self._fingerprints.move_to_end(key)
+            self._stats['fingerprint_hits'] += 1
+            return cached[4]
+        fingerprint = message_fingerprint(message)
+        self._fingerprints[key] = (message, content, tool_calls, framing, fingerprint)
+        self._fingerprints.move_to_end(key)
+        while len(self._fingerprints) > self.max_fingerprints:
+            self._fingerprints.popitem(last=False)
+        return fingerprint
+
+    # ---------- estimate mode ----------
+
+    def _raw_estimate(self, message: Dict[str, Any], model: str, fingerprint: Optional[str] = None) -> int:
+        key = ('estimate', 'any', fingerprint or self._fingerprint(message))
+        cached = self._get(key)
+        if cached is not None:
+            self._stats['estimate_hits'] += 1
+            return cached
+        self._stats['estimate_misses'] += 1
+        tokens = estimate_text_tokens(_message_text(message)) + MESSAGE_OVERHEAD_TOKENS
+        self._put(key, tokens)
+        return tokens
+
+    def calibration_factor(self, model: str) -> float:
+        return self._calibration.get(_model_family(model), 1.0)
+
+    def estimate_message_uncalibrated(self, message: Dict[str, Any]) -> int:
+        """Offline estimate for one message without calibration - the same in every process and run."""
+        if not isinstance(message, dict):
+            return 0
+        return self._raw_estimate(message, 'any')
+
+    def estimate_message(self, message: Dict[str, Any], model: str) -> int:
+        """Calibrated offline estimate for one message (no tokenizer, no network)."""
+        if not isinstance(message, dict):
+            return 0
+        return int(round(self._raw_estimate(message, model) * self.calibration_factor(model)))
+
+    def estimate_messages(self, messages: List[Dict[str, Any]], model: str) -> int:
+        """Calibrated offline estimate for a message list."""
+        raw = sum(self._raw_estimate(m, model) for m in messages if isinstance(m, dict))
+        return int(round(raw * self.calibration_factor(model)))
+
+    def observe_exact(self, model: str, messages: List[Dict[str, Any]], exact_tokens: int) -> None:
+        """Feed an exact count for `messages` back into the estimator's calibration."""
+        try:
+            raw = sum(self._raw_estimate(m, model) for m in messages if isinstance(m, dict))
+            if raw < CALIBRATION_MIN_TOKENS or exact_tokens <= 0:
+                return
+            family = _model_family(model)
+            ratio = min(max(exact_tokens / raw, CALIBRATION_BOUNDS[0]), CALIBRATION_BOUNDS[1])
+            previous = self._calibration.get(family)
+            self._calibration[family] = ratio if previous is None else (
+                previous + CALIBRATION_ALPHA * (ratio - previous)
+            )
+            self._stats['calibration_samples'] += 1
+        except Exception as e:
+            logger.debug(f"Token estimator calibration skipped: {e}")
+
+    # ---------- exact mode ----------
+
+    @staticmethod
+    def _tokenize_message(message: Dict[str, Any], model: str) -> int:
+        from litellm.utils import token_counter
+        return token_counter(model=model, messages=[_strip_cache_control_message(message)])
+
+    async def count_messages_exact(self, messages: List[Dict[str, Any]], model: str, calibrate: bool = True) -> int:
+        """
+        Exact total for a message list, tokenizing only messages not seen before.
+
+        Each message is counted on its own, so the total includes LiteLLM's small
+        per-call framing once per message - a slight, conservative overcount.
+        """
+        family = _model_family(model)
+        entries = [(m, self._fingerprint(m)) for m in messages if isinstance(m, dict)]
+        counts: Dict[str, int] = {}
+        missing: Dict[str, Dict[str, Any]] = {}
+
+        for message, fp in entries:
+            if fp in counts or fp in missing:
+                continue
+            cached = self._get(('exact', family, fp))
+            if cached is not None:
+                self._stats['exact_hits'] += 1
+                counts[fp] = cached
+            else:
+                missing[fp] = message
+
+        if missing:
+            await self._load_exact_from_redis(family, missing, counts)
+
+        if missing:
+            self._stats['exact_misses'] += len(missing)
+            pending = list(missing.items())
+            computed = await asyncio.to_thread(
+                lambda: [self._tokenize_message(message, model) for _, message in pending]
+            )
+            for (fp, _), tokens in zip(pending, computed):
+                counts[fp] = tokens
+                self._put(('exact', family, fp), tokens)
+            await self._store_exact_in_redis(family, dict(zip((fp for fp, _ in pending), computed)))
+
+        total = sum(counts[fp] for _, fp in entries)
+        if calibrate:
+            self.observe_exact(model, [m for m, _ in entries], total)
+        return total
+
+    async def _load_exact_from_redis(self, family: str, missing: Dict[str, Dict[str, Any]], counts: Dict[str, int]) -> None:
+        try:
+            from core.services import redis as redis_service
+            fps = list(missing.keys())
+            values = await redis_service.mget([f"{TOKEN_COUNT_KEY_PREFIX}:{family}:{fp}" for fp in fps], timeout=2.0)
+            for fp, value in zip(fps, values):
+                if value is None:
+                    continue
+                tokens = int(value)
+                counts[fp] = tokens
+                self._put(('exact', family, fp), tokens)
+                missing.pop(fp, None)
+                self._stats['exact_redis_hits'] += 1
+        except Exception as e:
+            logger.debug(f"Token count cache read failed: {e}")
+
+    async def _store_exact_in_redis(self, family: str, computed: Dict[str, int]) -> None:
+        if not computed:
+            return
+        try:
+            from core.services import redis as redis_service
+            await redis_service.set_multiple(
+                [(f"{TOKEN_COUNT_KEY_PREFIX}:{family}:{fp}", str(tokens), TOKEN_COUNT_REDIS_TTL) for fp, tokens in computed.items()],
+                timeout=2.0
+            )
+        except Exception as e:
+            logger.debug(f"Token count cache write failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            'entries': len(self._counts),
+            'fingerprints': len(self._fingerprints),
+            'calibration': {family: round(factor, 4) for family, factor in self._calibration.items()},
+        }
+
+
+def _strip_cache_control_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    if isinstance(message.get('content'), list):
+        return {**message, 'content': _strip_cache_control(message['content'])}
+    return message
+
+
+token_accountant = TokenAccountant()
@@ -38,9 +38,12 @@ class ToolResult:
     Attributes:
         success (bool): Whether the tool execution succeeded
         output (Any): Output data (can be dict, list, or string)
+        metadata (Dict[str, Any]): Execution details stored with the result message
+            (not shown to the LLM), e.g. tool result cache hits
     """
     success: bool
     output: Any
+    metadata: Dict[str, Any] = field(default_factory=dict)
 
 @dataclass
 class ToolMetadata:
@@ -0,0 +1,272 @@
+"""
+Tool execution scheduler for AgentPress.
+
+Every tool call in a turn is submitted here instead of being started directly.
+A call starts once three things hold:
+
+- ordering: no earlier call that conflicts with it is still outstanding. Calls
+  conflict when they touch the same file path and at least one of them writes
+  (two reads of a path run together, writes to a path run in call order).
+- resource budget: the backend it talks to has a free slot - the run's sandbox,
+  the shared browser, an external HTTP API or a specific MCP server.
+- tool budget: the tool itself has a free slot (e.g. at most 3 web_search).
+
+Calls without conflicts still run concurrently, and results complete in whatever
+order the tools finish. Queue time (submit -> start) and run time per tool are
+recorded in tool_scheduler_stats for /debug/cache.
+"""
+
+import asyncio
+import posixpath
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.utils.logger import logger
+from core.utils.json_helpers import safe_json_parse
+
+DEFAULT_TOOL_LIMIT = 4
+DEFAULT_MCP_SERVER_LIMIT = 2
+
+RESOURCE_LIMITS: Dict[str, int] = {
+    "sandbox": 6,
+    "browser": 1,
+    "external_api": 8,
+}
+
+TOOL_LIMITS: Dict[str, int] = {
+    "web_search": 3,
+    "scrape_webpage": 3,
+    "image_search": 3,
+    "people_search": 2,
+    "company_search": 2,
+    "paper_search": 2,
+    "execute_command": 3,
+}
+
+# Tools that live on a sandbox tool class but spend their time on a third-party API
+EXTERNAL_API_TOOLS = {
+    "web_search", "scrape_webpage", "image_search",
+    "people_search", "company_search",
+    "paper_search", "get_paper_details", "search_authors", "get_author_details", "get_author_papers",
+    "search_apify_actors", "get_actor_details", "run_apify_actor",
+    "get_actor_run_results", "get_actor_run_status", "stop_actor_run",
+}
+
+# function name -> (access, argument names holding paths)
+FILE_ACCESS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "create_file": ("write", ("file_path",)),
+    "str_replace": ("write", ("file_path",)),
+    "full_file_rewrite": ("write", ("file_path",)),
+    "delete_file": ("write", ("file_path",)),
+    "edit_file": ("write", ("target_file",)),
+    "read_file": ("read", ("file_path", "file_paths")),
+    "search_file": ("read", ("file_path", "file_paths")),
+}
+
+WORKSPACE_ROOT = "/workspace"
+
+
+@dataclass
+class ToolProfile:
+    resource: Optional[str]
+    access: Optional[str] = None
+    paths: Tuple[str, ...] = ()
+
+
+def normalize_path(path: str) -> str:
+    path = posixpath.normpath(str(path).strip())
+    if path == WORKSPACE_ROOT or path.startswith(WORKSPACE_ROOT + "/"):
+        path = path[len(WORKSPACE_ROOT):]
+    return path.lstrip("/") or "."
+
+
+def _parse_arguments(arguments: Any) -> Dict[str, Any]:
+    if isinstance(arguments, dict):
+        return arguments
+    if isinstance(arguments, str):
+        parsed = safe_json_parse(arguments)
+        if isinstance(parsed, dict):
+            return parsed
+    return {}
+
+
+class ToolSchedulerStats:
+    """Process-wide per-tool queue and run times."""
+
+    def __init__(self):
+        self._tools: Dict[str, Dict[str, float]] = {}
+        self._queued = 0
+        self._running = 0
+
+    def queued(self, delta: int):
+        self._queued += delta
+
+    def running(self, delta: int):
+        self._running += delta
+
+    def record(self, tool_name: str, queue_seconds: float, run_seconds: float):
+        entry = self._tools.get(tool_name)
+        if entry is None:
+            entry = self._tools[tool_name] = {
+                "calls": 0, "queue_total": 0.0, "queue_max": 0.0, "run_total": 0.0, "run_max": 0.0,
+            }
+        entry["calls"] += 1
+        entry["queue_total"] += queue_seconds
+        entry["queue_max"] = max(entry["queue_max"], queue_seconds)
+        entry["run_total"] += run_seconds
+        entry["run_max"] = max(entry["run_max"], run_seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        tools = {}
+        for name, entry in sorted(self._tools.items()):
+            calls = entry["calls"]
+            tools[name] = {
+                "calls": calls,
+                "avg_queue_ms": round(entry["queue_total"] / calls * 1000, 1),
+                "max_queue_ms": round(entry["queue_max"] * 1000, 1),
+                "avg_run_ms": round(entry["run_total"] / calls * 1000, 1),
+                "max_run_ms": round(entry["run_max"] * 1000, 1),
+            }
+        return {"queued": self._queued, "running": self._running, "tools": tools}
+
+
+tool_scheduler_stats = ToolSchedulerStats()
+
+
+class ToolScheduler:
+    """Admits tool calls for one agent run under ordering and concurrency rules."""
+
+    def __init__(self, tool_registry=None):
+        self.tool_registry = tool_registry
+        self._tool_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._resource_semaphores: Dict[str, asyncio.Semaphore] = {}
+        # path -> outstanding (access, done event) in submission order
+        self._path_queues: Dict[str, List[Tuple[str, asyncio.Event]]] = {}
+
+    def profile(self, tool_call: Dict[str, Any]) -> ToolProfile:
+        function_name = tool_call.get("function_name") or ""
+        arguments = _parse_arguments(tool_call.get("arguments"))
+
+        if function_name in FILE_ACCESS:
+            access, arg_names = FILE_ACCESS[function_name]
+            paths = []
+            for arg_name in arg_names:
+                value = arguments.get(arg_name)
+                for path in (value if isinstance(value, list) else [value]):
+                    if isinstance(path, str) and path.strip():
+                        paths.append(normalize_path(path))
+            return ToolProfile(resource="sandbox", access=access, paths=tuple(dict.fromkeys(paths)))
+
+        if function_name in EXTERNAL_API_TOOLS:
+            return ToolProfile(resource="external_api")
+        if function_name.startswith("browser_"):
+            return ToolProfile(resource="browser")
+
+        mcp_server = self._mcp_server(function_name, arguments)
+        if mcp_server:
+            return ToolProfile(resource=f"mcp:{mcp_server}")
+
+        if self._is_sandbox_tool(function_name):
+            return ToolProfile(resource="sandbox")
+        return ToolProfile(resource=None)
+
+    def _mcp_server(self, function_name: str, arguments: Dict[str, Any]) -> Optional[str]:
+        tool_name = arguments.get("tool_name") if function_name == "execute_mcp_tool" else function_name
+        if not tool_name:
+            return None
+        try:
+            from core.agentpress.mcp_registry import get_mcp_registry
+            tool_info = get_mcp_registry().get_tool_info(tool_name)
+        except Exception:
+            return None
+        if tool_info:
+            return tool_info.toolkit_slug
+        return "unknown" if function_name == "execute_mcp_tool" else None
+
+    def _is_sandbox_tool(self, function_name: str) -> bool:
+        if not self.tool_registry:
+            return False
+        instance = self.tool_registry.tools.get(function_name, {}).get("instance")
+        return instance is not None and any(cls.__name__ == "SandboxToolsBase" for cls in type(instance).__mro__)
+
+    def _semaphore(self, pool: Dict[str, asyncio.Semaphore], key: str, limit: int) -> asyncio.Semaphore:
+        semaphore = pool.get(key)
+        if semaphore is None:
+            semaphore = pool[key] = asyncio.Semaphore(limit)
+        return semaphore
+
+    def _resource_limit(self, resource: str) -> int:
+        if resource.startswith("mcp:"):
+            return DEFAULT_MCP_SERVER_LIMIT
+        return RESOURCE_LIMITS.get(resource, DEFAULT_TOOL_LIMIT)
+
+    def _register_paths(self, profile: ToolProfile) -> Tuple[List[asyncio.Event], Optional[asyncio.Event]]:
+        # Must run synchronously at submit time so call order decides who goes first
+        if not profile.paths:
+            return [], None
+        done = asyncio.Event()
+        waits = []
+        for path in profile.paths:
+            queue = self._path_queues.setdefault(path, [])
+            waits.extend(event for access, event in queue if access == "write" or profile.access == "write")
+            queue.append((profile.access, done))
+        return waits, done
+
+    def _release_paths(self, profile: ToolProfile, done: Optional[asyncio.Event]):
+        if done is None:
+            return
+        done.set()
+        for path in profile.paths:
+            queue = self._path_queues.get(path)
+            if queue is None:
+                continue
+            queue[:] = [entry for entry in queue if entry[1] is not done]
+            if not queue:
+                del self._path_queues[path]
+
+    def submit(
+        self,
+        tool_call: Dict[str, Any],
+        execute: Callable[[Dict[str, Any]], Awaitable[Any]],
+    ) -> asyncio.Task:
+        """Start a task that runs execute(tool_call) once the call is admitted."""
+        profile = self.profile(tool_call)
+        waits, done = self._register_paths(profile)
+        return asyncio.create_task(self._run(tool_call, execute, profile, waits, done))
+
+    async def _run(self, tool_call, execute, profile: ToolProfile, waits: List[asyncio.Event], done: Optional[asyncio.Event]):
+        tool_name = tool_call.get("function_name") or "unknown"
+        submitted = time.monotonic()
+        tool_scheduler_stats.queued(1)
+        started = None
+        try:
+            for event in waits:
+                await event.wait()
+
+            tool_semaphore = self._semaphore(self._tool_semaphores, tool_name, TOOL_LIMITS.get(tool_name, DEFAULT_TOOL_LIMIT))
+            # Fixed acquisition order (tool, then resource) so budgets cannot deadlock
+            async with tool_semaphore:
+                if profile.resource:
+                    resource_semaphore = self._semaphore(
+                        self._resource_semaphores, profile.resource, self._resource_limit(profile.resource)
+                    )
+                    await resource_semaphore.acquire()
+                try:
+                    started = time.monotonic()
+                    tool_scheduler_stats.queued(-1)
+                    tool_scheduler_stats.running(1)
+                    if started - submitted > 0.5:
+                        logger.debug(f"⏳ [TOOL SCHEDULER] {tool_name} waited {(started - submitted) * 1000:.0f}ms "
+                                     f"(resource={profile.resource}, paths={list(profile.paths)})")
+                    return await execute(tool_call)
+                finally:
+                    tool_scheduler_stats.running(-1)
+                    if profile.resource:
+                        resource_semaphore.release()
+        finally:
+            if started is None:
+                tool_scheduler_stats.queued(-1)
+            else:
+                tool_scheduler_stats.record(tool_name, started - submitted, time.monotonic() - started)
+            self._release_paths(profile, done)
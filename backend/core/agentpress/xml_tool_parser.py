@@ -3,11 +3,16 @@ XML Tool Call Parser Module
 
 This module provides a reliable XML tool call parsing system that supports
 the XML format with structured function_calls blocks.
+
+StreamingXMLToolCallParser is the incremental entry point: it is fed chunks as
+they arrive and emits each tool call as soon as its </invoke> closes, so parsing
+a streamed response is linear in its length. The one-shot helpers below run the
+same state machine over the whole string.
 """
 
 import re
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 import json
 import logging
@@ -21,6 +26,9 @@ class XMLToolCall:
     function_name: str
     parameters: Dict[str, Any]
     raw_xml: str
+    # Character offsets of raw_xml within the full parsed/streamed content
+    start: Optional[int] = None
+    end: Optional[int] = None
 
 
 # Regex patterns for extracting XML blocks
@@ -39,6 +47,11 @@ _PARAMETER_PATTERN = re.compile(
     re.DOTALL | re.IGNORECASE
 )
 
+_INVOKE_HEAD_PATTERN = re.compile(
+    r'<invoke\s+name=["\']([^"\']+)["\']>',
+    re.IGNORECASE
+)
+
 
 def _parse_parameter_value(value: str) -> Any:
     """Parse a parameter value, attempting to convert to appropriate type."""
@@ -68,32 +81,213 @@ def _parse_parameter_value(value: str) -> Any:
     return value
 
 
-def _parse_invoke_block(function_name: str, invoke_content: str, full_block: str) -> Optional[XMLToolCall]:
+def _parse_invoke_block(
+    function_name: str,
+    invoke_content: str,
+    raw_xml: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None
+) -> Optional[XMLToolCall]:
     """Parse a single invoke block into an XMLToolCall."""
     parameters = {}
     
-    # Extract all parameters
+    # Extract all parameters (only scans this invoke's body)
     param_matches = _PARAMETER_PATTERN.findall(invoke_content)
     
     for param_name, param_value in param_matches:
         param_value = param_value.strip()
         parameters[param_name] = _parse_parameter_value(param_value)
     
-    # Extract the raw XML for this specific invoke
-    invoke_pattern = re.compile(
-        rf'<invoke\s+name=["\']{re.escape(function_name)}["\']>.*?</invoke>',
-        re.DOTALL | re.IGNORECASE
-    )
-    raw_xml_match = invoke_pattern.search(full_block)
-    raw_xml = raw_xml_match.group(0) if raw_xml_match else f"<invoke name=\"{function_name}\">...</invoke>"
-    
     return XMLToolCall(
         function_name=function_name,
         parameters=parameters,
-        raw_xml=raw_xml
+        raw_xml=raw_xml,
+        start=start,
+        end=end
     )
 
 
+# Tag matching is ASCII case-insensitive (like the regexes above): candidates are
+# found with str.find('<') and only the tag-length slice after each '<' is lowered.
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+_OPEN_BLOCK = '<function_calls>'
+_CLOSE_BLOCK = '</function_calls>'
+_OPEN_INVOKE = '<invoke'
+_CLOSE_INVOKE = '</invoke>'
+
+_BLOCK_TAGS = (_OPEN_INVOKE, _CLOSE_BLOCK)
+_INVOKE_TAGS = (_CLOSE_INVOKE, _CLOSE_BLOCK)
+
+_STATE_OUTSIDE = 0
+_STATE_IN_BLOCK = 1
+_STATE_IN_INVOKE = 2
+
+# Longest <invoke ...> head we wait for before treating the tag as malformed
+_MAX_INVOKE_HEAD = 1024
+# Characters of lookback needed to see a closing tag split across chunks
+_TAIL_LENGTH = len(_CLOSE_BLOCK) - 1
+
+
+def _find_tag(text: str, tags: Tuple[str, ...], start: int = 0) -> Tuple[int, str]:
+    """Position and tag of the first ASCII case-insensitive occurrence of any of tags, or (-1, "")."""
+    i = text.find('<', start)
+    while i >= 0:
+        for tag in tags:
+            if text[i:i + len(tag)].translate(_ASCII_LOWER) == tag:
+                return i, tag
+        i = text.find('<', i + 1)
+    return -1, ""
+
+
+class StreamingXMLToolCallParser:
+    """
+    Incremental <function_calls>/<invoke> parser.
+    
+    Feed chunks in order; each call to feed() returns the tool calls whose
+    </invoke> arrived in that chunk. Text before the current block/invoke is
+    discarded after every chunk. While an invoke is open its body is kept as a
+    list of chunks (each new chunk is only checked for a closing tag, with a
+    tag-length lookback) and joined once when the invoke or its block closes,
+    so every character is copied and scanned a constant number of times.
+    
+    Semantics match the regex path: a block ends at the first </function_calls>,
+    an invoke at the first </invoke>, and an invoke still open when its block
+    closes (or when the stream ends) is dropped.
+    """
+    
+    def __init__(self):
+        self._buf = ""
+        self._parts: List[str] = []  # chunks of the open invoke not yet joined onto _buf
+        self._parts_len = 0
+        self._tail = ""  # last _TAIL_LENGTH characters fed
+        self._base = 0  # absolute offset of _buf[0] in the fed stream
+        self._scan = 0  # next position in _buf to search from
+        self._state = _STATE_OUTSIDE
+        self._invoke_start = 0
+        self._invoke_body_start = 0
+        self._invoke_name = ""
+        self.tool_call_count = 0
+        self.block_count = 0
+    
+    @property
+    def offset(self) -> int:
+        """Total number of characters fed so far."""
+        return self._base + len(self._buf) + self._parts_len
+    
+    @property
+    def in_function_calls(self) -> bool:
+        """True while a <function_calls> block is open."""
+        return self._state != _STATE_OUTSIDE
+    
+    def feed(self, chunk: str) -> List[XMLToolCall]:
+        """Append a chunk and return the tool calls it completed."""
+        if not chunk:
+            return []
+        window = self._tail + chunk
+        self._tail = window[-_TAIL_LENGTH:]
+        
+        if self._state == _STATE_IN_INVOKE and _find_tag(window, _INVOKE_TAGS)[0] < 0:
+            # Nothing closes here: park the chunk instead of growing _buf
+            self._parts.append(chunk)
+            self._parts_len += len(chunk)
+            return []
+        
+        if self._parts:
+            self._parts.append(chunk)
+            self._buf = "".join([self._buf, *self._parts])
+            self._parts = []
+            self._parts_len = 0
+        else:
+            self._buf += chunk
+        
+        completed = self._advance()
+        self._compact()
+        return completed
+    
+    def _advance(self) -> List[XMLToolCall]:
+        completed: List[XMLToolCall] = []
+        buf = self._buf
+        
+        while True:
+            if self._state == _STATE_OUTSIDE:
+                i, _ = _find_tag(buf, (_OPEN_BLOCK,), self._scan)
+                if i < 0:
+                    self._scan = max(self._scan, len(buf) - len(_OPEN_BLOCK) + 1)
+                    return completed
+                self._state = _STATE_IN_BLOCK
+                self._scan = i + len(_OPEN_BLOCK)
+                self.block_count += 1
+            
+            elif self._state == _STATE_IN_BLOCK:
+                i, tag = _find_tag(buf, _BLOCK_TAGS, self._scan)
+                if tag == _CLOSE_BLOCK:
+                    self._state = _STATE_OUTSIDE
+                    self._scan = i + len(_CLOSE_BLOCK)
+                    continue
+                if i < 0:
+                    self._scan = max(self._scan, len(buf) - len(_CLOSE_BLOCK) + 1)
+                    return completed
+                
+                head_end = buf.find('>', i, i + _MAX_INVOKE_HEAD)
+                if head_end < 0:
+                    if len(buf) - i < _MAX_INVOKE_HEAD:
+                        self._scan = i  # wait for the rest of the head
+                        return completed
+                    self._scan = i + len(_OPEN_INVOKE)
+                    continue
+                
+                head = _INVOKE_HEAD_PATTERN.fullmatch(buf, i, head_end + 1)
+                if not head:
+                    self._scan = i + len(_OPEN_INVOKE)
+                    continue
+                self._state = _STATE_IN_INVOKE
+                self._invoke_start = i
+                self._invoke_body_start = head_end + 1
+                self._invoke_name = head.group(1)
+                self._scan = head_end + 1
+            
+            else:  # _STATE_IN_INVOKE
+                i, tag = _find_tag(buf, _INVOKE_TAGS, self._scan)
+                if tag == _CLOSE_BLOCK:
+                    logger.debug(f"Dropping unterminated invoke for {self._invoke_name}")
+                    self._state = _STATE_OUTSIDE
+                    self._scan = i + len(_CLOSE_BLOCK)
+                    continue
+                if i < 0:
+                    self._scan = max(self._scan, len(buf) - len(_CLOSE_BLOCK) + 1)
+                    return completed
+                
+                end = i + len(_CLOSE_INVOKE)
+                try:
+                    tool_call = _parse_invoke_block(
+                        self._invoke_name,
+                        buf[self._invoke_body_start:i],
+                        buf[self._invoke_start:end],
+                        start=self._base + self._invoke_start,
+                        end=self._base + end
+                    )
+                    if tool_call:
+                        completed.append(tool_call)
+                        self.tool_call_count += 1
+                except Exception as e:
+                    logger.error(f"Error parsing invoke block for {self._invoke_name}: {e}")
+                self._state = _STATE_IN_BLOCK
+                self._scan = end
+    
+    def _compact(self) -> None:
+        """Drop the consumed prefix, leaving at most a tag-length tail, a pending head or the open invoke."""
+        keep_from = self._invoke_start if self._state == _STATE_IN_INVOKE else self._scan
+        if keep_from <= 0:
+            return
+        self._buf = self._buf[keep_from:]
+        self._base += keep_from
+        self._scan -= keep_from
+        if self._state == _STATE_IN_INVOKE:
+            self._invoke_start -= keep_from
+            self._invoke_body_start -= keep_from
+
+
 def parse_xml_tool_calls_to_objects(content: str) -> List[XMLToolCall]:
     """
     Parse XML tool calls from content, returning XMLToolCall objects.
@@ -104,26 +298,11 @@ def parse_xml_tool_calls_to_objects(content: str) -> List[XMLToolCall]:
         content: The text content potentially containing XML tool calls
         
     Returns:
-        List of parsed XMLToolCall objects
+        List of parsed XMLToolCall objects (offsets are relative to content)
     """
-    tool_calls = []
-    
-    # Find function_calls blocks
-    function_calls_matches = _FUNCTION_CALLS_PATTERN.findall(content)
-    
-    for fc_content in function_calls_matches:
-        # Find all invoke blocks within this function_calls block
-        invoke_matches = _INVOKE_PATTERN.findall(fc_content)
-        
-        for function_name, invoke_content in invoke_matches:
-            try:
-                tool_call = _parse_invoke_block(function_name, invoke_content, fc_content)
-                if tool_call:
-                    tool_calls.append(tool_call)
-            except Exception as e:
-                logger.error(f"Error parsing invoke block for {function_name}: {e}")
-    
-    return tool_calls
+    if not content:
+        return []
+    return StreamingXMLToolCallParser().feed(content)
 
 
 def strip_xml_tool_calls(content: str) -> str:
@@ -188,6 +367,30 @@ def extract_xml_chunks(content: str) -> List[str]:
     return chunks
 
 
+def xml_tool_call_to_dict(
+    xml_tool_call: XMLToolCall,
+    assistant_message_id: Optional[str] = None,
+    tool_index: int = 0
+) -> Dict[str, Any]:
+    """
+    Convert an XMLToolCall into the unified tool call dict with a generated ID.
+    
+    The ID has the form xml_tool_index{index}_{assistant_message_id}.
+    """
+    if assistant_message_id:
+        tool_call_id = f"xml_tool_index{tool_index}_{assistant_message_id}"
+    else:
+        # Fallback if no assistant_message_id yet
+        tool_call_id = f"xml_tool_index{tool_index}_{str(uuid.uuid4())}"
+    
+    return {
+        "function_name": xml_tool_call.function_name,
+        "id": tool_call_id,
+        "arguments": xml_tool_call.parameters,
+        "source": "xml"  # Mark as XML tool call for detection
+    }
+
+
 def parse_xml_tool_calls_with_ids(
     xml_chunk: str, 
     assistant_message_id: Optional[str] = None, 
@@ -217,20 +420,8 @@ def parse_xml_tool_calls_with_ids(
             
             # Process ALL tool calls found in the chunk
             for idx, xml_tool_call in enumerate(parsed_calls):
-                # Generate tool_call_id in format: xml_tool_index{id}_AssistantMessageId
-                tool_index = start_index + idx
-                if assistant_message_id:
-                    tool_call_id = f"xml_tool_index{tool_index}_{assistant_message_id}"
-                else:
-                    # Fallback if no assistant_message_id yet
-                    tool_call_id = f"xml_tool_index{tool_index}_{str(uuid.uuid4())}"
-                
-                tool_call = {
-                    "function_name": xml_tool_call.function_name,
-                    "id": tool_call_id,
-                    "arguments": xml_tool_call.parameters,
-                    "source": "xml"  # Mark as XML tool call for detection
-                }
+                tool_call = xml_tool_call_to_dict(xml_tool_call, assistant_message_id, start_index + idx)
+                tool_call_id = tool_call["id"]
                 
                 logger.debug(f"Parsed tool call from chunk: {tool_call['function_name']} (id: {tool_call_id})")
                 results.append(tool_call)
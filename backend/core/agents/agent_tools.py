@@ -1,5 +1,6 @@
 import json
 import base64
+import asyncio
 from datetime import datetime
 from typing import Optional, Dict, Any
 from fastapi import APIRouter, HTTPException, Depends, Request, Body
@@ -134,18 +135,21 @@ async def update_custom_mcp_tools_for_agent(
             raise HTTPException(status_code=400, detail="MCP URL is required")
         
         updated = False
+        saved_mcp = None
         for i, mcp in enumerate(custom_mcps):
             if mcp_type == 'composio':
                 # For Composio, match by profile_id
                 if (mcp.get('type') == 'composio' and 
                     mcp.get('config', {}).get('profile_id') == mcp_url):
                     custom_mcps[i]['enabledTools'] = enabled_tools
+                    saved_mcp = custom_mcps[i]
                     updated = True
                     break
             else:
                 if (mcp.get('customType') == mcp_type and 
                     mcp.get('config', {}).get('url') == mcp_url):
                     custom_mcps[i]['enabledTools'] = enabled_tools
+                    saved_mcp = custom_mcps[i]
                     updated = True
                     break
         
@@ -175,6 +179,7 @@ async def update_custom_mcp_tools_for_agent(
                     mcp_config = await profile_service.get_mcp_config_for_agent(profile_id)
                     mcp_config['enabledTools'] = enabled_tools
                     custom_mcps.append(mcp_config)
+                    saved_mcp = mcp_config
                 except Exception as e:
                     logger.error(f"Failed to get Composio profile config: {e}")
                     raise HTTPException(status_code=400, detail=f"Failed to get Composio profile: {str(e)}")
@@ -189,6 +194,7 @@ async def update_custom_mcp_tools_for_agent(
                     "enabledTools": enabled_tools
                 }
                 custom_mcps.append(new_mcp_config)
+                saved_mcp = new_mcp_config
         
         tools['custom_mcp'] = custom_mcps
         agent_config['tools'] = tools
@@ -210,6 +216,9 @@ async def update_custom_mcp_tools_for_agent(
             logger.error(f"Failed to create version for custom MCP tools update: {e}")
             raise HTTPException(status_code=500, detail="Failed to save changes")
         
+        from core.jit.mcp_schema_cache import mcp_server_schema_cache
+        await mcp_server_schema_cache.invalidate_custom_mcp(saved_mcp)
+        
         return {
             'success': True,
             'enabled_tools': enabled_tools,
@@ -336,6 +345,9 @@ async def update_agent_custom_mcps(
             logger.error(f"Failed to create version for custom MCP tools update: {e}")
             raise HTTPException(status_code=500, detail="Failed to save changes")
         
+        from core.jit.mcp_schema_cache import mcp_server_schema_cache
+        await asyncio.gather(*(mcp_server_schema_cache.invalidate_custom_mcp(mcp) for mcp in new_custom_mcps))
+        
         return {
             'success': True,
             'data': {
@@ -8,6 +8,7 @@ Thin API layer - delegates to core modules:
 
 import asyncio
 import json
+import re
 import time
 import traceback
 import uuid
@@ -43,6 +44,10 @@ router = APIRouter(tags=["agent-runs"])
 # Store cancellation events for stop mechanism (in-memory, per instance)
 _cancellation_events: Dict[str, asyncio.Event] = {}
 
+# SSE resumption: Last-Event-ID must be a Redis stream ID; catch-up reads are paged
+STREAM_ID_PATTERN = re.compile(r'\d+-\d+')
+STREAM_CATCH_UP_BATCH = 500
+
 
 # ============================================================================
 # Helper Functions
@@ -251,6 +256,11 @@ async def start_agent_run(
     # Parallel: load config + check limits
     step_start = time.time()
     
+    # One MGET warms agent config/MCPs, tier, user context etc. for everything below
+    # (awaited directly so the snapshot is inherited by the background run task)
+    from core.cache.runtime_cache import prefetch_agent_run_cache
+    await prefetch_agent_run_cache(agent_id=agent_id, project_id=project_id, account_id=account_id)
+    
     async def load_config():
         return await load_agent_config(agent_id, account_id, user_id=account_id, client=client, is_new_thread=is_new_thread)
     
@@ -633,13 +643,27 @@ async def get_agent_run(agent_run_id: str, user_id: str = Depends(verify_and_get
 async def stream_agent_run(
     agent_run_id: str,
     token: Optional[str] = None,
+    last_event_id: Optional[str] = None,
     request: Request = None
 ):
-    """Stream agent run responses via SSE."""
+    """
+    Stream agent run responses via SSE.
+
+    Each event's `id:` is its Redis stream entry ID. Reconnects resume after the
+    `Last-Event-ID` header (or `last_event_id` query param) and only receive the delta.
+    Trimming is done by the stream writer, never by readers. If the writer has
+    trimmed entries after the client's ID, a `{"type": "resync"}` event is sent
+    and the stream is replayed from its oldest remaining entry; the client should
+    reload the thread's persisted messages. The same event is sent mid-stream if
+    the client falls so far behind that entries it missed were trimmed.
+    """
     user_id = await get_user_id_from_stream_auth(request, token)
     agent_run_data = await _get_agent_run_with_access_check(agent_run_id, user_id)
 
     stream_key = f"agent_run:{agent_run_id}:stream"
+    resume_id = (request.headers.get('last-event-id') if request else None) or last_event_id
+    if resume_id and not STREAM_ID_PATTERN.fullmatch(resume_id):
+        resume_id = None
 
     def compare_stream_ids(id1: str, id2: str) -> int:
         """Compare Redis stream IDs. Returns -1 if id1 < id2, 0 if equal, 1 if id1 > id2."""
@@ -652,59 +676,43 @@ async def stream_agent_run(
         except Exception:
             return -1 if id1 < id2 else (0 if id1 == id2 else 1)
 
-    def find_last_safe_boundary(entries):
-        """Find last safe trim boundary in stream entries."""
-        last_safe = -1
-        open_responses = 0
+    def is_terminal_status(data: str) -> bool:
+        """Entries pass through undecoded; only candidate status entries are parsed."""
+        if '"status"' not in data:
+            return False
+        try:
+            response = json.loads(data)
+        except Exception:
+            return False
+        return response.get('type') == 'status' and response.get('status') in ['completed', 'failed', 'stopped', 'error']
 
-        for i, (_, fields) in enumerate(entries):
-            try:
-                data = json.loads(fields.get('data', '{}'))
-                msg_type = data.get('type')
-
-                if msg_type == 'llm_response_start':
-                    open_responses += 1
-                elif msg_type == 'llm_response_end':
-                    open_responses = max(0, open_responses - 1)
-                    if open_responses == 0:
-                        last_safe = i
-                elif msg_type == 'status' and data.get('status') in ['completed', 'failed', 'stopped', 'error']:
-                    last_safe = i
-            except Exception:
-                continue
-
-        if open_responses > 0:
-            return -1
-        return last_safe
+    def sse_event(entry_id: str, data: str) -> str:
+        return f"id: {entry_id}\ndata: {data}\n\n"
 
     async def stream_generator(agent_run_data):
         terminate = False
-        last_id = "0"
+        last_id = resume_id or "0"
 
         try:
-            # Initial catch-up
-            entries = await redis.stream_range(stream_key)
-            if entries:
+            # Catch-up: only entries after the client's last seen ID
+            start = redis.next_stream_id(resume_id) if resume_id else "-"
+            if resume_id:
+                oldest = await redis.stream_range(stream_key, start="-", count=1)
+                if oldest and compare_stream_ids(oldest[0][0], resume_id) > 0:
+                    # The client's position was trimmed (XTRIM MINID) - entries after it may be gone
+                    yield f"data: {json.dumps({'type': 'resync', 'reason': 'trimmed'})}\n\n"
+                    start = "-"
+            while True:
+                entries = await redis.stream_range(stream_key, start=start, count=STREAM_CATCH_UP_BATCH)
                 for entry_id, fields in entries:
-                    response = json.loads(fields.get('data', '{}'))
-                    yield f"data: {json.dumps(response)}\n\n"
+                    data = fields.get('data', '{}')
+                    yield sse_event(entry_id, data)
                     last_id = entry_id
-                    if response.get('type') == 'status' and response.get('status') in ['completed', 'failed', 'stopped', 'error']:
+                    if is_terminal_status(data):
                         return
-                
-                # Trim processed entries
-                if last_id != "0":
-                    try:
-                        safe_idx = find_last_safe_boundary(entries)
-                        if safe_idx >= 0:
-                            safe_id = entries[safe_idx][0]
-                            if '-' in safe_id:
-                                parts = safe_id.split('-')
-                                if len(parts) == 2:
-                                    next_id = f"{parts[0]}-{int(parts[1]) + 1}"
-                                    await redis.xtrim_minid(stream_key, next_id, approximate=True)
-                    except Exception:
-                        pass
+                if len(entries) < STREAM_CATCH_UP_BATCH:
+                    break
+                start = redis.next_stream_id(last_id)
 
             if agent_run_data.get('status') != 'running':
                 yield f"data: {json.dumps({'type': 'status', 'status': 'completed'})}\n\n"
@@ -714,7 +722,7 @@ async def stream_agent_run(
             # This fixes connection starvation when many SSE clients connect
             timeout_count = 0
             ping_count = 0
-            received_data = bool(entries)
+            received_data = False  # Replayed history doesn't show the worker is still alive
             MAX_PINGS_WITHOUT_DATA = 4  # ~20 seconds without data = check for dead worker
 
             try:
@@ -723,7 +731,10 @@ async def stream_agent_run(
                         if terminate:
                             break
 
-                        if msg is not None:
+                        if isinstance(msg, redis.StreamGap):
+                            # This client fell behind and the writer trimmed what it missed
+                            yield f"data: {json.dumps({'type': 'resync', 'reason': 'trimmed'})}\n\n"
+                        elif msg is not None:
                             entry_id, fields = msg
                             # Dedupe: skip if we already saw this in catch-up
                             if compare_stream_ids(entry_id, last_id) <= 0:
@@ -732,15 +743,11 @@ async def stream_agent_run(
                             timeout_count = 0
                             ping_count = 0
                             data = fields.get('data', '{}')
-                            yield f"data: {data}\n\n"
+                            yield sse_event(entry_id, data)
                             last_id = entry_id
 
-                            try:
-                                response = json.loads(data)
-                                if response.get('type') == 'status' and response.get('status') in ['completed', 'failed', 'stopped', 'error']:
-                                    return
-                            except Exception:
-                                pass
+                            if is_terminal_status(data):
+                                return
                         else:
                             # Timeout (0.5s) - send ping every ~5 seconds
                             timeout_count += 1
@@ -91,10 +91,12 @@ async def stream_status_message(
     stream_key: Optional[str] = None
 ) -> None:
     """Write a status message to Redis stream."""
+    writer = None
     if not stream_key:
         ctx = get_tool_output_streaming_context()
         if ctx:
             stream_key = ctx.stream_key
+            writer = ctx.writer
         else:
             return
     
@@ -103,6 +105,10 @@ async def stream_status_message(
         if metadata:
             status_msg["metadata"] = metadata
         
+        if writer is not None:
+            await asyncio.wait_for(writer.add(status_msg, flush=True), timeout=2.0)
+            return
+        
         await asyncio.wait_for(
             redis.stream_add(stream_key, {"data": json.dumps(status_msg)}, maxlen=200, approximate=True),
             timeout=2.0
@@ -111,6 +117,13 @@ async def stream_status_message(
         logger.debug(f"Failed to write status message (non-critical): {e}")
 
 
+def _requires_immediate_flush(response: Dict[str, Any]) -> bool:
+    """Status, llm_response_end and terminating tool messages skip the stream writer's linger."""
+    if response.get('type') in ('status', 'llm_response_end', 'timing'):
+        return True
+    return check_terminating_tool_call(response) is not None
+
+
 def check_terminating_tool_call(response: Dict[str, Any]) -> Optional[str]:
     """Check if response contains a terminating tool call (ask/complete)."""
     if response.get('type') != 'status':
@@ -778,6 +791,7 @@ async def execute_agent_run(
     stop_checker = None
     final_status = "failed"
     stream_key = f"agent_run:{agent_run_id}:stream"
+    stream_writer = None
     trace = None
     
     try:
@@ -837,7 +851,18 @@ async def execute_agent_run(
         
         stop_checker = asyncio.create_task(check_stop())
         
-        set_tool_output_streaming_context(agent_run_id=agent_run_id, stream_key=stream_key)
+        # Batched writer: pipelines run output XADDs, TTL is refreshed in the first flush
+        stream_writer = redis.stream_writer(stream_key, maxlen=200, ttl_seconds=REDIS_STREAM_TTL_SECONDS)
+        
+        set_tool_output_streaming_context(agent_run_id=agent_run_id, stream_key=stream_key, writer=stream_writer)
+        
+        # Second prefetch round-trip for keys only known now (resolved default agent, existing project)
+        from core.cache.runtime_cache import prefetch_agent_run_cache
+        await prefetch_agent_run_cache(
+            agent_id=agent_config.get('agent_id') if agent_config else None,
+            project_id=project_id,
+            account_id=account_id,
+        )
         
         # Run agent
         runner_config = AgentConfig(
@@ -855,7 +880,6 @@ async def execute_agent_run(
         first_response = False
         complete_tool_called = False
         total_responses = 0
-        stream_ttl_set = False
         error_message = None
         
         async for response in runner.run(cancellation_event=cancellation_event):
@@ -878,7 +902,7 @@ async def execute_agent_run(
                         "first_response_ms": round(first_response_time_ms, 1),
                         "timestamp": datetime.now(timezone.utc).isoformat(),
                     }
-                    await redis.stream_add(stream_key, {"data": json.dumps(timing_msg)}, maxlen=200, approximate=True)
+                    await stream_writer.add(timing_msg, flush=True)
                 except Exception:
                     pass  # Non-critical
 
@@ -887,14 +911,11 @@ async def execute_agent_run(
                 response = serialize_row(response)
             
             try:
-                await redis.stream_add(stream_key, {"data": json.dumps(response)}, maxlen=200, approximate=True)
-                
-                if not stream_ttl_set:
-                    try:
-                        await asyncio.wait_for(redis.expire(stream_key, REDIS_STREAM_TTL_SECONDS), timeout=2.0)
-                        stream_ttl_set = True
-                    except:
-                        pass
+                await stream_writer.add(
+                    response,
+                    flush=_requires_immediate_flush(response),
+                    boundary=response.get('type') == 'llm_response_end'
+                )
             except Exception as e:
                 logger.warning(f"Failed to write to stream: {e}")
             
@@ -922,7 +943,7 @@ async def execute_agent_run(
             
             completion_msg = {"type": "status", "status": "completed", "message": "Completed successfully"}
             try:
-                await redis.stream_add(stream_key, {'data': json.dumps(completion_msg)}, maxlen=200, approximate=True)
+                await stream_writer.add(completion_msg, flush=True)
             except:
                 pass
             
@@ -931,6 +952,9 @@ async def execute_agent_run(
         if stop_state['reason']:
             final_status = "stopped"
         
+        # Make buffered output visible before the run is marked finished
+        await stream_writer.flush()
+        
         await update_agent_run_status(agent_run_id, final_status, error=error_message, account_id=account_id)
         
         logger.info(f"✅ Agent run completed: {agent_run_id} | status={final_status}")
@@ -961,7 +985,16 @@ async def execute_agent_run(
                 log_cleanup_error(agent_run_id, "stop_checker", e)
                 cleanup_errors.append(f"stop_checker: {e}")
         
-        # Step 3: Set Redis stream TTL (ensure cleanup even if we crash)
+        # Step 3: Flush any buffered stream entries
+        if stream_writer is not None:
+            try:
+                await stream_writer.close()
+                logger.debug(f"Stream writer stats: {stream_writer.get_stats()}")
+            except Exception as e:
+                log_cleanup_error(agent_run_id, "stream_writer", e)
+                cleanup_errors.append(f"stream_writer: {e}")
+        
+        # Step 4: Set Redis stream TTL (ensure cleanup even if we crash)
         try:
             await redis.expire(stream_key, REDIS_STREAM_TTL_SECONDS)
         except Exception as e:
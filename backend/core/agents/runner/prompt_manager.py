@@ -7,6 +7,7 @@ from typing import Optional, Tuple
 from core.tools.mcp_tool_wrapper import MCPToolWrapper
 from core.agentpress.tool import SchemaType
 from core.tools.tool_guide_registry import get_minimal_tool_index, get_tool_guide
+from core.agentpress.prompt_segments import PromptSegment, SegmentedPrompt, fingerprint, prompt_segment_cache
 from core.utils.logger import logger
 
 class PromptManager:
@@ -23,14 +24,10 @@ class PromptManager:
         build_start = time.time()
         
         if agent_config and agent_config.get('system_prompt'):
-            system_content = agent_config['system_prompt'].strip()
+            base_prompt = agent_config['system_prompt'].strip()
         else:
             from core.prompts.core_prompt import get_core_system_prompt
-            system_content = get_core_system_prompt()
-        
-        t1 = time.time()
-        system_content = PromptManager._build_base_prompt(system_content)
-        logger.debug(f"⏱️ [PROMPT TIMING] _build_base_prompt: {(time.time() - t1) * 1000:.1f}ms")
+            base_prompt = get_core_system_prompt()
         
         # Start parallel fetch tasks
         kb_task = PromptManager._with_timeout(PromptManager._fetch_knowledge_base(agent_config, client), 2.0, "KB fetch")
@@ -38,9 +35,6 @@ class PromptManager:
         memory_task = PromptManager._fetch_user_memories(user_id, thread_id, client)
         file_task = PromptManager._fetch_file_context(thread_id)
         
-        agent_id = agent_config.get('agent_id') if agent_config else None
-        
-        t_mcp = time.time()
         fresh_mcp_config = None
         if agent_config and (agent_config.get('custom_mcps') or agent_config.get('configured_mcps')):
             fresh_mcp_config = {
@@ -48,36 +42,70 @@ class PromptManager:
                 'configured_mcps': agent_config.get('configured_mcps', []),
                 'account_id': user_id
             }
-            logger.debug(f"⏱️ [PROMPT TIMING] MCP config from agent_config (no re-fetch): 0.0ms")
-        else:
-            logger.debug(f"⏱️ [PROMPT TIMING] No MCP config in agent_config: 0.0ms")
+        mcp_config_hash = fingerprint(
+            fresh_mcp_config.get('custom_mcp') if fresh_mcp_config else None,
+            fresh_mcp_config.get('configured_mcps') if fresh_mcp_config else None,
+        )
+        
+        # Stable segments are memoized by a fingerprint of their inputs; volatile ones
+        # (user context, date) always go after them so the prefix stays byte-identical
+        prompt = SegmentedPrompt()
+        
+        t1 = time.time()
+        prompt.add(PromptSegment("base", prompt_segment_cache.get_or_build(
+            "base", fingerprint(base_prompt),
+            lambda: PromptManager._build_base_prompt(base_prompt)
+        )))
+        logger.debug(f"⏱️ [PROMPT TIMING] base segment: {(time.time() - t1) * 1000:.1f}ms")
         
         t3 = time.time()
-        system_content = await PromptManager._append_mcp_tools_info(system_content, agent_config, mcp_wrapper_instance, fresh_mcp_config)
-        logger.debug(f"⏱️ [PROMPT TIMING] _append_mcp_tools_info: {(time.time() - t3) * 1000:.1f}ms")
+        mcp_tool_set = []
+        if mcp_wrapper_instance and mcp_wrapper_instance._initialized:
+            try:
+                mcp_tool_set = sorted(
+                    (method_name, schema.schema.get('function', {}).get('description', ''))
+                    for method_name, schema_list in mcp_wrapper_instance.get_schemas().items()
+                    for schema in schema_list
+                    if schema.schema_type == SchemaType.OPENAPI
+                )
+            except Exception as e:
+                logger.warning(f"Failed to list MCP schemas for prompt fingerprint: {e}")
+        prompt.add(PromptSegment("mcp_tools", await prompt_segment_cache.aget_or_build(
+            "mcp_tools", fingerprint(mcp_config_hash, mcp_tool_set),
+            lambda: PromptManager._mcp_tools_info(agent_config, mcp_wrapper_instance, fresh_mcp_config)
+        )))
+        logger.debug(f"⏱️ [PROMPT TIMING] mcp_tools segment: {(time.time() - t3) * 1000:.1f}ms")
         
         t4 = time.time()
-        system_content = await PromptManager._append_jit_mcp_info(system_content, mcp_loader, fresh_mcp_config)
-        logger.debug(f"⏱️ [PROMPT TIMING] _append_jit_mcp_info: {(time.time() - t4) * 1000:.1f}ms")
-        
-        system_content = PromptManager._append_xml_tool_calling_instructions(system_content, xml_tool_calling, tool_registry)
-        system_content = PromptManager._append_datetime_info(system_content)
+        prompt.add(PromptSegment("jit_mcp", await prompt_segment_cache.aget_or_build(
+            "jit_mcp", mcp_config_hash,
+            lambda: PromptManager._jit_mcp_info(mcp_loader, fresh_mcp_config)
+        )))
+        logger.debug(f"⏱️ [PROMPT TIMING] jit_mcp segment: {(time.time() - t4) * 1000:.1f}ms")
+        
+        if xml_tool_calling and tool_registry:
+            prompt.add(PromptSegment("xml_tools", prompt_segment_cache.get_or_build(
+                "xml_tools", fingerprint(sorted(tool_registry.tools.keys())),
+                lambda: PromptManager._xml_tool_calling_instructions(xml_tool_calling, tool_registry)
+            )))
         
         t5 = time.time()
         kb_data, user_context_data, memory_data, file_data = await asyncio.gather(kb_task, user_context_task, memory_task, file_task)
         logger.debug(f"⏱️ [PROMPT TIMING] parallel fetches (kb/user_context/memory/file): {(time.time() - t5) * 1000:.1f}ms")
         
-        logger.info(f"⏱️ [PROMPT TIMING] Total build_system_prompt: {(time.time() - build_start) * 1000:.1f}ms")
-        
         if kb_data:
-            system_content += kb_data
+            prompt.add(PromptSegment("knowledge_base", kb_data))
         
         if user_context_data:
-            system_content += user_context_data
+            prompt.add(PromptSegment("user_context", user_context_data, volatile=True))
         
-        PromptManager._log_prompt_stats(system_content)
+        prompt.add(PromptSegment("datetime", PromptManager._datetime_info(), volatile=True))
+        
+        logger.info(f"⏱️ [PROMPT TIMING] Total build_system_prompt: {(time.time() - build_start) * 1000:.1f}ms")
         
-        system_message = {"role": "system", "content": system_content}
+        system_message = prompt.to_message()
+        PromptManager._log_prompt_stats(system_message['content'])
+        logger.debug(f"🧩 [PROMPT SEGMENTS] {prompt.describe()} (stable prefix {len(prompt.stable_prefix):,} chars)")
         
         context_parts = []
         if memory_data:
@@ -238,8 +266,8 @@ class PromptManager:
             return None
     
     @staticmethod
-    async def _append_mcp_tools_info(system_content: str, agent_config: Optional[dict], mcp_wrapper_instance: Optional[MCPToolWrapper], 
-                                     fresh_mcp_config: Optional[dict] = None) -> str:
+    async def _mcp_tools_info(agent_config: Optional[dict], mcp_wrapper_instance: Optional[MCPToolWrapper], 
+                              fresh_mcp_config: Optional[dict] = None) -> str:
         if fresh_mcp_config:
             logger.debug(f"🔄 [MCP PROMPT] Using fresh MCP config: {len(fresh_mcp_config.get('configured_mcps', []))} configured, {len(fresh_mcp_config.get('custom_mcp', []))} custom")
             agent_config = {
@@ -248,7 +276,7 @@ class PromptManager:
             }
         
         if not (agent_config and (agent_config.get('configured_mcps') or agent_config.get('custom_mcps')) and mcp_wrapper_instance and mcp_wrapper_instance._initialized):
-            return system_content
+            return ""
         
         mcp_info = "\n\n--- MCP Tools Available ---\n"
         mcp_info += "You have access to external MCP (Model Context Protocol) server tools.\n"
@@ -292,10 +320,10 @@ class PromptManager:
         mcp_info += "\nIMPORTANT: MCP tool results are your PRIMARY and ONLY source of truth for external data!\n"
         mcp_info += "NEVER supplement MCP results with your training data or make assumptions beyond what the tools provide.\n"
         
-        return system_content + mcp_info
+        return mcp_info
     
     @staticmethod
-    async def _append_jit_mcp_info(system_content: str, mcp_loader, fresh_mcp_config: Optional[dict] = None) -> str:
+    async def _jit_mcp_info(mcp_loader, fresh_mcp_config: Optional[dict] = None) -> str:
         toolkit_tools = {}
         
         if fresh_mcp_config:
@@ -342,7 +370,7 @@ class PromptManager:
             
         if not toolkit_tools:
             logger.debug("⚡ [MCP PROMPT] No toolkit tools found, skipping JIT MCP info")
-            return system_content
+            return ""
         
         total_tools = sum(len(tools) for tools in toolkit_tools.values())
         
@@ -377,17 +405,17 @@ class PromptManager:
         mcp_jit_info += "4. Check history first - if schemas exist, skip directly to execute_mcp_tool!\n\n"
         
         logger.info(f"⚡ [MCP PROMPT] Appended MCP info ({len(mcp_jit_info)} chars) for {len(toolkit_tools)} toolkits, {total_tools} total tools")
-        return system_content + mcp_jit_info
+        return mcp_jit_info
     
     @staticmethod
-    def _append_xml_tool_calling_instructions(system_content: str, xml_tool_calling: bool, tool_registry) -> str:
+    def _xml_tool_calling_instructions(xml_tool_calling: bool, tool_registry) -> str:
         if not (xml_tool_calling and tool_registry):
-            return system_content
+            return ""
         
         openapi_schemas = tool_registry.get_openapi_schemas()
         
         if not openapi_schemas:
-            return system_content
+            return ""
         
         schemas_json = json.dumps(openapi_schemas, indent=2)
         
@@ -456,11 +484,11 @@ Example of correct tool call format (multiple invokes in one block):
 [Generation stops here automatically - do not continue]
 """
         
-        logger.debug("Appended XML tool examples to system prompt")
-        return system_content + examples_content
+        logger.debug("Built XML tool examples for system prompt")
+        return examples_content
     
     @staticmethod
-    def _append_datetime_info(system_content: str) -> str:
+    def _datetime_info() -> str:
         now = datetime.datetime.now(datetime.timezone.utc)
         datetime_info = f"\n\n=== CURRENT DATE/TIME INFORMATION ===\n"
         datetime_info += f"Today's date: {now.strftime('%A, %B %d, %Y')}\n"
@@ -469,7 +497,7 @@ Example of correct tool call format (multiple invokes in one block):
         datetime_info += f"Current day: {now.strftime('%A')}\n"
         datetime_info += "Use this information for any time-sensitive tasks, research, or when current date/time context is needed.\n"
         
-        return system_content + datetime_info
+        return datetime_info
     
     @staticmethod
     async def _fetch_user_context_data(user_id: Optional[str], client) -> Optional[str]:
@@ -1,4 +1,4 @@
-from .models import Model, ModelProvider, ModelCapability, ModelPricing, ModelConfig
+from .models import Model, ModelProvider, ModelCapability, ModelPricing, ModelConfig, ModelDeployment
 from .registry import ModelRegistry, registry
 
 # Backwards compatibility alias
@@ -12,5 +12,6 @@ __all__ = [
     'ModelCapability',
     'ModelPricing',
     'ModelConfig',
+    'ModelDeployment',
     'model_manager',  # Backwards compatibility
 ]
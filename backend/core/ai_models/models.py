@@ -76,6 +76,17 @@ class ModelConfig:
     performanceConfig: Optional[Dict[str, str]] = None  # e.g., {"latency": "optimized"}
 
 
+@dataclass
+class ModelDeployment:
+    """One way of serving a model, e.g. a Bedrock inference profile or the direct Anthropic API.
+    
+    All deployments of a model are interchangeable; the LLM router picks between them.
+    """
+    litellm_model_id: str
+    provider: ModelProvider
+    config: Optional[ModelConfig] = None
+
+
 @dataclass
 class Model:
     # Registry ID - internal identifier (e.g., "kortix/basic")
@@ -102,6 +113,9 @@ class Model:
     # Centralized model configuration
     config: Optional[ModelConfig] = None
     
+    # Equivalent alternates to litellm_model_id (same model served elsewhere)
+    deployments: List[ModelDeployment] = field(default_factory=list)
+    
     def __post_init__(self):
         # Default litellm_model_id to id if not provided
         if self.litellm_model_id is None:
@@ -127,19 +141,30 @@ class Model:
     def is_free_tier(self) -> bool:
         return "free" in self.tier_availability
     
-    def get_litellm_params(self, **override_params) -> Dict[str, Any]:
-        """Get complete LiteLLM parameters for this model, including all configuration."""
+    @property
+    def primary_deployment(self) -> ModelDeployment:
+        return ModelDeployment(litellm_model_id=self.litellm_model_id, provider=self.provider, config=self.config)
+    
+    def get_deployments(self) -> List[ModelDeployment]:
+        """Primary deployment first, then the registered alternates."""
+        return [self.primary_deployment] + list(self.deployments)
+    
+    def get_litellm_params(self, deployment: Optional[ModelDeployment] = None, **override_params) -> Dict[str, Any]:
+        """Get complete LiteLLM parameters for this model (or one of its deployments), including all configuration."""
+        deployment = deployment or self.primary_deployment
+        model_config = deployment.config
+        
         # Start with intelligent defaults
         # Note: Keep num_retries low for streaming - retries are expensive for LLM calls
         # and can cause massive delays if the provider is slow/unresponsive
         params = {
-            "model": self.litellm_model_id,
+            "model": deployment.litellm_model_id,
             "num_retries": 1,  # Reduced from 5 to prevent 5x delay on failures
             "timeout": 120,   # 2 minute timeout to fail fast instead of hanging
         }
         
         # Apply model-specific configuration if available
-        if self.config:
+        if model_config:
             # Provider & API configuration parameters
             api_params = [
                 'api_base', 'api_version', 'base_url', 'deployment_id', 
@@ -148,16 +173,16 @@ class Model:
             
             # Apply configured parameters
             for param_name in api_params:
-                param_value = getattr(self.config, param_name, None)
+                param_value = getattr(model_config, param_name, None)
                 if param_value is not None:
                     params[param_name] = param_value
             
-            if self.config.headers:
-                params["headers"] = self.config.headers.copy()
-            if self.config.extra_headers:
-                params["extra_headers"] = self.config.extra_headers.copy()
-            if self.config.performanceConfig:
-                params["performanceConfig"] = self.config.performanceConfig.copy()
+            if model_config.headers:
+                params["headers"] = model_config.headers.copy()
+            if model_config.extra_headers:
+                params["extra_headers"] = model_config.extra_headers.copy()
+            if model_config.performanceConfig:
+                params["performanceConfig"] = model_config.performanceConfig.copy()
         
         # Apply any runtime overrides
         for key, value in override_params.items():
@@ -1,5 +1,5 @@
 from typing import Dict, List, Optional, Tuple, Any
-from .models import Model, ModelProvider, ModelCapability, ModelPricing, ModelConfig
+from .models import Model, ModelProvider, ModelCapability, ModelPricing, ModelConfig, ModelDeployment
 from core.utils.config import config, EnvMode
 from core.utils.logger import logger
 
@@ -112,7 +112,20 @@ class ModelRegistry:
         ))
         
         # Claude Haiku 4.5 - can be used as a fallback for vision tasks
-        haiku_litellm_id = HAIKU_BEDROCK_ARN if SHOULD_USE_BEDROCK else "anthropic/claude-haiku-4-5-20251001"
+        haiku_direct_id = "anthropic/claude-haiku-4-5-20251001"
+        haiku_litellm_id = HAIKU_BEDROCK_ARN if SHOULD_USE_BEDROCK else haiku_direct_id
+        haiku_config = ModelConfig(
+            extra_headers={
+                "anthropic-beta": "fine-grained-tool-streaming-2025-05-14,token-efficient-tools-2025-02-19"
+            },
+        )
+        
+        # The same model on the other provider, if its credentials are configured (LLM router alternates)
+        haiku_deployments = []
+        if SHOULD_USE_BEDROCK and config.ANTHROPIC_API_KEY:
+            haiku_deployments.append(ModelDeployment(haiku_direct_id, ModelProvider.ANTHROPIC, haiku_config))
+        elif not SHOULD_USE_BEDROCK and config.AWS_BEARER_TOKEN_BEDROCK:
+            haiku_deployments.append(ModelDeployment(HAIKU_BEDROCK_ARN, ModelProvider.BEDROCK, haiku_config))
         
         self.register(Model(
             id="kortix/haiku",
@@ -132,11 +145,8 @@ class ModelRegistry:
             priority=50,
             recommended=False,
             enabled=True,
-            config=ModelConfig(
-                extra_headers={
-                    "anthropic-beta": "fine-grained-tool-streaming-2025-05-14,token-efficient-tools-2025-02-19"
-                },
-            )
+            config=haiku_config,
+            deployments=haiku_deployments,
         ))
         
         # Kortix Test - uses MiniMax M2.1 via direct API (only in LOCAL and STAGING, not PRODUCTION)
@@ -254,8 +264,13 @@ class ModelRegistry:
             return model.supports_vision
         return False
     
-    def get_litellm_params(self, model_id: str, **override_params) -> Dict[str, Any]:
-        """Get complete LiteLLM parameters for a model from the registry."""
+    def get_deployments(self, model_id: str) -> List[ModelDeployment]:
+        """Interchangeable deployments of a model, primary first. Empty for unregistered models."""
+        model = self.get(model_id)
+        return model.get_deployments() if model else []
+    
+    def get_litellm_params(self, model_id: str, deployment: Optional[ModelDeployment] = None, **override_params) -> Dict[str, Any]:
+        """Get complete LiteLLM parameters for a model (optionally a specific deployment) from the registry."""
         model = self.get(model_id)
         if not model:
             return {
@@ -265,8 +280,8 @@ class ModelRegistry:
             }
         
         # Get config from model, then override the model ID with the actual LiteLLM model ID
-        params = model.get_litellm_params(**override_params)
-        params["model"] = self.get_litellm_model_id(model_id)
+        params = model.get_litellm_params(deployment=deployment, **override_params)
+        params["model"] = deployment.litellm_model_id if deployment else self.get_litellm_model_id(model_id)
         
         return params
     
@@ -298,10 +313,12 @@ class ModelRegistry:
         Used by cost calculator to find pricing. Returns input if not found.
         Handles model ID variations (with/without provider prefix).
         """
-        # Direct lookup in registered models
+        # Direct lookup in registered models (and their alternate deployments)
         for model in self._models.values():
             if model.litellm_model_id == litellm_model_id:
                 return model.id
+            if any(d.litellm_model_id == litellm_model_id for d in model.deployments):
+                return model.id
         
         # Try normalized version (handles openrouter/ prefix)
         normalized_id = self._normalize_model_id(litellm_model_id)
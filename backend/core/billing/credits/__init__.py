@@ -1,6 +1,7 @@
 from .manager import credit_manager
 from .calculator import calculate_token_cost, calculate_cached_token_cost, calculate_cache_write_cost
 from .integration import billing_integration
+from .usage_ledger import usage_ledger
 
 __all__ = [
     'credit_manager',
@@ -8,4 +9,5 @@ __all__ = [
     'calculate_cached_token_cost',
     'calculate_cache_write_cost',
     'billing_integration',
+    'usage_ledger',
 ]
@@ -3,6 +3,7 @@ from typing import Optional, Dict, Tuple, List
 from datetime import datetime, timezone
 from core.billing.credits.calculator import calculate_token_cost, calculate_cached_token_cost, calculate_cache_write_cost
 from core.billing.credits.manager import credit_manager
+from core.billing.credits.usage_ledger import usage_ledger
 from core.utils.config import config, EnvMode
 from core.utils.logger import logger
 from ..shared.config import is_model_allowed
@@ -52,6 +53,10 @@ class BillingIntegration:
         else:
             balance = Decimal(str(balance_info or 0))
         
+        if config.USAGE_LEDGER_ENABLED:
+            # Usage recorded since the last settlement is not in the stored balance yet
+            balance -= await usage_ledger.pending_amount(account_id)
+        
         if balance < 0:
             return False, f"Insufficient credits. Your balance is {int(balance * 100)} credits. Please add credits to continue.", None
         
@@ -154,6 +159,46 @@ class BillingIntegration:
         
         logger.debug(f"[BILLING] Calculated cost: ${cost:.6f} for {model}")
         
+        if config.USAGE_LEDGER_ENABLED and message_id:
+            try:
+                recorded = await usage_ledger.record(
+                    account_id=account_id,
+                    amount=cost,
+                    message_id=message_id,
+                    thread_id=thread_id,
+                    model=model
+                )
+                # Settled into the balance by the usage ledger worker
+                return {
+                    'success': True,
+                    'cost': float(cost),
+                    'deferred': True,
+                    'duplicate': not recorded
+                }
+            except Exception as e:
+                # A timed-out append may still have reached the stream: settle keyed on
+                # message_id so that entry is skipped, rather than deducting on top of it
+                logger.warning(f"[BILLING] Usage ledger unavailable, settling inline for {account_id}: {e!r}")
+                result = await usage_ledger.settle_now(
+                    account_id=account_id,
+                    amount=cost,
+                    message_id=message_id,
+                    thread_id=thread_id,
+                    model=model
+                ) or {}
+                if result.get('success'):
+                    await invalidate_account_state_cache(account_id)
+                else:
+                    logger.error(f"[BILLING] Failed to settle usage for user {account_id}: {result.get('error')}")
+                return {
+                    'success': result.get('success', False),
+                    'cost': float(cost),
+                    'new_balance': result.get('new_total', 0),
+                    'from_expiring': result.get('from_expiring', 0),
+                    'from_non_expiring': result.get('from_non_expiring', 0),
+                    'transaction_id': result.get('transaction_id')
+                }
+        
         result = await credit_manager.deduct_credits(
             account_id=account_id,
             amount=cost,
@@ -0,0 +1,260 @@
+"""
+Usage ledger: deferred, batched credit deductions for LLM usage.
+
+Charging an LLM call used to run atomic_use_credits and two cache invalidations
+inline, after every call, on the agent loop. Now the call's cost is appended to a
+Redis stream in one round trip, and a settlement worker drains the stream and
+deducts each account's accumulated usage with a single atomic_settle_usage call.
+
+- Idempotent on message_id: the append is skipped when the message was already
+  recorded, and usage_settlements skips entries that were settled before, so a
+  batch redelivered after a crash is never charged twice.
+- Durable: entries stay in the stream until their batch is committed; a failed
+  batch is retried, including by other instances once it has been idle.
+- Balance checks stay accurate between settlements: a per-account Redis counter
+  holds the recorded-but-unsettled amount and is subtracted from the balance.
+- If the append fails or times out, the call is settled right away through the
+  same message_id-keyed settlement (settle_now), never by a plain deduction.
+
+Amounts are kept as integer micro-dollars so the counter never drifts.
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.utils.logger import logger
+
+STREAM_KEY = "usage_ledger:v1:stream"
+CONSUMER_GROUP = "usage_settlement"
+SEEN_KEY_PREFIX = "usage_ledger:v1:seen:"
+PENDING_KEY_PREFIX = "usage_ledger:v1:pending:"
+SEEN_TTL = 7 * 86400
+PENDING_TTL = 86400
+
+SETTLE_INTERVAL_SECONDS = 2.0
+SETTLE_BATCH_SIZE = 500
+RECLAIM_IDLE_MS = 60_000
+REDIS_TIMEOUT = 3.0
+
+MICROS = Decimal(1_000_000)
+
+# KEYS: seen, stream, pending. ARGV: seen ttl, pending ttl, account, message, thread, model, micros
+_APPEND_SCRIPT = """
+if not redis.call('SET', KEYS[1], '1', 'NX', 'EX', ARGV[1]) then
+    return 0
+end
+redis.call('XADD', KEYS[2], '*',
+    'account_id', ARGV[3], 'message_id', ARGV[4], 'thread_id', ARGV[5],
+    'model', ARGV[6], 'amount_micros', ARGV[7])
+redis.call('INCRBY', KEYS[3], ARGV[7])
+redis.call('EXPIRE', KEYS[3], ARGV[2])
+return 1
+"""
+
+# KEYS: pending, stream. ARGV: group, settled micros, entry ids...
+_SETTLED_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    local remaining = redis.call('DECRBY', KEYS[1], ARGV[2])
+    if remaining <= 0 then
+        redis.call('DEL', KEYS[1])
+    end
+end
+local ids = {unpack(ARGV, 3)}
+redis.call('XACK', KEYS[2], ARGV[1], unpack(ids))
+return redis.call('XDEL', KEYS[2], unpack(ids))
+"""
+
+
+def to_micros(amount: Decimal) -> int:
+    return int((Decimal(str(amount)) * MICROS).to_integral_value())
+
+
+class UsageLedger:
+    def __init__(self):
+        self._group_ready = False
+        self._stats = {
+            "recorded": 0,
+            "duplicates": 0,
+            "direct_fallbacks": 0,
+            "settled_batches": 0,
+            "settled_entries": 0,
+            "failed_batches": 0,
+            "last_settle_ms": 0.0,
+        }
+
+    async def _client(self):
+        from core.services import redis
+        return await redis.get_client()
+
+    async def record(
+        self,
+        account_id: str,
+        amount: Decimal,
+        message_id: str,
+        thread_id: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> bool:
+        """Append one LLM call's cost. Returns False if message_id was already recorded."""
+        micros = to_micros(amount)
+        client = await self._client()
+        added = await asyncio.wait_for(
+            client.eval(
+                _APPEND_SCRIPT, 3,
+                f"{SEEN_KEY_PREFIX}{message_id}", STREAM_KEY, f"{PENDING_KEY_PREFIX}{account_id}",
+                SEEN_TTL, PENDING_TTL, account_id, message_id, thread_id or "", model or "", micros,
+            ),
+            timeout=REDIS_TIMEOUT,
+        )
+        if added:
+            self._stats["recorded"] += 1
+            return True
+        self._stats["duplicates"] += 1
+        logger.debug(f"[USAGE_LEDGER] Usage for message {message_id} already recorded, skipping")
+        return False
+
+    async def pending_amount(self, account_id: str) -> Decimal:
+        """Usage recorded for the account but not yet settled into its balance."""
+        try:
+            client = await self._client()
+            value = await asyncio.wait_for(client.get(f"{PENDING_KEY_PREFIX}{account_id}"), timeout=REDIS_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"[USAGE_LEDGER] Could not read pending usage for {account_id}: {e}")
+            return Decimal("0")
+        return max(Decimal(int(value or 0)), Decimal("0")) / MICROS
+
+    async def _ensure_group(self, client):
+        if self._group_ready:
+            return
+        try:
+            await client.xgroup_create(STREAM_KEY, CONSUMER_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def _read_batch(self, client, consumer: str) -> List[Tuple[str, Dict[str, str]]]:
+        # Entries another consumer read but never acknowledged (crash, failed settle) come first
+        _, claimed, *_ = await client.xautoclaim(
+            STREAM_KEY, CONSUMER_GROUP, consumer, RECLAIM_IDLE_MS, start_id="0-0", count=SETTLE_BATCH_SIZE
+        )
+        entries = [(entry_id, fields) for entry_id, fields in claimed if fields]
+        if len(entries) < SETTLE_BATCH_SIZE:
+            response = await client.xreadgroup(
+                CONSUMER_GROUP, consumer, {STREAM_KEY: ">"}, count=SETTLE_BATCH_SIZE - len(entries)
+            )
+            for _, stream_entries in response or []:
+                entries.extend(stream_entries)
+        return entries
+
+    async def settle_once(self, consumer: str) -> int:
+        """Settle one batch from the stream. Returns the number of entries processed."""
+        from core.billing import repo as billing_repo
+        from core.billing.shared.cache_utils import invalidate_all_billing_caches
+
+        client = await self._client()
+        await self._ensure_group(client)
+        entries = await self._read_batch(client, consumer)
+        if not entries:
+            return 0
+
+        start = time.monotonic()
+        by_account: Dict[str, List[Tuple[str, Dict[str, str]]]] = defaultdict(list)
+        for entry_id, fields in entries:
+            by_account[fields.get("account_id", "")].append((entry_id, fields))
+
+        processed = 0
+        for account_id, account_entries in by_account.items():
+            ids = [entry_id for entry_id, _ in account_entries]
+            micros = sum(int(fields.get("amount_micros", 0)) for _, fields in account_entries)
+            payload = [
+                {
+                    "message_id": fields.get("message_id"),
+                    "thread_id": fields.get("thread_id") or None,
+                    "model": fields.get("model") or None,
+                    "amount": str(Decimal(int(fields.get("amount_micros", 0))) / MICROS),
+                }
+                for _, fields in account_entries
+            ]
+            try:
+                result = await billing_repo.atomic_settle_usage(account_id, payload) if account_id else None
+            except Exception as e:
+                # Left unacknowledged: reclaimed and retried after RECLAIM_IDLE_MS
+                self._stats["failed_batches"] += 1
+                logger.error(f"[USAGE_LEDGER] Settlement of {len(ids)} entries for {account_id} failed: {e}")
+                continue
+
+            if not result or not result.get("success"):
+                # Not retryable (e.g. no credit account) - same outcome as a failed inline deduction
+                logger.error(f"[USAGE_LEDGER] Dropping {len(ids)} usage entries for {account_id}: {result}")
+            else:
+                logger.debug(f"[USAGE_LEDGER] Settled {result.get('settled', 0)} calls for {account_id}: "
+                             f"${result.get('amount_deducted', 0)} (new balance ${result.get('new_total', 0)})")
+                await invalidate_all_billing_caches(account_id)
+
+            await asyncio.wait_for(
+                client.eval(_SETTLED_SCRIPT, 2, f"{PENDING_KEY_PREFIX}{account_id}", STREAM_KEY,
+                            CONSUMER_GROUP, micros, *ids),
+                timeout=REDIS_TIMEOUT,
+            )
+            self._stats["settled_batches"] += 1
+            self._stats["settled_entries"] += len(ids)
+            processed += len(ids)
+
+        self._stats["last_settle_ms"] = round((time.monotonic() - start) * 1000, 1)
+        return processed
+
+    async def drain(self, consumer: str, max_batches: int = 20) -> int:
+        total = 0
+        for _ in range(max_batches):
+            processed = await self.settle_once(consumer)
+            total += processed
+            if processed < SETTLE_BATCH_SIZE:
+                break
+        return total
+
+    async def run_settlement_worker(self, consumer: str, interval_seconds: float = SETTLE_INTERVAL_SECONDS):
+        logger.info(f"[USAGE_LEDGER] Settlement worker started (consumer={consumer}, interval={interval_seconds}s)")
+        while True:
+            try:
+                await self.drain(consumer)
+                await asyncio.sleep(interval_seconds)
+            except asyncio.CancelledError:
+                logger.info("[USAGE_LEDGER] Settlement worker stopped")
+                raise
+            except Exception as e:
+                logger.error(f"[USAGE_LEDGER] Settlement worker error: {e}")
+                await asyncio.sleep(interval_seconds)
+
+    async def settle_now(
+        self,
+        account_id: str,
+        amount: Decimal,
+        message_id: str,
+        thread_id: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Settle one call's cost immediately, when it could not be recorded.
+
+        Goes through atomic_settle_usage, so it claims message_id in
+        usage_settlements like the worker does: an append that timed out after
+        Redis ran it still settles later, and is then skipped instead of charged
+        a second time.
+        """
+        from core.billing import repo as billing_repo
+
+        self._stats["direct_fallbacks"] += 1
+        return await billing_repo.atomic_settle_usage(account_id, [{
+            "message_id": message_id,
+            "thread_id": thread_id,
+            "model": model,
+            "amount": str(Decimal(to_micros(amount)) / MICROS),
+        }])
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self._stats)
+
+
+usage_ledger = UsageLedger()
@@ -90,6 +90,7 @@ from ._legacy import (
     atomic_add_credits,
     atomic_reset_expiring_credits,
     atomic_use_credits,
+    atomic_settle_usage,
     atomic_grant_renewal_credits,
     insert_credit_ledger,
     insert_credit_ledger_with_balance,
@@ -165,6 +166,7 @@ __all__ = [
     'atomic_add_credits',
     'atomic_reset_expiring_credits',
     'atomic_use_credits',
+    'atomic_settle_usage',
     'atomic_grant_renewal_credits',
     'insert_credit_ledger',
     'insert_credit_ledger_with_balance',
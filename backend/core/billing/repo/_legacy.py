@@ -5,6 +5,7 @@ Note: Credit account functions have been migrated to credit_accounts.py
 This file contains transactions, trial, and credit operations that will be
 migrated incrementally.
 """
+import json
 from typing import List, Dict, Any, Optional, Tuple
 from core.services.db import execute, execute_one, serialize_row
 from datetime import datetime, timezone, timedelta
@@ -528,6 +529,21 @@ async def atomic_use_credits(
     return row.get('result') if row else None
 
 
+async def atomic_settle_usage(account_id: str, entries: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Call atomic_settle_usage RPC function with a batch of usage ledger entries."""
+    sql = """
+    SELECT atomic_settle_usage(
+        CAST(:p_account_id AS uuid),
+        CAST(:p_entries AS jsonb)
+    ) as result
+    """
+    row = await execute_one(sql, {
+        "p_account_id": account_id,
+        "p_entries": json.dumps(entries)
+    }, commit=True)
+    return row.get('result') if row else None
+
+
 async def atomic_grant_renewal_credits(
     account_id: str,
     period_start: int,
@@ -8,10 +8,23 @@ This module provides Redis-based caching for frequently accessed data:
 - Thread count (thread limit checks)
 
 All caches use explicit invalidation on data changes, with TTL as safety net.
+
+Reads go through two tiers: a process-local LRU of encoded values (L1) in front of
+Redis (L2). invalidate_* and set_* publish the touched keys on a pub/sub channel so
+every instance drops its L1 copy; L1 is only used while that listener is connected.
+An L2 read that races an invalidation of the same key doesn't fill L1.
+
+Agent run setup reads its keys through a single MGET (prefetch_agent_run_cache);
+the per-key getters below consult that run-scoped snapshot before going to Redis.
 """
+import asyncio
 import json
+import os
 import time
-from typing import Dict, Any, Optional, Union
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union
 from core.utils.logger import logger
 
 # Use orjson for cache operations (3-5x faster than stdlib json)
@@ -37,6 +50,334 @@ def _json_loads(value: Union[str, bytes]) -> Any:
         return json.loads(value.decode('utf-8'))
     return json.loads(value)
 
+# ============================================================================
+# RUN PREFETCH SNAPSHOT - One MGET per agent run, consulted by the getters below
+# ============================================================================
+PREFETCH_SNAPSHOT_TTL = 30  # seconds - covers run setup, not the whole run
+
+# {'expires_at': monotonic deadline, 'values': {key: raw value or None for a known miss}}
+# The dict is shared (not copied) with tasks spawned from the prefetching context.
+_prefetch_snapshot: ContextVar[Optional[Dict[str, Any]]] = ContextVar('runtime_cache_prefetch', default=None)
+# Every unexpired snapshot on this instance, so invalidations (ours and peers') reach other runs' snapshots
+_live_snapshots: List[Dict[str, Any]] = []
+
+
+def _active_snapshot() -> Optional[Dict[str, Any]]:
+    snapshot = _prefetch_snapshot.get()
+    if snapshot is None or time.monotonic() >= snapshot['expires_at']:
+        return None
+    return snapshot
+
+
+async def _cache_get(cache_key: str) -> Optional[str]:
+    """GET that is answered from the prefetch snapshot when the key was prefetched."""
+    snapshot = _active_snapshot()
+    if snapshot is not None and cache_key in snapshot['values']:
+        return snapshot['values'][cache_key]
+    
+    from core.services import redis as redis_service
+    return await redis_service.get(cache_key)
+
+
+def _snapshot_put(cache_key: str, value: Optional[str]) -> None:
+    """Keep the snapshot coherent with writes made during the run."""
+    snapshot = _active_snapshot()
+    if snapshot is not None:
+        snapshot['values'][cache_key] = value
+
+
+def _snapshot_drop(*cache_keys: str) -> None:
+    snapshot = _active_snapshot()
+    if snapshot is not None:
+        for cache_key in cache_keys:
+            snapshot['values'].pop(cache_key, None)
+
+
+def _register_snapshot(snapshot: Dict[str, Any]) -> None:
+    now = time.monotonic()
+    _live_snapshots[:] = [s for s in _live_snapshots if s['expires_at'] > now]
+    _live_snapshots.append(snapshot)
+
+
+def _drop_from_live_snapshots(cache_keys: Optional[List[str]], keep: Optional[Dict[str, Any]] = None) -> None:
+    """Drop keys (every key when None) from all live snapshots but `keep`; getters then read Redis."""
+    for snapshot in _live_snapshots:
+        if snapshot is keep:
+            continue
+        if cache_keys is None:
+            snapshot['values'].clear()
+            continue
+        for cache_key in cache_keys:
+            snapshot['values'].pop(cache_key, None)
+
+# ============================================================================
+# L1 PROCESS CACHE - Decoded objects, kept coherent via Redis pub/sub
+# ============================================================================
+# Only config-like namespaces read through _cached_read use L1. Running runs, thread
+# counts and message history stay Redis-only (hot counters / large per-thread payloads).
+L1_MAX_ENTRIES = int(os.getenv("RUNTIME_CACHE_L1_MAX_ENTRIES", "5000"))
+L1_MAX_TTL = 60  # seconds - upper bound per entry, covers a dropped invalidation message
+INVALIDATION_CHANNEL = "runtime_cache:invalidate"
+
+# Identifies our own invalidation messages (already applied locally)
+_INSTANCE_TOKEN = uuid.uuid4().hex
+
+
+class _LRUCache:
+    """
+    Size- and TTL-bounded LRU. Single event loop, so no locking.
+    
+    Keys with a read in flight carry a generation that pop() and clear() bump;
+    end_read() tells the reader whether the value it fetched may still be cached.
+    """
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # key -> [generation, readers in flight]; only holds keys being read
+        self._reads: Dict[str, List[int]] = {}
+    
+    def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+    
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+    
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+        reads = self._reads.get(key)
+        if reads is not None:
+            reads[0] += 1
+    
+    def clear(self) -> None:
+        self._data.clear()
+        for reads in self._reads.values():
+            reads[0] += 1
+    
+    def begin_read(self, key: str) -> int:
+        reads = self._reads.setdefault(key, [0, 0])
+        reads[1] += 1
+        return reads[0]
+    
+    def end_read(self, key: str, generation: int) -> bool:
+        """True if the key wasn't invalidated since begin_read returned `generation`."""
+        reads = self._reads[key]
+        reads[1] -= 1
+        if reads[1] == 0:
+            del self._reads[key]
+        return reads[0] == generation
+    
+    def __contains__(self, key: str) -> bool:
+        return self.get(key)[0]
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_l1 = _LRUCache(L1_MAX_ENTRIES)
+_invalidation_state: Dict[str, Any] = {'task': None, 'connected': False, 'received': 0, 'reconnects': 0}
+_namespace_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _l1_enabled() -> bool:
+    # Without a live subscription we would miss other instances' invalidations
+    return _invalidation_state['connected'] and L1_MAX_ENTRIES > 0
+
+
+def _namespace(cache_key: str) -> str:
+    return cache_key.split(':', 1)[0]
+
+
+def _record_lookup(cache_key: str, outcome: str) -> None:
+    stats = _namespace_stats.setdefault(_namespace(cache_key), {'l1_hits': 0, 'l2_hits': 0, 'misses': 0})
+    stats[outcome] += 1
+
+
+def _decode_json(raw: Union[str, bytes]) -> Any:
+    return _json_loads(raw) if isinstance(raw, (str, bytes)) else raw
+
+
+def _decode_text(raw: Union[str, bytes]) -> str:
+    return raw.decode() if isinstance(raw, bytes) else raw
+
+
+async def _cached_read(cache_key: str, ttl: int, decode: Callable[[Any], Any]) -> Any:
+    """
+    Read through L1 -> run snapshot/Redis.
+    
+    L1 holds the encoded value and every hit decodes it, so callers get a private
+    copy they can mutate (orjson decoding is ~10x cheaper than deep-copying the
+    decoded object).
+    """
+    if _l1_enabled():
+        found, raw = _l1.get(cache_key)
+        if found:
+            _record_lookup(cache_key, 'l1_hits')
+            return decode(raw)
+    
+    generation = _l1.begin_read(cache_key)
+    try:
+        raw = await _cache_get(cache_key)
+    finally:
+        # An invalidation while the read was in flight may have replaced this value
+        current = _l1.end_read(cache_key, generation)
+    if raw is None:
+        _record_lookup(cache_key, 'misses')
+        return None
+    
+    _record_lookup(cache_key, 'l2_hits')
+    if current and _l1_enabled():
+        _l1.set(cache_key, raw, min(ttl, L1_MAX_TTL))
+    return decode(raw)
+
+
+async def _publish_invalidation(*cache_keys: str) -> None:
+    """Drop keys from the local L1 and run snapshots and tell every other instance to do the same."""
+    for cache_key in cache_keys:
+        _l1.pop(cache_key)
+    # The caller's own snapshot was already updated by _store/_remove
+    _drop_from_live_snapshots(list(cache_keys), keep=_active_snapshot())
+    
+    try:
+        from core.services import redis as redis_service
+        await redis_service.publish(
+            INVALIDATION_CHANNEL,
+            _json_dumps({'src': _INSTANCE_TOKEN, 'keys': list(cache_keys)}),
+            timeout=2.0
+        )
+    except Exception as e:
+        logger.warning(f"Failed to publish cache invalidation: {e}")
+
+
+async def _store(cache_key: str, payload: str, ttl: int) -> None:
+    """Write-through to Redis, L1 and the run snapshot, then invalidate peers' L1."""
+    from core.services import redis as redis_service
+    await redis_service.set(cache_key, payload, ex=ttl)
+    _snapshot_put(cache_key, payload)
+    await _publish_invalidation(cache_key)
+    if _l1_enabled():
+        _l1.set(cache_key, payload, min(ttl, L1_MAX_TTL))
+
+
+async def _remove(*cache_keys: str) -> int:
+    """Delete from Redis and drop every tier (local snapshot, local + peer L1)."""
+    from core.services.redis import delete_multiple
+    _snapshot_drop(*cache_keys)
+    deleted = await delete_multiple(list(cache_keys), timeout=5.0)
+    await _publish_invalidation(*cache_keys)
+    return deleted
+
+
+def _apply_invalidation_message(data: Union[str, bytes]) -> None:
+    try:
+        message = _json_loads(data)
+    except Exception:
+        return
+    _invalidation_state['received'] += 1
+    if message.get('src') == _INSTANCE_TOKEN:
+        return
+    cache_keys = message.get('keys') or []
+    for cache_key in cache_keys:
+        _l1.pop(cache_key)
+    _drop_from_live_snapshots(cache_keys)
+
+
+async def _invalidation_listener() -> None:
+    from core.services import redis as redis_service
+    
+    backoff = 1.0
+    while True:
+        pubsub = None
+        try:
+            client = await redis_service.get_client()
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Entries cached before (re)subscribing may have missed invalidations
+            _l1.clear()
+            _drop_from_live_snapshots(None)
+            _invalidation_state['connected'] = True
+            backoff = 1.0
+            logger.debug(f"✅ Runtime cache L1 enabled (listening on {INVALIDATION_CHANNEL})")
+            
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message.get('type') == 'message':
+                    _apply_invalidation_message(message['data'])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Runtime cache invalidation listener disconnected: {e}")
+        finally:
+            _invalidation_state['connected'] = False
+            _l1.clear()
+            _drop_from_live_snapshots(None)
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+        
+        _invalidation_state['reconnects'] += 1
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, 30.0)
+
+
+def start_cache_invalidation_listener() -> None:
+    """Start the pub/sub listener that enables the L1 tier. Call once Redis is initialized."""
+    task = _invalidation_state['task']
+    if task is not None and not task.done():
+        return
+    _invalidation_state['task'] = asyncio.create_task(_invalidation_listener())
+
+
+async def stop_cache_invalidation_listener() -> None:
+    task = _invalidation_state['task']
+    _invalidation_state['task'] = None
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def get_runtime_cache_stats() -> Dict[str, Any]:
+    """Per-namespace L1/L2 hit ratios plus L1 and listener state."""
+    namespaces = {}
+    for ns, stats in sorted(_namespace_stats.items()):
+        lookups = stats['l1_hits'] + stats['l2_hits'] + stats['misses']
+        namespaces[ns] = {
+            **stats,
+            'lookups': lookups,
+            'l1_hit_ratio': round(stats['l1_hits'] / lookups, 4) if lookups else 0.0,
+            'l2_hit_ratio': round(stats['l2_hits'] / lookups, 4) if lookups else 0.0,
+            'hit_ratio': round((stats['l1_hits'] + stats['l2_hits']) / lookups, 4) if lookups else 0.0,
+        }
+    return {
+        'l1': {
+            'enabled': _l1_enabled(),
+            'entries': len(_l1),
+            'max_entries': L1_MAX_ENTRIES,
+            'max_ttl_seconds': L1_MAX_TTL,
+            'invalidations_received': _invalidation_state['received'],
+            'listener_reconnects': _invalidation_state['reconnects'],
+        },
+        'namespaces': namespaces,
+        'message_history': get_message_history_cache_stats(),
+    }
+
 # ============================================================================
 # STATIC SUNA CONFIG - Loaded once at startup, never expires
 # This is Python code that's identical across all workers - safe to keep in memory
@@ -107,11 +448,8 @@ async def get_cached_user_mcps(agent_id: str) -> Optional[Dict[str, Any]]:
     cache_key = _get_user_mcps_key(agent_id)
     
     try:
-        from core.services import redis as redis_service
-        
-        cached = await redis_service.get(cache_key)
-        if cached:
-            data = _json_loads(cached) if isinstance(cached, (str, bytes)) else cached
+        data = await _cached_read(cache_key, AGENT_CONFIG_TTL, _decode_json)
+        if data:
             logger.debug(f"⚡ Redis cache hit for user MCPs: {agent_id}")
             return data
     except Exception as e:
@@ -135,8 +473,7 @@ async def set_cached_user_mcps(
     }
     
     try:
-        from core.services import redis as redis_service
-        await redis_service.set(cache_key, _json_dumps(data), ex=AGENT_CONFIG_TTL)
+        await _store(cache_key, _json_dumps(data), AGENT_CONFIG_TTL)
         logger.debug(f"✅ Cached user MCPs in Redis: {agent_id}")
     except Exception as e:
         logger.warning(f"Failed to cache user MCPs: {e}")
@@ -152,11 +489,8 @@ async def get_cached_mcp_version_config(agent_id: str) -> Optional[Dict[str, Any
     cache_key = _get_mcp_version_config_key(agent_id)
     
     try:
-        from core.services import redis as redis_service
-        
-        cached = await redis_service.get(cache_key)
-        if cached:
-            data = _json_loads(cached) if isinstance(cached, (str, bytes)) else cached
+        data = await _cached_read(cache_key, MCP_VERSION_CONFIG_TTL, _decode_json)
+        if data:
             logger.debug(f"⚡ Redis cache hit for MCP version config: {agent_id}")
             return data
     except Exception as e:
@@ -169,8 +503,7 @@ async def set_cached_mcp_version_config(agent_id: str, config: Dict[str, Any]) -
     cache_key = _get_mcp_version_config_key(agent_id)
     
     try:
-        from core.services import redis as redis_service
-        await redis_service.set(cache_key, _json_dumps(config), ex=MCP_VERSION_CONFIG_TTL)
+        await _store(cache_key, _json_dumps(config), MCP_VERSION_CONFIG_TTL)
         logger.debug(f"✅ Cached MCP version config in Redis: {agent_id}")
     except Exception as e:
         logger.warning(f"Failed to cache MCP version config: {e}")
@@ -180,8 +513,7 @@ async def invalidate_mcp_version_config(agent_id: str) -> None:
     cache_key = _get_mcp_version_config_key(agent_id)
     
     try:
-        from core.services import redis as redis_service
-        await redis_service.delete(cache_key)
+        await _remove(cache_key)
         logger.debug(f"🗑️ Invalidated MCP version config cache: {agent_id}")
     except Exception as e:
         logger.warning(f"Failed to invalidate MCP version config: {e}")
@@ -199,11 +531,8 @@ async def get_cached_agent_config(
     cache_key = _get_cache_key(agent_id, version_id)
     
     try:
-        from core.services import redis as redis_service
-        
-        cached = await redis_service.get(cache_key)
-        if cached:
-            data = _json_loads(cached) if isinstance(cached, (str, bytes)) else cached
+        data = await _cached_read(cache_key, AGENT_CONFIG_TTL, _decode_json)
+        if data:
             logger.debug(f"⚡ Redis cache hit for agent config: {agent_id}")
             return data
     except Exception as e:
@@ -232,8 +561,7 @@ async def set_cached_agent_config(
     cache_key = _get_cache_key(agent_id, version_id)
     
     try:
-        from core.services import redis as redis_service
-        await redis_service.set(cache_key, _json_dumps(config), ex=AGENT_CONFIG_TTL)
+        await _store(cache_key, _json_dumps(config), AGENT_CONFIG_TTL)
         logger.debug(f"✅ Cached custom agent config in Redis: {agent_id}")
     except Exception as e:
         logger.warning(f"Failed to cache agent config: {e}")
@@ -242,12 +570,11 @@ async def set_cached_agent_config(
 async def invalidate_agent_config_cache(agent_id: str) -> None:
     """Invalidate cached configs for an agent in Redis using batch delete."""
     try:
-        from core.services.redis import delete_multiple
         keys = [
             f"agent_config:{agent_id}:current",
             f"agent_mcps:{agent_id}"
         ]
-        deleted = await delete_multiple(keys, timeout=5.0)
+        deleted = await _remove(*keys)
         logger.info(f"🗑️ Invalidated Redis cache for agent: {agent_id} ({deleted} keys)")
     except Exception as e:
         logger.warning(f"Failed to invalidate cache: {e}")
@@ -287,11 +614,8 @@ async def get_cached_project_metadata(project_id: str) -> Optional[Dict[str, Any
     cache_key = _get_project_cache_key(project_id)
     
     try:
-        from core.services import redis as redis_service
-        
-        cached = await redis_service.get(cache_key)
-        if cached:
-            data = _json_loads(cached) if isinstance(cached, (str, bytes)) else cached
+        data = await _cached_read(cache_key, PROJECT_CACHE_TTL, _decode_json)
+        if data:
             logger.debug(f"⚡ Redis cache hit for project metadata: {project_id}")
             return data
     except Exception as e:
@@ -306,8 +630,7 @@ async def set_cached_project_metadata(project_id: str, sandbox: Dict[str, Any])
     data = {'project_id': project_id, 'sandbox': sandbox}
     
     try:
-        from core.services import redis as redis_service
-        await redis_service.set(cache_key, _json_dumps(data), ex=PROJECT_CACHE_TTL)
+        await _store(cache_key, _json_dumps(data), PROJECT_CACHE_TTL)
         logger.debug(f"✅ Cached project metadata in Redis: {project_id}")
     except Exception as e:
         logger.warning(f"Failed to cache project metadata: {e}")
@@ -316,8 +639,7 @@ async def set_cached_project_metadata(project_id: str, sandbox: Dict[str, Any])
 async def invalidate_project_cache(project_id: str) -> None:
     """Invalidate cached project metadata."""
     try:
-        from core.services import redis as redis_service
-        await redis_service.delete(_get_project_cache_key(project_id))
+        await _remove(_get_project_cache_key(project_id))
         logger.debug(f"🗑️ Invalidated project cache: {project_id}")
     except Exception as e:
         logger.warning(f"Failed to invalidate project cache: {e}")
@@ -474,12 +796,9 @@ async def get_cached_kb_context(agent_id: str) -> Optional[str]:
     cache_key = _get_kb_context_key(agent_id)
     
     try:
-        from core.services import redis as redis_service
-        
-        cached = await redis_service.get(cache_key)
-        if cached is not None:
+        data = await _cached_read(cache_key, KB_CONTEXT_TTL, _decode_text)
+        if data is not None:
             # Empty string means "no entries", None means cache miss
-            data = cached.decode() if isinstance(cached, bytes) else cached
             logger.debug(f"⚡ Redis cache hit for KB context: {agent_id}")
             return data if data else None  # Return None for empty string (no entries)
     except Exception as e:
@@ -496,9 +815,8 @@ async def set_cached_kb_context(agent_id: str, context: str) -> None:
     cache_key = _get_kb_context_key(agent_id)
     
     try:
-        from core.services import redis as redis_service
         # Store empty string as empty string (to distinguish from cache miss)
-        await redis_service.set(cache_key, context, ex=KB_CONTEXT_TTL)
+        await _store(cache_key, context, KB_CONTEXT_TTL)
         logger.debug(f"✅ Cached KB context in Redis: {agent_id} ({len(context)} chars)")
     except Exception as e:
         logger.warning(f"Failed to cache KB context: {e}")
@@ -507,8 +825,7 @@ async def set_cached_kb_context(agent_id: str, context: str) -> None:
 async def invalidate_kb_context_cache(agent_id: str) -> None:
     """Invalidate cached knowledge base context when KB entries change."""
     try:
-        from core.services import redis as redis_service
-        await redis_service.delete(_get_kb_context_key(agent_id))
+        await _remove(_get_kb_context_key(agent_id))
         logger.debug(f"🗑️ Invalidated KB context cache: {agent_id}")
     except Exception as e:
         logger.warning(f"Failed to invalidate KB context cache: {e}")
@@ -532,11 +849,8 @@ async def get_cached_user_context(user_id: str) -> Optional[str]:
     cache_key = _get_user_context_key(user_id)
     
     try:
-        from core.services import redis as redis_service
-        
-        cached = await redis_service.get(cache_key)
-        if cached is not None:
-            data = cached.decode() if isinstance(cached, bytes) else cached
+        data = await _cached_read(cache_key, USER_CONTEXT_TTL, _decode_text)
+        if data is not None:
             logger.debug(f"⚡ Redis cache hit for user context: {user_id}")
             return data if data else None  # Return None for empty string (no context)
     except Exception as e:
@@ -553,8 +867,7 @@ async def set_cached_user_context(user_id: str, context: str) -> None:
     cache_key = _get_user_context_key(user_id)
     
     try:
-        from core.services import redis as redis_service
-        await redis_service.set(cache_key, context, ex=USER_CONTEXT_TTL)
+        await _store(cache_key, context, USER_CONTEXT_TTL)
         logger.debug(f"✅ Cached user context in Redis: {user_id} ({len(context)} chars)")
     except Exception as e:
         logger.warning(f"Failed to cache user context: {e}")
@@ -563,58 +876,346 @@ async def set_cached_user_context(user_id: str, context: str) -> None:
 async def invalidate_user_context_cache(user_id: str) -> None:
     """Invalidate cached user context when profile is updated."""
     try:
-        from core.services import redis as redis_service
-        await redis_service.delete(_get_user_context_key(user_id))
+        await _remove(_get_user_context_key(user_id))
         logger.debug(f"🗑️ Invalidated user context cache: {user_id}")
     except Exception as e:
         logger.warning(f"Failed to invalidate user context cache: {e}")
 
 
 # ============================================================================
-# MESSAGE HISTORY CACHE - Short TTL for repeated turns in same thread
+# MESSAGE HISTORY CACHE - Append-only prefix, extended with a delta fetch per turn
+#
+# The cached payload holds the already-parsed LLM messages plus a high-water
+# mark (created_at, message_id) of the last row read. Each read refetches the
+# rows from MESSAGE_HISTORY_OVERLAP seconds below the mark onwards, so inserts
+# never invalidate and rows that commit after a later row was read are still
+# picked up. That assumes a row commits within the overlap of its created_at;
+# writers that can commit later (the write-behind MessagePersister) drop the
+# suffix from their earliest created_at after each write. Edits, deletes and
+# compression writes drop only the suffix starting at the first affected message.
+#
+# Writers are ordered by a per-thread generation counter: every invalidation
+# bumps it (atomically with its rewrite, under WATCH), and a reader only stores
+# what it built if the generation is still the one it read. An entry is
+# rebuilt from scratch MESSAGE_HISTORY_MAX_AGE seconds after its full read,
+# however often it was extended, which bounds how long a missed row can hide.
 # ============================================================================
-MESSAGE_HISTORY_TTL = 60  # 1 minute - very short since messages change frequently
+MESSAGE_HISTORY_TTL = 300  # 5 minutes - inserts extend the prefix instead of invalidating it
+MESSAGE_HISTORY_MAX_AGE = 300  # seconds since the full read before an entry is rebuilt
+MESSAGE_HISTORY_OVERLAP = 10  # seconds below the high-water mark refetched on every read
+MESSAGE_HISTORY_GENERATION_TTL = 3600
+MESSAGE_HISTORY_REWRITE_ATTEMPTS = 3
+_ZERO_UUID = '00000000-0000-0000-0000-000000000000'
+
+# KEYS: history, generation. ARGV: generation read with the entry, payload, ttl
+_SET_IF_GENERATION_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+_message_history_stats = {'hit': 0, 'partial_hit': 0, 'miss': 0, 'suffix_invalidations': 0, 'stale_writes': 0}
 
 def _get_message_history_key(thread_id: str) -> str:
     """Generate Redis cache key for message history."""
     return f"message_history:{thread_id}"
 
 
-async def get_cached_message_history(thread_id: str) -> Optional[list]:
-    """Get message history from Redis cache."""
-    cache_key = _get_message_history_key(thread_id)
-    
+def _get_message_history_generation_key(thread_id: str) -> str:
+    return f"message_history_gen:{thread_id}"
+
+
+def _to_iso(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _parse_iso(value: Any):
+    from datetime import datetime, timezone
+    if value is None or isinstance(value, datetime):
+        return value
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def record_message_history_lookup(outcome: str) -> None:
+    """Record a message history lookup outcome: 'hit', 'partial_hit' or 'miss'."""
+    _message_history_stats[outcome] = _message_history_stats.get(outcome, 0) + 1
+
+
+def get_message_history_cache_stats() -> Dict[str, Any]:
+    """Per-process message history cache counters."""
+    stats = dict(_message_history_stats)
+    lookups = stats['hit'] + stats['partial_hit'] + stats['miss']
+    stats['lookups'] = lookups
+    stats['reuse_ratio'] = round((stats['hit'] + stats['partial_hit']) / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def _decode_message_history(raw: Any) -> Optional[Dict[str, Any]]:
+    if not raw:
+        return None
+    data = _json_loads(raw) if isinstance(raw, (str, bytes)) else raw
+    # Legacy payloads were a bare list without a high-water mark - treat as miss
+    if not isinstance(data, dict) or 'messages' not in data or 'built_at' not in data:
+        return None
+    return data
+
+
+def _encode_message_history(
+    messages: list,
+    created_at: list,
+    cursor: Optional[Dict[str, Any]],
+    built_at: float
+) -> str:
+    return _json_dumps({
+        'messages': messages,
+        'created_at': [_to_iso(c) for c in created_at],
+        'cursor': {
+            'created_at': _to_iso(cursor.get('created_at')),
+            'message_id': str(cursor.get('message_id')),
+        } if cursor else None,
+        'built_at': built_at,
+    })
+
+
+async def get_cached_message_history(thread_id: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Get the cached message history prefix and the thread's cache generation.
+
+    Returns (entry, generation). entry is None on a miss, otherwise a dict with:
+    - messages: parsed LLM messages (each carries message_id)
+    - created_at: ISO created_at per message (aligned with messages)
+    - cursor: {'created_at', 'message_id'} of the last row read, or None
+    - built_at: epoch seconds of the full read the entry started from
+
+    Pass the generation to set_cached_message_history, also after a miss.
+    """
     try:
         from core.services import redis as redis_service
         
-        cached = await redis_service.get(cache_key)
-        if cached:
-            data = _json_loads(cached) if isinstance(cached, (str, bytes)) else cached
-            logger.debug(f"⚡ Redis cache hit for message history: {thread_id} ({len(data)} messages)")
-            return data
+        raw, generation = await redis_service.mget(
+            [_get_message_history_key(thread_id), _get_message_history_generation_key(thread_id)]
+        )
+        generation = _decode_text(generation) if generation is not None else ''
+        data = _decode_message_history(raw)
+        if data is None or time.time() - data['built_at'] > MESSAGE_HISTORY_MAX_AGE:
+            return None, generation
+        logger.debug(f"⚡ Redis cache hit for message history: {thread_id} ({len(data['messages'])} messages)")
+        return data, generation
     except Exception as e:
         logger.warning(f"Failed to get message history from cache: {e}")
     
-    return None
+    return None, None
 
 
-async def set_cached_message_history(thread_id: str, messages: list) -> None:
-    """Cache message history in Redis."""
-    cache_key = _get_message_history_key(thread_id)
+def split_message_history_window(cached: Dict[str, Any]) -> Tuple[list, list, Dict[str, Any]]:
+    """
+    Split a cached entry for the next read.
+
+    Returns (messages, created_at, after): the part of the prefix older than the
+    overlap window, and the keyset to fetch from. Rows at or after the window
+    start are refetched, including any that committed late.
+    """
+    from datetime import timedelta
+    
+    messages = cached['messages']
+    created_at = cached['created_at']
+    window_start = _parse_iso(cached['cursor']['created_at']) - timedelta(seconds=MESSAGE_HISTORY_OVERLAP)
+    keep = len(messages)
+    while keep > 0 and created_at[keep - 1] and _parse_iso(created_at[keep - 1]) >= window_start:
+        keep -= 1
+    return messages[:keep], created_at[:keep], {'created_at': window_start.isoformat(), 'message_id': _ZERO_UUID}
+
+
+async def set_cached_message_history(
+    thread_id: str,
+    messages: list,
+    created_at: list,
+    cursor: Optional[Dict[str, Any]],
+    generation: Optional[str],
+    built_at: Optional[float] = None
+) -> bool:
+    """
+    Cache message history prefix in Redis, unless it was invalidated since it was read.
+
+    Args:
+        thread_id: Thread ID
+        messages: Parsed LLM messages
+        created_at: created_at per message (aligned with messages)
+        cursor: {'created_at', 'message_id'} of the last row read (may be a skipped row)
+        generation: Generation returned by get_cached_message_history before the rows were read
+        built_at: built_at of the entry that was extended (now for a full read)
+
+    Returns True if stored.
+    """
+    if generation is None:
+        return False  # The read failed - we can't tell whether an invalidation raced it
     
+    payload = _encode_message_history(messages, created_at, cursor, built_at if built_at is not None else time.time())
     try:
         from core.services import redis as redis_service
-        await redis_service.set(cache_key, _json_dumps(messages), ex=MESSAGE_HISTORY_TTL)
+        client = await redis_service.get_client()
+        stored = await asyncio.wait_for(
+            client.eval(
+                _SET_IF_GENERATION_SCRIPT, 2,
+                _get_message_history_key(thread_id), _get_message_history_generation_key(thread_id),
+                generation, payload, MESSAGE_HISTORY_TTL,
+            ),
+            timeout=5.0,
+        )
+        if not stored:
+            _message_history_stats['stale_writes'] += 1
+            logger.debug(f"Message history for {thread_id} was invalidated while it was read - not caching")
+            return False
         logger.debug(f"✅ Cached message history in Redis: {thread_id} ({len(messages)} messages)")
+        return True
     except Exception as e:
         logger.warning(f"Failed to cache message history: {e}")
+        return False
+
+
+def _find_suffix_start(
+    messages: list,
+    created_at: list,
+    message_ids: Optional[set],
+    tool_call_ids: Optional[set],
+    since: Any
+) -> Optional[int]:
+    """Index of the first cached message affected by a write, or None."""
+    since_dt = _parse_iso(since) if since is not None else None
+    for idx, msg in enumerate(messages):
+        if message_ids and str(msg.get('message_id')) in message_ids:
+            return idx
+        if tool_call_ids:
+            if msg.get('role') == 'tool' and msg.get('tool_call_id') in tool_call_ids:
+                return idx
+            for tc in msg.get('tool_calls') or []:
+                if isinstance(tc, dict) and tc.get('id') in tool_call_ids:
+                    return idx
+        if since_dt is not None and idx < len(created_at) and created_at[idx]:
+            if _parse_iso(created_at[idx]) >= since_dt:
+                return idx
+    return None
+
+
+def _truncate_message_history(
+    cached: Optional[Dict[str, Any]],
+    message_ids: Optional[set],
+    tool_call_ids: Optional[set],
+    since: Any
+) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """New entry after an edit (None drops it) and whether it changed."""
+    if not cached:
+        return None, False
+    
+    messages = cached.get('messages') or []
+    created_at = cached.get('created_at') or []
+    cursor = cached.get('cursor')
+    
+    idx = _find_suffix_start(messages, created_at, message_ids, tool_call_ids, since)
+    if idx is None:
+        if since is not None and cursor and cursor.get('created_at'):
+            if _parse_iso(since) > _parse_iso(cursor['created_at']):
+                return cached, False  # Affected rows are past the high-water mark - next delta picks them up
+        if message_ids:
+            return None, True  # Position unknown
+        return cached, False
+    
+    if idx == 0:
+        return None, True
+    retained = messages[:idx]
+    retained_created_at = created_at[:idx]
+    return {
+        'messages': retained,
+        'created_at': retained_created_at,
+        'cursor': {'created_at': retained_created_at[-1], 'message_id': retained[-1].get('message_id')},
+        'built_at': cached['built_at'],
+    }, True
+
+
+async def invalidate_message_history_suffix(
+    thread_id: str,
+    message_ids: Optional[list] = None,
+    tool_call_ids: Optional[list] = None,
+    since: Any = None
+) -> None:
+    """
+    Drop only the part of the cached history affected by an edit.
+
+    The cached prefix is truncated at the first message that matches any of
+    ``message_ids``, contains/answers any of ``tool_call_ids``, or was created at
+    or after ``since``. The high-water mark moves back to the last retained
+    message so the next read refetches the suffix.
+
+    If ``message_ids`` are given but none is cached and no ``since`` proves the
+    rows sit past the high-water mark, their position is unknown and the whole
+    entry is dropped.
+
+    The rewrite and the generation bump are one WATCH/MULTI transaction, so a
+    concurrent reader can neither overwrite the truncation nor have it applied to
+    a stale copy.
+    """
+    from redis.exceptions import WatchError
+    
+    cache_key = _get_message_history_key(thread_id)
+    generation_key = _get_message_history_generation_key(thread_id)
+    ids = {str(m) for m in message_ids} if message_ids else None
+    calls = set(tool_call_ids) if tool_call_ids else None
+    
+    try:
+        from core.services import redis as redis_service
+        client = await redis_service.get_client()
+        
+        async with client.pipeline(transaction=True) as pipe:
+            for _ in range(MESSAGE_HISTORY_REWRITE_ATTEMPTS):
+                try:
+                    await pipe.watch(cache_key)
+                    cached = _decode_message_history(await pipe.get(cache_key))
+                    entry, changed = _truncate_message_history(cached, ids, calls, since)
+                    pipe.multi()
+                    if changed and entry is None:
+                        pipe.delete(cache_key)
+                    elif changed:
+                        pipe.set(
+                            cache_key,
+                            _encode_message_history(entry['messages'], entry['created_at'], entry['cursor'], entry['built_at']),
+                            ex=MESSAGE_HISTORY_TTL
+                        )
+                    # Always bump: a reader may be fetching the rows this edit touched
+                    pipe.incr(generation_key)
+                    pipe.expire(generation_key, MESSAGE_HISTORY_GENERATION_TTL)
+                    await asyncio.wait_for(pipe.execute(), timeout=5.0)
+                    if changed:
+                        _message_history_stats['suffix_invalidations'] += 1
+                        kept = len(entry['messages']) if entry else 0
+                        logger.debug(f"🗑️ Truncated message history cache: {thread_id} ({len(cached['messages'])} -> {kept} messages)")
+                    return
+                except WatchError:
+                    continue
+        
+        await invalidate_message_history_cache(thread_id)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate message history suffix: {e}")
+        await invalidate_message_history_cache(thread_id)
 
 
 async def invalidate_message_history_cache(thread_id: str) -> None:
-    """Invalidate cached message history when new message is added."""
+    """Invalidate the whole cached message history for a thread."""
     try:
         from core.services import redis as redis_service
-        await redis_service.delete(_get_message_history_key(thread_id))
+        client = await redis_service.get_client()
+        generation_key = _get_message_history_generation_key(thread_id)
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.delete(_get_message_history_key(thread_id))
+            pipe.incr(generation_key)
+            pipe.expire(generation_key, MESSAGE_HISTORY_GENERATION_TTL)
+            await asyncio.wait_for(pipe.execute(), timeout=5.0)
         logger.debug(f"🗑️ Invalidated message history cache: {thread_id}")
     except Exception as e:
         logger.warning(f"Failed to invalidate message history cache: {e}")
@@ -639,11 +1240,8 @@ async def get_cached_tier_info(account_id: str) -> Optional[Dict[str, Any]]:
     cache_key = _get_tier_info_key(account_id)
     
     try:
-        from core.services import redis as redis_service
-        
-        cached = await redis_service.get(cache_key)
-        if cached:
-            data = _json_loads(cached) if isinstance(cached, (str, bytes)) else cached
+        data = await _cached_read(cache_key, TIER_INFO_TTL, _decode_json)
+        if data:
             logger.debug(f"⚡ Redis cache hit for tier info: {account_id}")
             return data
     except Exception as e:
@@ -657,8 +1255,7 @@ async def set_cached_tier_info(account_id: str, tier_info: Dict[str, Any]) -> No
     cache_key = _get_tier_info_key(account_id)
     
     try:
-        from core.services import redis as redis_service
-        await redis_service.set(cache_key, _json_dumps(tier_info), ex=TIER_INFO_TTL)
+        await _store(cache_key, _json_dumps(tier_info), TIER_INFO_TTL)
         logger.debug(f"✅ Cached tier info in Redis: {account_id} (tier: {tier_info.get('name', 'unknown')})")
     except Exception as e:
         logger.warning(f"Failed to cache tier info: {e}")
@@ -667,9 +1264,88 @@ async def set_cached_tier_info(account_id: str, tier_info: Dict[str, Any]) -> No
 async def invalidate_tier_info_cache(account_id: str) -> None:
     """Invalidate cached tier info when subscription changes."""
     try:
-        from core.services import redis as redis_service
-        await redis_service.delete(_get_tier_info_key(account_id))
+        await _remove(_get_tier_info_key(account_id))
         logger.debug(f"🗑️ Invalidated tier info cache: {account_id}")
     except Exception as e:
         logger.warning(f"Failed to invalidate tier info cache: {e}")
 
+
+# ============================================================================
+# AGENT RUN PREFETCH - Warm every setup key in one MGET round-trip
+# ============================================================================
+
+def _agent_run_cache_keys(
+    agent_id: Optional[str],
+    project_id: Optional[str],
+    account_id: Optional[str],
+    user_id: Optional[str],
+) -> List[str]:
+    keys = []
+    if agent_id:
+        keys.extend([
+            _get_user_mcps_key(agent_id),
+            _get_cache_key(agent_id),
+            _get_mcp_version_config_key(agent_id),
+            _get_kb_context_key(agent_id),
+        ])
+    if project_id:
+        keys.append(_get_project_cache_key(project_id))
+    if account_id:
+        keys.append(_get_tier_info_key(account_id))
+    if user_id:
+        keys.append(_get_user_context_key(user_id))
+    return keys
+
+
+async def prefetch_agent_run_cache(
+    agent_id: Optional[str] = None,
+    project_id: Optional[str] = None,
+    account_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> int:
+    """
+    Fetch the agent run setup keys with a single MGET and snapshot them.
+    
+    Must be awaited directly (not via gather/create_task) so the snapshot lands in the
+    caller's context; tasks spawned afterwards share it. Keys already in an active
+    snapshot are skipped, so calling again once agent_id/project_id are resolved costs
+    at most one more round-trip. Invalidations received while the snapshot is live,
+    from this instance or over INVALIDATION_CHANNEL, drop the key from it; a key
+    invalidated while the MGET is in flight is not snapshotted.
+    
+    Returns:
+        Number of keys that were present in Redis.
+    """
+    user_id = user_id or account_id
+    snapshot = _active_snapshot()
+    if snapshot is None:
+        snapshot = {'expires_at': time.monotonic() + PREFETCH_SNAPSHOT_TTL, 'values': {}}
+        _prefetch_snapshot.set(snapshot)
+        _register_snapshot(snapshot)
+    
+    keys = [
+        k for k in _agent_run_cache_keys(agent_id, project_id, account_id, user_id)
+        if k not in snapshot['values'] and not (_l1_enabled() and k in _l1)
+    ]
+    if not keys:
+        return 0
+    
+    try:
+        from core.services import redis as redis_service
+        
+        t_start = time.time()
+        generations = [_l1.begin_read(k) for k in keys]
+        try:
+            values = await redis_service.mget(keys)
+        finally:
+            current = [_l1.end_read(k, g) for k, g in zip(keys, generations)]
+        for key, value, fresh in zip(keys, values, current):
+            if fresh:
+                snapshot['values'][key] = value.decode() if isinstance(value, bytes) else value
+        
+        hits = sum(1 for v in values if v is not None)
+        logger.debug(f"⚡ Prefetched agent run cache: {hits}/{len(keys)} hits in {(time.time() - t_start) * 1000:.1f}ms")
+        return hits
+    except Exception as e:
+        logger.warning(f"Failed to prefetch agent run cache: {e}")
+        return 0
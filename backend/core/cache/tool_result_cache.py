@@ -0,0 +1,265 @@
+"""
+Shared result cache for search and scrape tools.
+
+Upstream calls of the search tools (Tavily, Firecrawl, Serper, Semantic Scholar,
+Exa) are cached across runs and instances in Redis:
+
+- keys are the tool namespace plus its normalized inputs (whitespace-collapsed,
+  lower-cased queries; URLs without fragments, tracking parameters or default
+  ports, with sorted query strings) and parameters
+- each tool sets its own TTL - search answers age faster than papers
+- values are zlib-compressed JSON (base64, the Redis client decodes responses)
+- concurrent identical calls in one process share a single upstream call
+
+Tools opt in by decorating the method that makes the upstream call with
+@cached_tool_call. Every lookup made while a tool runs is reported back in the
+tool result metadata under "tool_cache" (see begin_tool_cache_report).
+"""
+import asyncio
+import base64
+import copy
+import functools
+import hashlib
+import json
+import time
+import zlib
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from core.utils.config import config
+from core.utils.logger import logger
+
+CACHE_KEY_PREFIX = "tool_result"
+CACHE_VERSION = "v1"
+REDIS_TIMEOUT_SECONDS = 2.0
+MAX_STORED_BYTES = 2 * 1024 * 1024  # compressed; larger results are not cached
+_ENCODING_TAG = "z1:"
+
+# Dropped from URLs before keying: they don't change the page
+_TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "mc_cid", "mc_eid", "ref_src"}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(str(query).split()).lower()
+
+
+def normalize_url(url: str) -> str:
+    url = str(url).strip()
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith("utm_") and name.lower() not in _TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def _encode(value: Any) -> str:
+    payload = json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+    return _ENCODING_TAG + base64.b64encode(zlib.compress(payload, 6)).decode("ascii")
+
+
+def _decode(raw: str) -> Any:
+    if not raw.startswith(_ENCODING_TAG):
+        raise ValueError("unknown tool cache encoding")
+    return json.loads(zlib.decompress(base64.b64decode(raw[len(_ENCODING_TAG):])))
+
+
+# Lookups made during the current tool execution; the list is shared (not copied)
+# with tasks the tool spawns, e.g. asyncio.gather over a batch of queries
+_report: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("tool_cache_report", default=None)
+
+
+def begin_tool_cache_report() -> None:
+    """Start collecting cache lookups for the tool execution in this context."""
+    _report.set([])
+
+
+def tool_cache_report() -> Optional[Dict[str, Any]]:
+    """Summary of the lookups since begin_tool_cache_report, or None if there were none."""
+    lookups = _report.get()
+    if not lookups:
+        return None
+    summary: Dict[str, Any] = {"hits": 0, "misses": 0, "shared": 0, "bypassed": 0}
+    for lookup in lookups:
+        summary[lookup["status"]] += 1
+    summary["lookups"] = list(lookups)
+    return summary
+
+
+def _record(namespace: str, status: str, age_seconds: Optional[float] = None) -> None:
+    lookups = _report.get()
+    if lookups is not None:
+        entry: Dict[str, Any] = {"namespace": namespace, "status": status}
+        if age_seconds is not None:
+            entry["age_seconds"] = round(age_seconds, 1)
+        lookups.append(entry)
+
+
+class ToolResultCache:
+    """Redis-backed result cache with in-process single-flight."""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def make_key(self, namespace: str, *parts: Any) -> str:
+        digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]
+        return f"{CACHE_KEY_PREFIX}:{CACHE_VERSION}:{namespace}:{digest}"
+
+    def _count(self, namespace: str, counter: str, amount: int = 1) -> None:
+        stats = self._stats.setdefault(namespace, {
+            "hits": 0, "misses": 0, "shared": 0, "stored": 0, "stored_bytes": 0, "errors": 0
+        })
+        stats[counter] += amount
+
+    async def get_or_fetch(
+        self,
+        namespace: str,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: int,
+        cacheable: Callable[[Any], bool] = lambda value: True
+    ) -> Any:
+        """Cached value for key, else the result of fetch() (stored if cacheable)."""
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                value = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The fetching task was cancelled, not us: take over the fetch
+                if inflight.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+            self._count(namespace, "shared")
+            _record(namespace, "shared")
+            # Callers may mutate the result; the fetching call returns the original
+            return copy.deepcopy(value)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value, age = await self._read(namespace, key)
+            if age is not None:
+                self._count(namespace, "hits")
+                _record(namespace, "hits", age)
+            else:
+                self._count(namespace, "misses")
+                _record(namespace, "misses")
+                value = await fetch()
+                if cacheable(value):
+                    await self._write(namespace, key, value, ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark retrieved so a fetch nobody else waited on doesn't log "exception never retrieved"
+                future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _read(self, namespace: str, key: str) -> Tuple[Any, Optional[float]]:
+        """(value, age in seconds) on a hit, (None, None) on a miss."""
+        from core.services import redis as redis_service
+
+        try:
+            raw = await redis_service.get(key, timeout=REDIS_TIMEOUT_SECONDS)
+            if not raw:
+                return None, None
+            entry = _decode(raw)
+            return entry["value"], max(0.0, time.time() - entry["stored_at"])
+        except Exception as e:
+            self._count(namespace, "errors")
+            logger.warning(f"⚠️  [TOOL CACHE] Read error for {namespace}: {e}")
+            return None, None
+
+    async def _write(self, namespace: str, key: str, value: Any, ttl: int) -> None:
+        from core.services import redis as redis_service
+
+        try:
+            raw = _encode({"stored_at": time.time(), "value": value})
+            if len(raw) > MAX_STORED_BYTES:
+                return
+            await redis_service.setex(key, ttl, raw, timeout=REDIS_TIMEOUT_SECONDS)
+            self._count(namespace, "stored")
+            self._count(namespace, "stored_bytes", len(raw))
+        except Exception as e:
+            self._count(namespace, "errors")
+            logger.warning(f"⚠️  [TOOL CACHE] Write error for {namespace}: {e}")
+
+    async def invalidate(self, namespace: str, *parts: Any) -> None:
+        from core.services import redis as redis_service
+
+        try:
+            await redis_service.delete(self.make_key(namespace, *parts), timeout=REDIS_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning(f"⚠️  [TOOL CACHE] Invalidate error for {namespace}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {}
+        for namespace, counters in self._stats.items():
+            lookups = counters["hits"] + counters["misses"] + counters["shared"]
+            stats[namespace] = {
+                **counters,
+                "hit_ratio": round((counters["hits"] + counters["shared"]) / lookups, 3) if lookups else None,
+            }
+        stats["inflight"] = len(self._inflight)
+        return stats
+
+
+tool_result_cache = ToolResultCache()
+
+
+def cached_tool_call(
+    namespace: str,
+    ttl: int,
+    key: Callable[..., Optional[Tuple[Any, ...]]],
+    cacheable: Callable[[Any], bool] = lambda value: True
+):
+    """Cache an async tool method's upstream call in the shared tool result cache.
+
+    Args:
+        namespace: Cache namespace, one per upstream call (e.g. "tavily_search")
+        ttl: Seconds a stored result is served
+        key: Called with the method's arguments (self included); returns the
+             normalized key parts, or None to bypass the cache for this call
+        cacheable: Whether a result may be stored (e.g. only successful ones)
+
+    The return value must be JSON-serializable.
+
+    Usage:
+        @cached_tool_call("tavily_search", ttl=600,
+                          key=lambda self, query, num_results: (normalize_query(query), num_results),
+                          cacheable=lambda result: bool(result.get("success")))
+        async def _execute_single_search(self, query, num_results):
+            ...
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            parts = key(*args, **kwargs) if config.TOOL_RESULT_CACHE_ENABLED else None
+            if parts is None:
+                _record(namespace, "bypassed")
+                return await func(*args, **kwargs)
+            return await tool_result_cache.get_or_fetch(
+                namespace,
+                tool_result_cache.make_key(namespace, *parts),
+                lambda: func(*args, **kwargs),
+                ttl,
+                cacheable
+            )
+        return wrapper
+    return decorator
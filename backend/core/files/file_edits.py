@@ -0,0 +1,235 @@
+"""
+Compact results for file-editing tools.
+
+Edit tools used to return the whole file before and after every edit. That
+text was stored twice per tool message, streamed to the client and replayed
+into every later prompt. Now a result carries a unified diff, the changed line
+ranges and the sha256 of both versions. The full versions are stored once per
+project, deduplicated by hash and zlib-compressed, in file_edit_snapshots. The
+UI fetches them on demand from GET /threads/{thread_id}/file-edits. Versions
+not saved again for 30 days are removed by a daily database job. Edit tools save
+them in the background (save_snapshots_in_background), so the insert is not on
+the tool call's path.
+"""
+import asyncio
+import difflib
+import hashlib
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from core.utils.logger import logger
+
+CONTEXT_LINES = 3
+MAX_DIFF_CHARS = 20_000
+MAX_MATCH_CELLS = 4_000_000
+
+
+def content_sha256(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _format_range(start: int, stop: int) -> str:
+    # Same convention as difflib.unified_diff hunk headers
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return str(beginning)
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def _split_lines(text: str) -> List[str]:
+    # Lines end at "\n" only, as in diff/patch; str.splitlines also breaks on "\r", "\x0c", ...
+    lines = text.split("\n")
+    return [line + "\n" for line in lines[:-1]] + ([lines[-1]] if lines[-1] else [])
+
+
+def _diff_lines(prefix: str, lines: List[str]) -> Iterable[str]:
+    for line in lines:
+        if line.endswith("\n"):
+            yield prefix + line
+        else:
+            yield f"{prefix}{line}\n\\ No newline at end of file\n"
+
+
+def _opcodes(a: List[str], b: List[str]) -> List[Tuple[str, int, int, int, int]]:
+    # Edits are usually local: match only the region between the common prefix and suffix
+    prefix = 0
+    limit = min(len(a), len(b))
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and a[len(a) - 1 - suffix] == b[len(b) - 1 - suffix]:
+        suffix += 1
+
+    opcodes = [("equal", 0, prefix, 0, prefix)] if prefix else []
+    a_mid, b_mid = a[prefix:len(a) - suffix], b[prefix:len(b) - suffix]
+    if len(a_mid) * len(b_mid) > MAX_MATCH_CELLS:
+        # Whole-file rewrites: SequenceMatcher is quadratic here, report one replaced block
+        opcodes.append(("replace", prefix, len(a) - suffix, prefix, len(b) - suffix))
+    else:
+        matcher = difflib.SequenceMatcher(None, a_mid, b_mid, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            opcodes.append((tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix))
+    if suffix:
+        opcodes.append(("equal", len(a) - suffix, len(a), len(b) - suffix, len(b)))
+
+    # Merge adjacent equal runs so grouping sees one block, like SequenceMatcher itself
+    merged: List[Tuple[str, int, int, int, int]] = []
+    for op in opcodes:
+        if merged and op[0] == "equal" and merged[-1][0] == "equal":
+            merged[-1] = ("equal", merged[-1][1], op[2], merged[-1][3], op[4])
+        else:
+            merged.append(op)
+    return merged
+
+
+def _grouped_opcodes(codes: List[Tuple[str, int, int, int, int]], n: int) -> Iterable[List[Tuple[str, int, int, int, int]]]:
+    # difflib.SequenceMatcher.get_grouped_opcodes over a precomputed opcode list
+    if not codes:
+        codes = [("equal", 0, 1, 0, 1)]
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    nn = n + n
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > nn:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def unified_diff(original: str, updated: str, file_path: str) -> Tuple[str, List[List[int]], int, int]:
+    """Return (diff, changed line ranges in the updated file, lines added, lines removed).
+
+    Ranges are 1-based and inclusive. A pure deletion is reported as the line it
+    happened before.
+    """
+    a = _split_lines(original)
+    b = _split_lines(updated)
+
+    out: List[str] = []
+    ranges: List[List[int]] = []
+    added = removed = 0
+    for group in _grouped_opcodes(_opcodes(a, b), CONTEXT_LINES):
+        if not out:
+            out.append(f"--- a/{file_path}\n+++ b/{file_path}\n")
+        first, last = group[0], group[-1]
+        out.append(f"@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@\n")
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                out.extend(_diff_lines(" ", a[i1:i2]))
+                continue
+            if tag in ("replace", "delete"):
+                out.extend(_diff_lines("-", a[i1:i2]))
+                removed += i2 - i1
+            if tag in ("replace", "insert"):
+                out.extend(_diff_lines("+", b[j1:j2]))
+                added += j2 - j1
+            ranges.append([j1 + 1, max(j2, j1 + 1)])
+    return "".join(out), ranges, added, removed
+
+
+def build_edit_result(
+    message: str,
+    file_path: str,
+    original: Optional[str],
+    updated: Optional[str],
+) -> Dict[str, Any]:
+    """Tool output for an edit: message, diff and hashes instead of full copies."""
+    result: Dict[str, Any] = {
+        "message": message,
+        "file_path": file_path,
+        "original_sha256": content_sha256(original) if original is not None else None,
+        "updated_sha256": content_sha256(updated) if updated is not None else None,
+    }
+    if original is None or updated is None:
+        return result
+
+    diff, ranges, added, removed = unified_diff(original, updated, file_path)
+    truncated = len(diff) > MAX_DIFF_CHARS
+    if truncated:
+        diff = diff[:MAX_DIFF_CHARS] + f"\n... [diff truncated, {len(diff) - MAX_DIFF_CHARS:,} more characters]\n"
+    result.update({
+        "diff": diff,
+        "diff_truncated": truncated,
+        "changed_lines": ranges,
+        "lines_added": added,
+        "lines_removed": removed,
+        "total_lines": updated.count("\n") + (0 if updated.endswith("\n") or not updated else 1),
+    })
+    return result
+
+
+# Background snapshot saves, referenced until done
+_pending_saves: Set[asyncio.Task] = set()
+
+
+def _snapshot_rows(project_id: str, contents: Tuple[Optional[str], ...]) -> Tuple[List[str], Dict[str, Any]]:
+    unique: Dict[str, str] = {}
+    for content in contents:
+        if content is not None:
+            unique.setdefault(content_sha256(content), content)
+
+    values = []
+    params: Dict[str, Any] = {"project_id": project_id}
+    for i, (digest, content) in enumerate(unique.items()):
+        encoded = content.encode("utf-8")
+        values.append(f"(:project_id, :sha_{i}, :data_{i}, :size_{i})")
+        params[f"sha_{i}"] = digest
+        params[f"data_{i}"] = zlib.compress(encoded, 6)
+        params[f"size_{i}"] = len(encoded)
+    return values, params
+
+
+async def save_snapshots(project_id: str, *contents: Optional[str]) -> None:
+    """Store file versions for on-demand retrieval. Failures are logged, never raised."""
+    from core.services.db import execute_mutate
+
+    try:
+        # Hashing and compressing a large file would otherwise stall the event loop
+        values, params = await asyncio.to_thread(_snapshot_rows, project_id, contents)
+        if not values:
+            return
+        sql = f"""
+        INSERT INTO file_edit_snapshots (project_id, content_sha256, content_zlib, size_bytes)
+        VALUES {", ".join(values)}
+        ON CONFLICT (project_id, content_sha256) DO UPDATE SET last_used_at = NOW()
+        """
+        await execute_mutate(sql, params)
+    except Exception as e:
+        logger.warning(f"Failed to save file edit snapshots for project {project_id}: {e}")
+
+
+def save_snapshots_in_background(project_id: str, *contents: Optional[str]) -> asyncio.Task:
+    """Schedule save_snapshots without waiting for it; the tool result only carries the hashes."""
+    task = asyncio.create_task(save_snapshots(project_id, *contents))
+    _pending_saves.add(task)
+    task.add_done_callback(_pending_saves.discard)
+    return task
+
+
+async def load_snapshots(project_id: str, hashes: List[str]) -> Dict[str, str]:
+    from core.services.db import execute_read
+
+    if not hashes:
+        return {}
+    rows = await execute_read(
+        """
+        SELECT content_sha256, content_zlib
+        FROM file_edit_snapshots
+        WHERE project_id = :project_id AND content_sha256 = ANY(:hashes)
+        """,
+        {"project_id": project_id, "hashes": list(hashes)},
+    )
+    return {row["content_sha256"]: zlib.decompress(bytes(row["content_zlib"])).decode("utf-8") for row in rows}
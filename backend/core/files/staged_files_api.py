@@ -8,7 +8,7 @@ from pydantic import BaseModel
 
 from core.utils.auth_utils import verify_and_get_user_id_from_jwt
 from core.utils.logger import logger
-from core.utils.fast_parse import parse, format_file_size, sanitize_filename_for_path, FileType, normalize_mime_type
+from core.utils.fast_parse import async_parse, format_file_size, sanitize_filename_for_path, FileType, normalize_mime_type
 from core.services.supabase import DBConnection
 
 router = APIRouter(tags=["staged-files"])
@@ -154,12 +154,12 @@ async def stage_file(
         except Exception as e:
             logger.warning(f"Failed to compress/store image: {e}")
     
-    def parse_file():
+    async def parse_file():
         import time
         parse_start = time.time()
         try:
             logger.info(f"🔍 [FAST_PARSE] Starting parse for {original_filename} ({format_file_size(file_size)}, mime: {mime_type})")
-            result = parse(content, original_filename, mime_type)
+            result = await async_parse(content, original_filename, mime_type)
             parse_time = (time.time() - parse_start) * 1000
             
             if result.success and result.file_type != FileType.IMAGE:
@@ -194,9 +194,8 @@ async def stage_file(
     
     import time
     parse_executor_start = time.time()
-    loop = asyncio.get_event_loop()
-    parsed_content, parsed_preview = await loop.run_in_executor(None, parse_file)
-    logger.debug(f"⏱️ [FAST_PARSE] Executor completed in {(time.time() - parse_executor_start) * 1000:.1f}ms")
+    parsed_content, parsed_preview = await parse_file()
+    logger.debug(f"⏱️ [FAST_PARSE] Parse engine completed in {(time.time() - parse_executor_start) * 1000:.1f}ms")
     
     await upload_task
     await image_task
@@ -29,7 +29,7 @@ async def fast_parse_files(files: List[UploadFile], prompt: str = "") -> Tuple[s
         Tuple of (updated message content with file refs, list of file data tuples)
         Each file tuple: (filename, content_bytes, mime_type, parsed_content)
     """
-    from core.utils.fast_parse import parse, FileType, format_file_size
+    from core.utils.fast_parse import async_parse, FileType, format_file_size
     
     if not files:
         return prompt, []
@@ -55,7 +55,7 @@ async def fast_parse_files(files: List[UploadFile], prompt: str = "") -> Tuple[s
             content_bytes = await file.read()
             mime_type = file.content_type or "application/octet-stream"
             
-            result = parse(content_bytes, original_filename, mime_type)
+            result = await async_parse(content_bytes, original_filename, mime_type)
             
             parsed_content = None
             if result.success and result.file_type != FileType.IMAGE:
@@ -224,11 +224,11 @@ async def _persist_and_invalidate(
         except Exception as e:
             logger.warning(f"Failed to persist refreshed URL for message {message_id}: {e}")
 
-    # Invalidate Redis cache
+    # Invalidate the cached history from the first refreshed message onwards
     if thread_id:
         try:
-            from core.cache.runtime_cache import invalidate_message_history_cache
-            await invalidate_message_history_cache(thread_id)
+            from core.cache.runtime_cache import invalidate_message_history_suffix
+            await invalidate_message_history_suffix(thread_id, message_ids=list(messages_to_update.keys()))
             logger.debug(f"🗑️ Invalidated message cache for thread {thread_id}")
         except Exception as e:
             logger.warning(f"Failed to invalidate cache for thread {thread_id}: {e}")
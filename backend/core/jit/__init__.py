@@ -5,6 +5,7 @@ from .config import JITConfig
 from .dependencies import DependencyResolver, get_dependency_resolver, TOOL_DEPENDENCIES
 from .tool_cache import ToolGuideCache, get_tool_cache
 from .mcp_loader import MCPJITLoader
+from .mcp_schema_cache import MCPServerSchemaCache, mcp_server_schema_cache
 from .mcp_registry import get_toolkit_tools, get_all_available_tools_from_toolkits
 from .mcp_registry import get_dynamic_registry, warm_cache_for_agent_toolkits
 from .result_types import (
@@ -26,6 +27,8 @@ __all__ = [
     'ToolGuideCache',
     'get_tool_cache',
     'MCPJITLoader',
+    'MCPServerSchemaCache',
+    'mcp_server_schema_cache',
     'get_toolkit_tools',
     'get_all_available_tools_from_toolkits',
     'get_dynamic_registry',
@@ -6,6 +6,7 @@ from dataclasses import dataclass
 from core.utils.logger import logger
 from core.jit.mcp_registry import get_toolkit_tools
 from core.jit.result_types import ActivationResult, ActivationSuccess, ActivationError, ActivationErrorType
+from core.jit.mcp_schema_cache import mcp_server_schema_cache
 
 @dataclass
 class MCPToolInfo:
@@ -211,33 +212,11 @@ class MCPJITLoader:
             logger.error("❌ [MCP JIT] Missing 'url' in SSE MCP config")
             return []
         
-        from mcp.client.sse import sse_client
-        from mcp import ClientSession
-        
-        headers = config.get('headers', {})
-        
         try:
-            try:
-                async with sse_client(url, headers=headers) as (read_stream, write_stream):
-                    async with ClientSession(read_stream, write_stream) as session:
-                        await session.initialize()
-                        tools_result = await session.list_tools()
-                        tools = tools_result.tools if hasattr(tools_result, 'tools') else tools_result
-                        tool_names = [tool.name for tool in tools]
-                        logger.debug(f"⚡ [MCP JIT] Discovered {len(tool_names)} SSE tools")
-                        return tool_names
-            except TypeError as e:
-                if "unexpected keyword argument" in str(e):
-                    async with sse_client(url) as (read_stream, write_stream):
-                        async with ClientSession(read_stream, write_stream) as session:
-                            await session.initialize()
-                            tools_result = await session.list_tools()
-                            tools = tools_result.tools if hasattr(tools_result, 'tools') else tools_result
-                            tool_names = [tool.name for tool in tools]
-                            logger.debug(f"⚡ [MCP JIT] Discovered {len(tool_names)} SSE tools (no headers)")
-                            return tool_names
-                else:
-                    raise
+            tools = await mcp_server_schema_cache.get_tools('sse', config)
+            tool_names = [tool['name'] for tool in tools]
+            logger.debug(f"⚡ [MCP JIT] Discovered {len(tool_names)} SSE tools")
+            return tool_names
         except Exception as e:
             logger.error(f"❌ [MCP JIT] Failed to discover SSE tools: {e}")
             return []
@@ -248,18 +227,11 @@ class MCPJITLoader:
             logger.error("❌ [MCP JIT] Missing 'url' in HTTP MCP config")
             return []
         
-        from mcp.client.streamable_http import streamablehttp_client
-        from mcp import ClientSession
-        
         try:
-            async with streamablehttp_client(url) as (read_stream, write_stream, _):
-                async with ClientSession(read_stream, write_stream) as session:
-                    await session.initialize()
-                    tools_result = await session.list_tools()
-                    tools = tools_result.tools if hasattr(tools_result, 'tools') else tools_result
-                    tool_names = [tool.name for tool in tools]
-                    logger.debug(f"⚡ [MCP JIT] Discovered {len(tool_names)} HTTP tools")
-                    return tool_names
+            tools = await mcp_server_schema_cache.get_tools('http', config)
+            tool_names = [tool['name'] for tool in tools]
+            logger.debug(f"⚡ [MCP JIT] Discovered {len(tool_names)} HTTP tools")
+            return tool_names
         except Exception as e:
             logger.error(f"❌ [MCP JIT] Failed to discover HTTP tools: {e}")
             return []
@@ -270,24 +242,11 @@ class MCPJITLoader:
             logger.error("❌ [MCP JIT] Missing 'command' in JSON/stdio MCP config")
             return []
         
-        from mcp import ClientSession, StdioServerParameters
-        from mcp.client.stdio import stdio_client
-        
         try:
-            server_params = StdioServerParameters(
-                command=command,
-                args=config.get("args", []),
-                env=config.get("env", {})
-            )
-            
-            async with stdio_client(server_params) as (read_stream, write_stream):
-                async with ClientSession(read_stream, write_stream) as session:
-                    await session.initialize()
-                    tools_result = await session.list_tools()
-                    tools = tools_result.tools if hasattr(tools_result, 'tools') else tools_result
-                    tool_names = [tool.name for tool in tools]
-                    logger.debug(f"⚡ [MCP JIT] Discovered {len(tool_names)} JSON/stdio tools")
-                    return tool_names
+            tools = await mcp_server_schema_cache.get_tools('json', config)
+            tool_names = [tool['name'] for tool in tools]
+            logger.debug(f"⚡ [MCP JIT] Discovered {len(tool_names)} JSON/stdio tools")
+            return tool_names
         except Exception as e:
             logger.error(f"❌ [MCP JIT] Failed to discover JSON/stdio tools: {e}")
             return []
@@ -432,8 +391,6 @@ class MCPJITLoader:
             
             from core.composio_integration.composio_profile_service import ComposioProfileService
             from core.services.supabase import DBConnection
-            from mcp.client.streamable_http import streamablehttp_client
-            from mcp import ClientSession
             
             db = DBConnection()
             profile_service = ComposioProfileService(db)
@@ -441,24 +398,8 @@ class MCPJITLoader:
             
             logger.debug(f"⚡ [MCP JIT] Resolved Composio profile {profile_id} to MCP URL for {tool_name}")
             
-            async with streamablehttp_client(mcp_url) as (read_stream, write_stream, _):
-                async with ClientSession(read_stream, write_stream) as session:
-                    await session.initialize()
-                    tools_result = await session.list_tools()
-                    tools = tools_result.tools if hasattr(tools_result, 'tools') else tools_result
-                    
-                    for tool in tools:
-                        if tool.name == tool_name:
-                            schema = {
-                                "name": tool.name,
-                                "description": tool.description,
-                                "input_schema": tool.inputSchema
-                            }
-                            logger.debug(f"⚡ [MCP JIT] Found Composio schema for {tool_name}")
-                            return schema
-                    
-                    available_tools = [tool.name for tool in tools]
-                    raise ValueError(f"Tool '{tool_name}' not found. Available: {available_tools}")
+            tools = await mcp_server_schema_cache.get_tools('http', {'url': mcp_url})
+            return self._find_tool_schema(tools, tool_name, "Composio")
                 
         except Exception as e:
             logger.error(f"❌ [MCP JIT] Failed to load Composio schema for {tool_name}: {e}")
@@ -486,111 +427,32 @@ class MCPJITLoader:
         if not url:
             raise ValueError(f"Missing 'url' in SSE MCP config for {tool_name}")
         
-        from mcp.client.sse import sse_client
-        from mcp import ClientSession
-        
-        headers = config.get('headers', {})
-        
-        try:
-            async with sse_client(url, headers=headers) as (read_stream, write_stream):
-                async with ClientSession(read_stream, write_stream) as session:
-                    await session.initialize()
-                    tools_result = await session.list_tools()
-                    tools = tools_result.tools if hasattr(tools_result, 'tools') else tools_result
-                    
-                    for tool in tools:
-                        if tool.name == tool_name:
-                            schema = {
-                                "name": tool.name,
-                                "description": tool.description,
-                                "input_schema": tool.inputSchema
-                            }
-                            logger.debug(f"⚡ [MCP JIT] Found SSE schema for {tool_name}")
-                            return schema
-                    
-                    available_tools = [tool.name for tool in tools]
-                    raise ValueError(f"Tool '{tool_name}' not found in SSE server. Available: {available_tools}")
-        except TypeError as e:
-            if "unexpected keyword argument" in str(e):
-                async with sse_client(url) as (read_stream, write_stream):
-                    async with ClientSession(read_stream, write_stream) as session:
-                        await session.initialize()
-                        tools_result = await session.list_tools()
-                        tools = tools_result.tools if hasattr(tools_result, 'tools') else tools_result
-                        
-                        for tool in tools:
-                            if tool.name == tool_name:
-                                schema = {
-                                    "name": tool.name,
-                                    "description": tool.description,
-                                    "input_schema": tool.inputSchema
-                                }
-                                logger.debug(f"⚡ [MCP JIT] Found SSE schema for {tool_name} (no headers)")
-                                return schema
-                        
-                        available_tools = [tool.name for tool in tools]
-                        raise ValueError(f"Tool '{tool_name}' not found in SSE server. Available: {available_tools}")
-            else:
-                raise
+        tools = await mcp_server_schema_cache.get_tools('sse', config)
+        return self._find_tool_schema(tools, tool_name, "SSE")
     
     async def _load_http_schema(self, tool_name: str, url: str, config: Dict[str, Any]) -> Dict[str, Any]:
         if not url:
             raise ValueError(f"Missing 'url' in HTTP MCP config for {tool_name}")
         
-        from mcp.client.streamable_http import streamablehttp_client
-        from mcp import ClientSession
-        
-        async with streamablehttp_client(url) as (read_stream, write_stream, _):
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                tools_result = await session.list_tools()
-                tools = tools_result.tools if hasattr(tools_result, 'tools') else tools_result
-                
-                for tool in tools:
-                    if tool.name == tool_name:
-                        schema = {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "input_schema": tool.inputSchema
-                        }
-                        logger.debug(f"⚡ [MCP JIT] Found HTTP schema for {tool_name}")
-                        return schema
-                
-                available_tools = [tool.name for tool in tools]
-                raise ValueError(f"Tool '{tool_name}' not found in HTTP server. Available: {available_tools}")
+        tools = await mcp_server_schema_cache.get_tools('http', {**config, 'url': url})
+        return self._find_tool_schema(tools, tool_name, "HTTP")
     
     async def _load_json_schema(self, tool_name: str, config: Dict[str, Any]) -> Dict[str, Any]:
         command = config.get('command')
         if not command:
             raise ValueError(f"Missing 'command' in JSON/stdio MCP config for {tool_name}")
         
-        from mcp import ClientSession, StdioServerParameters
-        from mcp.client.stdio import stdio_client
-        
-        server_params = StdioServerParameters(
-            command=command,
-            args=config.get("args", []),
-            env=config.get("env", {})
-        )
-        
-        async with stdio_client(server_params) as (read_stream, write_stream):
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                tools_result = await session.list_tools()
-                tools = tools_result.tools if hasattr(tools_result, 'tools') else tools_result
-                
-                for tool in tools:
-                    if tool.name == tool_name:
-                        schema = {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "input_schema": tool.inputSchema
-                        }
-                        logger.debug(f"⚡ [MCP JIT] Found JSON/stdio schema for {tool_name}")
-                        return schema
-                
-                available_tools = [tool.name for tool in tools]
-                raise ValueError(f"Tool '{tool_name}' not found in JSON/stdio server. Available: {available_tools}")
+        tools = await mcp_server_schema_cache.get_tools('json', config)
+        return self._find_tool_schema(tools, tool_name, "JSON/stdio")
+    
+    def _find_tool_schema(self, tools: List[Dict[str, Any]], tool_name: str, server_kind: str) -> Dict[str, Any]:
+        for tool in tools:
+            if tool['name'] == tool_name:
+                logger.debug(f"⚡ [MCP JIT] Found {server_kind} schema for {tool_name}")
+                return dict(tool)
+        
+        available_tools = [tool['name'] for tool in tools]
+        raise ValueError(f"Tool '{tool_name}' not found in {server_kind} server. Available: {available_tools}")
     
     def get_activation_stats(self) -> Dict[str, Any]:
         loaded_count = sum(1 for tool_info in self.tool_map.values() if tool_info.loaded)
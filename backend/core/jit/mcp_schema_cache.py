@@ -0,0 +1,171 @@
+import copy
+import hashlib
+import json
+import time
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import timedelta
+
+from core.utils.logger import logger
+from core.tools.utils.mcp_session_pool import mcp_session_pool, server_key
+
+
+class MCPServerSchemaCache:
+    """Whole-server tool lists for custom MCP servers, from one list_tools call.
+
+    Keyed by a fingerprint of (transport, url/command, headers/env digest), stored
+    in Redis with a TTL and in a short-lived local copy. Concurrent misses for the
+    same server share one fetch. Callers get their own copy of the list, so
+    mutating it doesn't leak into the cache.
+
+    A changed config is a new fingerprint; a server whose tools change behind
+    the same config is refreshed by invalidate() when it is reconnected
+    (discover) or its agent config is saved. Other workers' local copies
+    expire within LOCAL_TTL_SECONDS.
+    """
+
+    CACHE_TTL = timedelta(hours=1)
+    LOCAL_TTL_SECONDS = 60
+    CACHE_KEY_PREFIX = "mcp_server_tools:"
+    CACHE_VERSION = "v1"
+
+    def __init__(self, ttl: Optional[timedelta] = None):
+        self.ttl = ttl or self.CACHE_TTL
+        self._local: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._hits = 0
+        self._misses = 0
+        self._shared_fetches = 0
+
+    def fingerprint(self, transport: str, config: Dict[str, Any]) -> str:
+        key = server_key(transport, config)
+        return hashlib.sha256(f"{key.transport}|{key.target}|{key.digest}".encode()).hexdigest()[:32]
+
+    def _make_cache_key(self, fingerprint: str) -> str:
+        return f"{self.CACHE_KEY_PREFIX}{self.CACHE_VERSION}:{fingerprint}"
+
+    async def get_tools(self, transport: str, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Return [{name, description, input_schema}] for every tool on the server."""
+        fingerprint = self.fingerprint(transport, config)
+
+        local = self._local.get(fingerprint)
+        if local and local[0] > time.monotonic():
+            self._hits += 1
+            return copy.deepcopy(local[1])
+
+        while True:
+            inflight = self._inflight.get(fingerprint)
+            if inflight is None:
+                break
+            self._shared_fetches += 1
+            try:
+                return copy.deepcopy(await asyncio.shield(inflight))
+            except asyncio.CancelledError:
+                # The fetching task was cancelled, not us: take over the fetch
+                if inflight.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[fingerprint] = future
+        try:
+            tools = await self._load(fingerprint, transport, config)
+            future.set_result(tools)
+            return tools
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a fetch nobody else waited on doesn't log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(fingerprint, None)
+
+    async def _load(self, fingerprint: str, transport: str, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        from core.services import redis as redis_service
+
+        cache_key = self._make_cache_key(fingerprint)
+        try:
+            cached_data = await redis_service.get(cache_key, timeout=5.0)
+            if cached_data:
+                tools = json.loads(cached_data)
+                self._hits += 1
+                self._remember(fingerprint, tools)
+                logger.debug(f"⚡ [MCP SCHEMA CACHE] Hit: {fingerprint[:8]} ({len(tools)} tools)")
+                return tools
+        except Exception as e:
+            logger.warning(f"⚠️  [MCP SCHEMA CACHE] Read error for {fingerprint[:8]}: {e}")
+
+        self._misses += 1
+        start_time = time.time()
+        server_tools = await mcp_session_pool.list_tools(transport, config)
+        tools = [
+            {
+                "name": tool.name,
+                "description": tool.description,
+                "input_schema": tool.inputSchema
+            }
+            for tool in server_tools
+        ]
+        logger.debug(f"⚡ [MCP SCHEMA CACHE] Fetched {len(tools)} tools for {fingerprint[:8]} in {(time.time() - start_time) * 1000:.1f}ms")
+
+        # An empty list is more likely a misbehaving server than a real answer; don't pin it
+        if tools:
+            self._remember(fingerprint, tools)
+            try:
+                await redis_service.setex(cache_key, int(self.ttl.total_seconds()), json.dumps(tools), timeout=5.0)
+            except Exception as e:
+                logger.warning(f"⚠️  [MCP SCHEMA CACHE] Write error for {fingerprint[:8]}: {e}")
+        return tools
+
+    def _remember(self, fingerprint: str, tools: List[Dict[str, Any]]) -> None:
+        now = time.monotonic()
+        if len(self._local) > 512:
+            self._local = {fp: entry for fp, entry in self._local.items() if entry[0] > now}
+        self._local[fingerprint] = (now + self.LOCAL_TTL_SECONDS, copy.deepcopy(tools))
+
+    async def invalidate(self, transport: str, config: Dict[str, Any]) -> None:
+        from core.services import redis as redis_service
+
+        fingerprint = self.fingerprint(transport, config)
+        self._local.pop(fingerprint, None)
+        try:
+            await redis_service.delete(self._make_cache_key(fingerprint), timeout=5.0)
+        except Exception as e:
+            logger.warning(f"⚠️  [MCP SCHEMA CACHE] Invalidate error for {fingerprint[:8]}: {e}")
+
+    async def invalidate_custom_mcp(self, mcp_config: Dict[str, Any]) -> None:
+        """Invalidate an agent custom_mcp entry, keyed the way the MCP JIT loader resolves it."""
+        custom_type = mcp_config.get("customType", mcp_config.get("type", "standard"))
+        config = mcp_config.get("config", {})
+        try:
+            if custom_type == "composio":
+                profile_id = config.get("profile_id")
+                if not profile_id:
+                    return
+                from core.composio_integration.composio_profile_service import ComposioProfileService
+                from core.services.supabase import DBConnection
+
+                mcp_url = await ComposioProfileService(DBConnection()).get_mcp_url_for_runtime(profile_id)
+                await self.invalidate("http", {"url": mcp_url})
+            elif custom_type in ("sse", "json"):
+                await self.invalidate(custom_type, config)
+            elif config.get("url"):
+                await self.invalidate("http", config)
+        except Exception as e:
+            logger.warning(f"⚠️  [MCP SCHEMA CACHE] Could not invalidate {custom_type} MCP {mcp_config.get('name', '')}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "shared_fetches": self._shared_fetches,
+            "hit_ratio": round(self._hits / lookups, 3) if lookups else None,
+            "local_entries": len(self._local),
+        }
+
+
+mcp_server_schema_cache = MCPServerSchemaCache()
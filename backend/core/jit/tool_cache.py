@@ -78,12 +78,13 @@ class ToolGuideCache:
         try:
             from core.services import redis as redis_service
             
-            # Use individual gets with timeout - pipelining can be added later if needed
+            # Single MGET round-trip for the whole batch
+            cache_keys = [self._make_cache_key(tool_name) for tool_name in tool_names]
+            cached_values = await redis_service.mget(cache_keys, timeout=5.0)
+            
             guides = {}
             hits = 0
-            for tool_name in tool_names:
-                cache_key = self._make_cache_key(tool_name)
-                cached_data = await redis_service.get(cache_key, timeout=5.0)
+            for tool_name, cached_data in zip(tool_names, cached_values):
                 if cached_data:
                     data = json.loads(cached_data)
                     guides[tool_name] = data['guide']
@@ -105,24 +106,22 @@ class ToolGuideCache:
         try:
             from core.services import redis as redis_service
             
-            # Use individual sets with timeout - pipelining can be added later if needed
+            # One pipelined SETEX batch instead of a round-trip per guide
+            ttl_seconds = int(self.ttl.total_seconds())
+            items = []
             for tool_name, guide in guides.items():
                 if guide:
-                    cache_key = self._make_cache_key(tool_name)
                     data = {
                         'tool_name': tool_name,
                         'guide': guide,
                         'version': self.CACHE_VERSION
                     }
-                    await redis_service.setex(
-                        cache_key,
-                        int(self.ttl.total_seconds()),
-                        json.dumps(data),
-                        timeout=5.0
-                    )
-            
-            logger.info(f"💾 [TOOL CACHE] Batch stored: {len(guides)} guides")
-            return len(guides)
+                    items.append((self._make_cache_key(tool_name), json.dumps(data), ttl_seconds))
+            
+            stored = await redis_service.set_multiple(items, timeout=5.0)
+            
+            logger.info(f"💾 [TOOL CACHE] Batch stored: {stored}/{len(guides)} guides")
+            return stored
             
         except Exception as e:
             logger.error(f"❌ [TOOL CACHE] Error in batch store: {e}")
@@ -1,6 +1,7 @@
 import os
 import io
 import uuid
+import asyncio
 import re
 from typing import Dict, Any
 from pathlib import Path
@@ -11,12 +12,15 @@ import PyPDF2
 import docx
 
 from core.utils.logger import logger
+from core.utils.fast_parse import get_parse_engine, FileType
 from core.services.supabase import DBConnection
 from core.services.llm import make_llm_api_call
 
 class FileProcessor:
     SUPPORTED_EXTENSIONS = {'.txt', '.pdf', '.docx'}
     MAX_FILE_SIZE = 50 * 1024 * 1024
+    # The largest summary model takes ~1M tokens (~4M chars); nothing past that is ever read
+    SUMMARY_MAX_CHARS = 4_000_000
     
     def __init__(self):
         self.db = DBConnection()
@@ -155,7 +159,7 @@ class FileProcessor:
         """Background task to generate and update file summary."""
         try:
             # Extract content
-            content = self._extract_content(file_content, filename, mime_type)
+            content = await self._parse_content(file_content, filename, mime_type)
             if not content:
                 content = f"File: {filename} ({len(file_content)} bytes, {mime_type})"
             
@@ -222,7 +226,7 @@ class FileProcessor:
             )
             
             # Extract content for summary
-            content = self._extract_content(file_content, filename, mime_type)
+            content = await self._parse_content(file_content, filename, mime_type)
             if not content:
                 # If no content could be extracted, create a basic file info summary
                 content = f"File: {filename} ({len(file_content)} bytes, {mime_type})"
@@ -399,6 +403,16 @@ Keep it under 200 words and make it actionable for context injection."""
         # Generate intelligent fallback
         return f"This {content_type} '{filename}' contains {len(content):,} characters across {len(non_empty_lines)} lines. Preview: {preview[:200]}{'...' if len(preview) > 200 else ''} This file would be useful for understanding the specific content and context it provides."
     
+    async def _parse_content(self, file_content: bytes, filename: str, mime_type: str) -> str:
+        """Extract text via the shared fast_parse engine, streamed up to SUMMARY_MAX_CHARS."""
+        try:
+            result = await get_parse_engine().parse(file_content, filename, mime_type, max_chars=self.SUMMARY_MAX_CHARS)
+            if result.success and result.file_type not in (FileType.BINARY, FileType.IMAGE) and not result.is_empty:
+                return result.content
+        except Exception as e:
+            logger.warning(f"Fast parse failed for {filename}, falling back to basic extraction: {str(e)}")
+        return await asyncio.to_thread(self._extract_content, file_content, filename, mime_type)
+    
     def _extract_content(self, file_content: bytes, filename: str, mime_type: str) -> str:
         """Extract text content from file bytes."""
         file_extension = Path(filename).suffix.lower()
@@ -394,11 +394,17 @@ class MCPService:
 
     async def discover_custom_tools(self, request_type: str, config: Dict[str, Any]) -> CustomMCPConnectionResult:
         if request_type == "http":
-            return await self._discover_http_tools(config)
+            result = await self._discover_http_tools(config)
         elif request_type == "sse":
-            return await self._discover_sse_tools(config)
+            result = await self._discover_sse_tools(config)
         else:
             raise CustomMCPError(f"Unsupported request type: {request_type}")
+        
+        if result.success:
+            # (Re)connecting is when users expect tools changed on the server to show up in runs
+            from core.jit.mcp_schema_cache import mcp_server_schema_cache
+            await mcp_server_schema_cache.invalidate(request_type, config)
+        return result
     
     async def _discover_http_tools(self, config: Dict[str, Any]) -> CustomMCPConnectionResult:
         url = config.get("url")
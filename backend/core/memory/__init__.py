@@ -2,6 +2,7 @@ from .embedding_service import EmbeddingService
 from .extraction_service import MemoryExtractionService
 from .retrieval_service import MemoryRetrievalService
 from .models import MemoryType, MemoryItem, ExtractionQueueStatus
+from .vector_index import MemoryVectorIndex, memory_vector_index
 
 __all__ = [
     'EmbeddingService',
@@ -10,4 +11,6 @@ __all__ = [
     'MemoryType',
     'MemoryItem',
     'ExtractionQueueStatus',
+    'MemoryVectorIndex',
+    'memory_vector_index',
 ]
@@ -292,6 +292,14 @@ async def create_memory(
         
         created = new_memory.data[0]
         
+        # Make the memory retrievable right away (also invalidates cached retrievals)
+        from core.memory.vector_index import memory_vector_index
+        try:
+            await memory_vector_index.add(user_id, [created], [embedding])
+        except Exception as e:
+            logger.warning(f"Memory index update failed for {user_id}, invalidating: {e}")
+            await memory_vector_index.invalidate(user_id)
+        
         return MemoryResponse(
             memory_id=created['memory_id'],
             content=created['content'],
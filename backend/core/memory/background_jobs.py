@@ -119,6 +119,7 @@ async def run_memory_embedding(
                 'metadata': mem.get('metadata', {})
             })
         
+        ids_to_delete = []
         if current_count + len(to_insert) > max_memories:
             overflow = (current_count + len(to_insert)) - max_memories
             old = await client.table('user_memories').select('memory_id').eq('account_id', account_id).order('confidence_score', desc=False).limit(overflow).execute()
@@ -126,9 +127,17 @@ async def run_memory_embedding(
                 ids_to_delete = [m['memory_id'] for m in old.data]
                 await client.table('user_memories').delete().in_('memory_id', ids_to_delete).execute()
         
-        await client.table('user_memories').insert(to_insert).execute()
+        inserted = await client.table('user_memories').insert(to_insert).execute()
         logger.info(f"✅ Stored {len(to_insert)} memories")
         
+        # Keep the in-process retrieval index current (also invalidates cached retrievals)
+        from core.memory.vector_index import memory_vector_index
+        inserted_rows = inserted.data or []
+        if len(inserted_rows) == len(to_insert):
+            await memory_vector_index.add(account_id, inserted_rows, [row['embedding'] for row in to_insert], removed_ids=ids_to_delete)
+        else:
+            await memory_vector_index.invalidate(account_id)
+        
     except Exception as e:
         logger.error(f"Memory embedding failed: {e}", exc_info=True)
 
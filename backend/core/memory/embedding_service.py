@@ -1,9 +1,22 @@
+import array
 import asyncio
-from typing import List, Optional, Dict, Any
+import base64
+import hashlib
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, Set, Tuple
 from abc import ABC, abstractmethod
 from core.utils.logger import logger
 from core.utils.config import config
 
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
+EMBEDDING_BATCH_LINGER_MS = float(os.getenv("EMBEDDING_BATCH_LINGER_MS", "10"))
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", str(30 * 86400)))
+EMBEDDING_CACHE_L1_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_L1_MAX_ENTRIES", "2048"))
+EMBEDDING_CACHE_KEY_PREFIX = "embedding:v1"
+LOCAL_EMBEDDING_WORKERS = int(os.getenv("LOCAL_EMBEDDING_WORKERS", "2"))
+
 class EmbeddingProvider(ABC):
     @abstractmethod
     async def embed(self, texts: List[str]) -> List[List[float]]:
@@ -79,10 +92,22 @@ class VoyageAIEmbeddingProvider(EmbeddingProvider):
         return embeddings[0]
 
 class LocalEmbeddingProvider(EmbeddingProvider):
+    # Dedicated pool so model inference never occupies the loop's default executor
+    # (used by to_thread/DNS/file IO); the semaphore bounds work queued behind it.
+    _executor: Optional[ThreadPoolExecutor] = None
+    _slots: Optional[asyncio.Semaphore] = None
+    
     def __init__(self, model: str = "all-MiniLM-L6-v2"):
         self.model = model
         self._model_instance = None
     
+    @classmethod
+    def _get_executor(cls) -> Tuple[ThreadPoolExecutor, asyncio.Semaphore]:
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(max_workers=LOCAL_EMBEDDING_WORKERS, thread_name_prefix="local-embedding")
+            cls._slots = asyncio.Semaphore(LOCAL_EMBEDDING_WORKERS * 2)
+        return cls._executor, cls._slots
+    
     @property
     def model_instance(self):
         if self._model_instance is None:
@@ -96,11 +121,13 @@ class LocalEmbeddingProvider(EmbeddingProvider):
     
     async def embed(self, texts: List[str]) -> List[List[float]]:
         try:
-            loop = asyncio.get_event_loop()
-            embeddings = await loop.run_in_executor(
-                None,
-                lambda: self.model_instance.encode(texts, convert_to_numpy=True)
-            )
+            executor, slots = self._get_executor()
+            async with slots:
+                loop = asyncio.get_running_loop()
+                embeddings = await loop.run_in_executor(
+                    executor,
+                    lambda: self.model_instance.encode(texts, convert_to_numpy=True)
+                )
             return embeddings.tolist()
         except Exception as e:
             logger.error(f"Local embedding error: {str(e)}")
@@ -110,11 +137,226 @@ class LocalEmbeddingProvider(EmbeddingProvider):
         embeddings = await self.embed([text])
         return embeddings[0]
 
+def _encode_vector(vector: List[float]) -> str:
+    return base64.b64encode(array.array('f', vector).tobytes()).decode('ascii')
+
+
+def _decode_vector(payload: str) -> List[float]:
+    values = array.array('f')
+    values.frombytes(base64.b64decode(payload))
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache: sha256(model, text) -> vector.
+    
+    Small in-process LRU in front of Redis; vectors are stored as base64 float32
+    (~4x smaller than JSON) with a long TTL since an embedding never changes.
+    """
+    
+    def __init__(self, max_entries: int = EMBEDDING_CACHE_L1_MAX_ENTRIES, ttl: int = EMBEDDING_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.stats = {'l1_hits': 0, 'redis_hits': 0, 'misses': 0}
+    
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        digest = hashlib.sha256(f"{model}\0{text}".encode('utf-8')).hexdigest()
+        return f"{EMBEDDING_CACHE_KEY_PREFIX}:{digest}"
+    
+    def _remember(self, key: str, vector: List[float]):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        remote = []
+        for key in keys:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                found[key] = vector
+                self.stats['l1_hits'] += 1
+            else:
+                remote.append(key)
+        
+        if remote:
+            try:
+                from core.services import redis as redis_service
+                values = await redis_service.mget(remote, timeout=2.0)
+                for key, value in zip(remote, values):
+                    if value:
+                        vector = _decode_vector(value)
+                        found[key] = vector
+                        self._remember(key, vector)
+                        self.stats['redis_hits'] += 1
+            except Exception as e:
+                logger.debug(f"Embedding cache read failed: {e}")
+        
+        self.stats['misses'] += len(keys) - len(found)
+        return found
+    
+    async def set_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        for key, vector in items.items():
+            self._remember(key, vector)
+        try:
+            from core.services import redis as redis_service
+            await redis_service.set_multiple(
+                [(key, _encode_vector(vector), self.ttl) for key, vector in items.items()],
+                timeout=2.0
+            )
+        except Exception as e:
+            logger.debug(f"Embedding cache write failed: {e}")
+
+
+class EmbeddingPipeline:
+    """
+    Cache + micro-batcher in front of one provider/model.
+    
+    Concurrent embed_single() calls are queued and sent as one provider.embed()
+    when EMBEDDING_BATCH_MAX_SIZE texts are waiting or EMBEDDING_BATCH_LINGER_MS
+    after the first, whichever comes first. A text already queued or in flight is
+    awaited rather than re-sent, and every text is looked up in the cache first.
+    If a batch fails, its texts are retried one by one, so only the callers whose
+    own text is rejected see the error.
+    """
+    
+    def __init__(self, provider: EmbeddingProvider, model: str, cache: Optional[EmbeddingCache] = None,
+                 max_batch: int = EMBEDDING_BATCH_MAX_SIZE, linger_ms: float = EMBEDDING_BATCH_LINGER_MS):
+        self.provider = provider
+        self.model = model
+        self.cache = cache or EmbeddingCache()
+        self.max_batch = max(1, max_batch)
+        self.linger_s = max(0.0, linger_ms) / 1000
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._waiters: Dict[str, asyncio.Future] = {}  # cache key -> future for queued/in-flight texts
+        self._timer: Optional[asyncio.Task] = None
+        self._batches: Set[asyncio.Task] = set()  # running batches, referenced until done
+        self.stats = {'provider_calls': 0, 'texts_embedded': 0, 'max_batch_size': 0, 'coalesced_requests': 0,
+                      'batch_failures': 0}
+    
+    async def embed_single(self, text: str) -> List[float]:
+        key = EmbeddingCache.key(self.model, text)
+        waiter = self._waiters.get(key)
+        if waiter is not None:
+            self.stats['coalesced_requests'] += 1
+            return await asyncio.shield(waiter)
+        
+        cached = await self.cache.get_many([key])
+        if key in cached:
+            return cached[key]
+        waiter = self._waiters.get(key)  # queued by another caller during the lookup
+        if waiter is not None:
+            self.stats['coalesced_requests'] += 1
+            return await asyncio.shield(waiter)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[key] = future
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._linger())
+        return await asyncio.shield(future)
+    
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list (order preserved), only sending uncached unique texts to the provider."""
+        keys = [EmbeddingCache.key(self.model, text) for text in texts]
+        found = await self.cache.get_many(list(dict.fromkeys(keys)))
+        missing = list(dict.fromkeys(text for text, key in zip(texts, keys) if key not in found))
+        for i in range(0, len(missing), self.max_batch):
+            found.update(await self._embed_uncached(missing[i:i + self.max_batch]))
+        return [found[key] for key in keys]
+    
+    async def _embed_uncached(self, texts: List[str]) -> Dict[str, List[float]]:
+        vectors = await self.provider.embed(texts)
+        if len(vectors) != len(texts):
+            raise ValueError(f"Embedding provider returned {len(vectors)} vectors for {len(texts)} texts")
+        self.stats['provider_calls'] += 1
+        self.stats['texts_embedded'] += len(texts)
+        self.stats['max_batch_size'] = max(self.stats['max_batch_size'], len(texts))
+        items = {EmbeddingCache.key(self.model, text): vector for text, vector in zip(texts, vectors)}
+        await self.cache.set_many(items)
+        return items
+    
+    async def _linger(self):
+        try:
+            await asyncio.sleep(self.linger_s)
+        except asyncio.CancelledError:
+            return
+        self._timer = None
+        self._flush_now()
+    
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+    
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        try:
+            try:
+                found = await self._embed_uncached([text for text, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    raise
+                # One bad input fails the whole request; retry each text so only its own caller fails
+                self.stats['batch_failures'] += 1
+                logger.warning(f"Embedding batch of {len(batch)} failed ({e}), retrying texts individually")
+                await asyncio.gather(*(self._run_batch([item]) for item in batch))
+                return
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(found[EmbeddingCache.key(self.model, text)])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for text, _ in batch:
+                self._waiters.pop(EmbeddingCache.key(self.model, text), None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        calls = self.stats['provider_calls']
+        lookups = sum(self.cache.stats.values())
+        hits = self.cache.stats['l1_hits'] + self.cache.stats['redis_hits']
+        return {
+            'model': self.model,
+            **self.stats,
+            'avg_batch_size': round(self.stats['texts_embedded'] / calls, 2) if calls else 0.0,
+            'cache': {
+                **self.cache.stats,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'l1_entries': len(self.cache._entries),
+            },
+        }
+
+
+# One pipeline per provider/model, shared by every EmbeddingService instance in the process
+_pipelines: Dict[Tuple[str, str], EmbeddingPipeline] = {}
+
+
+def get_embedding_stats() -> Dict[str, Any]:
+    """Batch sizes and cache hit rates for every embedding pipeline in this process."""
+    return {f"{provider}:{model}": pipeline.get_stats() for (provider, model), pipeline in _pipelines.items()}
+
+
 class EmbeddingService:
     def __init__(self, provider: Optional[str] = None, model: Optional[str] = None):
         self.provider_name = provider or config.MEMORY_EMBEDDING_PROVIDER or "openai"
         self.model = model
         self._provider = None
+        self._pipeline: Optional[EmbeddingPipeline] = None
     
     @property
     def provider(self) -> EmbeddingProvider:
@@ -122,6 +364,17 @@ class EmbeddingService:
             self._provider = self._create_provider()
         return self._provider
     
+    @property
+    def pipeline(self) -> EmbeddingPipeline:
+        if self._pipeline is None:
+            provider = self.provider
+            model = getattr(provider, 'model', None) or 'default'
+            key = (type(provider).__name__, model)
+            if key not in _pipelines:
+                _pipelines[key] = EmbeddingPipeline(provider, model)
+            self._pipeline = _pipelines[key]
+        return self._pipeline
+    
     def _create_provider(self) -> EmbeddingProvider:
         provider_name = self.provider_name.lower()
         
@@ -148,7 +401,7 @@ class EmbeddingService:
         if not text or not text.strip():
             raise ValueError("Text cannot be empty")
         
-        return await self.provider.embed_single(text)
+        return await self.pipeline.embed_single(text)
     
     async def embed_texts(self, texts: List[str]) -> List[List[float]]:
         if not texts:
@@ -158,7 +411,7 @@ class EmbeddingService:
         if not valid_texts:
             raise ValueError("All texts are empty")
         
-        return await self.provider.embed(valid_texts)
+        return await self.pipeline.embed(valid_texts)
     
     async def embed_batch(self, texts: List[str], batch_size: int = 100) -> List[List[float]]:
         if not texts:
@@ -67,3 +67,17 @@ async def delete_all_memories(account_id: str) -> int:
     """
     result = await execute_mutate(sql, {"account_id": account_id})
     return len(result) if result else 0
+
+
+async def get_memories_with_embeddings(account_id: str, limit: int = 5000) -> List[Dict[str, Any]]:
+    """Rows for the in-process vector index; embedding comes back as pgvector text."""
+    sql = """
+    SELECT memory_id, content, memory_type, confidence_score, metadata, created_at,
+           embedding::text AS embedding
+    FROM user_memories
+    WHERE account_id = :account_id AND embedding IS NOT NULL
+    ORDER BY created_at
+    LIMIT :limit
+    """
+    rows = await execute(sql, {"account_id": account_id, "limit": limit})
+    return [dict(row) for row in rows] if rows else []
@@ -1,3 +1,4 @@
+import hashlib
 from typing import List, Dict, Any, Optional
 from core.utils.logger import logger
 from core.utils.cache import Cache
@@ -6,6 +7,7 @@ from core.billing.shared.config import get_memory_config, is_memory_enabled
 from core.utils.config import config
 from .embedding_service import EmbeddingService
 from .models import MemoryItem, MemoryType
+from .vector_index import memory_vector_index
 
 class MemoryRetrievalService:
     def __init__(self):
@@ -37,8 +39,13 @@ class MemoryRetrievalService:
                 logger.debug(f"Memory retrieval limit is 0 for tier: {tier_name}")
                 return []
             
-            cache_key = f"memories:retrieved:{account_id}:{hash(query_text)}"
-            cached = await Cache.get(cache_key)
+            # Version is bumped on every memory write, so stale entries are never read back.
+            # Unknown version (Redis down): skip the cache rather than risk a stale hit
+            version = await memory_vector_index.get_version(account_id)
+            cache_key = None
+            if version is not None:
+                cache_key = self._retrieval_cache_key(account_id, version, query_text, retrieval_limit, similarity_threshold)
+            cached = await Cache.get(cache_key) if cache_key else None
             if cached:
                 logger.debug(f"Retrieved memories from cache for {account_id}")
                 return [self._dict_to_memory_item(m) for m in cached]
@@ -51,26 +58,33 @@ class MemoryRetrievalService:
                 logger.debug(f"No memories stored for account {account_id}")
                 return []
             
-            # Need Supabase client for embedding-based similarity search RPC
-            await self.db.initialize()
-            client = await self.db.client
-            
             query_embedding = await self.embedding_service.embed_text(query_text)
             
-            result = await client.rpc(
-                'search_memories_by_similarity',
-                {
-                    'p_account_id': account_id,
-                    'p_query_embedding': query_embedding,
-                    'p_limit': retrieval_limit,
-                    'p_similarity_threshold': similarity_threshold
-                }
-            ).execute()
-            
-            logger.debug(f"Memory retrieval RPC returned {len(result.data) if result.data else 0} results")
+            rows = await memory_vector_index.search(
+                account_id, query_embedding, retrieval_limit, similarity_threshold, version=version
+            )
+            if rows is not None:
+                logger.debug(f"Memory retrieval index returned {len(rows)} results")
+            else:
+                # Need Supabase client for embedding-based similarity search RPC
+                await self.db.initialize()
+                client = await self.db.client
+                
+                result = await client.rpc(
+                    'search_memories_by_similarity',
+                    {
+                        'p_account_id': account_id,
+                        'p_query_embedding': query_embedding,
+                        'p_limit': retrieval_limit,
+                        'p_similarity_threshold': similarity_threshold
+                    }
+                ).execute()
+                rows = result.data or []
+                
+                logger.debug(f"Memory retrieval RPC returned {len(rows)} results")
             
             memories = []
-            for row in result.data or []:
+            for row in rows:
                 memory = MemoryItem(
                     memory_id=row['memory_id'],
                     account_id=account_id,
@@ -82,7 +96,8 @@ class MemoryRetrievalService:
                 )
                 memories.append(memory)
             
-            await Cache.set(cache_key, [self._memory_item_to_dict(m) for m in memories], ttl=self.cache_ttl)
+            if cache_key:
+                await Cache.set(cache_key, [self._memory_item_to_dict(m) for m in memories], ttl=self.cache_ttl)
             
             logger.info(f"Retrieved {len(memories)} memories for account {account_id}")
             return memories
@@ -258,10 +273,22 @@ class MemoryRetrievalService:
         
         return "# What You Remember About This User\n\n" + "\n\n".join(formatted_parts)
     
+    def _retrieval_cache_key(
+        self,
+        account_id: str,
+        version: int,
+        query_text: str,
+        limit: int,
+        similarity_threshold: float
+    ) -> str:
+        # sha256, not hash(): str hashes are salted per process, so keys must be stable across workers
+        digest = hashlib.sha256(f"{limit}:{similarity_threshold}:{query_text}".encode('utf-8')).hexdigest()[:32]
+        return f"memories:retrieved:{account_id}:v{version}:{digest}"
+    
     async def _invalidate_cache(self, account_id: str):
         try:
-            pattern = f"memories:retrieved:{account_id}:*"
-            await Cache.delete_pattern(pattern)
+            # Bumping the version orphans every cached retrieval (they expire via TTL) and the local index
+            await memory_vector_index.invalidate(account_id)
         except Exception as e:
             logger.warning(f"Failed to invalidate cache for {account_id}: {str(e)}")
     
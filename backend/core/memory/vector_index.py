@@ -0,0 +1,350 @@
+"""
+In-process vector index for account memories.
+
+Accounts with up to MEMORY_INDEX_MAX_ITEMS memories are searched locally: their
+embeddings live in a float32 matrix of L2-normalized rows, so top-k retrieval is
+one matrix-vector product instead of a search_memories_by_similarity RPC. Scores
+are cosine similarity, the same 1 - (a <=> b) the RPC computes.
+
+Indexes are built lazily from user_memories and snapshotted to MEMORY_INDEX_DIR
+as a .npy matrix (loaded memory-mapped, so workers on one host share pages) plus a
+JSON sidecar with row data. A per-account version counter in Redis is bumped on
+every write; an index or snapshot is only used while its version is current, and
+the writer that bumps it applies its own inserts incrementally.
+
+NumPy is optional - without it (or for larger accounts) callers fall back to the RPC.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.utils.logger import logger
+
+try:
+    import numpy as np
+    _HAS_NUMPY = True
+except ImportError:
+    np = None
+    _HAS_NUMPY = False
+
+MEMORY_INDEX_ENABLED = os.getenv("MEMORY_INDEX_ENABLED", "true").lower() == "true"
+MEMORY_INDEX_MAX_ITEMS = int(os.getenv("MEMORY_INDEX_MAX_ITEMS", "5000"))
+MEMORY_INDEX_MAX_ACCOUNTS = int(os.getenv("MEMORY_INDEX_MAX_ACCOUNTS", "256"))
+MEMORY_INDEX_DIR = os.getenv("MEMORY_INDEX_DIR", os.path.join(tempfile.gettempdir(), "memory_index"))
+
+VERSION_KEY_PREFIX = "memory_index:version"
+VERSION_KEY_TTL = 30 * 86400
+
+_ROW_FIELDS = ('memory_id', 'content', 'memory_type', 'confidence_score', 'metadata', 'created_at')
+
+
+def _row_for_index(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the fields retrieval returns, JSON-safe."""
+    out = {field: row.get(field) for field in _ROW_FIELDS}
+    out['memory_id'] = str(out['memory_id'])
+    if isinstance(out['created_at'], datetime):
+        out['created_at'] = out['created_at'].isoformat()
+    if isinstance(out['metadata'], str):
+        try:
+            out['metadata'] = json.loads(out['metadata'])
+        except Exception:
+            out['metadata'] = {}
+    out['metadata'] = out['metadata'] or {}
+    return out
+
+
+def parse_embedding(value: Any) -> Optional["np.ndarray"]:
+    """pgvector text ('[0.1,0.2,...]') or a float list -> float32 vector."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip().lstrip('[').rstrip(']')
+        if not value:
+            return None
+        return np.array(value.split(','), dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+def _normalize(matrix: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class _AccountIndex:
+    """Immutable snapshot of one account's memories; updates produce a new instance."""
+
+    __slots__ = ('version', 'rows', 'matrix')
+
+    def __init__(self, version: int, rows: List[Dict[str, Any]], matrix: "np.ndarray"):
+        self.version = version
+        self.rows = rows
+        self.matrix = matrix
+
+    def search(self, query: "np.ndarray", limit: int, threshold: float) -> List[Dict[str, Any]]:
+        if not self.rows or limit <= 0:
+            return []
+        scores = self.matrix @ query
+        candidates = np.flatnonzero(scores >= threshold)
+        if candidates.size > limit:
+            top = np.argpartition(scores[candidates], -limit)[-limit:]
+            candidates = candidates[top]
+        ordered = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [{**self.rows[i], 'similarity': float(scores[i])} for i in ordered]
+
+    def with_changes(self, version: int, added_rows: List[Dict[str, Any]],
+                     added_matrix: Optional["np.ndarray"], removed_ids: Iterable[str]) -> "_AccountIndex":
+        removed = {str(memory_id) for memory_id in removed_ids}
+        keep = [i for i, row in enumerate(self.rows) if row['memory_id'] not in removed]
+        rows = [self.rows[i] for i in keep]
+        matrix = self.matrix[keep] if len(keep) != len(self.rows) else np.asarray(self.matrix)
+        if added_rows:
+            rows = rows + added_rows
+            matrix = np.vstack([matrix, added_matrix]) if len(matrix) else added_matrix
+        return _AccountIndex(version, rows, matrix)
+
+
+class MemoryVectorIndex:
+    """Per-account LRU of _AccountIndex, versioned through Redis, snapshotted to disk."""
+
+    def __init__(self, max_items: int = MEMORY_INDEX_MAX_ITEMS, max_accounts: int = MEMORY_INDEX_MAX_ACCOUNTS,
+                 snapshot_dir: Optional[str] = MEMORY_INDEX_DIR):
+        self.max_items = max_items
+        self.max_accounts = max_accounts
+        self.snapshot_dir = snapshot_dir
+        self._indexes: "OrderedDict[str, _AccountIndex]" = OrderedDict()
+        self._build_locks: Dict[str, asyncio.Lock] = {}
+        self._stats = {
+            'searches': 0,
+            'fallbacks': 0,
+            'builds': 0,
+            'snapshot_loads': 0,
+            'incremental_updates': 0,
+        }
+
+    @property
+    def available(self) -> bool:
+        return MEMORY_INDEX_ENABLED and _HAS_NUMPY
+
+    # ---------- versioning ----------
+
+    async def get_version(self, account_id: str) -> Optional[int]:
+        """Current write version for an account (0 if never written).
+
+        None when Redis is unavailable: without the version nothing cached can be
+        trusted as current, so callers treat it as a miss.
+        """
+        try:
+            from core.services import redis as redis_service
+            value = await redis_service.get(f"{VERSION_KEY_PREFIX}:{account_id}", timeout=2.0)
+            return int(value) if value else 0
+        except Exception as e:
+            logger.debug(f"Memory index version read failed for {account_id}: {e}")
+            return None
+
+    async def bump_version(self, account_id: str) -> Optional[int]:
+        """Mark the account's memories as changed. Returns the new version, or None on failure."""
+        try:
+            from core.services import redis as redis_service
+            key = f"{VERSION_KEY_PREFIX}:{account_id}"
+            version = await redis_service.incr(key, timeout=2.0)
+            await redis_service.expire(key, VERSION_KEY_TTL, timeout=2.0)
+            return int(version) if version is not None else None
+        except Exception as e:
+            logger.warning(f"Memory index version bump failed for {account_id}: {e}")
+            return None
+
+    # ---------- search ----------
+
+    async def search(self, account_id: str, query_embedding: List[float], limit: int,
+                     similarity_threshold: float, version: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Top-k memories by cosine similarity, best first, each row with a 'similarity'.
+
+        Returns None when the account can't be served locally (NumPy missing, index
+        disabled, too many memories, build failure, version unknown) - callers then
+        use the RPC.
+        """
+        if not self.available:
+            return None
+        try:
+            if version is None:
+                version = await self.get_version(account_id)
+            if version is None:
+                self._stats['fallbacks'] += 1
+                return None
+            index = await self._get_index(account_id, version)
+            if index is None:
+                self._stats['fallbacks'] += 1
+                return None
+            self._stats['searches'] += 1
+            if not index.rows:
+                return []
+            query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+            if index.matrix.shape[1:] != query.shape:
+                logger.warning(f"Memory index dimension mismatch for {account_id}, falling back to RPC")
+                self.drop(account_id)
+                self._stats['fallbacks'] += 1
+                return None
+            return index.search(query, limit, similarity_threshold)
+        except Exception as e:
+            logger.warning(f"Memory index search failed for {account_id}: {e}")
+            self._stats['fallbacks'] += 1
+            return None
+
+    async def _get_index(self, account_id: str, version: int) -> Optional[_AccountIndex]:
+        index = self._indexes.get(account_id)
+        if index is not None and index.version == version:
+            self._indexes.move_to_end(account_id)
+            return index
+
+        lock = self._build_locks.setdefault(account_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(account_id)
+            if index is not None and index.version == version:
+                return index
+
+            index = await asyncio.to_thread(self._load_snapshot, account_id, version)
+            if index is not None:
+                self._stats['snapshot_loads'] += 1
+            else:
+                index = await self._build(account_id, version)
+            if index is not None:
+                self._remember(account_id, index)
+            return index
+
+    async def _build(self, account_id: str, version: int) -> Optional[_AccountIndex]:
+        from core.memory import repo as memory_repo
+
+        rows = await memory_repo.get_memories_with_embeddings(account_id, limit=self.max_items + 1)
+        if len(rows) > self.max_items:
+            logger.debug(f"Account {account_id} has more than {self.max_items} memories, using RPC search")
+            return None
+
+        def _assemble():
+            kept, vectors = [], []
+            for row in rows:
+                vector = parse_embedding(row.get('embedding'))
+                if vector is None:
+                    continue
+                kept.append(_row_for_index(row))
+                vectors.append(vector)
+            matrix = _normalize(np.vstack(vectors)) if vectors else np.zeros((0, 0), dtype=np.float32)
+            index = _AccountIndex(version, kept, matrix)
+            self._save_snapshot(account_id, index)
+            return index
+
+        index = await asyncio.to_thread(_assemble)
+        self._stats['builds'] += 1
+        logger.debug(f"Built memory index for {account_id}: {len(index.rows)} memories (v{version})")
+        return index
+
+    # ---------- writes ----------
+
+    async def add(self, account_id: str, rows: List[Dict[str, Any]], embeddings: List[List[float]],
+                  removed_ids: Iterable[str] = ()) -> None:
+        """
+        Record stored/deleted memories. Bumps the version; if this process held the
+        previous version, the change is applied incrementally instead of rebuilding.
+        """
+        previous = self._indexes.get(account_id)
+        version = await self.bump_version(account_id)
+        if not self.available or previous is None or version is None or previous.version != version - 1:
+            self.drop(account_id)
+            return
+        try:
+            def _apply():
+                added_rows = [_row_for_index(row) for row in rows]
+                added_matrix = _normalize(np.asarray(embeddings, dtype=np.float32)) if added_rows else None
+                index = previous.with_changes(version, added_rows, added_matrix, removed_ids)
+                if len(index.rows) > self.max_items:
+                    return None
+                self._save_snapshot(account_id, index)
+                return index
+
+            index = await asyncio.to_thread(_apply)
+            if index is None:
+                self.drop(account_id)
+                return
+            self._remember(account_id, index)
+            self._stats['incremental_updates'] += 1
+        except Exception as e:
+            logger.warning(f"Memory index incremental update failed for {account_id}: {e}")
+            self.drop(account_id)
+
+    async def invalidate(self, account_id: str) -> None:
+        """Memories changed in a way we don't track row-by-row (deletes)."""
+        self.drop(account_id)
+        await self.bump_version(account_id)
+
+    def drop(self, account_id: str) -> None:
+        self._indexes.pop(account_id, None)
+
+    def _remember(self, account_id: str, index: _AccountIndex) -> None:
+        self._indexes[account_id] = index
+        self._indexes.move_to_end(account_id)
+        while len(self._indexes) > self.max_accounts:
+            evicted, _ = self._indexes.popitem(last=False)
+            self._build_locks.pop(evicted, None)
+
+    # ---------- snapshots ----------
+
+    def _snapshot_paths(self, account_id: str, version: int):
+        base = os.path.join(self.snapshot_dir, account_id)
+        return f"{base}.json", f"{base}.v{version}.npy"
+
+    def _save_snapshot(self, account_id: str, index: _AccountIndex) -> None:
+        if not self.snapshot_dir:
+            return
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            meta_path, matrix_path = self._snapshot_paths(account_id, index.version)
+            tmp_matrix = f"{matrix_path}.{os.getpid()}.tmp"
+            with open(tmp_matrix, 'wb') as f:
+                np.save(f, np.ascontiguousarray(index.matrix))
+            os.replace(tmp_matrix, matrix_path)
+            tmp_meta = f"{meta_path}.{os.getpid()}.tmp"
+            with open(tmp_meta, 'w') as f:
+                json.dump({'version': index.version, 'rows': index.rows}, f, default=str)
+            os.replace(tmp_meta, meta_path)
+            if index.version > 0:
+                _, stale_path = self._snapshot_paths(account_id, index.version - 1)
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+        except Exception as e:
+            logger.debug(f"Memory index snapshot write failed for {account_id}: {e}")
+
+    def _load_snapshot(self, account_id: str, version: int) -> Optional[_AccountIndex]:
+        if not self.snapshot_dir:
+            return None
+        meta_path, matrix_path = self._snapshot_paths(account_id, version)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get('version') != version:
+                return None
+            matrix = np.load(matrix_path, mmap_mode='r')
+            if len(matrix) != len(meta['rows']):
+                return None
+            return _AccountIndex(version, meta['rows'], matrix)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f"Memory index snapshot load failed for {account_id}: {e}")
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            'available': self.available,
+            'accounts': len(self._indexes),
+            'memories': sum(len(index.rows) for index in self._indexes.values()),
+        }
+
+
+memory_vector_index = MemoryVectorIndex()
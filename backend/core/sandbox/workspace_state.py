@@ -0,0 +1,292 @@
+"""
+Incremental workspace snapshots for sandbox tools.
+
+Reading the workspace used to mean one download per file on every call. Instead,
+one in-sandbox command returns a manifest (path, size, mtime, sha1) and only files
+whose content hash is not already known for the project are downloaded, through a
+bounded concurrent fetcher. Contents are cached per project by hash, so unchanged,
+renamed or duplicated files cost nothing. Downloaded bytes are re-hashed, since a
+file can change between the manifest and its download, and the cache is bounded
+by project count and by MAX_CACHED_BYTES of content across projects.
+
+A 2,000 file workspace with 3 edits costs one manifest call and 3 downloads.
+"""
+import asyncio
+import hashlib
+import json
+import shlex
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.utils.files_utils import EXCLUDED_DIRS, EXCLUDED_EXT, EXCLUDED_FILES, should_exclude_file
+from core.utils.logger import logger
+
+MAX_FILE_BYTES = 5 * 1024 * 1024
+DOWNLOAD_CONCURRENCY = 8
+MAX_CACHED_PROJECTS = 32
+MAX_CACHED_BYTES = 256 * 1024 * 1024  # decoded text held across all projects
+MANIFEST_TIMEOUT = 60
+
+# Runs inside the sandbox. Hashes are reused from the previous run for files whose
+# (size, mtime_ns) did not change, so repeated manifests only re-read edited files.
+_MANIFEST_SCRIPT = r'''
+import hashlib, json, os, sys
+root, excluded_dirs, excluded_files, excluded_ext, max_bytes = sys.argv[1], set(json.loads(sys.argv[2])), set(json.loads(sys.argv[3])), set(json.loads(sys.argv[4])), int(sys.argv[5])
+cache_path = "/tmp/.workspace_manifest_cache.json"
+try:
+    with open(cache_path) as f:
+        saved = json.load(f)
+    previous = saved["files"] if saved.get("root") == root else {}
+except Exception:
+    previous = {}
+entries, cache = [], {}
+for dirpath, dirnames, filenames in os.walk(root):
+    dirnames[:] = [d for d in dirnames if d not in excluded_dirs]
+    for name in filenames:
+        if name in excluded_files or os.path.splitext(name)[1].lower() in excluded_ext:
+            continue
+        full = os.path.join(dirpath, name)
+        try:
+            st = os.stat(full)
+        except OSError:
+            continue
+        if not os.path.isfile(full):
+            continue
+        rel = os.path.relpath(full, root)
+        stamp = [st.st_size, st.st_mtime_ns]
+        digest = None
+        if st.st_size <= max_bytes:
+            hit = previous.get(rel)
+            if hit and hit[0] == stamp:
+                digest = hit[1]
+            else:
+                h = hashlib.sha1()
+                try:
+                    with open(full, "rb") as f:
+                        for block in iter(lambda: f.read(1 << 20), b""):
+                            h.update(block)
+                    digest = h.hexdigest()
+                except OSError:
+                    continue
+            cache[rel] = [stamp, digest]
+        entries.append([rel, st.st_size, st.st_mtime, digest])
+try:
+    with open(cache_path, "w") as f:
+        json.dump({"root": root, "files": cache}, f)
+except OSError:
+    pass
+json.dump(entries, sys.stdout)
+'''
+
+
+class _ProjectState:
+    __slots__ = ("manifest", "contents", "binary", "size")
+
+    def __init__(self):
+        self.manifest: Dict[str, Tuple[int, float, Optional[str]]] = {}
+        self.contents: Dict[str, str] = {}  # sha1 -> decoded text
+        self.binary: set = set()            # sha1 of files that are not UTF-8 text
+        self.size = 0                       # characters held in contents
+
+
+class _ProjectLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0  # callers holding or waiting for the lock
+
+
+class WorkspaceStateCache:
+    def __init__(self, max_projects: int = MAX_CACHED_PROJECTS, concurrency: int = DOWNLOAD_CONCURRENCY,
+                 max_bytes: int = MAX_CACHED_BYTES):
+        self._projects: "OrderedDict[str, _ProjectState]" = OrderedDict()
+        self._max_projects = max_projects
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._concurrency = concurrency
+        # Only for projects that are cached or have a call in progress
+        self._locks: Dict[str, _ProjectLock] = {}
+        self._manifest_calls = 0
+        self._downloads = 0
+        self._reused = 0
+        self._fallbacks = 0
+        self._stale_hashes = 0
+
+    async def get_workspace_state(self, sandbox, project_id: str, workspace_path: str = "/workspace") -> Dict[str, Dict[str, Any]]:
+        """Return {rel_path: {content, is_dir, size, modified}} for every text file in the workspace."""
+        entry = self._locks.get(project_id)
+        if entry is None:
+            entry = self._locks[project_id] = _ProjectLock()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                return await self._build_state(sandbox, project_id, workspace_path)
+        finally:
+            entry.users -= 1
+            if entry.users == 0 and project_id not in self._projects:
+                self._locks.pop(project_id, None)
+
+    async def _build_state(self, sandbox, project_id: str, workspace_path: str) -> Dict[str, Dict[str, Any]]:
+        try:
+            manifest = await self._fetch_manifest(sandbox, workspace_path)
+        except Exception as e:
+            logger.warning(f"Workspace manifest failed for project {project_id}, falling back to full listing: {e}")
+            self._fallbacks += 1
+            return await self._full_listing(sandbox, workspace_path)
+
+        state = self._projects.pop(project_id, None) or _ProjectState()
+        self._projects[project_id] = state
+
+        # One download per unknown hash, even if several paths share it
+        to_fetch: Dict[str, List[str]] = {}
+        for rel_path, (_, _, digest) in manifest.items():
+            if digest and digest not in state.contents and digest not in state.binary:
+                to_fetch.setdefault(digest, []).append(rel_path)
+        self._reused += sum(1 for _, _, digest in manifest.values() if digest and digest not in to_fetch)
+
+        if to_fetch:
+            semaphore = asyncio.Semaphore(self._concurrency)
+
+            async def download(rel_path: str) -> Optional[bytes]:
+                async with semaphore:
+                    try:
+                        data = await sandbox.fs.download_file(f"{workspace_path}/{rel_path}")
+                    except Exception as e:
+                        logger.debug(f"Error reading workspace file {rel_path}: {e}")
+                        return None
+                self._downloads += 1
+                return data
+
+            def store(rel_path: str, data: bytes) -> str:
+                # The file may have changed since the manifest: key it by what was downloaded
+                digest = hashlib.sha1(data).hexdigest()
+                size, mtime, _ = manifest[rel_path]
+                manifest[rel_path] = (size, mtime, digest)
+                try:
+                    state.contents[digest] = data.decode()
+                except UnicodeDecodeError:
+                    state.binary.add(digest)
+                return digest
+
+            async def fetch(expected: str, paths: List[str]) -> None:
+                data = await download(paths[0])
+                if data is None:
+                    return
+                if store(paths[0], data) == expected:
+                    for rel_path in paths[1:]:
+                        size, mtime, _ = manifest[rel_path]
+                        manifest[rel_path] = (size, mtime, expected)
+                    return
+                # Stale manifest hash: the other paths that shared it can't be assumed identical
+                self._stale_hashes += 1
+                for rel_path in paths[1:]:
+                    data = await download(rel_path)
+                    if data is not None:
+                        store(rel_path, data)
+
+            await asyncio.gather(*(fetch(digest, paths) for digest, paths in to_fetch.items()))
+
+        # Drop contents no longer referenced by the workspace
+        live = {digest for _, _, digest in manifest.values() if digest}
+        state.contents = {digest: text for digest, text in state.contents.items() if digest in live}
+        state.binary &= live
+        state.manifest = manifest
+        size = sum(len(text) for text in state.contents.values())
+        if self._projects.get(project_id) is state:  # Not invalidated meanwhile
+            self._bytes += size - state.size
+        state.size = size
+
+        files_state = {}
+        for rel_path, (size, mtime, digest) in manifest.items():
+            content = state.contents.get(digest) if digest else None
+            if content is None:
+                continue
+            files_state[rel_path] = {
+                "content": content,
+                "is_dir": False,
+                "size": size,
+                "modified": datetime.fromtimestamp(mtime, tz=timezone.utc).isoformat()
+            }
+
+        if state.size > self._max_bytes and self._projects.get(project_id) is state:
+            self._evicted(project_id, self._projects.pop(project_id))  # Bigger than the whole budget
+        # Least recently used first
+        while self._projects and (len(self._projects) > self._max_projects or self._bytes > self._max_bytes):
+            self._evicted(*self._projects.popitem(last=False))
+        return files_state
+
+    async def _fetch_manifest(self, sandbox, workspace_path: str) -> Dict[str, Tuple[int, float, Optional[str]]]:
+        command = " ".join([
+            "python3", "-c", shlex.quote(_MANIFEST_SCRIPT),
+            shlex.quote(workspace_path),
+            shlex.quote(json.dumps(sorted(EXCLUDED_DIRS))),
+            shlex.quote(json.dumps(sorted(EXCLUDED_FILES))),
+            shlex.quote(json.dumps(sorted(EXCLUDED_EXT))),
+            str(MAX_FILE_BYTES),
+        ])
+        self._manifest_calls += 1
+        result = await sandbox.process.exec(command, timeout=MANIFEST_TIMEOUT)
+        if result.exit_code != 0:
+            raise RuntimeError(f"manifest command exited with {result.exit_code}: {result.result[-500:]}")
+
+        manifest = {}
+        for rel_path, size, mtime, digest in json.loads(result.result):
+            # EXCLUDED_DIRS also matches nested names like "src/dist"; keep the shared rule authoritative
+            if should_exclude_file(rel_path):
+                continue
+            manifest[rel_path] = (size, mtime, digest)
+        return manifest
+
+    async def _full_listing(self, sandbox, workspace_path: str) -> Dict[str, Dict[str, Any]]:
+        files = await sandbox.fs.list_files(workspace_path)
+        targets: List[Any] = [f for f in files if not f.is_dir and not should_exclude_file(f.name)]
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def fetch(file_info):
+            async with semaphore:
+                try:
+                    return file_info, (await sandbox.fs.download_file(f"{workspace_path}/{file_info.name}")).decode()
+                except Exception as e:
+                    logger.debug(f"Error reading workspace file {file_info.name}: {e}")
+                    return file_info, None
+
+        files_state = {}
+        for file_info, content in await asyncio.gather(*(fetch(f) for f in targets)):
+            if content is None:
+                continue
+            self._downloads += 1
+            files_state[file_info.name] = {
+                "content": content,
+                "is_dir": False,
+                "size": file_info.size,
+                "modified": file_info.mod_time
+            }
+        return files_state
+
+    def _evicted(self, project_id: str, state: _ProjectState) -> None:
+        self._bytes -= state.size
+        entry = self._locks.get(project_id)
+        if entry is not None and entry.users == 0:
+            del self._locks[project_id]
+
+    def invalidate(self, project_id: str) -> None:
+        state = self._projects.pop(project_id, None)
+        if state is not None:
+            self._evicted(project_id, state)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "projects": len(self._projects),
+            "cached_bytes": self._bytes,
+            "locks": len(self._locks),
+            "stale_hashes": self._stale_hashes,
+            "manifest_calls": self._manifest_calls,
+            "downloads": self._downloads,
+            "reused": self._reused,
+            "fallbacks": self._fallbacks,
+        }
+
+
+workspace_state_cache = WorkspaceStateCache()
@@ -158,7 +158,7 @@ def _save_debug_input(params: Dict[str, Any]) -> None:
     except Exception as e:
         logger.warning(f"[LLM] ⚠️ Error saving debug input: {e}")
 
-_INTERNAL_MESSAGE_PROPERTIES = {"message_id"}
+_INTERNAL_MESSAGE_PROPERTIES = {"message_id", "cache_breakpoints"}
 
 def _strip_internal_properties(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     cleaned_messages = []
@@ -224,9 +224,51 @@ async def make_llm_api_call(
     if headers is not None: override_params["headers"] = headers
     if extra_headers is not None: override_params["extra_headers"] = extra_headers
     
-    params = model_manager.get_litellm_params(resolved_model_name, **override_params)
+    deployments = model_manager.get_deployments(resolved_model_name)
+    if api_key is not None or api_base is not None:
+        # Explicit credentials/endpoint belong to the primary deployment only
+        deployments = deployments[:1]
     
-    actual_litellm_model_id = params.get("model", resolved_model_name)
+    def build_params(deployment=None) -> Dict[str, Any]:
+        params = model_manager.get_litellm_params(resolved_model_name, deployment=deployment, **override_params)
+        _apply_call_params(params, tools, tool_choice, model_id, stream)
+        return params
+    
+    import time as time_module
+    call_start = time_module.monotonic()
+    
+    try:
+        if deployments:
+            return await _routed_call(deployments, build_params, model_name, stream, call_start)
+        
+        params = build_params()
+        _save_debug_input(params)
+        
+        if stream:
+            response = await _acompletion(params)
+            ttft = time_module.monotonic() - call_start
+            _log_ttft(ttft, model_name)
+            
+            if hasattr(response, '__aiter__'):
+                return _wrap_streaming_response(response, call_start, model_name, ttft_seconds=ttft)
+            return response
+        else:
+            response = await _acompletion(params)
+            duration = time_module.monotonic() - call_start
+            logger.info(f"[LLM] ✅ {duration:.2f}s {model_name}")
+            return response
+        
+    except Exception as e:
+        total_time = time_module.monotonic() - call_start
+        logger.error(f"[LLM] call error after {total_time:.2f}s for {model_name}: {str(e)[:100]}")
+        processed_error = ErrorProcessor.process_llm_error(e, context={"model": model_name})
+        ErrorProcessor.log_error(processed_error)
+        raise LLMError(processed_error.message)
+
+
+def _apply_call_params(params: Dict[str, Any], tools: Optional[List[Dict[str, Any]]], tool_choice: str,
+                       model_id: Optional[str], stream: bool) -> None:
+    actual_litellm_model_id = params.get("model", "")
     is_openrouter_model = isinstance(actual_litellm_model_id, str) and actual_litellm_model_id.startswith("openrouter/")
     
     if is_openrouter_model:
@@ -249,40 +291,57 @@ async def make_llm_api_call(
     if is_minimax:
         params["reasoning"] = {"enabled": True}
         params["reasoning_split"] = True
-    
+
+
+async def _acompletion(params: Dict[str, Any]):
+    # Deployments under mock/ are served by test-harness providers (latency and failure injection)
+    if str(params.get("model", "")).startswith("mock/"):
+        from core.test_harness.mock_llm import get_mock_deployment
+        return await get_mock_deployment(params["model"]).aopen(**params)
+    return await litellm.acompletion(**params)
+
+
+def _is_retryable(error: Exception) -> bool:
+    # Malformed requests and context overflows fail the same way on every deployment
+    return not isinstance(error, litellm.BadRequestError)
+
+
+def _log_ttft(ttft: float, model_name: str) -> None:
+    # Log TTFT with severity based on duration
+    if ttft > 30.0:
+        logger.error(f"[LLM] 🚨 TTFT={ttft:.2f}s (CRITICAL) {model_name}")
+    elif ttft > 10.0:
+        logger.warning(f"[LLM] ⚠️ TTFT={ttft:.2f}s (slow) {model_name}")
+    else:
+        logger.info(f"[LLM] ✅ TTFT={ttft:.2f}s {model_name}")
+
+
+async def _routed_call(deployments, build_params, model_name: str, stream: bool, call_start: float):
+    """Call a registry model through the LLM router (deployment choice, fallback, optional hedging)."""
     import time as time_module
-    call_start = time_module.monotonic()
+    from core.services.llm_router import llm_router
     
-    try:
+    async def open_deployment(deployment):
+        params = build_params(deployment)
         _save_debug_input(params)
-        
-        if stream:
-            response = await litellm.acompletion(**params)
-            ttft = time_module.monotonic() - call_start
-            
-            # Log TTFT with severity based on duration
-            if ttft > 30.0:
-                logger.error(f"[LLM] 🚨 TTFT={ttft:.2f}s (CRITICAL) {model_name}")
-            elif ttft > 10.0:
-                logger.warning(f"[LLM] ⚠️ TTFT={ttft:.2f}s (slow) {model_name}")
-            else:
-                logger.info(f"[LLM] ✅ TTFT={ttft:.2f}s {model_name}")
-            
-            if hasattr(response, '__aiter__'):
-                return _wrap_streaming_response(response, call_start, model_name, ttft_seconds=ttft)
-            return response
-        else:
-            response = await litellm.acompletion(**params)
-            duration = time_module.monotonic() - call_start
-            logger.info(f"[LLM] ✅ {duration:.2f}s {model_name}")
-            return response
-        
-    except Exception as e:
-        total_time = time_module.monotonic() - call_start
-        logger.error(f"[LLM] call error after {total_time:.2f}s for {model_name}: {str(e)[:100]}")
-        processed_error = ErrorProcessor.process_llm_error(e, context={"model": model_name})
-        ErrorProcessor.log_error(processed_error)
-        raise LLMError(processed_error.message)
+        return await _acompletion(params)
+    
+    if not stream:
+        deployment, response = await llm_router.call(deployments, open_deployment, retryable=_is_retryable)
+        duration = time_module.monotonic() - call_start
+        logger.info(f"[LLM] ✅ {duration:.2f}s {model_name} via {deployment.litellm_model_id}")
+        return response
+    
+    deployment, response, _ = await llm_router.open_stream(
+        deployments, open_deployment,
+        hedge=bool(getattr(config, 'LLM_HEDGING_ENABLED', False)),
+        retryable=_is_retryable
+    )
+    ttft = time_module.monotonic() - call_start
+    _log_ttft(ttft, model_name)
+    if len(deployments) > 1:
+        logger.debug(f"[LLM] {model_name} served by {deployment.litellm_model_id}")
+    return _wrap_streaming_response(response, call_start, model_name, ttft_seconds=ttft)
 
 
 async def _wrap_streaming_response(response, start_time: float, model_name: str, ttft_seconds: float = None) -> AsyncGenerator:
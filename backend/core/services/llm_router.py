@@ -0,0 +1,351 @@
+"""
+Latency-aware routing across equivalent model deployments.
+
+A model in the ai_models registry can be served by several interchangeable
+deployments (e.g. Haiku on Bedrock and on the Anthropic API). The router keeps
+rolling per-deployment statistics - time to first token and errors over the
+last WINDOW_SECONDS - and for each call:
+
+- orders the deployments by expected TTFT (an exponentially weighted moving
+  average, so a bad minute shows up within a few calls, inflated by the recent
+  error rate). A deployment with COOLDOWN_AFTER_ERRORS consecutive failures sits out
+  COOLDOWN_SECONDS; one without enough samples is assumed to run at
+  UNKNOWN_TTFT_SECONDS, so it gets tried once the preferred one degrades. The
+  first call after a cooldown runs out goes to that deployment, to notice that
+  it recovered. Healthy alternates are not probed with live calls: moving a
+  conversation to another deployment loses its prompt cache. A slow
+  deployment's samples age out of the window, after which it counts as unknown
+- falls back to the next deployment when a request fails before its first token
+- optionally hedges a streaming call: if the first token has not arrived within
+  the preferred deployment's p95 TTFT, a second request goes to the next
+  deployment (or the same one, if it is the only one). The first to produce a
+  token wins and the other request is cancelled
+
+Only the phase up to the first token is raced. Once a stream has won, its
+chunks are passed through unchanged, and errors after that point propagate
+as before.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from core.ai_models.models import ModelDeployment
+from core.utils.logger import logger
+
+WINDOW_SECONDS = 600
+WINDOW_SIZE = 200
+MIN_SAMPLES = 5
+UNKNOWN_TTFT_SECONDS = 3.0
+EWMA_ALPHA = 0.3
+ERROR_PENALTY = 4.0
+COOLDOWN_AFTER_ERRORS = 3
+COOLDOWN_SECONDS = 30.0
+EWMA_RESET_SECONDS = 15.0  # a sample after this long without one restarts the average
+HEDGE_MIN_DELAY_SECONDS = 1.0
+HEDGE_MAX_DELAY_SECONDS = 10.0  # the "slow" TTFT threshold make_llm_api_call warns at
+
+TTFT_MARKER = "__llm_ttft_seconds__"
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _is_ttft_marker(chunk: Any) -> bool:
+    return isinstance(chunk, dict) and TTFT_MARKER in chunk
+
+
+async def _close_stream(stream: Any) -> None:
+    aclose = getattr(stream, "aclose", None)
+    if aclose is None:
+        return
+    try:
+        await aclose()
+    except Exception as e:
+        logger.debug(f"[LLM ROUTER] Closing abandoned stream failed: {e}")
+
+
+async def _prepend(first: Any, iterator: AsyncIterator) -> AsyncIterator:
+    try:
+        if first is not None:
+            yield first
+        async for chunk in iterator:
+            yield chunk
+    finally:
+        await _close_stream(iterator)
+
+
+class DeploymentStats:
+    """Rolling TTFT and error statistics of one deployment."""
+
+    def __init__(self):
+        # (timestamp, ttft seconds or None for an error)
+        self._samples: Deque[Tuple[float, Optional[float]]] = deque(maxlen=WINDOW_SIZE)
+        self.ttft_ewma: Optional[float] = None
+        self.last_sample_at = 0.0
+        self.last_attempt_at = 0.0
+        self.consecutive_errors = 0
+        self.cooldown_until = 0.0
+        self.counters = {"requests": 0, "errors": 0, "hedges": 0, "hedge_wins": 0, "cancelled": 0}
+
+    def record_ttft(self, seconds: float) -> None:
+        now = time.monotonic()
+        self._samples.append((now, seconds))
+        if self.ttft_ewma is None or now - self.last_sample_at > EWMA_RESET_SECONDS:
+            # First sample after a quiet spell: the old average says nothing about now
+            self.ttft_ewma = seconds
+        else:
+            self.ttft_ewma = EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.ttft_ewma
+        self.last_sample_at = now
+        self.consecutive_errors = 0
+        self.cooldown_until = 0.0
+
+    def record_attempt(self) -> None:
+        self.counters["requests"] += 1
+        self.last_attempt_at = time.monotonic()
+
+    def record_success(self) -> None:
+        self.consecutive_errors = 0
+        self.cooldown_until = 0.0
+
+    def record_error(self) -> None:
+        now = time.monotonic()
+        self._samples.append((now, None))
+        self.counters["errors"] += 1
+        self.consecutive_errors += 1
+        if self.consecutive_errors >= COOLDOWN_AFTER_ERRORS:
+            self.cooldown_until = now + COOLDOWN_SECONDS
+
+    def _recent(self) -> List[Tuple[float, Optional[float]]]:
+        cutoff = time.monotonic() - WINDOW_SECONDS
+        return [sample for sample in self._samples if sample[0] >= cutoff]
+
+    def ttft_percentile(self, q: float) -> Optional[float]:
+        ttfts = [ttft for _, ttft in self._recent() if ttft is not None]
+        if len(ttfts) < MIN_SAMPLES:
+            return None
+        return _percentile(ttfts, q)
+
+    def error_rate(self) -> float:
+        recent = self._recent()
+        if not recent:
+            return 0.0
+        return sum(1 for _, ttft in recent if ttft is None) / len(recent)
+
+    def in_cooldown(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def probe_due(self) -> bool:
+        """Cooldown over and not tried since: one call checks whether it recovered."""
+        return 0 < self.cooldown_until <= time.monotonic() and self.last_attempt_at < self.cooldown_until
+
+    def expected_ttft(self) -> float:
+        samples = sum(1 for _, ttft in self._recent() if ttft is not None)
+        base = self.ttft_ewma if samples >= MIN_SAMPLES else UNKNOWN_TTFT_SECONDS
+        return base * (1 + ERROR_PENALTY * self.error_rate())
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = self.ttft_percentile(0.5), self.ttft_percentile(0.95)
+        return {
+            **self.counters,
+            "samples": len(self._recent()),
+            "ttft_p50": round(p50, 3) if p50 is not None else None,
+            "ttft_p95": round(p95, 3) if p95 is not None else None,
+            "ttft_ewma": round(self.ttft_ewma, 3) if self.ttft_ewma is not None else None,
+            "error_rate": round(self.error_rate(), 3),
+            "in_cooldown": self.in_cooldown(),
+        }
+
+
+class LLMRouter:
+    """Chooses, falls back and hedges between deployments of one model."""
+
+    def __init__(
+        self,
+        hedge_min_delay: float = HEDGE_MIN_DELAY_SECONDS,
+        hedge_max_delay: float = HEDGE_MAX_DELAY_SECONDS
+    ):
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self._stats: Dict[str, DeploymentStats] = {}
+
+    def stats_for(self, deployment: ModelDeployment) -> DeploymentStats:
+        key = deployment.litellm_model_id
+        if key not in self._stats:
+            self._stats[key] = DeploymentStats()
+        return self._stats[key]
+
+    def order(self, deployments: List[ModelDeployment]) -> List[ModelDeployment]:
+        """Deployments by expected TTFT; cooling-down ones last, ones just out of cooldown first, registry order breaks ties."""
+        def rank(item: Tuple[int, ModelDeployment]):
+            index, deployment = item
+            stats = self.stats_for(deployment)
+            return (stats.in_cooldown(), not stats.probe_due(), stats.expected_ttft(), index)
+
+        return [deployment for _, deployment in sorted(enumerate(deployments), key=rank)]
+
+    def hedge_delay(self, deployment: ModelDeployment) -> float:
+        """Time to wait for a first token before hedging: the deployment's p95 TTFT, clamped."""
+        p95 = self.stats_for(deployment).ttft_percentile(0.95)
+        if p95 is None:
+            return self.hedge_max_delay
+        return min(max(p95, self.hedge_min_delay), self.hedge_max_delay)
+
+    async def _first_token(
+        self,
+        deployment: ModelDeployment,
+        open_stream: Callable[[ModelDeployment], Awaitable[Any]],
+        retryable: Callable[[Exception], bool]
+    ) -> Tuple[AsyncIterator, float]:
+        stats = self.stats_for(deployment)
+        started = time.monotonic()
+        iterator = None
+        try:
+            response = await open_stream(deployment)
+            iterator = response.__aiter__()
+            try:
+                first = await iterator.__anext__()
+                while _is_ttft_marker(first):
+                    first = await iterator.__anext__()
+            except StopAsyncIteration:
+                first = None
+        except asyncio.CancelledError:
+            stats.counters["cancelled"] += 1
+            if iterator is not None:
+                await _close_stream(iterator)
+            raise
+        except Exception as e:
+            if retryable(e):
+                stats.record_error()
+            raise
+        ttft = time.monotonic() - started
+        stats.record_ttft(ttft)
+        return _prepend(first, iterator), ttft
+
+    async def open_stream(
+        self,
+        deployments: List[ModelDeployment],
+        open_stream: Callable[[ModelDeployment], Awaitable[Any]],
+        hedge: bool = False,
+        retryable: Callable[[Exception], bool] = lambda e: True
+    ) -> Tuple[ModelDeployment, AsyncIterator, float]:
+        """Open a streaming call and wait for its first token.
+
+        Args:
+            deployments: Interchangeable deployments, primary first
+            open_stream: Starts the request on a deployment and returns the stream
+            hedge: Send a second request once the first is past its p95 TTFT
+            retryable: False for errors another deployment would repeat (bad request)
+
+        Returns:
+            (winning deployment, stream starting at the first token, TTFT in seconds)
+        """
+        candidates = self.order(deployments)
+        hedge_target = candidates[1] if len(candidates) > 1 else candidates[0]
+        launched: Dict[asyncio.Task, Tuple[ModelDeployment, float]] = {}
+        hedge_task: Optional[asyncio.Task] = None
+        next_fallback = 1
+        last_error: Optional[Exception] = None
+
+        def launch(deployment: ModelDeployment) -> asyncio.Task:
+            self.stats_for(deployment).record_attempt()
+            task = asyncio.create_task(self._first_token(deployment, open_stream, retryable))
+            launched[task] = (deployment, time.monotonic())
+            return task
+
+        started = time.monotonic()
+        pending = {launch(candidates[0])}
+        hedge_at = started + self.hedge_delay(candidates[0]) if hedge else None
+        try:
+            while pending:
+                timeout = max(0.0, hedge_at - time.monotonic()) if hedge_at is not None else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Preferred deployment is past its p95 TTFT
+                    hedge_at = None
+                    self.stats_for(hedge_target).counters["hedges"] += 1
+                    logger.warning(f"[LLM ROUTER] No first token from {candidates[0].litellm_model_id} after "
+                                   f"{time.monotonic() - started:.2f}s, hedging to {hedge_target.litellm_model_id}")
+                    hedge_task = launch(hedge_target)
+                    pending.add(hedge_task)
+                    if hedge_target is not candidates[0]:
+                        next_fallback = 2
+                    continue
+
+                for task in done:
+                    deployment, _ = launched[task]
+                    if task.cancelled():
+                        continue
+                    error = task.exception()
+                    if error is None:
+                        stream, ttft = task.result()
+                        if task is hedge_task:
+                            self.stats_for(deployment).counters["hedge_wins"] += 1
+                        await self._discard_losers(launched, winner=task, winner_ttft=ttft)
+                        return deployment, stream, ttft
+                    last_error = error
+                    logger.warning(f"[LLM ROUTER] {deployment.litellm_model_id} failed before first token: {str(error)[:200]}")
+                    if not retryable(error):
+                        raise error
+
+                if not pending and next_fallback < len(candidates):
+                    # Everything in flight failed: fall back to the next deployment
+                    hedge_at = None
+                    pending = {launch(candidates[next_fallback])}
+                    next_fallback += 1
+            raise last_error or RuntimeError("No deployment produced a response")
+        finally:
+            for task in launched:
+                if not task.done():
+                    task.cancel()
+
+    async def _discard_losers(self, launched: Dict[asyncio.Task, Tuple[ModelDeployment, float]],
+                              winner: asyncio.Task, winner_ttft: float) -> None:
+        now = time.monotonic()
+        for task, (deployment, started) in launched.items():
+            if task is winner:
+                continue
+            if not task.done():
+                # Slower than the winner over a longer wait: keep the lower bound as a sample
+                if now - started >= winner_ttft:
+                    self.stats_for(deployment).record_ttft(now - started)
+                task.cancel()
+            elif not task.cancelled() and task.exception() is None:
+                stream, _ = task.result()
+                await _close_stream(stream)
+
+    async def call(
+        self,
+        deployments: List[ModelDeployment],
+        call: Callable[[ModelDeployment], Awaitable[Any]],
+        retryable: Callable[[Exception], bool] = lambda e: True
+    ) -> Tuple[ModelDeployment, Any]:
+        """Non-streaming call: best deployment first, next one on a retryable failure."""
+        last_error: Optional[Exception] = None
+        for deployment in self.order(deployments):
+            stats = self.stats_for(deployment)
+            stats.record_attempt()
+            try:
+                result = await call(deployment)
+                stats.record_success()
+                return deployment, result
+            except Exception as e:
+                if not retryable(e):
+                    raise
+                stats.record_error()
+                last_error = e
+                logger.warning(f"[LLM ROUTER] {deployment.litellm_model_id} failed: {str(e)[:200]}")
+        raise last_error or RuntimeError("No deployment produced a response")
+
+    def reset(self) -> None:
+        self._stats.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {key: stats.snapshot() for key, stats in self._stats.items()}
+
+
+llm_router = LLMRouter()
@@ -6,7 +6,7 @@ from redis.retry import Retry
 import os
 import asyncio
 import time
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, NamedTuple, Tuple
 from dotenv import load_dotenv
 from core.utils.logger import logger
 
@@ -25,14 +25,57 @@ STREAM_POOL_SIZE = int(os.getenv("REDIS_STREAM_POOL_SIZE", "50"))
 
 
 # =============================================================================
-# StreamHub: 1 Redis reader per stream key, fan-out to N clients
-# Solves: 100 SSE clients = 100 XREAD -> 100 SSE clients = 1 XREAD + 100 queues
+# StreamHub: a few sharded Redis readers, fan-out to N clients per stream key
+# Solves: 1000 watched streams = 1000 blocked XREADs -> HUB_SHARDS multi-stream XREADs
 # =============================================================================
 
-from collections import defaultdict
-from typing import Set
-import builtins
-_builtin_set = builtins.set  # Save reference before module-level 'set' function shadows it
+import zlib
+
+HUB_SHARDS = int(os.getenv("REDIS_HUB_SHARDS", "4"))
+HUB_BLOCK_MS = int(os.getenv("REDIS_HUB_BLOCK_MS", "200"))  # Also bounds how long a new stream waits to join a read
+HUB_READ_COUNT = 100  # Max entries per stream per XREAD
+
+
+def next_stream_id(stream_id: str) -> str:
+    """Smallest stream ID strictly greater than stream_id (for exclusive XRANGE starts)."""
+    ms, _, seq = stream_id.partition('-')
+    return f"{ms}-{int(seq or 0) + 1}"
+
+
+def _stream_id_after(a: str, b: str) -> bool:
+    """True if stream ID a sorts after b."""
+    a_ms, _, a_seq = a.partition('-')
+    b_ms, _, b_seq = b.partition('-')
+    return (int(a_ms), int(a_seq or 0)) > (int(b_ms), int(b_seq or 0))
+
+
+class StreamGap(NamedTuple):
+    """
+    Yielded by StreamHub.iter_queue where entries were trimmed from the stream before
+    a lagging subscriber could replay them. Entries after the gap follow as usual.
+    """
+    after_id: Optional[str]  # Last entry delivered before the gap
+
+
+class _HubQueue(asyncio.Queue):
+    """
+    Subscriber queue that remembers its position in the stream.
+
+    When the queue is full the hub stops enqueueing and marks it lagging instead of
+    dropping entries; iter_queue() then replays the gap from Redis with XRANGE once the
+    consumer has drained the queue, so slow consumers never stall the shard reader. If
+    the writer trimmed skipped entries before the replay reached them, iter_queue()
+    yields a StreamGap instead of silently jumping ahead.
+    """
+
+    def __init__(self, stream_key: str, maxsize: int):
+        super().__init__(maxsize=maxsize)
+        self.stream_key = stream_key
+        self.last_id: Optional[str] = None  # Last entry ID enqueued or replayed
+        self.lagging = False
+        self.skipped_upto: Optional[str] = None  # Newest entry ID skipped while lagging
+        self.skipped_from: Optional[str] = None  # Oldest skipped entry ID not yet checked for trimming
+
 
 class _HubSubscription:
     """Context manager for safe subscribe/unsubscribe."""
@@ -40,7 +83,7 @@ class _HubSubscription:
         self._hub = hub
         self._stream_key = stream_key
         self._last_id = last_id
-        self._queue: Optional[asyncio.Queue] = None
+        self._queue: Optional[_HubQueue] = None
 
     async def __aenter__(self) -> asyncio.Queue:
         self._queue = await self._hub.subscribe(self._stream_key, self._last_id)
@@ -52,9 +95,86 @@ class _HubSubscription:
         return False
 
 
+class _HubShard:
+    """One reader task issuing a single multi-stream XREAD for every key hashed to this shard."""
+
+    def __init__(self, hub: "StreamHub", index: int):
+        self._hub = hub
+        self.index = index
+        self.positions: Dict[str, str] = {}  # stream_key -> last ID read
+        # stream_key -> registration; a key removed and re-added while an XREAD is in flight
+        # gets a new one, so that read's (stale) result is not applied to it
+        self.generations: Dict[str, int] = {}
+        self._next_generation = 0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.reads = 0
+
+    def add(self, stream_key: str, last_id: str):
+        if stream_key not in self.positions:
+            self.positions[stream_key] = last_id
+            self._next_generation += 1
+            self.generations[stream_key] = self._next_generation
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._wake.set()
+
+    def remove(self, stream_key: str):
+        self.positions.pop(stream_key, None)
+        self.generations.pop(stream_key, None)
+
+    async def _run(self):
+        try:
+            while True:
+                if not self.positions:
+                    self._wake.clear()
+                    await self._wake.wait()
+                    continue
+                try:
+                    read_generations = dict(self.generations)
+                    result = await self._hub._redis.xread(
+                        dict(self.positions), block=HUB_BLOCK_MS, count=HUB_READ_COUNT
+                    )
+                    self.reads += 1
+                    if not result:
+                        continue
+                    for stream_key, entries in result:
+                        if stream_key not in self.positions or not entries:
+                            continue  # Unsubscribed while the read was in flight
+                        if self.generations.get(stream_key) != read_generations.get(stream_key):
+                            continue  # Re-subscribed while the read was in flight: read from its own position
+                        self.positions[stream_key] = entries[-1][0]
+                        self._hub._fan_out(stream_key, entries)
+                except (ConnectionError, RedisConnectionError, OSError) as e:
+                    logger.warning(f"Hub shard {self.index} connection error: {e}")
+                    await asyncio.sleep(0.5)
+                except Exception as e:
+                    logger.warning(f"Hub shard {self.index} error: {e}")
+                    await asyncio.sleep(0.1)
+        except asyncio.CancelledError:
+            logger.debug(f"Hub shard {self.index} cancelled")
+            raise
+
+    async def close(self):
+        task, self._task = self._task, None
+        self.positions.clear()
+        self.generations.clear()
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
 class StreamHub:
     """
-    Multiplexes stream reads: 1 XREAD per stream key, fan-out to N clients.
+    Multiplexes stream reads: HUB_SHARDS reader tasks, each issuing one XREAD over all
+    of its stream keys, fan-out to N clients per key.
+
+    Subscriber sets are immutable tuples replaced on (un)subscribe, so fan-out reads
+    them without a lock. Full queues are handled by lagging + XRANGE replay (see
+    _HubQueue) rather than dropping messages.
 
     Usage in SSE endpoint:
         async with redis.hub.subscription(stream_key) as queue:
@@ -62,81 +182,106 @@ class StreamHub:
                 yield format_sse(msg)
     """
 
-    def __init__(self, redis_client: Redis, queue_maxsize: int = 256):
+    def __init__(self, redis_client: Redis, queue_maxsize: int = 256, shards: int = HUB_SHARDS):
         self._redis = redis_client
         self._queue_maxsize = queue_maxsize
-        self._pumps: Dict[str, asyncio.Task] = {}
-        self._subs: Dict[str, Set[asyncio.Queue]] = defaultdict(_builtin_set)
-        self._lock = asyncio.Lock()
+        self._shards = [_HubShard(self, i) for i in range(max(1, shards))]
+        self._subs: Dict[str, Tuple[_HubQueue, ...]] = {}
         # Metrics
         self.streams_active = 0
         self.subscribers_total = 0
         self.messages_delivered = 0
-        self.messages_dropped = 0
+        self.messages_deferred = 0  # Entries a lagging subscriber will replay from Redis
+        self.resyncs = 0
+        self.gaps = 0  # Replays that found skipped entries already trimmed
+
+    def _shard_for(self, stream_key: str) -> _HubShard:
+        return self._shards[zlib.crc32(stream_key.encode()) % len(self._shards)]
 
     async def subscribe(self, stream_key: str, last_id: str = "0") -> asyncio.Queue:
         """Subscribe to stream. Returns bounded queue for messages."""
-        queue = asyncio.Queue(maxsize=self._queue_maxsize)
-        async with self._lock:
-            self._subs[stream_key].add(queue)
-            self.subscribers_total += 1
-            if stream_key not in self._pumps:
-                self._pumps[stream_key] = asyncio.create_task(self._pump(stream_key, last_id))
-                self.streams_active += 1
-                logger.debug(f"Hub: Started pump for {stream_key}")
+        queue = _HubQueue(stream_key, self._queue_maxsize)
+        subs = self._subs.get(stream_key, ())
+        self._subs[stream_key] = subs + (queue,)
+        self.subscribers_total += 1
+        if not subs:
+            self._shard_for(stream_key).add(stream_key, last_id)
+            self.streams_active += 1
+            logger.debug(f"Hub: Watching {stream_key}")
         return queue
 
     async def unsubscribe(self, stream_key: str, queue: asyncio.Queue):
         """Unsubscribe from stream. MUST be called (use context manager)."""
-        async with self._lock:
-            subs = self._subs.get(stream_key)
-            if not subs:
-                return
-            subs.discard(queue)
-            if not subs:
-                task = self._pumps.pop(stream_key, None)
-                if task:
-                    task.cancel()
+        subs = self._subs.get(stream_key)
+        if not subs:
+            return
+        remaining = tuple(q for q in subs if q is not queue)
+        if remaining:
+            self._subs[stream_key] = remaining
+            return
+        self._subs.pop(stream_key, None)
+        self._shard_for(stream_key).remove(stream_key)
+        self.streams_active -= 1
+        logger.debug(f"Hub: Stopped watching {stream_key}")
+
+    def _fan_out(self, stream_key: str, entries: List[Tuple[str, Dict[str, Any]]]):
+        for queue in self._subs.get(stream_key, ()):
+            for msg_id, fields in entries:
+                if queue.last_id is not None and not _stream_id_after(msg_id, queue.last_id):
+                    continue  # Already replayed from Redis while this read was in flight
+                if not queue.lagging:
                     try:
-                        await task
-                    except asyncio.CancelledError:
-                        pass
-                    self.streams_active -= 1
-                    logger.debug(f"Hub: Stopped pump for {stream_key}")
-                self._subs.pop(stream_key, None)
-
-    async def _pump(self, stream_key: str, last_id: str):
-        """Single reader per stream, fans out to all subscribers."""
-        try:
-            while True:
-                try:
-                    result = await self._redis.xread({stream_key: last_id}, block=500, count=100)
-                    if not result:
+                        queue.put_nowait((msg_id, fields))
+                        queue.last_id = msg_id
+                        self.messages_delivered += 1
                         continue
-                    for stream_name, entries in result:
-                        for msg_id, fields in entries:
-                            last_id = msg_id
-                            async with self._lock:
-                                subs = list(self._subs.get(stream_key, []))
-                            for queue in subs:
-                                try:
-                                    queue.put_nowait((msg_id, fields))
-                                    self.messages_delivered += 1
-                                except asyncio.QueueFull:
-                                    self.messages_dropped += 1
-                except (ConnectionError, RedisConnectionError, OSError) as e:
-                    logger.warning(f"Hub pump connection error for {stream_key}: {e}")
-                    await asyncio.sleep(0.5)
-                except Exception as e:
-                    logger.warning(f"Hub pump error for {stream_key}: {e}")
-                    await asyncio.sleep(0.1)
-        except asyncio.CancelledError:
-            logger.debug(f"Hub pump cancelled for {stream_key}")
-            raise
+                    except asyncio.QueueFull:
+                        queue.lagging = True
+                if queue.skipped_from is None:
+                    queue.skipped_from = msg_id
+                queue.skipped_upto = msg_id
+                self.messages_deferred += 1
+
+    async def _replay(self, queue: _HubQueue) -> List[Any]:
+        """
+        Fetch the next batch a lagging queue skipped; clears lagging once caught up.
+
+        The batch starts with a StreamGap if the first skipped entry is no longer in
+        the stream (trimmed by the writer), since entries after it may be gone too.
+        """
+        start = next_stream_id(queue.last_id) if queue.last_id else "-"
+        try:
+            entries = await self._redis.xrange(queue.stream_key, start, "+", count=self._queue_maxsize)
+        except Exception as e:
+            logger.warning(f"Hub replay failed for {queue.stream_key}: {e}")
+            await asyncio.sleep(0.1)
+            return []
+        batch: List[Any] = list(entries)
+        if queue.skipped_from is not None:
+            if not entries or _stream_id_after(entries[0][0], queue.skipped_from):
+                batch.insert(0, StreamGap(queue.last_id))
+                self.gaps += 1
+                logger.debug(f"Hub replay for {queue.stream_key}: entries from {queue.skipped_from} were trimmed")
+            queue.skipped_from = None
+        if entries:
+            queue.last_id = entries[-1][0]
+        # No await between this check and clearing the flag, so the reader can't slip an entry past us
+        if len(entries) < self._queue_maxsize and (
+            queue.skipped_upto is None or queue.last_id is None
+            or not _stream_id_after(queue.skipped_upto, queue.last_id)
+        ):
+            queue.lagging = False
+            queue.skipped_upto = None
+            self.resyncs += 1
+        return batch
 
     async def iter_queue(self, queue: asyncio.Queue, timeout: float = 1.0):
-        """Async iterator for queue. Yields (msg_id, fields) or None on timeout."""
+        """Async iterator for queue. Yields (msg_id, fields), a StreamGap, or None on timeout."""
         while True:
+            if isinstance(queue, _HubQueue) and queue.lagging and queue.empty():
+                for msg in await self._replay(queue):
+                    yield msg
+                continue
             try:
                 msg = await asyncio.wait_for(queue.get(), timeout=timeout)
                 yield msg
@@ -148,30 +293,227 @@ class StreamHub:
         return _HubSubscription(self, stream_key, last_id)
 
     async def close(self):
-        """Cancel all pump tasks on shutdown."""
-        async with self._lock:
-            tasks = list(self._pumps.values())
-            self._pumps.clear()
-            self._subs.clear()
-        for t in tasks:
-            t.cancel()
-        for t in tasks:
-            try:
-                await t
-            except asyncio.CancelledError:
-                pass
-        logger.debug(f"Hub: Closed, cancelled {len(tasks)} pumps")
+        """Cancel all shard readers on shutdown."""
+        self._subs.clear()
+        for shard in self._shards:
+            await shard.close()
+        logger.debug(f"Hub: Closed {len(self._shards)} shard readers")
 
     def get_stats(self) -> Dict[str, Any]:
         return {
             "streams_active": self.streams_active,
             "subscribers_total": self.subscribers_total,
             "messages_delivered": self.messages_delivered,
-            "messages_dropped": self.messages_dropped,
+            "messages_deferred": self.messages_deferred,
+            "resyncs": self.resyncs,
+            "gaps": self.gaps,
+            "shards": [
+                {"streams": len(shard.positions), "reads": shard.reads}
+                for shard in self._shards
+            ],
         }
 
 
 
+# =============================================================================
+# StreamWriter: per-run batched XADD writer
+# Solves: 1 XADD round-trip per token chunk -> N chunks per pipelined round-trip
+# =============================================================================
+
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+import json as _json
+
+_stream_writer_totals = {"entries": 0, "round_trips": 0, "failed_flushes": 0, "dropped_entries": 0}
+
+
+def _dumps_stream_entry(message: Any) -> str:
+    if isinstance(message, str):
+        return message
+    if _orjson is not None:
+        return _orjson.dumps(message, default=str).decode("utf-8")
+    return _json.dumps(message, default=str)
+
+
+class StreamWriter:
+    """
+    Coalesces XADDs for one stream into pipelined round-trips.
+
+    Entries are buffered and flushed when the buffer reaches ``max_batch`` or
+    ``linger_ms`` after the first buffered entry, whichever comes first. Callers
+    pass ``flush=True`` for entries that must be visible immediately (status,
+    llm_response_end, terminal messages). The stream TTL is set once, in the
+    same pipeline as the first flush.
+
+    Entries added with ``boundary=True`` (e.g. llm_response_end) mark points where
+    the stream can be cut cleanly. When a new boundary is written, everything up to
+    the previous boundary is trimmed (XTRIM MINID) in the next flush's pipeline, so
+    the stream keeps the last complete response plus the one in flight as the
+    catch-up window for reconnecting readers. ``maxlen`` remains a hard cap.
+
+    A failed flush puts its batch back at the front of the buffer to be retried
+    by the next flush (entries may then be written twice if the pipeline failed
+    part-way). At most ``max_buffer`` entries are held; beyond that the oldest
+    are dropped and counted. ``add()`` waits while ``max_batch`` entries are
+    buffered, so a slow Redis slows producers instead of growing the buffer.
+
+    Usage:
+        writer = redis.stream_writer(stream_key, maxlen=200, ttl_seconds=600)
+        await writer.add({"type": "assistant", ...})
+        await writer.add({"type": "llm_response_end", ...}, flush=True, boundary=True)
+        await writer.add({"type": "status", ...}, flush=True)
+        await writer.close()
+    """
+
+    def __init__(self, client: "RedisClient", stream_key: str, maxlen: Optional[int] = 200,
+                 approximate: bool = True, ttl_seconds: Optional[int] = None,
+                 max_batch: int = 32, linger_ms: float = 5.0, timeout: float = 5.0,
+                 max_buffer: int = 1024):
+        self._client = client
+        self.stream_key = stream_key
+        self._maxlen = maxlen
+        self._approximate = approximate
+        self._ttl_seconds = ttl_seconds
+        self._ttl_pending = ttl_seconds is not None
+        self._max_batch = max(1, max_batch)
+        self._linger_s = max(0.0, linger_ms) / 1000
+        self._timeout = timeout
+        self._max_buffer = max(self._max_batch, max_buffer)
+        self._buffer: List[str] = []
+        self._boundaries: List[int] = []  # Buffer positions of boundary entries
+        self._last_boundary_id: Optional[str] = None
+        self._pending_minid: Optional[str] = None
+        self._flush_lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._closed = False
+        # Metrics
+        self.entries_written = 0
+        self.round_trips = 0
+        self.failed_flushes = 0
+        self.dropped_entries = 0
+        self.trims = 0
+
+    async def add(self, message: Any, flush: bool = False, boundary: bool = False) -> None:
+        """Buffer one entry (dict or pre-serialized JSON string) as the stream's 'data' field."""
+        if self._closed:
+            logger.debug(f"StreamWriter for {self.stream_key} is closed, dropping entry")
+            return
+        # Backpressure: wait for a full buffer to be written before adding to it
+        while len(self._buffer) >= self._max_batch:
+            if not await self.flush():
+                break
+        if boundary:
+            self._boundaries.append(len(self._buffer))
+        self._buffer.append(_dumps_stream_entry(message))
+        if flush or len(self._buffer) >= self._max_batch:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._linger())
+
+    async def _linger(self):
+        try:
+            await asyncio.sleep(self._linger_s)
+        except asyncio.CancelledError:
+            return
+        # Clear before flushing so close() never cancels an in-flight pipeline
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> bool:
+        """Write all buffered entries in one pipelined round-trip."""
+        async with self._flush_lock:
+            if not self._buffer and not self._ttl_pending:
+                return True
+            batch, self._buffer = self._buffer, []
+            boundaries, self._boundaries = self._boundaries, []
+            set_ttl = self._ttl_pending
+            minid = self._pending_minid
+
+            redis_client = await self._client.get_client()
+            pipe = redis_client.pipeline(transaction=False)
+            kwargs = {}
+            if self._maxlen is not None:
+                kwargs['maxlen'] = self._maxlen
+                kwargs['approximate'] = self._approximate
+            for data in batch:
+                pipe.xadd(self.stream_key, {"data": data}, **kwargs)
+            if set_ttl:
+                pipe.expire(self.stream_key, self._ttl_seconds)
+            if minid:
+                pipe.xtrim(self.stream_key, minid=minid, approximate=self._approximate)
+
+            result = await self._client._with_timeout(
+                pipe.execute(),
+                timeout_seconds=self._timeout,
+                operation_name=f"stream_writer_flush({self.stream_key}, {len(batch)} entries)",
+                default=None
+            )
+            self.round_trips += 1
+            _stream_writer_totals["round_trips"] += 1
+            if result is None:
+                self.failed_flushes += 1
+                _stream_writer_totals["failed_flushes"] += 1
+                dropped = self._requeue(batch, boundaries)
+                logger.warning(
+                    f"⚠️ StreamWriter flush failed (non-fatal) for {self.stream_key}: "
+                    f"{len(batch) - dropped} entries re-queued, {dropped} dropped"
+                )
+                return False
+            if set_ttl:
+                self._ttl_pending = False
+            if minid:
+                self.trims += 1
+                if self._pending_minid == minid:
+                    self._pending_minid = None
+            for position in boundaries:
+                entry_id = result[position]
+                if self._last_boundary_id:
+                    self._pending_minid = next_stream_id(self._last_boundary_id)
+                self._last_boundary_id = entry_id
+            self.entries_written += len(batch)
+            _stream_writer_totals["entries"] += len(batch)
+            return True
+
+    def _requeue(self, batch: List[str], boundaries: List[int]) -> int:
+        """Put a failed batch back ahead of newer entries, keeping at most max_buffer. Returns the number dropped."""
+        self._boundaries = boundaries + [position + len(batch) for position in self._boundaries]
+        self._buffer = batch + self._buffer
+        dropped = max(0, len(self._buffer) - self._max_buffer)
+        if dropped:
+            # Oldest first: readers see a gap rather than lose the latest state
+            del self._buffer[:dropped]
+            self._boundaries = [position - dropped for position in self._boundaries if position >= dropped]
+            self.dropped_entries += dropped
+            _stream_writer_totals["dropped_entries"] += dropped
+        return dropped
+
+    async def close(self) -> None:
+        """Flush remaining entries and stop accepting new ones."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not await self.flush() and self._buffer:
+            dropped, self._buffer, self._boundaries = len(self._buffer), [], []
+            self.dropped_entries += dropped
+            _stream_writer_totals["dropped_entries"] += dropped
+            logger.warning(f"⚠️ StreamWriter for {self.stream_key} closed with {dropped} unwritten entries")
+        self._closed = True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "stream_key": self.stream_key,
+            "entries_written": self.entries_written,
+            "round_trips": self.round_trips,
+            "failed_flushes": self.failed_flushes,
+            "dropped_entries": self.dropped_entries,
+            "trims": self.trims,
+            "entries_per_round_trip": round(self.entries_written / self.round_trips, 2) if self.round_trips else 0.0,
+        }
+
+
 class RedisClient:
     def __init__(self):
         # General pool - for GET/SET/XADD (non-blocking ops)
@@ -180,7 +522,7 @@ class RedisClient:
         # Stream pool - for XREAD/XREADGROUP (blocking ops) - prevents starvation
         self._stream_pool: Optional[ConnectionPool] = None
         self._stream_client: Optional[Redis] = None
-        # Hub for SSE fan-out (1 reader per stream, N clients)
+        # Hub for SSE fan-out (sharded multi-stream readers, N clients per stream)
         self._hub: Optional[StreamHub] = None
 
         self._init_lock: Optional[asyncio.Lock] = None
@@ -240,6 +582,7 @@ class RedisClient:
                 "timeout_count": self._timeout_count,
                 "error_count": self._error_count,
                 "hub": self._hub.get_stats() if self._hub else None,
+                "stream_writer": dict(_stream_writer_totals),
             }
         return {"status": "pool_not_initialized"}
 
@@ -402,7 +745,7 @@ class RedisClient:
 
     @property
     def hub(self) -> StreamHub:
-        """Get StreamHub for SSE fan-out (1 reader per stream, N clients)."""
+        """Get StreamHub for SSE fan-out (sharded multi-stream readers, N clients per stream)."""
         if not self._hub:
             raise RuntimeError("Redis not initialized. Call get_client() first.")
         return self._hub
@@ -526,6 +869,82 @@ class RedisClient:
                     pass
             return deleted_count
     
+    async def mget(self, keys: List[str], timeout: float = None) -> List[Optional[str]]:
+        """Get multiple keys in a single MGET round-trip.
+        
+        Returns values positionally aligned with ``keys`` (None for missing keys).
+        On timeout or error every key is reported as missing.
+        """
+        if not keys:
+            return []
+        
+        timeout = timeout or DEFAULT_OP_TIMEOUT
+        if self._initialized and self._client:
+            client = self._client
+        else:
+            client = await self.get_client()
+        
+        results = await self._with_timeout(
+            client.mget(keys),
+            timeout_seconds=timeout,
+            operation_name=f"mget({len(keys)} keys)",
+            default=None
+        )
+        if not results or len(results) != len(keys):
+            return [None] * len(keys)
+        return list(results)
+    
+    async def set_multiple(self, items: List[Tuple[str, str, Optional[int]]], timeout: float = None) -> int:
+        """Set multiple keys in one non-transactional pipeline.
+        
+        Args:
+            items: (key, value, ttl_seconds) tuples. A falsy TTL stores the key without expiry.
+            timeout: Timeout for the whole pipeline round-trip.
+        
+        Returns:
+            Number of keys written.
+        """
+        if not items:
+            return 0
+        
+        timeout = timeout or DEFAULT_OP_TIMEOUT
+        if self._initialized and self._client:
+            client = self._client
+        else:
+            client = await self.get_client()
+        
+        pipe = client.pipeline(transaction=False)
+        for key, value, ttl_seconds in items:
+            if ttl_seconds:
+                pipe.setex(key, int(ttl_seconds), value)
+            else:
+                pipe.set(key, value)
+        
+        results = await self._with_timeout(
+            pipe.execute(),
+            timeout_seconds=timeout,
+            operation_name=f"set_multiple({len(items)} keys)",
+            default=None
+        )
+        if not results:
+            return 0
+        return sum(1 for r in results if r)
+    
+    async def publish(self, channel: str, message: str, timeout: float = None) -> int:
+        """Publish a pub/sub message with timeout protection. Returns receiver count."""
+        timeout = timeout or DEFAULT_OP_TIMEOUT
+        if self._initialized and self._client:
+            client = self._client
+        else:
+            client = await self.get_client()
+        result = await self._with_timeout(
+            client.publish(channel, message),
+            timeout_seconds=timeout,
+            operation_name=f"publish({channel})",
+            default=0
+        )
+        return result or 0
+    
     async def incr(self, key: str, timeout: float = None) -> int:
         """Increment a key with timeout protection."""
         timeout = timeout or DEFAULT_OP_TIMEOUT
@@ -665,6 +1084,19 @@ class RedisClient:
                 return None
             raise
     
+    def stream_writer(self, stream_key: str, maxlen: Optional[int] = 200, approximate: bool = True,
+                      ttl_seconds: Optional[int] = None, max_batch: int = None,
+                      linger_ms: float = None) -> StreamWriter:
+        """Create a batched writer that pipelines XADDs (and the TTL) for one stream."""
+        if max_batch is None:
+            max_batch = int(os.getenv("REDIS_STREAM_WRITER_MAX_BATCH", "32"))
+        if linger_ms is None:
+            linger_ms = float(os.getenv("REDIS_STREAM_WRITER_LINGER_MS", "5"))
+        return StreamWriter(
+            self, stream_key, maxlen=maxlen, approximate=approximate,
+            ttl_seconds=ttl_seconds, max_batch=max_batch, linger_ms=linger_ms
+        )
+
     async def stream_read(self, stream_key: str, last_id: str = "0", block_ms: int = None,
                           count: int = None, timeout: Optional[float] = None) -> List[tuple]:
         """Read from stream with timeout protection. Uses STREAM_POOL if blocking."""
@@ -953,6 +1385,15 @@ async def delete(key: str, timeout: float = None):
 async def delete_multiple(keys: List[str], timeout: float = None) -> int:
     return await redis.delete_multiple(keys, timeout=timeout)
 
+async def mget(keys: List[str], timeout: float = None) -> List[Optional[str]]:
+    return await redis.mget(keys, timeout=timeout)
+
+async def set_multiple(items: List[Tuple[str, str, Optional[int]]], timeout: float = None) -> int:
+    return await redis.set_multiple(items, timeout=timeout)
+
+async def publish(channel: str, message: str, timeout: float = None) -> int:
+    return await redis.publish(channel, message, timeout=timeout)
+
 async def incr(key: str, timeout: float = None) -> int:
     return await redis.incr(key, timeout=timeout)
 
@@ -982,6 +1423,12 @@ async def stream_add(stream_key: str, fields: dict, maxlen: int = None, approxim
     return await redis.stream_add(stream_key, fields, maxlen=maxlen, approximate=approximate, 
                                   timeout=timeout, fail_silently=fail_silently)
 
+def stream_writer(stream_key: str, maxlen: Optional[int] = 200, approximate: bool = True,
+                  ttl_seconds: Optional[int] = None, max_batch: int = None,
+                  linger_ms: float = None) -> StreamWriter:
+    return redis.stream_writer(stream_key, maxlen=maxlen, approximate=approximate,
+                               ttl_seconds=ttl_seconds, max_batch=max_batch, linger_ms=linger_ms)
+
 async def stream_read(stream_key: str, last_id: str = "0", block_ms: int = None, 
                       count: int = None, timeout: Optional[float] = None):
     return await redis.stream_read(stream_key, last_id, block_ms=block_ms, count=count, timeout=timeout)
@@ -1050,6 +1497,9 @@ __all__ = [
     'setex',
     'delete',
     'delete_multiple',
+    'mget',
+    'set_multiple',
+    'publish',
     'incr',
     'expire',
     'ttl',
@@ -1059,8 +1509,11 @@ __all__ = [
     'llen',
     'scan_keys',
     'stream_add',
+    'stream_writer',
+    'StreamWriter',
     'stream_read',
     'stream_range',
+    'next_stream_id',
     'stream_len',
     'xadd',
     'xread',
@@ -0,0 +1,125 @@
+"""
+Local HTTP fixture server for image enrichment tests and benchmarks.
+
+Serves generated PNG, JPEG, GIF and WebP images from a background thread and
+counts the body bytes it sends, so tests can check how much of an image a
+client actually pulled.
+
+    with ImageFixtureServer() as server:
+        url = server.add_image("photo.jpg", "JPEG", (1600, 1200))
+        ...
+        server.bytes_sent["/photo.jpg"]
+
+Byte ranges ("Range: bytes=start-end") are honored unless the server is
+created with honor_range=False, which simulates hosts that ignore them.
+"""
+import random
+import re
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+_CONTENT_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "GIF": "image/gif", "WEBP": "image/webp"}
+_CHUNK_SIZE = 8 * 1024
+
+
+def make_image(image_format: str, size: Tuple[int, int], seed: int = 0) -> bytes:
+    """Noisy (barely compressible) image of the given size, as encoded bytes."""
+    from PIL import Image
+
+    width, height = size
+    rng = random.Random(seed)
+    image = Image.frombytes("RGB", size, rng.randbytes(width * height * 3))
+    if image_format == "GIF":
+        image = image.convert("P")
+    buffer = BytesIO()
+    image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+class ImageFixtureServer:
+    """Threaded HTTP server on 127.0.0.1 serving registered byte bodies."""
+
+    def __init__(self, honor_range: bool = True):
+        self.honor_range = honor_range
+        self.files: Dict[str, Tuple[bytes, str]] = {}
+        self.requests: Dict[str, int] = defaultdict(int)
+        self.bytes_sent: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_file(self, name: str, body: bytes, content_type: str) -> str:
+        self.files[f"/{name}"] = (body, content_type)
+        return f"{self.base_url}/{name}"
+
+    def add_image(self, name: str, image_format: str, size: Tuple[int, int], seed: int = 0) -> str:
+        return self.add_file(name, make_image(image_format, size, seed), _CONTENT_TYPES[image_format])
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.bytes_sent.clear()
+
+    def start(self) -> "ImageFixtureServer":
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with fixture._lock:
+                    fixture.requests[self.path] += 1
+                entry = fixture.files.get(self.path)
+                if entry is None:
+                    self.send_error(404)
+                    return
+                body, content_type = entry
+                status, start, end = 200, 0, len(body)
+                match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+                if match and fixture.honor_range:
+                    start = int(match.group(1))
+                    end = min(len(body), int(match.group(2)) + 1) if match.group(2) else len(body)
+                    status = 206
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(end - start))
+                self.send_header("Accept-Ranges", "bytes")
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(body)}")
+                self.end_headers()
+                try:
+                    for offset in range(start, end, _CHUNK_SIZE):
+                        chunk = body[offset:min(end, offset + _CHUNK_SIZE)]
+                        self.wfile.write(chunk)
+                        with fixture._lock:
+                            fixture.bytes_sent[self.path] += len(chunk)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client stopped reading after the header
+                    pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "ImageFixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -13,20 +13,60 @@ from datetime import datetime
 import re
 
 
+class MockLLMError(Exception):
+    """Failure injected by a mock provider"""
+
+
 class MockLLMProvider:
     """
     Mock LLM provider that generates deterministic streaming responses
     for stress testing without real API calls
     """
     
-    def __init__(self, delay_ms: int = 20):
+    def __init__(self, delay_ms: int = 20, ttft_ms: int = 0, fail_next: int = 0):
         """
         Initialize mock provider
         
         Args:
             delay_ms: Delay between stream chunks in milliseconds
+            ttft_ms: Extra latency before the first chunk (a slow provider)
+            fail_next: Number of upcoming aopen() calls that fail (a provider outage)
         """
         self.delay_ms = delay_ms
+        self.ttft_ms = ttft_ms
+        self.fail_next = fail_next
+        self.calls = 0
+        self.completed = 0
+        self.cancelled = 0
+    
+    async def aopen(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str = "mock-ai",
+        stream: bool = True,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Awaitable counterpart of acompletion, shaped like litellm.acompletion(stream=True):
+        raises injected failures, then returns the stream
+        
+        Args:
+            messages: List of conversation messages
+            model: Model name, reported in chunks
+            stream: Whether to stream (always True for mock)
+            tools: Available tools for the agent
+            **kwargs: Additional LiteLLM parameters (ignored)
+        
+        Returns:
+            Stream of chunks simulating a real LLM response
+        """
+        self.calls += 1
+        await asyncio.sleep(self.delay_ms / 1000)
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            raise MockLLMError(f"Injected failure from {model}")
+        return self.acompletion(messages=messages, model=model, stream=stream, tools=tools)
     
     async def acompletion(
         self,
@@ -53,8 +93,13 @@ class MockLLMProvider:
         Yields:
             Stream chunks simulating real LLM response
         """
-        async for chunk in self.get_mock_response(messages, tools or [], model):
-            yield chunk
+        try:
+            async for chunk in self.get_mock_response(messages, tools or [], model):
+                yield chunk
+            self.completed += 1
+        except (asyncio.CancelledError, GeneratorExit):
+            self.cancelled += 1
+            raise
     
     async def get_mock_response(
         self,
@@ -115,9 +160,13 @@ class MockLLMProvider:
                 if tool_calls:
                     self.tool_calls = tool_calls
         
+        # Simulated provider latency before anything streams
+        if self.ttft_ms:
+            await asyncio.sleep(self.ttft_ms / 1000)
+        
         # Yield TTFT metadata first (simulates time to first token)
         # The delay_ms represents the mock "thinking" time
-        ttft_seconds = self.delay_ms / 1000.0
+        ttft_seconds = (self.delay_ms + self.ttft_ms) / 1000.0
         yield {"__llm_ttft_seconds__": ttft_seconds, "model": model}
         
         # Stream tool calls first
@@ -334,6 +383,27 @@ def get_mock_provider(delay_ms: int = 20) -> MockLLMProvider:
     return _mock_provider
 
 
+# Mock deployments by LiteLLM model ID ("mock/<name>"), served by make_llm_api_call
+_mock_deployments: Dict[str, MockLLMProvider] = {}
+
+
+def register_mock_deployment(litellm_model_id: str, provider: MockLLMProvider) -> MockLLMProvider:
+    """Serve a "mock/..." deployment from `provider` (e.g. one with injected latency)"""
+    _mock_deployments[litellm_model_id] = provider
+    return provider
+
+
+def get_mock_deployment(litellm_model_id: str) -> MockLLMProvider:
+    """Provider for a "mock/..." deployment, created with defaults if none was registered"""
+    if litellm_model_id not in _mock_deployments:
+        _mock_deployments[litellm_model_id] = MockLLMProvider()
+    return _mock_deployments[litellm_model_id]
+
+
+def clear_mock_deployments():
+    _mock_deployments.clear()
+
+
 def enable_mock_mode():
     """Enable mock LLM mode globally (for stress testing)"""
     global _mock_provider
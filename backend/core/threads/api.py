@@ -277,8 +277,10 @@ async def delete_project(
         
         if thread_ids:
             logger.debug(f"Deleting messages for {len(thread_ids)} threads")
+            from core.cache.runtime_cache import invalidate_message_history_cache
             for thread_id in thread_ids:
                 await client.table('messages').delete().eq('thread_id', thread_id).execute()
+                await invalidate_message_history_cache(thread_id)
         
         if thread_ids:
             logger.debug(f"Deleting {len(thread_ids)} threads")
@@ -601,6 +603,40 @@ async def get_thread_messages(
         logger.error(f"Error fetching messages for thread {thread_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch messages: {str(e)}")
 
+@router.get("/threads/{thread_id}/file-edits", summary="Get File Edit Versions", operation_id="get_file_edit_versions")
+async def get_file_edit_versions(
+    thread_id: str,
+    request: Request,
+    original: Optional[str] = Query(None, description="original_sha256 from the edit tool result"),
+    updated: Optional[str] = Query(None, description="updated_sha256 from the edit tool result"),
+):
+    """Full file contents before/after an edit, which tool results only reference by hash."""
+    from core.threads import repo as threads_repo
+    from core.files.file_edits import load_snapshots
+
+    client = await db.client
+    user_id = await get_optional_user_id(request)
+    await verify_and_authorize_thread_access(client, thread_id, user_id)
+
+    project_id = await threads_repo.get_thread_project_id(thread_id)
+    if not project_id:
+        raise HTTPException(status_code=404, detail="Thread has no project")
+
+    hashes = [h for h in (original, updated) if h]
+    try:
+        snapshots = await load_snapshots(str(project_id), hashes)
+    except Exception as e:
+        logger.error(f"Error loading file edit versions for thread {thread_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to load file edit versions")
+
+    if any(h not in snapshots for h in hashes):
+        raise HTTPException(status_code=404, detail="File version not found")
+
+    return {
+        "original_content": snapshots.get(original) if original else None,
+        "updated_content": snapshots.get(updated) if updated else None,
+    }
+
 @router.post("/threads/{thread_id}/messages/add", summary="Add Message to Thread", operation_id="add_message_to_thread")
 async def add_message_to_thread(
     thread_id: str,
@@ -697,6 +733,8 @@ async def delete_message_endpoint(
     await verify_and_authorize_thread_access(client, thread_id, user_id, require_write_access=True)
     try:
         await threads_repo.delete_message(thread_id, message_id, is_llm_message=True)
+        from core.cache.runtime_cache import invalidate_message_history_suffix
+        await invalidate_message_history_suffix(thread_id, message_ids=[message_id])
         return {"message": "Message deleted successfully"}
     except Exception as e:
         logger.error(f"Error deleting message {message_id} from thread {thread_id}: {str(e)}")
@@ -1,7 +1,15 @@
-from typing import Optional, List, Dict, Any, Tuple
+import asyncio
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator
 from core.services.db import execute, execute_one, serialize_row, serialize_rows
 from core.utils.logger import logger
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    import json
+    _json_loads = json.loads
+
 async def list_user_threads(
     account_id: str,
     limit: int = 100,
@@ -128,6 +136,9 @@ async def delete_thread_data(thread_id: str) -> bool:
         {"thread_id": thread_id}
     )
     
+    from core.cache.runtime_cache import invalidate_message_history_cache
+    await invalidate_message_history_cache(thread_id)
+    
     return len(result) > 0
 
 
@@ -673,26 +684,69 @@ async def get_llm_messages(
     return [dict(row) for row in rows] if rows else []
 
 
-async def get_llm_messages_paginated(
+async def iter_llm_messages(
     thread_id: str,
-    offset: int = 0,
-    batch_size: int = 1000
-) -> List[Dict[str, Any]]:
-    sql = """
-    SELECT message_id, type, content, metadata
-    FROM messages
-    WHERE thread_id = :thread_id 
-      AND is_llm_message = true
-      AND (metadata->>'omitted' IS NULL OR metadata->>'omitted' != 'true')
-    ORDER BY created_at ASC
-    LIMIT :limit OFFSET :offset
+    after_created_at: Optional[Any] = None,
+    after_message_id: Optional[str] = None,
+    batch_size: int = 1000,
+    batch_timeout: Optional[float] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Stream a thread's LLM messages in (created_at, message_id) order.
+
+    Pages with a keyset cursor, so every page is an index range scan
+    (idx_messages_thread_llm_keyset) no matter how deep into the thread it is.
+    Compressed messages have compressed_content swapped in by SQL and metadata
+    never leaves the database. Yields {message_id, type, created_at, content,
+    is_compressed} with content already decoded (plain text for non-JSON
+    compressed summaries). With a (created_at, message_id) mark, starts strictly after it.
     """
-    rows = await execute(sql, {
-        "thread_id": thread_id,
-        "limit": batch_size,
-        "offset": offset
-    })
-    return [dict(row) for row in rows] if rows else []
+    cursor = (after_created_at, after_message_id) if after_created_at is not None and after_message_id is not None else None
+
+    while True:
+        params: Dict[str, Any] = {"thread_id": thread_id, "limit": batch_size}
+        if cursor:
+            keyset = "AND (created_at, message_id) > (CAST(:after_created_at AS timestamptz), CAST(:after_message_id AS uuid))"
+            params["after_created_at"] = str(cursor[0])
+            params["after_message_id"] = str(cursor[1])
+        else:
+            keyset = ""
+        sql = f"""
+        SELECT message_id, type, created_at,
+               CASE WHEN metadata->>'compressed' = 'true'
+                    THEN COALESCE(metadata->>'compressed_content', content::text)
+                    ELSE content::text
+               END AS content,
+               COALESCE(metadata->>'compressed' = 'true' AND metadata->>'compressed_content' IS NOT NULL, false) AS is_compressed
+        FROM messages
+        WHERE thread_id = :thread_id
+          AND is_llm_message = true
+          AND (metadata->>'omitted' IS NULL OR metadata->>'omitted' != 'true')
+          {keyset}
+        ORDER BY created_at ASC, message_id ASC
+        LIMIT :limit
+        """
+        if batch_timeout:
+            rows = await asyncio.wait_for(execute(sql, params), timeout=batch_timeout)
+        else:
+            rows = await execute(sql, params)
+
+        for row in rows:
+            content = row["content"]
+            try:
+                content = _json_loads(content)
+            except (ValueError, TypeError):
+                pass  # Plain-text compressed summary
+            yield {
+                "message_id": row["message_id"],
+                "type": row["type"],
+                "created_at": row["created_at"],
+                "content": content,
+                "is_compressed": row["is_compressed"],
+            }
+
+        if len(rows) < batch_size:
+            return
+        cursor = (rows[-1]["created_at"], rows[-1]["message_id"])
 
 
 async def get_thread_metadata(thread_id: str) -> Optional[Dict[str, Any]]:
@@ -1258,6 +1312,64 @@ async def insert_message(
     return dict(result) if result else None
 
 
+async def insert_messages_batch(
+    messages: List[Dict[str, Any]],
+    batch_size: int = 200
+) -> int:
+    """Insert pre-built message rows in multi-row INSERT statements.
+
+    Rows carry their own message_id and created_at (see MessagePersister), so
+    ON CONFLICT (message_id) DO NOTHING makes re-sending a batch after a failed
+    or partial flush safe.
+
+    Args:
+        messages: Dicts with message_id, thread_id, type, content, created_at and
+            optional is_llm_message, metadata, agent_id, agent_version_id
+        batch_size: Max rows per SQL statement
+
+    Returns:
+        Number of rows inserted (rows that already existed are not counted)
+    """
+    from core.services.db import execute_mutate
+
+    if not messages:
+        return 0
+
+    columns = (
+        "message_id", "thread_id", "type", "content", "is_llm_message",
+        "metadata", "agent_id", "agent_version_id", "created_at"
+    )
+    total_inserted = 0
+
+    for batch_start in range(0, len(messages), batch_size):
+        batch = messages[batch_start:batch_start + batch_size]
+
+        values_parts = []
+        params = {}
+        for i, message in enumerate(batch):
+            values_parts.append("(" + ", ".join(f":{col}_{i}" for col in columns) + ")")
+            params[f"message_id_{i}"] = message["message_id"]
+            params[f"thread_id_{i}"] = message["thread_id"]
+            params[f"type_{i}"] = message["type"]
+            params[f"content_{i}"] = message["content"]
+            params[f"is_llm_message_{i}"] = message.get("is_llm_message", False)
+            params[f"metadata_{i}"] = message.get("metadata") or {}
+            params[f"agent_id_{i}"] = message.get("agent_id")
+            params[f"agent_version_id_{i}"] = message.get("agent_version_id")
+            params[f"created_at_{i}"] = message["created_at"]
+
+        sql = f"""
+        INSERT INTO messages ({', '.join(columns)})
+        VALUES {', '.join(values_parts)}
+        ON CONFLICT (message_id) DO NOTHING
+        RETURNING message_id
+        """
+        result = await execute_mutate(sql, params)
+        total_inserted += len(result) if result else 0
+
+    return total_inserted
+
+
 async def get_latest_message_type(thread_id: str) -> Optional[str]:
     sql = """
     SELECT type FROM messages 
@@ -4,12 +4,23 @@ from core.utils.config import config
 from core.sandbox.tool_base import SandboxToolsBase
 from core.agentpress.thread_manager import ThreadManager
 from core.services.http_client import get_http_client
+from core.cache.tool_result_cache import cached_tool_call, normalize_query
 import httpx
 import json
 import logging
 import time
 from typing import Union, List
 
+# Shared tool result cache TTL (seconds)
+IMAGE_SEARCH_CACHE_TTL = 6 * 60 * 60
+
+
+def _serper_cache_key(payload: Union[dict, list]) -> Union[dict, list]:
+    if isinstance(payload, list):
+        return [_serper_cache_key(item) for item in payload]
+    return {**payload, "q": normalize_query(payload["q"])}
+
+
 @tool_metadata(
     display_name="Image Search",
     description="Find images on the internet for any topic or subject",
@@ -154,21 +165,7 @@ class SandboxImageSearchTool(SandboxToolsBase):
             
             # SERPER API request
             start_time = time.time()
-            async with get_http_client() as client:
-                headers = {
-                    "X-API-KEY": self.serper_api_key,
-                    "Content-Type": "application/json"
-                }
-                
-                response = await client.post(
-                    "https://google.serper.dev/images",
-                    json=payload,
-                    headers=headers,
-                    timeout=30.0
-                )
-                
-                response.raise_for_status()
-                data = response.json()
+            data = await self._serper_images(payload)
             elapsed_time = round(time.time() - start_time, 2)
             
             if is_batch:
@@ -244,3 +241,25 @@ class SandboxImageSearchTool(SandboxToolsBase):
             if len(error_message) > 200:
                 simplified_message += "..."
             return self.fail_response(simplified_message)
+
+    @cached_tool_call(
+        "serper_images", ttl=IMAGE_SEARCH_CACHE_TTL,
+        key=lambda self, payload: (_serper_cache_key(payload),)
+    )
+    async def _serper_images(self, payload: Union[dict, list]) -> Union[dict, list]:
+        """POST a single or batch query to the SERPER images endpoint."""
+        async with get_http_client() as client:
+            headers = {
+                "X-API-KEY": self.serper_api_key,
+                "Content-Type": "application/json"
+            }
+            
+            response = await client.post(
+                "https://google.serper.dev/images",
+                json=payload,
+                headers=headers,
+                timeout=30.0
+            )
+            
+            response.raise_for_status()
+            return response.json()
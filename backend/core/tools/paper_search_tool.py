@@ -7,6 +7,17 @@ from core.agentpress.tool import Tool, ToolResult, openapi_schema, tool_metadata
 from core.utils.config import config
 from core.utils.logger import logger
 from core.agentpress.thread_manager import ThreadManager
+from core.cache.tool_result_cache import cached_tool_call, normalize_query
+
+# Semantic Scholar metadata changes slowly (citation counts drift over days)
+PAPER_CACHE_TTL = 24 * 60 * 60
+
+
+def _request_cache_key(url: str, params: Optional[Dict[str, Any]]) -> tuple:
+    params = dict(params or {})
+    if "query" in params:
+        params["query"] = normalize_query(params["query"])
+    return (url, params)
 
 @tool_metadata(
     display_name="Academic Research",
@@ -67,6 +78,10 @@ class PaperSearchTool(Tool):
         else:
             logger.warning("SEMANTIC_SCHOLAR_API_KEY not configured - Paper Search Tool will not be available")
     
+    @cached_tool_call(
+        "semantic_scholar", ttl=PAPER_CACHE_TTL,
+        key=lambda self, url, params=None, max_retries=3: _request_cache_key(url, params)
+    )
     async def _rate_limited_request(
         self,
         url: str,
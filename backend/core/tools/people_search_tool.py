@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional, Union
 import asyncio
 import structlog
 import json
@@ -22,6 +22,10 @@ from core.agentpress.thread_manager import ThreadManager
 from core.billing.credits.manager import CreditManager
 from core.billing.shared.config import TOKEN_PRICE_MULTIPLIER
 from core.services.supabase import DBConnection
+from core.cache.tool_result_cache import cached_tool_call, normalize_query
+
+# Shared tool result cache TTL (seconds); billing still applies to cached results
+WEBSET_CACHE_TTL = 24 * 60 * 60
 
 @tool_metadata(
     display_name="People Research",
@@ -122,6 +126,93 @@ class PeopleSearchTool(Tool):
             logger.error(f"Error deducting credits: {e}")
             return False
 
+    @cached_tool_call(
+        "exa_people_search", ttl=WEBSET_CACHE_TTL,
+        key=lambda self, query, enrichment_description: (normalize_query(query), enrichment_description),
+        cacheable=lambda results: isinstance(results, list)
+    )
+    async def _search_webset(self, query: str, enrichment_description: str) -> Union[List[Dict[str, Any]], ToolResult]:
+        """Run an Exa webset search; the first 10 items as JSON-safe dicts, or a failed ToolResult."""
+        logger.info(f"Creating Exa webset for: '{query}' with 10 results")
+        
+        enrichment_config = CreateEnrichmentParameters(
+            description=enrichment_description,
+            format="text"
+        )
+        
+        webset_params = CreateWebsetParameters(
+            search={
+                "query": query,
+                "count": 10
+            },
+            enrichments=[enrichment_config]
+        )
+        
+        try:
+            webset = await asyncio.to_thread(
+                self.exa_client.websets.create,
+                params=webset_params
+            )
+            
+            logger.info(f"Webset created with ID: {webset.id}")
+        except Exception as create_error:
+            logger.error(f"Failed to create webset - Error type: {type(create_error).__name__}")
+            try:
+                error_str = str(create_error)
+                logger.error(f"Failed to create webset - Error message: {error_str}")
+            except:
+                error_str = "Unknown error"
+                logger.error(f"Failed to create webset - Could not convert error to string")
+            
+            if "401" in error_str:
+                return self.fail_response(
+                    "Authentication failed with Exa API. Please check your API key configuration."
+                )
+            elif "400" in error_str:
+                return self.fail_response(
+                    "Invalid request to Exa API. Please check your query format."
+                )
+            else:
+                return self.fail_response(
+                    "Failed to create webset. Please try again."
+                )
+        
+        logger.info(f"Waiting for webset {webset.id} to complete processing...")
+        try:
+            webset = await asyncio.to_thread(
+                self.exa_client.websets.wait_until_idle,
+                webset.id
+            )
+            logger.info(f"Webset {webset.id} processing complete")
+        except Exception as wait_error:
+            logger.error(f"Error waiting for webset: {type(wait_error).__name__}: {repr(wait_error)}")
+            return self.fail_response("Failed while waiting for search results. Please try again.")
+
+        logger.info(f"Retrieving items from webset {webset.id}...")
+        try:
+            items = await asyncio.to_thread(
+                self.exa_client.websets.items.list,
+                webset_id=webset.id
+            )
+            logger.info(f"Retrieved items from webset")
+        except Exception as items_error:
+            logger.error(f"Error retrieving items: {type(items_error).__name__}: {repr(items_error)}")
+            return self.fail_response("Failed to retrieve search results. Please try again.")
+        
+        results = items.data if items else []
+        logger.info(f"Got {len(results)} results from webset")
+        
+        items_data = []
+        for item in results[:10]:
+            if hasattr(item, 'model_dump'):
+                item_dict = item.model_dump()
+            elif isinstance(item, dict):
+                item_dict = item
+            else:
+                item_dict = vars(item) if hasattr(item, '__dict__') else {}
+            items_data.append(json.loads(json.dumps(item_dict, default=str)))
+        return items_data
+    
     @openapi_schema({
         "type": "function",
         "function": {
@@ -166,84 +257,12 @@ class PeopleSearchTool(Tool):
             )
         
         try:
-            logger.info(f"Creating Exa webset for: '{query}' with 10 results")
-            
-            enrichment_config = CreateEnrichmentParameters(
-                description=enrichment_description,
-                format="text"
-            )
-            
-            webset_params = CreateWebsetParameters(
-                search={
-                    "query": query,
-                    "count": 10
-                },
-                enrichments=[enrichment_config]
-            )
-            
-            try:
-                webset = await asyncio.to_thread(
-                    self.exa_client.websets.create,
-                    params=webset_params
-                )
-                
-                logger.info(f"Webset created with ID: {webset.id}")
-            except Exception as create_error:
-                logger.error(f"Failed to create webset - Error type: {type(create_error).__name__}")
-                try:
-                    error_str = str(create_error)
-                    logger.error(f"Failed to create webset - Error message: {error_str}")
-                except:
-                    error_str = "Unknown error"
-                    logger.error(f"Failed to create webset - Could not convert error to string")
-                
-                if "401" in error_str:
-                    return self.fail_response(
-                        "Authentication failed with Exa API. Please check your API key configuration."
-                    )
-                elif "400" in error_str:
-                    return self.fail_response(
-                        "Invalid request to Exa API. Please check your query format."
-                    )
-                else:
-                    return self.fail_response(
-                        "Failed to create webset. Please try again."
-                    )
-            
-            logger.info(f"Waiting for webset {webset.id} to complete processing...")
-            try:
-                webset = await asyncio.to_thread(
-                    self.exa_client.websets.wait_until_idle,
-                    webset.id
-                )
-                logger.info(f"Webset {webset.id} processing complete")
-            except Exception as wait_error:
-                logger.error(f"Error waiting for webset: {type(wait_error).__name__}: {repr(wait_error)}")
-                return self.fail_response("Failed while waiting for search results. Please try again.")
-
-            logger.info(f"Retrieving items from webset {webset.id}...")
-            try:
-                items = await asyncio.to_thread(
-                    self.exa_client.websets.items.list,
-                    webset_id=webset.id
-                )
-                logger.info(f"Retrieved items from webset")
-            except Exception as items_error:
-                logger.error(f"Error retrieving items: {type(items_error).__name__}: {repr(items_error)}")
-                return self.fail_response("Failed to retrieve search results. Please try again.")
-            
-            results = items.data if items else []
-            logger.info(f"Got {len(results)} results from webset")
+            results = await self._search_webset(query, enrichment_description)
+            if isinstance(results, ToolResult):
+                return results
             
             formatted_results = []
-            for idx, item in enumerate(results[:10], 1):
-                if hasattr(item, 'model_dump'):
-                    item_dict = item.model_dump()
-                elif isinstance(item, dict):
-                    item_dict = item
-                else:
-                    item_dict = vars(item) if hasattr(item, '__dict__') else {}
-                
+            for idx, item_dict in enumerate(results, 1):
                 properties = item_dict.get('properties', {})
                 person_info = properties.get('person', {})
                 
@@ -8,11 +8,14 @@ from core.sandbox.tool_base import SandboxToolsBase
 from core.agentpress.thread_manager import ThreadManager
 from core.utils.config import config
 from core.utils.logger import logger
+from core.utils.fast_parse import get_parse_engine
 
 MAX_FILE_SIZE = 10 * 1024 * 1024
 MAX_OUTPUT_CHARS = 50000
 MAX_BATCH_SIZE = 20
 KB_VERSION = "0.1.2"
+# Extracted in the backend with fast_parse, which stops reading once MAX_OUTPUT_CHARS is reached
+STREAM_PARSED_TYPES = {'docx', 'pptx', 'xlsx'}
 
 @tool_metadata(
     display_name="File Reader",
@@ -129,6 +132,18 @@ class SandboxFileReaderTool(SandboxToolsBase):
         ext = os.path.splitext(file_path)[1].lower()
         return ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp', '.ico']
 
+    async def _stream_extract(self, full_path: str, file_path: str) -> str:
+        try:
+            data = await self.sandbox.fs.download_file(full_path)
+            # Parsed in the engine's worker processes; one extra char so the caller can tell the output was cut
+            result = await get_parse_engine().parse(data, os.path.basename(file_path), max_chars=MAX_OUTPUT_CHARS + 1)
+            if result.success:
+                return result.content
+            logger.debug(f"[ReadFile] fast_parse failed for '{file_path}': {result.error}")
+        except Exception as e:
+            logger.debug(f"[ReadFile] fast_parse extraction error for '{file_path}': {e}")
+        return ""
+
     async def _read_single_file(self, file_path: str) -> dict:
         try:
             cleaned_path = self.clean_path(file_path)
@@ -168,7 +183,12 @@ class SandboxFileReaderTool(SandboxToolsBase):
             content = ""
             extraction_method = "unknown"
 
-            if file_type == 'pdf':
+            if file_type in STREAM_PARSED_TYPES:
+                content = await self._stream_extract(full_path, cleaned_path)
+
+            if content:
+                extraction_method = "fast_parse"
+            elif file_type == 'pdf':
                 # Try pdftotext first (fast for native PDFs)
                 result = await self.sandbox.process.exec(
                     f'pdftotext {escaped_path} - 2>/dev/null',
@@ -316,8 +336,9 @@ class SandboxFileReaderTool(SandboxToolsBase):
                 content = result.result
 
             else:
+                # Never more than 4 bytes per char, so this still trips the truncation below
                 result = await self.sandbox.process.exec(
-                    f'cat {escaped_path}',
+                    f'head -c {MAX_OUTPUT_CHARS * 4} {escaped_path}',
                     timeout=60
                 )
                 if result.exit_code != 0:
@@ -327,7 +348,7 @@ class SandboxFileReaderTool(SandboxToolsBase):
                         "error": f"Failed to read file"
                     }
                 content = result.result
-                extraction_method = "cat"
+                extraction_method = "head"
 
             truncated = False
             if len(content) > MAX_OUTPUT_CHARS:
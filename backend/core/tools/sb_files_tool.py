@@ -1,5 +1,7 @@
 from core.agentpress.tool import ToolResult, openapi_schema, tool_metadata
 from core.sandbox.tool_base import SandboxToolsBase
+from core.sandbox.workspace_state import workspace_state_cache
+from core.files.file_edits import build_edit_result, save_snapshots_in_background
 from core.utils.files_utils import should_exclude_file, clean_path
 from core.agentpress.thread_manager import ThreadManager
 from core.utils.logger import logger
@@ -85,39 +87,28 @@ class SandboxFilesTool(SandboxToolsBase):
         except Exception:
             return False
 
+    async def _edit_response(
+        self,
+        success: bool,
+        message: str,
+        file_path: str,
+        original_content: Optional[str],
+        updated_content: Optional[str],
+    ) -> ToolResult:
+        """Return a diff and content hashes; full versions are fetched on demand via /threads/{id}/file-edits"""
+        save_snapshots_in_background(self.project_id, original_content, updated_content)
+        result = await asyncio.to_thread(build_edit_result, message, file_path, original_content, updated_content)
+        return ToolResult(success=success, output=json.dumps(result))
+
     async def get_workspace_state(self) -> dict:
-        """Get the current workspace state by reading all files"""
-        files_state = {}
+        """Get the current workspace state, downloading only files changed since the last call"""
         try:
             # Ensure sandbox is initialized
             await self._ensure_sandbox()
-            
-            files = await self.sandbox.fs.list_files(self.workspace_path)
-            for file_info in files:
-                rel_path = file_info.name
-                
-                # Skip excluded files and directories
-                if self._should_exclude_file(rel_path) or file_info.is_dir:
-                    continue
-
-                try:
-                    full_path = self._get_full_path(rel_path)
-                    content = (await self.sandbox.fs.download_file(full_path)).decode()
-                    files_state[rel_path] = {
-                        "content": content,
-                        "is_dir": file_info.is_dir,
-                        "size": file_info.size,
-                        "modified": file_info.mod_time
-                    }
-                except Exception as e:
-                    print(f"Error reading file {rel_path}: {e}")
-                except UnicodeDecodeError:
-                    print(f"Skipping binary file: {rel_path}")
-
-            return files_state
+            return await workspace_state_cache.get_workspace_state(self.sandbox, self.project_id, self.workspace_path)
         
         except Exception as e:
-            print(f"Error getting workspace state: {str(e)}")
+            logger.error(f"Error getting workspace state: {str(e)}")
             return {}
 
     # def _get_preview_url(self, file_path: str) -> Optional[str]:
@@ -242,12 +233,7 @@ class SandboxFilesTool(SandboxToolsBase):
             new_content = content.replace(old_str, new_str)
             await self.sandbox.fs.upload_file(new_content.encode(), full_path)
             
-            return ToolResult(success=True, output=json.dumps({
-                "message": f"Replacement successful.",
-                "file_path": file_path,
-                "original_content": content,
-                "updated_content": new_content
-            }))
+            return await self._edit_response(True, "Replacement successful.", file_path, content, new_content)
             
         except Exception as e:
             return self.fail_response(f"Error replacing string: {str(e)}")
@@ -516,37 +502,21 @@ class SandboxFilesTool(SandboxToolsBase):
                     
                     new_content = json.dumps(original_wrapper, indent=2)
                 else:
-                    return ToolResult(success=False, output=json.dumps({
-                        "message": f"AI editing failed: {error_message}",
-                        "file_path": target_file,
-                        "original_content": original_content,
-                        "updated_content": None
-                    }))
+                    return await self._edit_response(False, f"AI editing failed: {error_message}", target_file, original_content, None)
 
             if new_content is None:
-                return ToolResult(success=False, output=json.dumps({
-                    "message": "AI editing failed for an unknown reason. The model returned no content.",
-                    "file_path": target_file,
-                    "original_content": original_content,
-                    "updated_content": None
-                }))
+                return await self._edit_response(
+                    False, "AI editing failed for an unknown reason. The model returned no content.", target_file, original_content, None
+                )
 
             if new_content == original_content:
-                return ToolResult(success=True, output=json.dumps({
-                    "message": f"AI editing resulted in no changes to the file '{target_file}'.",
-                    "file_path": target_file,
-                    "original_content": original_content,
-                    "updated_content": original_content
-                }))
+                return await self._edit_response(
+                    True, f"AI editing resulted in no changes to the file '{target_file}'.", target_file, original_content, original_content
+                )
 
             await self.sandbox.fs.upload_file(new_content.encode(), full_path)
             
-            return ToolResult(success=True, output=json.dumps({
-                "message": f"File '{target_file}' edited successfully.",
-                "file_path": target_file,
-                "original_content": original_content,
-                "updated_content": new_content
-            }))
+            return await self._edit_response(True, f"File '{target_file}' edited successfully.", target_file, original_content, new_content)
                     
         except Exception as e:
             logger.error(f"Unhandled error in edit_file: {str(e)}", exc_info=True)
@@ -559,10 +529,5 @@ class SandboxFilesTool(SandboxToolsBase):
             except:
                 pass
             
-            return ToolResult(success=False, output=json.dumps({
-                "message": f"Error editing file: {str(e)}",
-                "file_path": target_file,
-                "original_content": original_content_on_error,
-                "updated_content": None
-            }))
+            return await self._edit_response(False, f"Error editing file: {str(e)}", target_file, original_content_on_error, None)
             
\ No newline at end of file
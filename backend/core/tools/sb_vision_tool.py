@@ -522,7 +522,12 @@ Images remain in the sandbox and can be loaded again anytime. SVG files are auto
         try:
             client = await self.db.client
             result = await client.table('messages').delete().eq('thread_id', self.thread_id).eq('type', 'image_context').execute()
-            return len(result.data) if result.data else 0
+            deleted_ids = [row['message_id'] for row in result.data or [] if row.get('message_id')]
+            if deleted_ids:
+                # Deletes are invisible to the incremental history cache; drop the cached suffix holding them
+                from core.cache.runtime_cache import invalidate_message_history_suffix
+                await invalidate_message_history_suffix(self.thread_id, message_ids=deleted_ids)
+            return len(deleted_ids)
         except Exception as e:
             print(f"[LoadImage] Error clearing images: {e}")
             return 0
@@ -0,0 +1,222 @@
+"""
+Web search image enrichment.
+
+Adds width, height and (when Replicate is configured) a Moondream2 description
+to the image URLs a search returns. Without a description to make, only the
+image header is read (see image_probe); results are cached per image URL in the
+shared tool result cache, so the same image found by another search or run is
+not fetched again.
+
+Kept apart from the web search tool so it can be used and tested without the
+sandbox/Tavily stack.
+"""
+import asyncio
+import base64
+import logging
+from typing import List, Optional
+
+import replicate
+
+from core.cache.tool_result_cache import cached_tool_call, normalize_url
+from core.services.http_client import get_http_client
+from core.tools.utils.image_probe import PROBE_MAX_BYTES, ImageTransferStats, parse_image_size, probe_image
+from core.utils.config import config
+
+IMAGE_ENRICHMENT_CACHE_TTL = 7 * 24 * 60 * 60  # keyed by image URL; dimensions and descriptions rarely change
+
+IMAGE_REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+
+
+def image_descriptions_enabled() -> bool:
+    return bool(config.REPLICATE_API_TOKEN)
+
+
+def image_transfer_report(queries: list, transfers: List[ImageTransferStats]) -> dict:
+    """Image bytes downloaded per search query (0 when the search was served from cache)."""
+    return {
+        "bytes_transferred": sum(transfer.bytes_transferred for transfer in transfers),
+        "queries": [{"query": q, **transfer.as_dict()} for q, transfer in zip(queries, transfers)]
+    }
+
+
+async def enrich_images(images: list, transfer: Optional[ImageTransferStats] = None) -> list:
+    """
+    Enrich image URLs with OCR text and dimensions.
+    Probes (or downloads, when describing) all images and runs OCR IN PARALLEL for speed.
+
+    Args:
+        images: List of image URLs (strings) or image objects from Tavily
+        transfer: Collects image counts and bytes downloaded
+
+    Returns:
+        List of enriched image objects with url, width, height, and description
+    """
+    if not images:
+        return []
+
+    # Collect valid image URLs
+    valid_images = []
+    for img in images:
+        if isinstance(img, str):
+            img_url = img
+        elif isinstance(img, dict):
+            img_url = img.get('url', '')
+        else:
+            continue
+
+        if img_url:
+            valid_images.append(img_url)
+
+    if not valid_images:
+        return []
+
+    logging.info(f"[WebSearch] Starting parallel image enrichment for {len(valid_images)} images")
+    if transfer is not None:
+        transfer.images += len(valid_images)
+
+    # Process all images in parallel
+    async with get_http_client() as client:
+        tasks = [enrich_single_image(img_url, client, transfer) for img_url in valid_images]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Collect results, handling any exceptions
+    enriched = []
+    for i, result in enumerate(results):
+        if isinstance(result, Exception):
+            logging.debug(f"[WebSearch] Error enriching image {i}: {result}")
+            enriched.append({
+                "url": valid_images[i],
+                "width": 0,
+                "height": 0,
+                "description": ""
+            })
+        else:
+            # Cached or shared results carry the URL they were first fetched under
+            enriched.append({**result, "url": valid_images[i]})
+
+    logging.info(f"[WebSearch] Completed parallel enrichment for {len(enriched)} images")
+    return enriched
+
+
+@cached_tool_call(
+    "image_enrichment", ttl=IMAGE_ENRICHMENT_CACHE_TTL,
+    key=lambda img_url, client, transfer=None: (normalize_url(img_url), image_descriptions_enabled()),
+    cacheable=lambda image: image["width"] > 0 and (bool(image["description"]) or not image_descriptions_enabled())
+)
+async def enrich_single_image(img_url: str, client, transfer: Optional[ImageTransferStats] = None) -> dict:
+    """
+    Enrich a single image with dimensions and description.
+    Uses Moondream2 vision model for image understanding.
+
+    Without a description to make, only the first few KB are read (ranged,
+    streamed GET) and the dimensions come from the image header; the full
+    image is downloaded for Moondream2, or when the header can't be parsed.
+
+    Args:
+        img_url: URL of the image
+        client: HTTP client for downloading
+        transfer: Collects the bytes downloaded
+
+    Returns:
+        Enriched image data dict
+    """
+    image_data = {
+        "url": img_url,
+        "width": 0,
+        "height": 0,
+        "description": ""
+    }
+    transfer = transfer if transfer is not None else ImageTransferStats()
+
+    try:
+        describe = image_descriptions_enabled()
+        if not describe:
+            probe = await probe_image(client, img_url, headers=IMAGE_REQUEST_HEADERS)
+            transfer.probed += 1
+            transfer.bytes_transferred += probe.bytes_read
+            if probe.width:
+                image_data["width"] = probe.width
+                image_data["height"] = probe.height
+                logging.debug(f"[WebSearch] Image dimensions from header: {probe.width}x{probe.height} ({probe.bytes_read} bytes read)")
+                return image_data
+            if not probe.is_image or probe.content_type.startswith("image/svg"):
+                return image_data
+
+        response = await client.get(img_url, headers=IMAGE_REQUEST_HEADERS, timeout=15.0, follow_redirects=True)
+        transfer.full_downloads += 1
+        transfer.bytes_transferred += response.num_bytes_downloaded
+
+        if response.status_code == 200:
+            image_bytes = response.content
+            content_type = response.headers.get("content-type", "")
+
+            if content_type.startswith("image/"):
+                parsed = parse_image_size(image_bytes[:PROBE_MAX_BYTES])
+                if parsed:
+                    _, image_data["width"], image_data["height"] = parsed
+                else:
+                    # Get dimensions using PIL
+                    try:
+                        from PIL import Image
+                        from io import BytesIO
+                        img_pil = Image.open(BytesIO(image_bytes))
+                        image_data["width"] = img_pil.width
+                        image_data["height"] = img_pil.height
+                        logging.debug(f"[WebSearch] Image dimensions: {img_pil.width}x{img_pil.height}")
+                    except Exception as dim_err:
+                        logging.debug(f"[WebSearch] Could not get dimensions: {dim_err}")
+
+                if describe:
+                    # Get image description using Moondream2
+                    description = await describe_image(image_bytes, content_type)
+                    image_data["description"] = description
+
+    except Exception as e:
+        logging.debug(f"[WebSearch] Error enriching image {img_url[:50]}...: {str(e)[:100]}")
+
+    return image_data
+
+
+async def describe_image(image_bytes: bytes, content_type: str) -> str:
+    """
+    Get image description using Moondream2 vision model.
+    Runs in ~2 seconds on Replicate GPU, includes text extraction.
+
+    Args:
+        image_bytes: Raw image bytes
+        content_type: MIME type of the image
+
+    Returns:
+        Image description, or empty string if processing fails
+    """
+    try:
+        logging.debug(f"[WebSearch] Running Moondream2 on image ({len(image_bytes)} bytes)")
+
+        # Convert to base64 data URL
+        image_b64 = base64.b64encode(image_bytes).decode("utf-8")
+        data_url = f"data:{content_type};base64,{image_b64}"
+
+        # Call Moondream2 vision model
+        def run_moondream(data_url: str) -> str:
+            output = replicate.run(
+                "lucataco/moondream2:72ccb656353c348c1385df54b237eeb7bfa874bf11486cf0b9473e691b662d31",
+                input={
+                    "image": data_url,
+                    "prompt": "Describe this image in detail. Include any text visible in the image."
+                }
+            )
+            # Output is a generator, consume it to get the full text
+            if hasattr(output, '__iter__') and not isinstance(output, (str, bytes)):
+                return "".join(str(chunk) for chunk in output)
+            return str(output) if output else ""
+
+        description = await asyncio.to_thread(run_moondream, data_url)
+
+        logging.debug(f"[WebSearch] Got description: {len(description)} chars")
+        return description.strip()
+
+    except Exception as e:
+        logging.debug(f"[WebSearch] Moondream2 error: {e}")
+        return ""
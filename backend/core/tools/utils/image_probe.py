@@ -0,0 +1,163 @@
+"""
+Header-only image probing.
+
+Reads the first bytes of an image (a ranged GET, streamed and abandoned as soon
+as the header parses) and takes width and height from the PNG, GIF, JPEG or
+WebP header, so getting dimensions does not mean downloading the whole image.
+Used by the web search tool's image enrichment; the full body is only fetched
+when an image description is needed or the format is not one of the above.
+"""
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+PROBE_RANGE_BYTES = 8 * 1024
+PROBE_MAX_BYTES = 64 * 1024  # JPEG SOF can follow a large EXIF block
+_SNIFF_BYTES = 32
+
+# JPEG start-of-frame markers (C4 = DHT, C8 = JPG, CC = DAC are not frames)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head.startswith(b"\xff\xd8"):
+        return "jpeg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def _jpeg_size(head: bytes) -> Optional[Tuple[int, int]]:
+    i = 2
+    while i + 4 <= len(head):
+        if head[i] != 0xFF:
+            return None
+        marker = head[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # standalone markers
+            i += 2
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            if i + 9 > len(head):
+                return None
+            height = int.from_bytes(head[i + 5:i + 7], "big")
+            width = int.from_bytes(head[i + 7:i + 9], "big")
+            return width, height
+        i += 2 + int.from_bytes(head[i + 2:i + 4], "big")
+    return None
+
+
+def _webp_size(head: bytes) -> Optional[Tuple[int, int]]:
+    chunk = head[12:16]
+    if chunk == b"VP8 " and len(head) >= 30:
+        return (int.from_bytes(head[26:28], "little") & 0x3FFF,
+                int.from_bytes(head[28:30], "little") & 0x3FFF)
+    if chunk == b"VP8L" and len(head) >= 25:
+        b0, b1, b2, b3 = head[21:25]
+        return (1 + (((b1 & 0x3F) << 8) | b0),
+                1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6)))
+    if chunk == b"VP8X" and len(head) >= 30:
+        return (1 + int.from_bytes(head[24:27], "little"),
+                1 + int.from_bytes(head[27:30], "little"))
+    return None
+
+
+def parse_image_size(head: bytes) -> Optional[Tuple[str, int, int]]:
+    """(format, width, height) from the start of an image, or None if not (yet) parseable."""
+    image_format = sniff_format(head)
+    size = None
+    if image_format == "png" and len(head) >= 24 and head[12:16] == b"IHDR":
+        size = (int.from_bytes(head[16:20], "big"), int.from_bytes(head[20:24], "big"))
+    elif image_format == "gif" and len(head) >= 10:
+        size = (int.from_bytes(head[6:8], "little"), int.from_bytes(head[8:10], "little"))
+    elif image_format == "jpeg":
+        size = _jpeg_size(head)
+    elif image_format == "webp":
+        size = _webp_size(head)
+    if size is None:
+        return None
+    return image_format, size[0], size[1]
+
+
+@dataclass
+class ImageProbe:
+    url: str
+    status_code: int = 0
+    content_type: str = ""
+    format: Optional[str] = None
+    width: int = 0
+    height: int = 0
+    bytes_read: int = 0
+
+    @property
+    def is_image(self) -> bool:
+        return self.status_code in (200, 206) and self.content_type.startswith("image/")
+
+
+@dataclass
+class ImageTransferStats:
+    """Image enrichment traffic of one search."""
+    images: int = 0
+    probed: int = 0
+    full_downloads: int = 0
+    bytes_transferred: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "images": self.images,
+            "probed": self.probed,
+            "full_downloads": self.full_downloads,
+            "bytes_transferred": self.bytes_transferred,
+        }
+
+
+async def probe_image(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    max_bytes: int = PROBE_MAX_BYTES,
+    timeout: float = 15.0
+) -> ImageProbe:
+    """Content type and dimensions of an image from at most about max_bytes of it.
+
+    Asks for the first PROBE_RANGE_BYTES, then for the rest of max_bytes only if
+    the header isn't complete yet (JPEGs with large EXIF blocks). Reading stops
+    once the header parses, so a server that ignores Range is abandoned early.
+    """
+    probe = ImageProbe(url=url)
+    head = b""
+    ranges = [(0, min(PROBE_RANGE_BYTES, max_bytes))]
+    if max_bytes > PROBE_RANGE_BYTES:
+        ranges.append((PROBE_RANGE_BYTES, max_bytes))
+
+    for start, end in ranges:
+        request_headers = {**(headers or {}), "Range": f"bytes={start}-{end - 1}"}
+        async with client.stream("GET", url, headers=request_headers, timeout=timeout, follow_redirects=True) as response:
+            if start == 0:
+                probe.status_code = response.status_code
+                probe.content_type = response.headers.get("content-type", "")
+            elif response.status_code != 206:
+                break
+            ranged = response.status_code == 206
+            if probe.is_image:
+                async with aclosing(response.aiter_bytes()) as chunks:
+                    async for chunk in chunks:
+                        head += chunk
+                        parsed = parse_image_size(head)
+                        if parsed:
+                            probe.format, probe.width, probe.height = parsed
+                            break
+                        if len(head) >= max_bytes or (len(head) >= _SNIFF_BYTES and sniff_format(head) is None):
+                            break
+            probe.bytes_read += response.num_bytes_downloaded
+        if probe.format or not probe.is_image or not ranged or len(head) < end or sniff_format(head) is None:
+            break
+    return probe
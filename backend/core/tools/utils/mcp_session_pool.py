@@ -0,0 +1,403 @@
+"""
+MCP Session Pool - persistent client sessions for custom SSE/HTTP/stdio MCP servers.
+
+Opening a transport and running the initialize handshake (or spawning a stdio
+process) on every tool call dominates latency when an agent calls the same server
+repeatedly. The pool keeps one initialized ClientSession per server per worker,
+keyed by (transport, url/command, digest of headers/env).
+
+Each pooled session is owned by a background task: anyio transports must be
+entered and exited in the same task, so the owner opens the transport, publishes
+the session and parks until the pool closes it. Callers only send requests over it.
+
+- Idle sessions are closed after MCP_POOL_IDLE_TTL seconds
+- Sessions idle longer than MCP_POOL_HEALTH_CHECK_INTERVAL are pinged before reuse
+- At MCP_POOL_MAX_SESSIONS the least recently used idle session is evicted; if all
+  are busy the request gets a one-off session instead of waiting
+- Only transport/connection failures close the shared session; a timeout or a
+  bad result fails that one request and leaves other callers' requests running
+- A failed reused session is replaced and the request replayed once, but only when
+  that cannot run a tool twice (idempotent request, or the request was never sent)
+- `timeout` bounds the whole request, connecting included
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import anyio
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+
+from core.utils.logger import logger
+
+MCP_POOL_MAX_SESSIONS = int(os.getenv("MCP_POOL_MAX_SESSIONS", "32"))
+MCP_POOL_IDLE_TTL = float(os.getenv("MCP_POOL_IDLE_TTL", "300"))
+MCP_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("MCP_POOL_HEALTH_CHECK_INTERVAL", "60"))
+MCP_POOL_CONNECT_TIMEOUT = 30.0
+MCP_POOL_PING_TIMEOUT = 5.0
+MCP_POOL_CLOSE_TIMEOUT = 5.0
+_LATENCY_WINDOW = 256
+
+# Raised when the session's write side is already gone: the request never reached
+# the server, so replaying it on a fresh session cannot double-execute a tool.
+_UNSENT_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError)
+# The transport itself is gone: the session can't serve anyone else either
+_CONNECTION_ERRORS = _UNSENT_ERRORS + (anyio.EndOfStream, ConnectionError)
+
+
+@dataclass(frozen=True)
+class MCPServerKey:
+    transport: str  # 'sse' | 'http' | 'json' (stdio)
+    target: str     # URL, or command line for stdio
+    digest: str     # sha256 of headers/env, so secrets never end up in keys or stats
+
+    @property
+    def label(self) -> str:
+        if self.transport == "json":
+            # Command plus first positional arg (usually the server package/script),
+            # never flags, which may carry credentials
+            parts = self.target.split(" ")
+            positional = next((p for p in parts[1:] if p and not p.startswith("-")), "")
+            return f"stdio:{os.path.basename(parts[0])} {os.path.basename(positional)}".rstrip()
+        parsed = urlparse(self.target)
+        return f"{self.transport}:{parsed.netloc}{parsed.path}"
+
+
+def server_key(transport: str, config: Dict[str, Any]) -> MCPServerKey:
+    if transport == "json":
+        target = " ".join([config["command"], *config.get("args", [])])
+        secret = config.get("env") or {}
+    else:
+        target = config["url"]
+        secret = config.get("headers") or {}
+    digest = hashlib.sha256(json.dumps(secret, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return MCPServerKey(transport, target, digest)
+
+
+def _open_transport(transport: str, config: Dict[str, Any]):
+    if transport == "sse":
+        headers = config.get("headers") or {}
+        try:
+            return sse_client(config["url"], headers=headers)
+        except TypeError as e:
+            if "unexpected keyword argument" in str(e):
+                return sse_client(config["url"])
+            raise
+    if transport == "http":
+        headers = config.get("headers") or {}
+        return streamablehttp_client(config["url"], headers=headers) if headers else streamablehttp_client(config["url"])
+    if transport == "json":
+        return stdio_client(StdioServerParameters(
+            command=config["command"],
+            args=config.get("args", []),
+            env=config.get("env", {})
+        ))
+    raise ValueError(f"Unsupported MCP transport: {transport}")
+
+
+class _ServerStats:
+    __slots__ = ("connects", "connect_ms", "requests", "errors", "replays", "latencies")
+
+    def __init__(self):
+        self.connects = 0
+        self.connect_ms = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.replays = 0
+        self.latencies: deque = deque(maxlen=_LATENCY_WINDOW)
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+
+        def pct(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 1)
+
+        return {
+            "connects": self.connects,
+            "avg_connect_ms": round(self.connect_ms / self.connects, 1) if self.connects else None,
+            "requests": self.requests,
+            "errors": self.errors,
+            "replays": self.replays,
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+        }
+
+
+class _PooledSession:
+    __slots__ = ("key", "config", "session", "task", "closing", "in_use", "reused",
+                 "ephemeral", "last_used", "last_ok")
+
+    def __init__(self, key: MCPServerKey, config: Dict[str, Any], ephemeral: bool = False):
+        self.key = key
+        self.config = config
+        self.session: Optional[ClientSession] = None
+        self.task: Optional[asyncio.Task] = None
+        self.closing = asyncio.Event()
+        self.in_use = 0
+        self.reused = False
+        self.ephemeral = ephemeral
+        self.last_used = time.monotonic()
+        self.last_ok = self.last_used
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and not self.closing.is_set() and self.task is not None and not self.task.done()
+
+
+class MCPSessionPool:
+    def __init__(
+        self,
+        max_sessions: int = MCP_POOL_MAX_SESSIONS,
+        idle_ttl: float = MCP_POOL_IDLE_TTL,
+        health_check_interval: float = MCP_POOL_HEALTH_CHECK_INTERVAL
+    ):
+        self._max_sessions = max_sessions
+        self._idle_ttl = idle_ttl
+        self._health_check_interval = health_check_interval
+        self._sessions: Dict[MCPServerKey, _PooledSession] = {}
+        self._locks: Dict[MCPServerKey, asyncio.Lock] = {}
+        self._stats: Dict[str, _ServerStats] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reaper: Optional[asyncio.Task] = None
+        self._evicted_idle = 0
+        self._evicted_cap = 0
+        self._overflow = 0
+        self._health_check_failures = 0
+
+    async def call_tool(
+        self,
+        transport: str,
+        config: Dict[str, Any],
+        tool_name: str,
+        arguments: Dict[str, Any],
+        timeout: float = 30.0
+    ):
+        return await self._request(
+            transport, config, lambda session: session.call_tool(tool_name, arguments),
+            idempotent=False, timeout=timeout
+        )
+
+    async def list_tools(self, transport: str, config: Dict[str, Any], timeout: float = 30.0) -> List[Any]:
+        result = await self._request(
+            transport, config, lambda session: session.list_tools(),
+            idempotent=True, timeout=timeout
+        )
+        return result.tools if hasattr(result, 'tools') else result
+
+    async def _request(
+        self,
+        transport: str,
+        config: Dict[str, Any],
+        operation: Callable[[ClientSession], Awaitable[Any]],
+        idempotent: bool,
+        timeout: float
+    ):
+        key = server_key(transport, config)
+        stats = self._stats.setdefault(key.label, _ServerStats())
+        # One budget for connecting and the call, replay included
+        deadline = asyncio.get_running_loop().time() + timeout
+
+        for attempt in range(2):
+            try:
+                async with asyncio.timeout_at(deadline):
+                    pooled = await self._checkout(key, config, stats)
+            except TimeoutError:
+                stats.errors += 1
+                raise
+            start = time.monotonic()
+            try:
+                async with asyncio.timeout_at(deadline):
+                    result = await operation(pooled.session)
+            except McpError as e:
+                # Protocol-level error from a live server keeps the session; a closed
+                # connection (e.g. the stdio process exited) does not
+                stats.errors += 1
+                await self._release(pooled, broken=e.error.code == CONNECTION_CLOSED)
+                raise
+            except Exception as e:
+                stats.errors += 1
+                # A timeout only abandons this request (its response is dropped when it
+                # arrives); other callers' requests on the session keep running
+                broken = isinstance(e, _CONNECTION_ERRORS) or not pooled.alive
+                await self._release(pooled, broken=broken)
+                replay = (
+                    attempt == 0
+                    and broken
+                    and pooled.reused
+                    and (idempotent or isinstance(e, _UNSENT_ERRORS))
+                )
+                if not replay:
+                    raise
+                stats.replays += 1
+                logger.warning(f"MCP session to {key.label} failed ({type(e).__name__}: {e}), reconnecting")
+                continue
+
+            elapsed_ms = (time.monotonic() - start) * 1000
+            stats.requests += 1
+            stats.latencies.append(elapsed_ms)
+            pooled.last_ok = time.monotonic()
+            await self._release(pooled)
+            return result
+
+    async def _checkout(self, key: MCPServerKey, config: Dict[str, Any], stats: _ServerStats) -> _PooledSession:
+        self._bind_loop()
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+
+        async with lock:
+            pooled = self._sessions.get(key)
+            if pooled is not None and not pooled.alive:
+                await self._close(pooled)
+                pooled = None
+
+            if pooled is not None and pooled.in_use == 0 and time.monotonic() - pooled.last_ok > self._health_check_interval:
+                try:
+                    async with asyncio.timeout(MCP_POOL_PING_TIMEOUT):
+                        await pooled.session.send_ping()
+                    pooled.last_ok = time.monotonic()
+                except Exception as e:
+                    self._health_check_failures += 1
+                    logger.debug(f"MCP session to {key.label} failed health check: {e}")
+                    await self._close(pooled)
+                    pooled = None
+
+            if pooled is None:
+                ephemeral = not await self._make_room()
+                if ephemeral:
+                    self._overflow += 1
+                pooled = await self._connect(key, config, stats, ephemeral)
+                if not ephemeral:
+                    self._sessions[key] = pooled
+            else:
+                pooled.reused = True
+
+            pooled.in_use += 1
+            return pooled
+
+    async def _release(self, pooled: _PooledSession, broken: bool = False) -> None:
+        pooled.in_use -= 1
+        pooled.last_used = time.monotonic()
+        if broken or pooled.ephemeral:
+            await self._close(pooled)
+
+    async def _connect(self, key: MCPServerKey, config: Dict[str, Any], stats: _ServerStats, ephemeral: bool) -> _PooledSession:
+        pooled = _PooledSession(key, config, ephemeral=ephemeral)
+        opened = asyncio.get_running_loop().create_future()
+        start = time.monotonic()
+        pooled.task = asyncio.create_task(self._own(pooled, opened))
+        try:
+            await asyncio.wait_for(opened, timeout=MCP_POOL_CONNECT_TIMEOUT)
+        except BaseException:
+            await self._close(pooled)
+            raise
+
+        stats.connects += 1
+        stats.connect_ms += (time.monotonic() - start) * 1000
+        logger.debug(f"MCP session opened to {key.label} in {(time.monotonic() - start) * 1000:.0f}ms")
+        return pooled
+
+    async def _own(self, pooled: _PooledSession, opened: asyncio.Future) -> None:
+        try:
+            async with _open_transport(pooled.key.transport, pooled.config) as streams:
+                read_stream, write_stream = streams[0], streams[1]
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    pooled.session = session
+                    if not opened.done():
+                        opened.set_result(None)
+                    await pooled.closing.wait()
+        except Exception as e:
+            if not opened.done():
+                opened.set_exception(e)
+            elif not pooled.closing.is_set():
+                logger.debug(f"MCP session to {pooled.key.label} closed unexpectedly: {e}")
+        finally:
+            if not opened.done():
+                opened.cancel()
+            pooled.closing.set()
+            if self._sessions.get(pooled.key) is pooled:
+                del self._sessions[pooled.key]
+
+    async def _close(self, pooled: _PooledSession) -> None:
+        if self._sessions.get(pooled.key) is pooled:
+            del self._sessions[pooled.key]
+        pooled.closing.set()
+        task = pooled.task
+        if task is None or task.done() or task is asyncio.current_task():
+            return
+        done, _ = await asyncio.wait({task}, timeout=MCP_POOL_CLOSE_TIMEOUT)
+        if not done:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _make_room(self) -> bool:
+        while len(self._sessions) >= self._max_sessions:
+            idle = [p for p in self._sessions.values() if p.in_use == 0]
+            if not idle:
+                return False
+            victim = min(idle, key=lambda p: p.last_used)
+            self._evicted_cap += 1
+            await self._close(victim)
+        return True
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            if self._reaper is None or self._reaper.done():
+                self._reaper = asyncio.create_task(self._reap_idle())
+            return
+        # Sessions and locks from another event loop (e.g. a previous asyncio.run)
+        # can neither be used nor closed from here; forget them.
+        self._sessions.clear()
+        self._locks.clear()
+        self._loop = loop
+        self._reaper = asyncio.create_task(self._reap_idle())
+
+    async def _reap_idle(self) -> None:
+        interval = max(1.0, min(self._idle_ttl / 2, 30.0))
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            expired = [p for p in self._sessions.values() if p.in_use == 0 and now - p.last_used > self._idle_ttl]
+            for pooled in expired:
+                self._evicted_idle += 1
+                logger.debug(f"Closing idle MCP session to {pooled.key.label}")
+                try:
+                    await self._close(pooled)
+                except Exception as e:
+                    logger.warning(f"Error closing idle MCP session to {pooled.key.label}: {e}")
+
+    async def close_all(self) -> None:
+        if self._reaper is not None and not self._reaper.done():
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+        self._reaper = None
+        for pooled in list(self._sessions.values()):
+            await self._close(pooled)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "open_sessions": len(self._sessions),
+            "max_sessions": self._max_sessions,
+            "evicted_idle": self._evicted_idle,
+            "evicted_cap": self._evicted_cap,
+            "overflow": self._overflow,
+            "health_check_failures": self._health_check_failures,
+            "servers": {label: stats.to_dict() for label, stats in self._stats.items()},
+        }
+
+
+mcp_session_pool = MCPSessionPool()
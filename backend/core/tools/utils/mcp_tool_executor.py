@@ -1,15 +1,11 @@
 import json
-import asyncio
 import ipaddress
 import socket
 from typing import Dict, Any
 from urllib.parse import urlparse
 from core.agentpress.tool import ToolResult
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.sse import sse_client
-from mcp.client.stdio import stdio_client
-from mcp.client.streamable_http import streamablehttp_client
 from core.mcp_module import mcp_service
+from core.tools.utils.mcp_session_pool import mcp_session_pool
 from core.utils.logger import logger
 
 
@@ -170,30 +166,14 @@ class MCPToolExecutor:
         original_tool_name = tool_info['original_name']
         
         url = custom_config['url']
-        headers = custom_config.get('headers', {})
         
         # SSRF Protection: Validate URL before connecting
         is_safe, error_msg = is_safe_url(url)
         if not is_safe:
             return self._create_error_result(f"URL validation failed: {error_msg}")
         
-        async with asyncio.timeout(30):
-            try:
-                async with sse_client(url, headers=headers) as (read, write):
-                    async with ClientSession(read, write) as session:
-                        await session.initialize()
-                        result = await session.call_tool(original_tool_name, arguments)
-                        return self._create_success_result(self._extract_content(result))
-                        
-            except TypeError as e:
-                if "unexpected keyword argument" in str(e):
-                    async with sse_client(url) as (read, write):
-                        async with ClientSession(read, write) as session:
-                            await session.initialize()
-                            result = await session.call_tool(original_tool_name, arguments)
-                            return self._create_success_result(self._extract_content(result))
-                else:
-                    raise
+        result = await mcp_session_pool.call_tool('sse', custom_config, original_tool_name, arguments)
+        return self._create_success_result(self._extract_content(result))
     
     async def _execute_http_tool(self, tool_name: str, arguments: Dict[str, Any], tool_info: Dict[str, Any]) -> ToolResult:
         custom_config = tool_info['custom_config']
@@ -207,12 +187,8 @@ class MCPToolExecutor:
             return self._create_error_result(f"URL validation failed: {error_msg}")
         
         try:
-            async with asyncio.timeout(30):
-                async with streamablehttp_client(url) as (read, write, _):
-                    async with ClientSession(read, write) as session:
-                        await session.initialize()
-                        result = await session.call_tool(original_tool_name, arguments)
-                        return self._create_success_result(self._extract_content(result))
+            result = await mcp_session_pool.call_tool('http', custom_config, original_tool_name, arguments)
+            return self._create_success_result(self._extract_content(result))
                         
         except Exception as e:
             logger.error(f"Error executing HTTP MCP tool: {str(e)}")
@@ -222,18 +198,8 @@ class MCPToolExecutor:
         custom_config = tool_info['custom_config']
         original_tool_name = tool_info['original_name']
         
-        server_params = StdioServerParameters(
-            command=custom_config["command"],
-            args=custom_config.get("args", []),
-            env=custom_config.get("env", {})
-        )
-        
-        async with asyncio.timeout(30):
-            async with stdio_client(server_params) as (read, write):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    result = await session.call_tool(original_tool_name, arguments)
-                    return self._create_success_result(self._extract_content(result))
+        result = await mcp_session_pool.call_tool('json', custom_config, original_tool_name, arguments)
+        return self._create_success_result(self._extract_content(result))
     
     async def _resolve_external_user_id(self, custom_config: Dict[str, Any]) -> str:
         profile_id = custom_config.get('profile_id')
@@ -5,17 +5,22 @@ from core.utils.config import config
 from core.sandbox.tool_base import SandboxToolsBase
 from core.agentpress.thread_manager import ThreadManager
 from core.services.http_client import get_http_client
+from core.cache.tool_result_cache import cached_tool_call, normalize_query, normalize_url
+from core.tools.utils.image_enrichment import enrich_images, image_transfer_report
+from core.tools.utils.image_probe import ImageTransferStats
 import json
 import datetime
 import asyncio
 import logging
 import time
-import base64
-import replicate
 import httpx
 
 # TODO: add subpages, etc... in filters as sometimes its necessary 
 
+# Shared tool result cache TTLs (seconds)
+SEARCH_CACHE_TTL = 15 * 60  # answers to "latest ..." queries go stale quickly
+SCRAPE_CACHE_TTL = 60 * 60
+
 @tool_metadata(
     display_name="Web Search",
     description="Search the internet for information, news, and research",
@@ -205,9 +210,10 @@ class SandboxWebSearchTool(SandboxToolsBase):
                 
                 # Execute all searches concurrently
                 start_time = time.time()
+                transfers = [ImageTransferStats() for _ in queries]
                 tasks = [
-                    self._execute_single_search(q, num_results) 
-                    for q in queries
+                    self._execute_single_search(q, num_results, transfer)
+                    for q, transfer in zip(queries, transfers)
                 ]
                 search_results = await asyncio.gather(*tasks, return_exceptions=True)
                 elapsed_time = time.time() - start_time
@@ -249,7 +255,8 @@ class SandboxWebSearchTool(SandboxToolsBase):
                 
                 return ToolResult(
                     success=all_successful,
-                    output=json.dumps(batch_response, ensure_ascii=False)
+                    output=json.dumps(batch_response, ensure_ascii=False),
+                    metadata={"image_transfer": image_transfer_report(queries, transfers)}
                 )
             else:
                 if not query or not isinstance(query, str):
@@ -261,22 +268,26 @@ class SandboxWebSearchTool(SandboxToolsBase):
                 
                 logging.info(f"Executing web search for query: '{query}' with {num_results} results")
                 start_time = time.time()
-                result = await self._execute_single_search(query, num_results)
+                transfer = ImageTransferStats()
+                result = await self._execute_single_search(query, num_results, transfer)
                 elapsed_time = time.time() - start_time
                 
                 response = result.get("response", {})
                 response["elapsed_time"] = round(elapsed_time, 2)
+                metadata = {"image_transfer": image_transfer_report([query], [transfer])}
                 
                 if result.get("success", False):
                     return ToolResult(
                         success=True,
-                        output=json.dumps(response, ensure_ascii=False)
+                        output=json.dumps(response, ensure_ascii=False),
+                        metadata=metadata
                     )
                 else:
                     logging.warning(f"No search results or answer found for query: '{query}'")
                     return ToolResult(
                         success=False,
-                        output=json.dumps(response, ensure_ascii=False)
+                        output=json.dumps(response, ensure_ascii=False),
+                        metadata=metadata
                     )
         
         except Exception as e:
@@ -287,14 +298,22 @@ class SandboxWebSearchTool(SandboxToolsBase):
             if len(error_message) > 200:
                 simplified_message += "..."
             return self.fail_response(simplified_message)
-    
-    async def _execute_single_search(self, query: str, num_results: int) -> dict:
+
+    @cached_tool_call(
+        "tavily_search", ttl=SEARCH_CACHE_TTL,
+        key=lambda self, query, num_results, transfer=None: (normalize_query(query), num_results),
+        cacheable=lambda result: bool(result.get("success"))
+    )
+    async def _execute_single_search(
+        self, query: str, num_results: int, transfer: ImageTransferStats | None = None
+    ) -> dict:
         """
         Helper function to execute a single search query.
         
         Parameters:
         - query: The search query string
         - num_results: Number of results to return
+        - transfer: Collects the image bytes downloaded while enriching results
         
         Returns:
         - dict with success status, results, answer, images (with OCR & dimensions), and full response
@@ -314,12 +333,13 @@ class SandboxWebSearchTool(SandboxToolsBase):
             raw_images = search_response.get('images', [])
             
             # Enrich images with OCR and dimensions
-            enriched_images = await self._enrich_images_with_metadata(raw_images)
+            transfer = transfer if transfer is not None else ImageTransferStats()
+            enriched_images = await enrich_images(raw_images, transfer)
             
             # Consider search successful if we have either results OR an answer
             success = len(results) > 0 or (answer and answer.strip())
             
-            logging.info(f"Retrieved search results for query: '{query}' - {len(results)} results, answer: {'yes' if answer else 'no'}, {len(enriched_images)} images enriched")
+            logging.info(f"Retrieved search results for query: '{query}' - {len(results)} results, answer: {'yes' if answer else 'no'}, {len(enriched_images)} images enriched ({transfer.bytes_transferred} image bytes, {transfer.full_downloads} full downloads)")
             
             # Update search_response with enriched images
             enriched_response = dict(search_response)
@@ -345,153 +365,6 @@ class SandboxWebSearchTool(SandboxToolsBase):
                 "error": error_message
             }
 
-    async def _enrich_images_with_metadata(self, images: list) -> list:
-        """
-        Enrich image URLs with OCR text and dimensions.
-        Downloads all images and runs OCR IN PARALLEL for speed.
-        
-        Args:
-            images: List of image URLs (strings) or image objects from Tavily
-            
-        Returns:
-            List of enriched image objects with url, width, height, and description
-        """
-        if not images:
-            return []
-        
-        # Collect valid image URLs
-        valid_images = []
-        for img in images:
-            if isinstance(img, str):
-                img_url = img
-            elif isinstance(img, dict):
-                img_url = img.get('url', '')
-            else:
-                continue
-            
-            if img_url:
-                valid_images.append(img_url)
-        
-        if not valid_images:
-            return []
-        
-        logging.info(f"[WebSearch] Starting parallel image enrichment for {len(valid_images)} images")
-        
-        # Process all images in parallel
-        async with get_http_client() as client:
-            tasks = [self._enrich_single_image(img_url, client) for img_url in valid_images]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Collect results, handling any exceptions
-        enriched = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logging.debug(f"[WebSearch] Error enriching image {i}: {result}")
-                enriched.append({
-                    "url": valid_images[i],
-                    "width": 0,
-                    "height": 0,
-                    "description": ""
-                })
-            else:
-                enriched.append(result)
-        
-        logging.info(f"[WebSearch] Completed parallel enrichment for {len(enriched)} images")
-        return enriched
-    
-    async def _enrich_single_image(self, img_url: str, client) -> dict:
-        """
-        Download and enrich a single image with dimensions and description.
-        Uses Moondream2 vision model for image understanding.
-        
-        Args:
-            img_url: URL of the image
-            client: HTTP client for downloading
-            
-        Returns:
-            Enriched image data dict
-        """
-        image_data = {
-            "url": img_url,
-            "width": 0,
-            "height": 0,
-            "description": ""
-        }
-        
-        try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            }
-            
-            response = await client.get(img_url, headers=headers, timeout=15.0, follow_redirects=True)
-            
-            if response.status_code == 200:
-                image_bytes = response.content
-                content_type = response.headers.get("content-type", "")
-                
-                if content_type.startswith("image/"):
-                    # Get dimensions using PIL
-                    try:
-                        from PIL import Image
-                        from io import BytesIO
-                        img_pil = Image.open(BytesIO(image_bytes))
-                        image_data["width"] = img_pil.width
-                        image_data["height"] = img_pil.height
-                        logging.debug(f"[WebSearch] Image dimensions: {img_pil.width}x{img_pil.height}")
-                    except Exception as dim_err:
-                        logging.debug(f"[WebSearch] Could not get dimensions: {dim_err}")
-                    
-                    # Get image description using Moondream2
-                    description = await self._describe_image(image_bytes, content_type)
-                    image_data["description"] = description
-        
-        except Exception as e:
-            logging.debug(f"[WebSearch] Error enriching image {img_url[:50]}...: {str(e)[:100]}")
-        
-        return image_data
-    
-    async def _describe_image(self, image_bytes: bytes, content_type: str) -> str:
-        """
-        Get image description using Moondream2 vision model.
-        Runs in ~2 seconds on Replicate GPU, includes text extraction.
-        
-        Args:
-            image_bytes: Raw image bytes
-            content_type: MIME type of the image
-            
-        Returns:
-            Image description, or empty string if processing fails
-        """
-        try:
-            logging.debug(f"[WebSearch] Running Moondream2 on image ({len(image_bytes)} bytes)")
-            
-            # Convert to base64 data URL
-            image_b64 = base64.b64encode(image_bytes).decode("utf-8")
-            data_url = f"data:{content_type};base64,{image_b64}"
-            
-            # Call Moondream2 vision model
-            def run_moondream(data_url: str) -> str:
-                output = replicate.run(
-                    "lucataco/moondream2:72ccb656353c348c1385df54b237eeb7bfa874bf11486cf0b9473e691b662d31",
-                    input={
-                        "image": data_url,
-                        "prompt": "Describe this image in detail. Include any text visible in the image."
-                    }
-                )
-                # Output is a generator, consume it to get the full text
-                if hasattr(output, '__iter__') and not isinstance(output, (str, bytes)):
-                    return "".join(str(chunk) for chunk in output)
-                return str(output) if output else ""
-            
-            description = await asyncio.to_thread(run_moondream, data_url)
-            
-            logging.debug(f"[WebSearch] Got description: {len(description)} chars")
-            return description.strip()
-            
-        except Exception as e:
-            logging.debug(f"[WebSearch] Moondream2 error: {e}")
-            return ""
-
     @openapi_schema({
         "type": "function",
         "function": {
@@ -613,6 +486,62 @@ class SandboxWebSearchTool(SandboxToolsBase):
             logging.error(f"Error in scrape_webpage: {error_message}")
             return self.fail_response(f"Error processing scrape request: {error_message[:200]}")
     
+    @cached_tool_call(
+        "firecrawl_scrape", ttl=SCRAPE_CACHE_TTL,
+        key=lambda self, url, include_html=False: (normalize_url(url), bool(include_html)),
+        cacheable=lambda data: bool(data.get("data", {}).get("markdown"))
+    )
+    async def _firecrawl_scrape(self, url: str, include_html: bool = False) -> dict:
+        """Fetch a page through the Firecrawl scrape endpoint (with retries on timeouts)."""
+        # ---------- Firecrawl scrape endpoint ----------
+        logging.info(f"Sending request to Firecrawl for URL: {url}")
+        async with get_http_client() as client:
+            headers = {
+                "Authorization": f"Bearer {self.firecrawl_api_key}",
+                "Content-Type": "application/json",
+            }
+            # Determine formats to request based on include_html flag
+            formats = ["markdown"]
+            if include_html:
+                formats.append("html")
+            
+            payload = {
+                "url": url,
+                "formats": formats
+            }
+            
+            # Use longer timeout and retry logic for more reliability
+            max_retries = 3
+            timeout_seconds = 30
+            retry_count = 0
+            
+            while retry_count < max_retries:
+                try:
+                    logging.info(f"Sending request to Firecrawl (attempt {retry_count + 1}/{max_retries})")
+                    response = await client.post(
+                        f"{self.firecrawl_url}/v1/scrape",
+                        json=payload,
+                        headers=headers,
+                        timeout=timeout_seconds,
+                    )
+                    response.raise_for_status()
+                    data = response.json()
+                    logging.info(f"Successfully received response from Firecrawl for {url}")
+                    break
+                except (httpx.ReadTimeout, httpx.ConnectTimeout, httpx.ReadError) as timeout_err:
+                    retry_count += 1
+                    logging.warning(f"Request timed out (attempt {retry_count}/{max_retries}): {str(timeout_err)}")
+                    if retry_count >= max_retries:
+                        raise Exception(f"Request timed out after {max_retries} attempts with {timeout_seconds}s timeout")
+                    # Exponential backoff
+                    logging.info(f"Waiting {2 ** retry_count}s before retry")
+                    await asyncio.sleep(2 ** retry_count)
+                except Exception as e:
+                    # Don't retry on non-timeout errors
+                    logging.error(f"Error during scraping: {str(e)}")
+                    raise e
+        return data
+
     async def _scrape_single_url(self, url: str, include_html: bool = False) -> dict:
         """
         Helper function to scrape a single URL and return the result information.
@@ -630,53 +559,7 @@ class SandboxWebSearchTool(SandboxToolsBase):
         logging.info(f"Scraping single URL: {url}")
         
         try:
-            # ---------- Firecrawl scrape endpoint ----------
-            logging.info(f"Sending request to Firecrawl for URL: {url}")
-            async with get_http_client() as client:
-                headers = {
-                    "Authorization": f"Bearer {self.firecrawl_api_key}",
-                    "Content-Type": "application/json",
-                }
-                # Determine formats to request based on include_html flag
-                formats = ["markdown"]
-                if include_html:
-                    formats.append("html")
-                
-                payload = {
-                    "url": url,
-                    "formats": formats
-                }
-                
-                # Use longer timeout and retry logic for more reliability
-                max_retries = 3
-                timeout_seconds = 30
-                retry_count = 0
-                
-                while retry_count < max_retries:
-                    try:
-                        logging.info(f"Sending request to Firecrawl (attempt {retry_count + 1}/{max_retries})")
-                        response = await client.post(
-                            f"{self.firecrawl_url}/v1/scrape",
-                            json=payload,
-                            headers=headers,
-                            timeout=timeout_seconds,
-                        )
-                        response.raise_for_status()
-                        data = response.json()
-                        logging.info(f"Successfully received response from Firecrawl for {url}")
-                        break
-                    except (httpx.ReadTimeout, httpx.ConnectTimeout, httpx.ReadError) as timeout_err:
-                        retry_count += 1
-                        logging.warning(f"Request timed out (attempt {retry_count}/{max_retries}): {str(timeout_err)}")
-                        if retry_count >= max_retries:
-                            raise Exception(f"Request timed out after {max_retries} attempts with {timeout_seconds}s timeout")
-                        # Exponential backoff
-                        logging.info(f"Waiting {2 ** retry_count}s before retry")
-                        await asyncio.sleep(2 ** retry_count)
-                    except Exception as e:
-                        # Don't retry on non-timeout errors
-                        logging.error(f"Error during scraping: {str(e)}")
-                        raise e
+            data = await self._firecrawl_scrape(url, include_html)
 
             # Format the response
             title = data.get("data", {}).get("metadata", {}).get("title", "")
@@ -276,6 +276,15 @@ class Configuration:
     # Vercel Analytics (via drains) - primary source of truth for visitor tracking
     VERCEL_DRAIN_SECRET: Optional[str] = None  # Secret for authenticating Vercel drain webhooks
 
+    # Record LLM usage in the Redis usage ledger and settle credits in batches (vs. inline deduction)
+    USAGE_LEDGER_ENABLED: bool = True
+
+    # Send a second streaming LLM request when the first token is later than the deployment's p95 TTFT
+    LLM_HEDGING_ENABLED: bool = False
+
+    # Share search/scrape tool results across runs through the Redis tool result cache
+    TOOL_RESULT_CACHE_ENABLED: bool = True
+
     # LLM API keys
     ANTHROPIC_API_KEY: Optional[str] = None
     OPENAI_API_KEY: Optional[str] = None
@@ -1,13 +1,16 @@
 from .parser import (
     FastParse,
     ParseResult,
+    ParseChunk,
     ParseError,
     FileType,
     parse,
     parse_file,
+    iter_parse,
     get_parser,
 )
 from .config import FastParseConfig, DEFAULT_CONFIG
+from .engine import ParseEngine, PARSER_VERSION, get_parse_engine
 from .async_parser import (
     AsyncFastParse,
     ImageAnalysisResult,
@@ -49,12 +52,17 @@ from .exceptions import (
 __all__ = [
     "FastParse",
     "ParseResult",
+    "ParseChunk",
     "ParseError",
     "FileType",
     "FastParseConfig",
     "DEFAULT_CONFIG",
+    "ParseEngine",
+    "PARSER_VERSION",
+    "get_parse_engine",
     "parse",
     "parse_file",
+    "iter_parse",
     "get_parser",
     "AsyncFastParse",
     "ImageAnalysisResult",
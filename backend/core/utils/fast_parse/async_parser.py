@@ -2,13 +2,13 @@ from __future__ import annotations
 import asyncio
 import base64
 import io
-from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union, BinaryIO, Callable
 
 from .parser import FastParse, ParseResult, ParseError, FileType
 from .config import FastParseConfig, DEFAULT_CONFIG
+from .engine import ParseEngine, get_parse_engine
 
 
 @dataclass
@@ -22,18 +22,18 @@ class ImageAnalysisResult:
 
 
 class AsyncFastParse:
-    __slots__ = ("_sync_parser", "_config", "_executor", "_image_analyzer")
+    __slots__ = ("_sync_parser", "_config", "_image_analyzer", "_engine")
     
     def __init__(
         self,
         config: Optional[FastParseConfig] = None,
-        max_workers: int = 4,
         image_analyzer: Optional[Callable] = None,
+        engine: Optional[ParseEngine] = None,
     ):
         self._config = config or DEFAULT_CONFIG
         self._sync_parser = FastParse(self._config)
-        self._executor = ThreadPoolExecutor(max_workers=max_workers)
         self._image_analyzer = image_analyzer
+        self._engine = engine or get_parse_engine()
     
     def set_image_analyzer(self, analyzer: Callable) -> None:
         self._image_analyzer = analyzer
@@ -45,11 +45,9 @@ class AsyncFastParse:
         mime_type: Optional[str] = None,
         analyze_images: bool = False,
     ) -> ParseResult:
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            self._executor,
-            lambda: self._sync_parser.parse(content, filename, mime_type)
-        )
+        if hasattr(content, "read"):
+            content = content.read()
+        result = await self._engine.parse(content, filename, mime_type, self._config)
         
         if analyze_images and result.file_type == FileType.IMAGE and result.success:
             if self._image_analyzer:
@@ -111,11 +109,7 @@ class AsyncFastParse:
                 error=f"File exceeds maximum size limit of {self._config.max_file_size_bytes / (1024*1024):.1f}MB",
             )
         
-        loop = asyncio.get_event_loop()
-        content = await loop.run_in_executor(
-            self._executor,
-            lambda: path.read_bytes()
-        )
+        content = await asyncio.to_thread(path.read_bytes)
         
         return await self.parse(content, path.name, analyze_images=analyze_images)
     
@@ -155,11 +149,7 @@ class AsyncFastParse:
             if asyncio.iscoroutinefunction(self._image_analyzer):
                 result = await self._image_analyzer(image_bytes, filename, mime_type)
             else:
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(
-                    self._executor,
-                    lambda: self._image_analyzer(image_bytes, filename, mime_type)
-                )
+                result = await asyncio.to_thread(self._image_analyzer, image_bytes, filename, mime_type)
             
             if isinstance(result, ImageAnalysisResult):
                 return result
@@ -199,7 +189,8 @@ class AsyncFastParse:
         return self._sync_parser.detect_file_type(filename, mime_type)
     
     async def close(self) -> None:
-        self._executor.shutdown(wait=False)
+        # Parsing runs in the shared ParseEngine, which outlives this wrapper
+        pass
     
     async def __aenter__(self) -> "AsyncFastParse":
         return self
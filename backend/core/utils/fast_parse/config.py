@@ -12,6 +12,11 @@ class FastParseConfig:
     enable_script_detection: bool = True
     enable_image_analysis: bool = True
     image_analysis_timeout: float = 30.0
+    process_workers: int = 2
+    process_job_timeout: float = 120.0
+    process_inline_max_bytes: int = 128 * 1024
+    result_cache_max_bytes: int = 64 * 1024 * 1024
+    result_cache_ttl_seconds: int = 24 * 60 * 60
     
     dangerous_patterns: Set[str] = field(default_factory=lambda: {
         "<script",
@@ -0,0 +1,378 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import mimetypes
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Union, BinaryIO
+
+from .parser import FastParse, ParseResult, FileType
+from .config import FastParseConfig, DEFAULT_CONFIG
+
+# Bump whenever extraction output changes, so results cached by older code are ignored
+PARSER_VERSION = "1"
+
+_REDIS_KEY_PREFIX = "fast_parse:result"
+_REDIS_MAX_CONTENT_CHARS = 2_000_000
+_HASH_IN_THREAD_BYTES = 1024 * 1024
+_MAX_TASKS_PER_CHILD = 50
+
+# Cheap to parse, and the binary placeholder embeds the filename: never pooled or cached
+_INLINE_TYPES = (FileType.IMAGE, FileType.BINARY)
+
+
+def _parse_job(
+    file_bytes: bytes,
+    filename: str,
+    mime_type: str,
+    config: FastParseConfig,
+    max_chars: Optional[int] = None,
+) -> ParseResult:
+    parser = FastParse(config)
+    if max_chars is not None:
+        # Stops reading pages/rows once the budget is reached
+        return parser.parse_stream(file_bytes, filename, mime_type, max_chars)
+    return parser.parse(file_bytes, filename, mime_type)
+
+
+def _config_digest(config: FastParseConfig) -> str:
+    limits = (
+        config.max_pdf_pages,
+        config.max_excel_rows,
+        config.max_excel_sheets,
+        config.max_text_chars,
+        config.enable_script_detection,
+        sorted(config.dangerous_patterns),
+    )
+    return hashlib.sha256(repr(limits).encode()).hexdigest()[:12]
+
+
+def _copy_result(result: ParseResult, filename: str, mime_type: str) -> ParseResult:
+    return replace(
+        result,
+        filename=filename,
+        mime_type=mime_type,
+        metadata=dict(result.metadata),
+        warnings=list(result.warnings),
+    )
+
+
+def _result_to_json(result: ParseResult) -> str:
+    return json.dumps({
+        "content": result.content,
+        "file_type": result.file_type.name,
+        "file_size": result.file_size,
+        "metadata": result.metadata,
+        "warnings": result.warnings,
+    }, default=str)
+
+
+def _result_from_json(raw: Union[str, bytes], filename: str, mime_type: str) -> ParseResult:
+    data = json.loads(raw)
+    return ParseResult(
+        success=True,
+        content=data["content"],
+        file_type=FileType[data["file_type"]],
+        filename=filename,
+        mime_type=mime_type,
+        file_size=data["file_size"],
+        metadata=data.get("metadata", {}),
+        warnings=data.get("warnings", []),
+    )
+
+
+class ParseEngine:
+    """Runs FastParse in a bounded process pool with a content-addressed result cache.
+
+    Document extraction holds the GIL for the whole parse, so running it in threads
+    still stalls the event loop. Jobs go to spawned worker processes instead, each
+    bounded by the config's size limit and process_job_timeout. A job that times out
+    cannot be cancelled: its pool is retired (new jobs go to a fresh pool), the
+    other jobs on it run to completion, and only then are its workers killed.
+    Successful results are cached by sha256(bytes) + PARSER_VERSION + extension +
+    config limits, in an in-process LRU and in Redis, so the same upload is only
+    parsed once.
+    """
+
+    __slots__ = (
+        "_max_workers", "_pool", "_jobs", "_draining", "_cache", "_cache_bytes", "_cache_max_bytes",
+        "_use_redis", "_inflight", "_stats",
+    )
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        cache_max_bytes: Optional[int] = None,
+        use_redis: bool = True,
+    ):
+        self._max_workers = max_workers or DEFAULT_CONFIG.process_workers
+        self._use_redis = use_redis
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Submitted, unfinished jobs per pool, so a retired pool can drain before it is killed
+        self._jobs: Dict[ProcessPoolExecutor, Set[Future]] = {}
+        self._draining: Set[asyncio.Task] = set()
+        self._cache: "OrderedDict[str, ParseResult]" = OrderedDict()
+        self._cache_bytes = 0
+        self._cache_max_bytes = cache_max_bytes if cache_max_bytes is not None else DEFAULT_CONFIG.result_cache_max_bytes
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats = {
+            "parsed_in_pool": 0,
+            "parsed_inline": 0,
+            "cache_hits": 0,
+            "redis_hits": 0,
+            "shared": 0,
+            "timeouts": 0,
+            "pool_restarts": 0,
+            "pools_retired": 0,
+        }
+
+    async def parse(
+        self,
+        content: Union[bytes, BinaryIO, str],
+        filename: str,
+        mime_type: Optional[str] = None,
+        config: Optional[FastParseConfig] = None,
+        max_chars: Optional[int] = None,
+    ) -> ParseResult:
+        """Parse content; with max_chars, extraction streams and stops at that many characters."""
+        config = config or DEFAULT_CONFIG
+        if isinstance(content, str):
+            file_bytes = content.encode("utf-8")
+        elif hasattr(content, "read"):
+            file_bytes = content.read()
+        else:
+            file_bytes = bytes(content)
+
+        parser = FastParse(config)
+        if len(file_bytes) > config.max_file_size_bytes:
+            # Rejected before any hashing or dispatch
+            return parser.parse(file_bytes, filename, mime_type)
+
+        if not mime_type:
+            mime_type, _ = mimetypes.guess_type(filename)
+            mime_type = mime_type or "application/octet-stream"
+
+        file_type = parser.detect_file_type(filename, mime_type)
+        if file_type in _INLINE_TYPES:
+            self._stats["parsed_inline"] += 1
+            return await asyncio.to_thread(parser.parse, file_bytes, filename, mime_type)
+
+        if len(file_bytes) > _HASH_IN_THREAD_BYTES:
+            digest = (await asyncio.to_thread(hashlib.sha256, file_bytes)).hexdigest()
+        else:
+            digest = hashlib.sha256(file_bytes).hexdigest()
+        key = f"{PARSER_VERSION}:{digest}:{Path(filename).suffix.lower()}:{file_type.name}:{_config_digest(config)}:{max_chars or ''}"
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self._stats["cache_hits"] += 1
+            return _copy_result(cached, filename, mime_type)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["shared"] += 1
+            return _copy_result(await asyncio.shield(inflight), filename, mime_type)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._redis_get(key, filename, mime_type)
+            if result is None:
+                result = await self._run(file_bytes, filename, mime_type, config, file_type, max_chars)
+                if result.success and result.file_type not in _INLINE_TYPES:
+                    await self._redis_put(key, result, config)
+            if result.success and result.file_type not in _INLINE_TYPES:
+                self._cache_put(key, result)
+            future.set_result(result)
+            return _copy_result(result, filename, mime_type)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def parse_many(
+        self,
+        items: List[Dict[str, Any]],
+        config: Optional[FastParseConfig] = None,
+    ) -> List[ParseResult]:
+        """Parse [{content, filename, mime_type?}] concurrently across the pool."""
+        return await asyncio.gather(*(
+            self.parse(item["content"], item["filename"], item.get("mime_type"), config)
+            for item in items
+        ))
+
+    async def _run(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        mime_type: str,
+        config: FastParseConfig,
+        file_type: FileType,
+        max_chars: Optional[int] = None,
+    ) -> ParseResult:
+        if file_type == FileType.TEXT and len(file_bytes) <= config.process_inline_max_bytes:
+            # Small text decodes faster than the round-trip to a worker
+            self._stats["parsed_inline"] += 1
+            return await asyncio.to_thread(_parse_job, file_bytes, filename, mime_type, config, max_chars)
+
+        for attempt in range(2):
+            pool = self._get_pool()
+            try:
+                future = pool.submit(_parse_job, file_bytes, filename, mime_type, config, max_chars)
+            except (BrokenProcessPool, RuntimeError):
+                self._restart_pool(pool)
+                continue
+            jobs = self._jobs.setdefault(pool, set())
+            jobs.add(future)
+            future.add_done_callback(jobs.discard)
+            try:
+                result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=config.process_job_timeout)
+                self._stats["parsed_in_pool"] += 1
+                return result
+            except asyncio.TimeoutError:
+                # A running job cannot be cancelled; retire the pool and reclaim the worker once the others finish
+                self._stats["timeouts"] += 1
+                self._retire_pool(pool, config.process_job_timeout)
+                return ParseResult(
+                    success=False,
+                    content="",
+                    file_type=file_type,
+                    filename=filename,
+                    mime_type=mime_type,
+                    file_size=len(file_bytes),
+                    error=f"Parsing timed out after {config.process_job_timeout:.0f}s",
+                )
+            except BrokenProcessPool:
+                # A worker died; retry once on a fresh pool
+                self._restart_pool(pool)
+
+        return ParseResult(
+            success=False,
+            content="",
+            file_type=file_type,
+            filename=filename,
+            mime_type=mime_type,
+            file_size=len(file_bytes),
+            error="Parsing failed: parser process crashed",
+        )
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, not fork: forking a threaded event-loop process can deadlock the child
+            self._pool = ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=_MAX_TASKS_PER_CHILD,
+            )
+        return self._pool
+
+    def _restart_pool(self, pool: ProcessPoolExecutor) -> None:
+        if self._pool is not pool:
+            return
+        self._pool = None
+        self._stats["pool_restarts"] += 1
+        self._kill_pool(pool)
+
+    def _retire_pool(self, pool: ProcessPoolExecutor, drain_timeout: float) -> None:
+        """Stop using pool now; kill its workers after the jobs still running on it finish."""
+        if self._pool is not pool:
+            return  # Already retired (and draining) or restarted
+        self._pool = None
+        self._stats["pools_retired"] += 1
+        task = asyncio.get_running_loop().create_task(self._drain_and_kill(pool, drain_timeout))
+        self._draining.add(task)
+        task.add_done_callback(self._draining.discard)
+
+    async def _drain_and_kill(self, pool: ProcessPoolExecutor, drain_timeout: float) -> None:
+        # Every job gets at most drain_timeout, so waiting that long covers all but the hung ones
+        running = [asyncio.wrap_future(job) for job in list(self._jobs.get(pool, ())) if not job.done()]
+        if running:
+            await asyncio.wait(running, timeout=drain_timeout)
+        self._kill_pool(pool)
+
+    def _kill_pool(self, pool: ProcessPoolExecutor) -> None:
+        self._jobs.pop(pool, None)
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def _cache_put(self, key: str, result: ParseResult) -> None:
+        size = len(result.content)
+        if size > self._cache_max_bytes // 4:
+            return
+        if key in self._cache:
+            self._cache_bytes -= len(self._cache.pop(key).content)
+        self._cache[key] = result
+        self._cache_bytes += size
+        while self._cache_bytes > self._cache_max_bytes and self._cache:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted.content)
+
+    async def _redis_get(self, key: str, filename: str, mime_type: str) -> Optional[ParseResult]:
+        if not self._use_redis:
+            return None
+        try:
+            from core.services import redis as redis_service
+            raw = await redis_service.get(f"{_REDIS_KEY_PREFIX}:{key}", timeout=2.0)
+        except Exception:
+            return None
+        if not raw:
+            return None
+        self._stats["redis_hits"] += 1
+        return _result_from_json(raw, filename, mime_type)
+
+    async def _redis_put(self, key: str, result: ParseResult, config: FastParseConfig) -> None:
+        if not self._use_redis or len(result.content) > _REDIS_MAX_CONTENT_CHARS:
+            return
+        try:
+            from core.services import redis as redis_service
+            await redis_service.setex(
+                f"{_REDIS_KEY_PREFIX}:{key}",
+                config.result_cache_ttl_seconds,
+                _result_to_json(result),
+                timeout=2.0,
+            )
+        except Exception:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "workers": self._max_workers,
+            "cache_entries": len(self._cache),
+            "cache_bytes": self._cache_bytes,
+        }
+
+    def shutdown(self) -> None:
+        for task in list(self._draining):
+            task.cancel()
+        for pool in list(self._jobs):
+            if pool is not self._pool:
+                self._kill_pool(pool)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._jobs.clear()
+
+
+_default_engine: Optional[ParseEngine] = None
+
+
+def get_parse_engine() -> ParseEngine:
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = ParseEngine()
+    return _default_engine
@@ -2,11 +2,13 @@ from __future__ import annotations
 import io
 import os
 import re
+import codecs
 import mimetypes
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from enum import Enum, auto
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union, BinaryIO
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union, BinaryIO
 import chardet
 
 from .config import FastParseConfig, DEFAULT_CONFIG
@@ -71,6 +73,35 @@ class ParseResult:
         }
 
 
+@dataclass
+class ParseChunk:
+    """One page, slide, sheet block or text block from FastParse.iter_parse.
+
+    Chunks carry their own leading separator, so "".join(c.content for c in chunks)
+    is the same text parse() returns, and offset is the chunk's position in it.
+    """
+    index: int
+    kind: str
+    label: str
+    content: str
+    offset: int
+    truncated: bool = False
+
+
+class _Joiner:
+    __slots__ = ("_sep", "_started")
+    
+    def __init__(self, sep: str):
+        self._sep = sep
+        self._started = False
+    
+    def add(self, part: str) -> str:
+        if self._started:
+            return self._sep + part
+        self._started = True
+        return part
+
+
 class FastParse:
     __slots__ = ("_config", "_extension_map")
     
@@ -218,6 +249,347 @@ class FastParse:
         
         return self.parse(content, path.name)
     
+    def iter_parse(
+        self,
+        source: Union[str, Path, bytes, BinaryIO],
+        filename: Optional[str] = None,
+        mime_type: Optional[str] = None,
+        max_chars: Optional[int] = None,
+    ) -> Iterator[ParseChunk]:
+        """Yield a document incrementally instead of building the whole text in memory.
+
+        source is a path, raw bytes or a binary file object; paths are read through a
+        file handle. PDFs yield one chunk per page, PPTX one per slide, XLSX/CSV blocks
+        of rows per sheet and text blocks of config.chunk_size bytes. Iteration stops
+        after max_chars characters (default max_text_chars), so later pages are never
+        read. Formats without a streaming reader are parsed whole and yielded as one
+        chunk. Raises ParseError if the file cannot be read.
+        """
+        with self._open_source(source, filename) as (handle, name, _):
+            yield from self._iter_chunks(handle, name, mime_type, max_chars)
+    
+    def parse_stream(
+        self,
+        source: Union[str, Path, bytes, BinaryIO],
+        filename: Optional[str] = None,
+        mime_type: Optional[str] = None,
+        max_chars: Optional[int] = None,
+    ) -> ParseResult:
+        """parse() built on iter_parse: same text, bounded by max_chars, lighter metadata."""
+        name = self._source_name(source, filename)
+        if not mime_type:
+            mime_type, _ = mimetypes.guess_type(name)
+            mime_type = mime_type or "application/octet-stream"
+        file_type = self.detect_file_type(name, mime_type)
+        budget = self._config.max_text_chars if max_chars is None else max_chars
+        file_size = 0
+        
+        try:
+            with self._open_source(source, filename) as (handle, name, file_size):
+                parts: List[str] = []
+                truncated = False
+                for chunk in self._iter_chunks(handle, name, mime_type, budget):
+                    parts.append(chunk.content)
+                    truncated = chunk.truncated
+        except ParseError as e:
+            return ParseResult(
+                success=False,
+                content="",
+                file_type=file_type,
+                filename=name,
+                mime_type=mime_type,
+                file_size=file_size,
+                error=e.message,
+            )
+        except Exception as e:
+            return ParseResult(
+                success=False,
+                content="",
+                file_type=file_type,
+                filename=name,
+                mime_type=mime_type,
+                file_size=file_size,
+                error=f"Parsing failed: {str(e)}",
+            )
+        
+        content = "".join(parts)
+        warnings = self._check_script_injection(content)
+        if truncated:
+            warnings.append(f"Content truncated to {budget:,} characters")
+        
+        return ParseResult(
+            success=True,
+            content=content,
+            file_type=file_type,
+            filename=name,
+            mime_type=mime_type,
+            file_size=file_size,
+            metadata={"streamed": True, "chunks": len(parts), "truncated": truncated},
+            warnings=warnings,
+        )
+    
+    @staticmethod
+    def _source_name(source: Union[str, Path, bytes, BinaryIO], filename: Optional[str]) -> str:
+        if filename:
+            return filename
+        if isinstance(source, (str, Path)):
+            return Path(source).name
+        return Path(str(getattr(source, "name", "") or "")).name
+    
+    @contextmanager
+    def _open_source(self, source: Union[str, Path, bytes, BinaryIO], filename: Optional[str]):
+        name = self._source_name(source, filename)
+        if isinstance(source, (str, Path)):
+            path = Path(source)
+            if not path.is_file():
+                raise ParseError(f"File not found: {source}", "FILE_NOT_FOUND")
+            size = path.stat().st_size
+            handle: BinaryIO = open(path, "rb")
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            size = len(source)
+            handle = io.BytesIO(source)
+        else:
+            handle = source
+            start = handle.tell()
+            size = handle.seek(0, os.SEEK_END) - start
+            handle.seek(start)
+        
+        try:
+            if size > self._config.max_file_size_bytes:
+                raise ParseError(
+                    f"File exceeds maximum size limit of {self._config.max_file_size_bytes / (1024*1024):.1f}MB",
+                    "FILE_TOO_LARGE",
+                )
+            yield handle, name, size
+        finally:
+            if handle is not source:
+                handle.close()
+    
+    def _iter_chunks(
+        self,
+        handle: BinaryIO,
+        name: str,
+        mime_type: Optional[str],
+        max_chars: Optional[int],
+    ) -> Iterator[ParseChunk]:
+        if not mime_type:
+            mime_type, _ = mimetypes.guess_type(name)
+            mime_type = mime_type or "application/octet-stream"
+        file_type = self.detect_file_type(name, mime_type)
+        ext = Path(name).suffix.lower()
+        
+        if file_type == FileType.TEXT:
+            pieces = self._iter_text(handle)
+        elif file_type == FileType.PDF:
+            pieces = self._iter_pdf(handle)
+        elif file_type == FileType.EXCEL and ext == ".csv":
+            pieces = self._iter_csv(handle)
+        elif file_type == FileType.EXCEL and ext in (".xlsx", ".xlsm", ".xlsb"):
+            pieces = self._iter_xlsx(handle)
+        elif file_type == FileType.PRESENTATION and ext == ".pptx":
+            pieces = self._iter_pptx(handle)
+        elif file_type == FileType.WORD and ext == ".docx":
+            pieces = self._iter_docx(handle)
+        else:
+            pieces = self._iter_whole(handle, name, mime_type)
+        
+        budget = self._config.max_text_chars if max_chars is None else max_chars
+        offset = 0
+        try:
+            for index, (kind, label, text) in enumerate(pieces):
+                remaining = budget - offset
+                if len(text) > remaining:
+                    yield ParseChunk(index, kind, label, text[:remaining], offset, truncated=True)
+                    return
+                yield ParseChunk(index, kind, label, text, offset)
+                offset += len(text)
+        finally:
+            # Releases the reader (e.g. openpyxl's zip handle) when stopping early
+            pieces.close()
+    
+    def _detect_encoding(self, sample: bytes) -> str:
+        try:
+            encoding = chardet.detect(sample).get("encoding") or "utf-8"
+            codecs.lookup(encoding)
+        except Exception:
+            return "utf-8"
+        # A pure-ASCII head says nothing about later bytes; utf-8 is the safe superset
+        return "utf-8" if encoding.lower() == "ascii" else encoding
+    
+    def _iter_text(self, handle: BinaryIO) -> Iterator[Tuple[str, str, str]]:
+        block = handle.read(self._config.chunk_size)
+        decoder = codecs.getincrementaldecoder(self._detect_encoding(block[:10000]))(errors="replace")
+        position = 0
+        while block:
+            text = decoder.decode(block)
+            if text:
+                yield "text", f"bytes {position}-{position + len(block)}", text
+            position += len(block)
+            block = handle.read(self._config.chunk_size)
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield "text", f"bytes {position}-{position}", tail
+    
+    def _iter_csv(self, handle: BinaryIO) -> Iterator[Tuple[str, str, str]]:
+        block = handle.read(self._config.chunk_size)
+        decoder = codecs.getincrementaldecoder(self._detect_encoding(block[:10000]))(errors="replace")
+        joiner = _Joiner("\n")
+        rows = 0
+        first_row = 1
+        pending: List[str] = []
+        pending_size = 0
+        carry = ""
+        
+        while True:
+            final = not block
+            text = carry + decoder.decode(block, final=final)
+            lines = text.splitlines(keepends=True)
+            # The last line may continue in the next block (or be the \r of a \r\n)
+            carry = "" if final or not lines else lines.pop()
+            for line in lines:
+                if rows >= self._config.max_excel_rows:
+                    break
+                part = joiner.add((line.splitlines() or [""])[0])
+                pending.append(part)
+                pending_size += len(part)
+                rows += 1
+                if pending_size >= self._config.chunk_size:
+                    yield "sheet", f"rows {first_row}-{rows}", "".join(pending)
+                    pending, pending_size, first_row = [], 0, rows + 1
+            if final or rows >= self._config.max_excel_rows:
+                break
+            block = handle.read(self._config.chunk_size)
+        
+        if pending:
+            yield "sheet", f"rows {first_row}-{rows}", "".join(pending)
+    
+    def _iter_pdf(self, handle: BinaryIO) -> Iterator[Tuple[str, str, str]]:
+        try:
+            import PyPDF2
+        except ImportError:
+            raise ParseError("PyPDF2 not installed", "MISSING_DEPENDENCY")
+        
+        try:
+            reader = PyPDF2.PdfReader(handle)
+        except Exception as e:
+            raise ParseError(f"Invalid or corrupted PDF: {str(e)}", "INVALID_PDF")
+        
+        joiner = _Joiner("\n\n")
+        for i in range(min(len(reader.pages), self._config.max_pdf_pages)):
+            try:
+                page_text = reader.pages[i].extract_text() or ""
+                if not page_text.strip():
+                    continue
+                text = f"--- Page {i + 1} ---\n{page_text}"
+            except Exception:
+                text = f"--- Page {i + 1} ---\n[Error extracting text from this page]"
+            yield "page", f"Page {i + 1}", joiner.add(text)
+    
+    def _iter_xlsx(self, handle: BinaryIO) -> Iterator[Tuple[str, str, str]]:
+        try:
+            import openpyxl
+        except ImportError:
+            raise ParseError("openpyxl not installed", "MISSING_DEPENDENCY")
+        
+        try:
+            wb = openpyxl.load_workbook(handle, read_only=True, data_only=True)
+        except Exception as e:
+            raise ParseError(f"Invalid or corrupted Excel file: {str(e)}", "INVALID_EXCEL")
+        
+        try:
+            sheets = _Joiner("\n")
+            total_rows = 0
+            for sheet_name in wb.sheetnames[:self._config.max_excel_sheets]:
+                pending: List[str] = []
+                pending_size = 0
+                has_rows = False
+                for row in wb[sheet_name].iter_rows(values_only=True):
+                    if total_rows >= self._config.max_excel_rows:
+                        break
+                    cells = [str(cell) if cell is not None else "" for cell in row]
+                    if not any(c.strip() for c in cells):
+                        continue
+                    if not has_rows:
+                        # Header only for sheets with rows, like _parse_xlsx
+                        pending.append(sheets.add(f"=== Sheet: {sheet_name} ===\n"))
+                        has_rows = True
+                    line = " | ".join(cells) + "\n"
+                    pending.append(line)
+                    pending_size += len(line)
+                    total_rows += 1
+                    if pending_size >= self._config.chunk_size:
+                        yield "sheet", sheet_name, "".join(pending)
+                        pending, pending_size = [], 0
+                if pending:
+                    yield "sheet", sheet_name, "".join(pending)
+        finally:
+            wb.close()
+    
+    def _iter_pptx(self, handle: BinaryIO) -> Iterator[Tuple[str, str, str]]:
+        try:
+            from pptx import Presentation
+        except ImportError:
+            raise ParseError("python-pptx not installed", "MISSING_DEPENDENCY")
+        
+        try:
+            prs = Presentation(handle)
+        except Exception as e:
+            raise ParseError(f"Invalid or corrupted PPTX: {str(e)}", "INVALID_PPTX")
+        
+        joiner = _Joiner("\n\n")
+        for i, slide in enumerate(prs.slides):
+            slide_text = self._slide_text(i, slide)
+            if slide_text:
+                yield "slide", f"Slide {i + 1}", joiner.add(slide_text)
+    
+    def _iter_docx(self, handle: BinaryIO) -> Iterator[Tuple[str, str, str]]:
+        try:
+            import docx
+        except ImportError:
+            raise ParseError("python-docx not installed", "MISSING_DEPENDENCY")
+        
+        try:
+            doc = docx.Document(handle)
+        except Exception as e:
+            raise ParseError(f"Invalid or corrupted DOCX: {str(e)}", "INVALID_DOCX")
+        
+        joiner = _Joiner("\n")
+        pending: List[str] = []
+        pending_size = 0
+        count = 0
+        first = 1
+        for paragraph in doc.paragraphs:
+            text = paragraph.text
+            if not text.strip():
+                continue
+            part = joiner.add(text)
+            pending.append(part)
+            pending_size += len(part)
+            count += 1
+            if pending_size >= self._config.chunk_size:
+                yield "text", f"Paragraphs {first}-{count}", "".join(pending)
+                pending, pending_size, first = [], 0, count + 1
+        if pending:
+            yield "text", f"Paragraphs {first}-{count}", "".join(pending)
+        
+        tables_started = False
+        for i, table in enumerate(doc.tables):
+            table_rows = [" | ".join(cell.text.strip() for cell in row.cells) for row in table.rows]
+            if not table_rows:
+                continue
+            prefix = ""
+            if not tables_started:
+                prefix = joiner.add("") + joiner.add("--- Tables ---")
+                tables_started = True
+            yield "table", f"Table {i + 1}", prefix + joiner.add(f"[Table {i + 1}]\n" + "\n".join(table_rows))
+    
+    def _iter_whole(self, handle: BinaryIO, name: str, mime_type: str) -> Iterator[Tuple[str, str, str]]:
+        result = self.parse(handle.read(), name, mime_type)
+        if not result.success:
+            raise ParseError(result.error or "Parsing failed", "PARSE_ERROR")
+        if result.content:
+            yield "document", name, result.content
+    
     def _check_script_injection(self, content: str) -> List[str]:
         if not self._config.enable_script_detection:
             return []
@@ -699,22 +1071,9 @@ class FastParse:
         slides_content: List[str] = []
         
         for i, slide in enumerate(prs.slides):
-            slide_text: List[str] = [f"--- Slide {i + 1} ---"]
-            
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    slide_text.append(shape.text.strip())
-                
-                if shape.has_table:
-                    table_rows: List[str] = []
-                    for row in shape.table.rows:
-                        cells = [cell.text.strip() for cell in row.cells]
-                        table_rows.append(" | ".join(cells))
-                    if table_rows:
-                        slide_text.append("[Table]\n" + "\n".join(table_rows))
-            
-            if len(slide_text) > 1:
-                slides_content.append("\n".join(slide_text))
+            slide_text = self._slide_text(i, slide)
+            if slide_text:
+                slides_content.append(slide_text)
         
         content = "\n\n".join(slides_content)
         warnings = self._check_script_injection(content)
@@ -735,6 +1094,23 @@ class FastParse:
             warnings=warnings,
         )
     
+    def _slide_text(self, index: int, slide: Any) -> Optional[str]:
+        slide_text: List[str] = [f"--- Slide {index + 1} ---"]
+        
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text.strip():
+                slide_text.append(shape.text.strip())
+            
+            if shape.has_table:
+                table_rows: List[str] = []
+                for row in shape.table.rows:
+                    cells = [cell.text.strip() for cell in row.cells]
+                    table_rows.append(" | ".join(cells))
+                if table_rows:
+                    slide_text.append("[Table]\n" + "\n".join(table_rows))
+        
+        return "\n".join(slide_text) if len(slide_text) > 1 else None
+    
     def _parse_ppt_legacy(self, data: bytes, filename: str, mime_type: str, file_size: int) -> ParseResult:
         return ParseResult(
             success=True,
@@ -889,3 +1265,13 @@ def parse_file(
 ) -> ParseResult:
     return get_parser(config).parse_file(file_path)
 
+
+def iter_parse(
+    source: Union[str, Path, bytes, BinaryIO],
+    filename: Optional[str] = None,
+    mime_type: Optional[str] = None,
+    max_chars: Optional[int] = None,
+    config: Optional[FastParseConfig] = None,
+) -> Iterator[ParseChunk]:
+    return get_parser(config).iter_parse(source, filename, mime_type, max_chars)
+
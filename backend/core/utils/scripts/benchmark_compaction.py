@@ -0,0 +1,184 @@
+"""
+Benchmark context compaction: the former tiered loop vs the single-pass planner.
+
+Runs both over long threads and reports, per thread:
+  - wall time of compression
+  - exact token counts issued (each one re-applies the caching transform and is a
+    tokenizer or count_tokens API call in production)
+  - resulting tokens vs target, and how many messages were truncated, stubbed or
+    omitted (fewer means less context lost)
+
+Threads are JSON files holding a list of LLM messages as the agent sees them
+(role, content, message_id, tool_calls / tool_call_id), e.g. a recorded thread
+exported from the messages table. Without --thread, synthetic agent threads of
+the given sizes are generated, one dominated by large tool outputs and one
+made of many mid-sized turns.
+
+Exact counts are modelled as COUNT_LATENCY plus the calibrated estimate, so the
+timings show the cost of the count round trips rather than tokenizer speed.
+DB writes of compressed messages are skipped.
+
+Usage:
+    uv run python core/utils/scripts/benchmark_compaction.py [--thread t1.json --thread t2.json] [--sizes 180000,400000] [--model kortix/basic]
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from core.agentpress.context_manager import ContextManager
+from core.agentpress.token_accounting import token_accountant
+from core.ai_models import model_manager
+
+COUNT_LATENCY = 0.12
+SYSTEM_PROMPT = {"role": "system", "content": "You are a helpful agent. " * 1500}
+
+
+def synthetic_thread(target_tokens: int, model: str, shape: str = "tools", seed: int = 7) -> list:
+    """shape: "tools" - large tool outputs dominate; "chat" - many mid-sized turns under the stub thresholds."""
+    rng = random.Random(seed)
+    words = "the agent reads files runs commands searches the web and edits code to finish the task".split()
+
+    def text(n_words: int) -> str:
+        return " ".join(rng.choice(words) for _ in range(n_words))
+
+    messages = [{"role": "user", "content": text(300), "message_id": "m-0"}]
+    total, turn = 0, 0
+    while total < target_tokens:
+        turn += 1
+        call_id = f"call_{turn}"
+        chat = shape == "chat"
+        assistant = {
+            "role": "assistant", "content": text(rng.randint(150, 350) if chat else rng.randint(50, 1500)), "message_id": f"m-{turn}-a",
+            "tool_calls": [{"id": call_id, "type": "function",
+                            "function": {"name": "web_search", "arguments": json.dumps({"query": text(6)})}}],
+        }
+        tool = {"role": "tool", "tool_call_id": call_id, "name": "web_search",
+                "content": text(rng.randint(150, 350) if chat else rng.choice([200, 800, 3000, 9000])), "message_id": f"m-{turn}-t"}
+        messages += [assistant, tool]
+        if chat or turn % 4 == 0:
+            messages.append({"role": "user", "content": text(rng.randint(20, 1200)), "message_id": f"m-{turn}-u"})
+        total = token_accountant.estimate_messages(messages, model)
+    return messages
+
+
+def effective_limit(model: str) -> int:
+    context_window = model_manager.get_context_window(model)
+    if context_window >= 1_000_000:
+        return context_window - 300_000
+    if context_window >= 400_000:
+        return context_window - 64_000
+    if context_window >= 200_000:
+        return context_window - 32_000
+    if context_window >= 100_000:
+        return context_window - 16_000
+    return context_window - 8_000
+
+
+def instrumented_manager():
+    manager = ContextManager(db=object())
+    manager.exact_counts = 0
+
+    async def count_tokens(model, messages, system_prompt=None, apply_caching=True):
+        manager.exact_counts += 1
+        await asyncio.sleep(COUNT_LATENCY)
+        return manager.estimate_tokens(model, messages, system_prompt)
+
+    async def save_compressed_messages(compressed_messages):
+        return len(compressed_messages)
+
+    manager.count_tokens = count_tokens
+    manager.save_compressed_messages = save_compressed_messages
+    return manager
+
+
+async def legacy_compress(cm, messages, model, max_tokens, system_prompt, token_threshold=4096, max_iterations=5, total=None):
+    """The tiered loop compress_messages ran before the planner."""
+    target_tokens = int(max_tokens * cm.compression_target_ratio)
+    result = cm.remove_meta_messages(messages)
+    if total is None:
+        total = await cm.count_tokens(model, result, system_prompt, apply_caching=True)
+    if total <= max_tokens:
+        return result
+
+    result = cm.remove_old_tool_outputs(result, keep_last_n=cm.keep_recent_tool_outputs)
+    current = cm.estimate_tokens(model, result, system_prompt)
+    if current > target_tokens:
+        result = cm.compress_user_messages_in_memory(result, keep_last_n=cm.keep_recent_user_messages)
+        current = cm.estimate_tokens(model, result, system_prompt)
+    if current > target_tokens:
+        result = cm.compress_assistant_messages_in_memory(result, keep_last_n=cm.keep_recent_assistant_messages)
+        current = cm.estimate_tokens(model, result, system_prompt)
+    total = current
+
+    limit, threshold = (target_tokens, 500) if total > target_tokens else (max_tokens, token_threshold)
+    result = await cm.compress_tool_result_messages(result, model, limit, threshold, total)
+    result = await cm.compress_user_messages(result, model, limit, threshold, total)
+    result = await cm.compress_assistant_messages(result, model, limit, threshold, total)
+
+    compressed_total = await cm.count_tokens(model, result, system_prompt, apply_caching=True)
+    if max_iterations <= 0 or compressed_total > target_tokens and compressed_total <= max_tokens:
+        result = await cm.compress_messages_by_omitting_messages(result, model, target_tokens, system_prompt=system_prompt)
+        await cm.count_tokens(model, result, system_prompt, apply_caching=True)
+    elif compressed_total > max_tokens:
+        return await legacy_compress(cm, result, model, max_tokens, system_prompt,
+                                     token_threshold // 2, max_iterations - 1, compressed_total)
+    return result
+
+
+def changes(before: list, after: list) -> str:
+    kept = {m.get("message_id"): m for m in after}
+    modified = sum(1 for m in before if m.get("message_id") in kept and kept[m["message_id"]]["content"] != m["content"])
+    omitted = sum(1 for m in before if m.get("message_id") not in kept)
+    return f"{modified} rewritten, {omitted} omitted"
+
+
+async def run_thread(name: str, messages: list, model: str):
+    max_tokens = effective_limit(model)
+    target = int(max_tokens * ContextManager(db=object()).compression_target_ratio)
+    before = token_accountant.estimate_messages([SYSTEM_PROMPT] + messages, model)
+    print(f"{name}: {len(messages)} messages, ~{before} tokens (max {max_tokens}, target {target})")
+
+    for label in ("tiered", "planner"):
+        cm = instrumented_manager()
+        original = cm.remove_meta_messages(copy.deepcopy(messages))
+        start = time.perf_counter()
+        if label == "tiered":
+            result = await legacy_compress(cm, copy.deepcopy(messages), model, max_tokens, SYSTEM_PROMPT)
+            # compress_messages has always ended with the middle-out message cap
+            result = await cm.middle_out_messages(result, max_messages=cm.max_messages)
+        else:
+            result = await cm.compress_messages(copy.deepcopy(messages), model, system_prompt=SYSTEM_PROMPT)
+        elapsed = time.perf_counter() - start
+        after = cm.estimate_tokens(model, result, SYSTEM_PROMPT)
+        print(f"  {label:8s} {elapsed * 1000:8.1f} ms  exact counts={cm.exact_counts}  "
+              f"-> ~{after} tokens  ({changes(original, result)})")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--thread", action="append", default=[], help="JSON file with a recorded thread (repeatable)")
+    parser.add_argument("--sizes", default="180000,400000", help="synthetic thread sizes in tokens")
+    parser.add_argument("--model", default="kortix/basic")
+    args = parser.parse_args()
+
+    threads = [(path, json.loads(Path(path).read_text())) for path in args.thread]
+    if not threads:
+        threads = [
+            (f"synthetic {shape} {size}", synthetic_thread(int(size), args.model, shape))
+            for size in args.sizes.split(",") for shape in ("tools", "chat")
+        ]
+
+    for name, messages in threads:
+        await run_thread(name, messages, args.model)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
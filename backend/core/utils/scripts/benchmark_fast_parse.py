@@ -0,0 +1,178 @@
+"""
+Benchmark fast_parse document extraction: thread executor vs process-pool engine.
+
+Builds a mixed corpus (PDF, DOCX, XLSX, PPTX, text) in memory and parses it with:
+  - legacy: FastParse in the default ThreadPoolExecutor (the old upload path)
+  - cold:   ParseEngine with an empty cache (worker processes)
+  - warm:   the same engine again (content-hash cache hits)
+
+While each run is in flight a ticker task measures event-loop lag, which is what
+other requests on the same worker feel during a parse.
+
+Redis is not used; the engine cache is in-process only.
+
+Usage:
+    uv run python core/utils/scripts/benchmark_fast_parse.py [--files 24] [--workers 2] [--pages 40]
+"""
+
+import argparse
+import asyncio
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from core.utils.fast_parse import FastParse, ParseEngine
+
+LOREM = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt. "
+
+
+def make_pdf(tag: int, pages: int) -> bytes:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    for page in range(pages):
+        for line in range(50):
+            pdf.drawString(40, 750 - line * 14, f"{tag}.{page}.{line} {LOREM[:80]}")
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def make_docx(tag: int, paragraphs: int) -> bytes:
+    import docx
+
+    document = docx.Document()
+    for i in range(paragraphs):
+        document.add_paragraph(f"{tag}.{i} {LOREM * 3}")
+    table = document.add_table(rows=50, cols=4)
+    for row in table.rows:
+        for cell in row.cells:
+            cell.text = "cell"
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def make_xlsx(tag: int, rows: int) -> bytes:
+    import openpyxl
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for i in range(rows):
+        sheet.append([i, f"name {tag}.{i}", i * 1.5, LOREM[:40]])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def make_pptx(tag: int, slides: int) -> bytes:
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    presentation = Presentation()
+    for i in range(slides):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {tag}.{i}"
+        slide.shapes.add_textbox(Inches(1), Inches(2), Inches(8), Inches(4)).text_frame.text = LOREM * 4
+    buffer = io.BytesIO()
+    presentation.save(buffer)
+    return buffer.getvalue()
+
+
+def build_corpus(count: int, pages: int):
+    # Every file is generated separately so the cold run cannot hit the cache
+    makers = [
+        ("report.pdf", "application/pdf", lambda tag: make_pdf(tag, pages)),
+        ("notes.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document", lambda tag: make_docx(tag, pages * 10)),
+        ("data.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", lambda tag: make_xlsx(tag, pages * 100)),
+        ("deck.pptx", "application/vnd.openxmlformats-officedocument.presentationml.presentation", lambda tag: make_pptx(tag, pages)),
+        ("log.txt", "text/plain", lambda tag: f"{tag} {LOREM * 4000}".encode()),
+    ]
+    corpus = []
+    for i in range(count):
+        name, mime, make = makers[i % len(makers)]
+        corpus.append((f"{i}_{name}", mime, make(i)))
+    return corpus
+
+
+async def measure(label: str, run):
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - start - 0.01)
+
+    tick_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    results = await run()
+    elapsed = time.perf_counter() - start
+    done.set()
+    await tick_task
+
+    ok = sum(1 for r in results if r.success)
+    chars = sum(len(r.content) for r in results)
+    worst = max(lags) * 1000 if lags else 0.0
+    print(f"  {label:7s} {elapsed * 1000:9.1f} ms  ok={ok}/{len(results)}  chars={chars}  "
+          f"max loop lag={worst:.1f} ms")
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=24, help="documents in the corpus")
+    parser.add_argument("--workers", type=int, default=2, help="engine worker processes")
+    parser.add_argument("--pages", type=int, default=40, help="size knob for generated documents")
+    args = parser.parse_args()
+
+    print("Building corpus...")
+    corpus = build_corpus(args.files, args.pages)
+    total = sum(len(content) for _, _, content in corpus)
+    print(f"{len(corpus)} files, {total / 1024 / 1024:.1f} MB")
+
+    loop = asyncio.get_running_loop()
+    legacy_parser = FastParse()
+
+    async def legacy():
+        return await asyncio.gather(*(
+            loop.run_in_executor(None, legacy_parser.parse, content, name, mime)
+            for name, mime, content in corpus
+        ))
+
+    engine = ParseEngine(max_workers=args.workers, use_redis=False)
+
+    async def pooled():
+        return await engine.parse_many([
+            {"content": content, "filename": name, "mime_type": mime}
+            for name, mime, content in corpus
+        ])
+
+    try:
+        # Spawned workers import the parser libraries once; keep that out of the timings
+        await engine.parse_many([
+            {"content": content, "filename": name, "mime_type": mime}
+            for name, mime, content in build_corpus(args.workers * 5, 1)
+        ])
+        engine._cache.clear()
+        engine._cache_bytes = 0
+
+        legacy_results = await measure("legacy", legacy)
+        cold_results = await measure("cold", pooled)
+        await measure("warm", pooled)
+
+        mismatches = sum(1 for a, b in zip(legacy_results, cold_results) if a.content != b.content)
+        print(f"output mismatches vs legacy: {mismatches}")
+        print(f"engine stats: {engine.get_stats()}")
+    finally:
+        engine.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
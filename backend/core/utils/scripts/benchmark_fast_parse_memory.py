@@ -0,0 +1,117 @@
+"""
+Benchmark peak memory of fast_parse: whole-document parse vs streaming iter_parse.
+
+Writes large documents (PDF, XLSX, PPTX, CSV, text) to a temp directory and, for each
+one, measures the peak RSS of a fresh process running:
+  - parse:        FastParse.parse_file (reads the file, builds the full text)
+  - stream:       FastParse.iter_parse over the path, discarding chunks as they arrive
+  - stream+limit: iter_parse with a character budget (--budget), stopping early
+
+Each measurement runs in its own spawned process so peaks do not carry over. The
+reported delta is peak RSS minus the process's RSS after imports (Linux only).
+
+Usage:
+    uv run python core/utils/scripts/benchmark_fast_parse_memory.py [--scale 1.0] [--budget 200000]
+"""
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from core.utils.scripts.benchmark_fast_parse import LOREM, make_pdf, make_pptx
+
+
+def write_corpus(directory: Path, scale: float):
+    import openpyxl
+
+    files = []
+
+    path = directory / "report.pdf"
+    path.write_bytes(make_pdf(0, int(400 * scale)))
+    files.append(path)
+
+    path = directory / "data.xlsx"
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("data")
+    for i in range(int(100_000 * scale)):
+        sheet.append([i, f"name {i}", i * 1.5, LOREM])
+    workbook.save(path)
+    files.append(path)
+
+    path = directory / "deck.pptx"
+    path.write_bytes(make_pptx(0, int(300 * scale)))
+    files.append(path)
+
+    path = directory / "export.csv"
+    with open(path, "w") as f:
+        for i in range(int(400_000 * scale)):
+            f.write(f"{i},{LOREM}\n")
+    files.append(path)
+
+    path = directory / "server.log"
+    with open(path, "w") as f:
+        for i in range(int(600_000 * scale)):
+            f.write(f"2026-01-01T00:00:{i % 60:02d} INFO {LOREM}\n")
+    files.append(path)
+
+    return files
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _current_rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+
+
+def _measure(mode: str, path: str, budget: int, queue):
+    # Import every reader up front so library loading is not counted
+    import PyPDF2, docx, openpyxl, pptx, chardet  # noqa: F401
+    from core.utils.fast_parse import FastParse, FastParseConfig
+
+    parser = FastParse(FastParseConfig(max_text_chars=100_000_000))
+    baseline = _current_rss_mb()
+    start = time.perf_counter()
+    chars = 0
+    if mode == "parse":
+        result = parser.parse_file(path)
+        chars = len(result.content)
+    else:
+        for chunk in parser.iter_parse(path, max_chars=budget if mode == "stream+limit" else None):
+            chars += len(chunk.content)
+    queue.put((_max_rss_mb(), _max_rss_mb() - baseline, time.perf_counter() - start, chars))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for document sizes")
+    parser.add_argument("--budget", type=int, default=200_000, help="character budget for stream+limit")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        print("Writing corpus...")
+        files = write_corpus(Path(tmp), args.scale)
+        for path in files:
+            print(f"{path.name} ({path.stat().st_size / 1024 / 1024:.1f} MB)")
+            for mode in ("parse", "stream", "stream+limit"):
+                queue = context.Queue()
+                process = context.Process(target=_measure, args=(mode, str(path), args.budget, queue))
+                process.start()
+                peak, delta, elapsed, chars = queue.get()
+                process.join()
+                print(f"  {mode:13s} peak={peak:7.1f} MB  delta={delta:7.1f} MB  "
+                      f"{elapsed * 1000:8.1f} ms  chars={chars}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark the size of file-edit tool results: full before/after copies vs diff + hashes.
+
+Simulates N str_replace-style edits on a generated source file and, for each
+result format, reports the bytes that end up:
+  - stored:  messages row (content + metadata.result) plus, for the diff format,
+             the compressed file_edit_snapshots rows
+  - streamed: the tool message published to the client
+  - prompt:  the tool message content replayed into every later LLM call
+             (tokens estimated as chars / 4)
+
+Nothing touches the database; the snapshot size is the zlib payload that would
+be inserted.
+
+Usage:
+    uv run python core/utils/scripts/benchmark_file_edit_results.py [--size-kb 200] [--edits 10]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from core.files.file_edits import build_edit_result, content_sha256
+
+
+def make_source(size_kb: int) -> str:
+    lines = []
+    i = 0
+    while sum(len(line) for line in lines) < size_kb * 1024:
+        lines.append(f"def handler_{i}(request, context):\n")
+        lines.append(f"    value = compute(request.payload, factor={i % 17})\n")
+        lines.append(f"    return respond(value, status={200 + i % 5})\n\n")
+        i += 1
+    return "".join(lines)
+
+
+def legacy_output(file_path: str, before: str, after: str) -> str:
+    return json.dumps({
+        "message": "Replacement successful.",
+        "file_path": file_path,
+        "original_content": before,
+        "updated_content": after,
+    })
+
+
+def message_bytes(output: str) -> int:
+    # _add_tool_result stores the raw output as content and the parsed output in metadata.result
+    message = {
+        "content": {"role": "tool", "tool_call_id": "call_0", "name": "str_replace", "content": output},
+        "metadata": {"result": {"success": True, "output": json.loads(output), "error": None}},
+    }
+    return len(json.dumps(message).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-kb", type=int, default=200, help="size of the edited file")
+    parser.add_argument("--edits", type=int, default=10, help="number of consecutive edits")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    file_path = "src/handlers.py"
+    content = make_source(args.size_kb)
+
+    legacy = {"stored": 0, "streamed": 0, "prompt": 0}
+    compact = {"stored": 0, "streamed": 0, "prompt": 0}
+    snapshots = set()
+    diff_time = 0.0
+
+    for edit in range(args.edits):
+        index = random.randrange(0, content.count("def handler_"))
+        old = f"factor={index % 17})\n    return respond(value, status={200 + index % 5})"
+        start = content.find(f"def handler_{index}(")
+        position = content.find(old, start)
+        updated = content[:position] + old.replace("respond(", f"respond_v{edit}(") + content[position + len(old):]
+
+        output = legacy_output(file_path, content, updated)
+        legacy["stored"] += message_bytes(output)
+        legacy["streamed"] += message_bytes(output)
+        legacy["prompt"] += len(output)
+
+        start_time = time.perf_counter()
+        output = json.dumps(build_edit_result("Replacement successful.", file_path, content, updated))
+        diff_time += time.perf_counter() - start_time
+        compact["stored"] += message_bytes(output)
+        compact["streamed"] += message_bytes(output)
+        compact["prompt"] += len(output)
+        for version in (content, updated):
+            digest = content_sha256(version)
+            if digest not in snapshots:
+                snapshots.add(digest)
+                compact["stored"] += len(zlib.compress(version.encode(), 6))
+
+        content = updated
+
+    print(f"{args.edits} edits on a {args.size_kb} KB file (diff build {diff_time * 1000 / args.edits:.1f} ms/edit)")
+    for key in ("stored", "streamed", "prompt"):
+        saved = 1 - compact[key] / legacy[key]
+        print(f"  {key:9s} legacy={legacy[key] / 1024:9.1f} KB  diff={compact[key] / 1024:8.1f} KB  saved={saved:6.1%}")
+    print(f"  prompt tokens (chars/4): legacy={legacy['prompt'] // 4:,}  diff={compact['prompt'] // 4:,}")
+
+
+if __name__ == "__main__":
+    main()
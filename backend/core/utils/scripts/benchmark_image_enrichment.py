@@ -0,0 +1,72 @@
+"""
+Benchmark web search image enrichment: full downloads vs header-only probes.
+
+Serves a mix of PNG, JPEG, GIF and WebP images from the local image fixture
+server and gets their dimensions three ways:
+  - full:    GET every image and open it with PIL, as enrichment did before
+  - probe:   ranged, streamed GET of the header only (image_probe.probe_image)
+  - no-range: probe against a server that ignores Range (early abort only)
+
+Reports bytes transferred and wall time per "search" of --images images.
+
+Usage:
+    uv run python core/utils/scripts/benchmark_image_enrichment.py [--images 10] [--searches 5]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+import httpx
+
+from core.test_harness.image_server import ImageFixtureServer
+from core.tools.utils.image_probe import probe_image
+
+FORMATS = [("PNG", "png"), ("JPEG", "jpg"), ("GIF", "gif"), ("WEBP", "webp")]
+
+
+async def full_download(client: httpx.AsyncClient, url: str) -> int:
+    from PIL import Image
+
+    response = await client.get(url)
+    Image.open(BytesIO(response.content)).size
+    return response.num_bytes_downloaded
+
+
+async def header_probe(client: httpx.AsyncClient, url: str) -> int:
+    return (await probe_image(client, url)).bytes_read
+
+
+async def run(label: str, fetch, honor_range: bool, images: int, searches: int):
+    with ImageFixtureServer(honor_range=honor_range) as server:
+        urls = [
+            server.add_image(f"{i}.{ext}", image_format, (800 + 40 * i, 600 + 30 * i), seed=i)
+            for i, (image_format, ext) in ((i, FORMATS[i % len(FORMATS)]) for i in range(images))
+        ]
+        total_bytes, start = 0, time.monotonic()
+        async with httpx.AsyncClient() as client:
+            for _ in range(searches):
+                total_bytes += sum(await asyncio.gather(*(fetch(client, url) for url in urls)))
+        elapsed = time.monotonic() - start
+    print(f"  {label:8s} {total_bytes / searches / 1024:10.1f} KB/search  {elapsed / searches * 1000:7.1f} ms/search")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=10, help="images per search")
+    parser.add_argument("--searches", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.searches} searches x {args.images} images")
+    await run("full", full_download, True, args.images, args.searches)
+    await run("probe", header_probe, True, args.images, args.searches)
+    await run("no-range", header_probe, False, args.images, args.searches)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""
+Benchmark LLM deployment routing: one deployment vs routed vs routed + hedged.
+
+Replays the same sequence of calls against two mock deployments of one model
+(a fast primary and a somewhat slower alternate, e.g. Bedrock and the direct
+Anthropic API). The primary has an occasional slow tail and, in the middle of
+the run, a "bad minute" with very slow first tokens and failures.
+
+Reports time to first token (p50 / p95 / p99) and failed calls for:
+  - single:  the primary only, as make_llm_api_call did before the router
+  - routed:  both deployments, ordered by rolling TTFT with fallback on errors
+  - hedged:  routed, plus a second request once the first is past its p95 TTFT
+
+Latencies are given in real-world milliseconds; the run is time-compressed by
+--scale (router windows and cooldowns are scaled with it).
+
+Usage:
+    uv run python core/utils/scripts/benchmark_llm_router.py [--calls 300] [--concurrency 4] [--scale 0.05]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from core.ai_models.models import ModelDeployment, ModelProvider
+from core.services import llm_router as llm_router_module
+from core.services.llm_router import LLMRouter
+from core.test_harness.mock_llm import MockLLMError, MockLLMProvider
+
+PRIMARY = ModelDeployment("mock/primary", ModelProvider.BEDROCK)
+ALTERNATE = ModelDeployment("mock/alternate", ModelProvider.ANTHROPIC)
+MESSAGES = [{"role": "user", "content": "Summarize the report"}]
+
+
+def plan_calls(n: int, seed: int = 7):
+    """Per call: (primary TTFT ms, primary fails, alternate TTFT ms)."""
+    rng = random.Random(seed)
+    bad_start, bad_end = int(n * 0.4), int(n * 0.6)
+    calls = []
+    for i in range(n):
+        if bad_start <= i < bad_end:
+            primary, fails = rng.uniform(5000, 9000), rng.random() < 0.15
+        else:
+            primary = rng.lognormvariate(6.0, 0.3) if rng.random() > 0.05 else rng.uniform(2000, 4000)
+            fails = rng.random() < 0.01
+        calls.append((primary, fails, rng.lognormvariate(6.4, 0.25)))
+    return calls
+
+
+class PlannedDeployment(MockLLMProvider):
+    """Mock provider whose TTFT and failure are set per call from the plan."""
+
+    def __init__(self, scale: float):
+        super().__init__(delay_ms=0)
+        self.scale = scale
+
+    async def open(self, ttft_ms: float, fails: bool):
+        self.calls += 1
+        await asyncio.sleep(ttft_ms * self.scale / 1000)
+        if fails:
+            raise MockLLMError("Injected failure")
+        return self.acompletion(messages=MESSAGES, model="mock")
+
+
+async def run(label: str, deployments, hedge: bool, calls, concurrency: int, scale: float):
+    router = LLMRouter(
+        hedge_min_delay=llm_router_module.HEDGE_MIN_DELAY_SECONDS * scale,
+        hedge_max_delay=llm_router_module.HEDGE_MAX_DELAY_SECONDS * scale
+    )
+    providers = {d.litellm_model_id: PlannedDeployment(scale) for d in deployments}
+    ttfts, failed = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(primary_ms, primary_fails, alternate_ms):
+        nonlocal failed
+
+        async def open_stream(deployment):
+            if deployment is PRIMARY:
+                return await providers[deployment.litellm_model_id].open(primary_ms, primary_fails)
+            return await providers[deployment.litellm_model_id].open(alternate_ms, False)
+
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                _, stream, _ = await router.open_stream(deployments, open_stream, hedge=hedge)
+            except MockLLMError:
+                failed += 1
+                return
+            ttfts.append((time.monotonic() - start) / scale * 1000)
+            await stream.aclose()
+
+    await asyncio.gather(*(one(*call) for call in calls))
+
+    ttfts.sort()
+    pct = lambda q: ttfts[min(len(ttfts) - 1, int(q * len(ttfts)))]
+    print(f"  {label:7s} TTFT p50 {pct(0.5):7.0f} ms  p95 {pct(0.95):7.0f} ms  p99 {pct(0.99):7.0f} ms  "
+          f"failed {failed:3d}  requests {sum(p.calls for p in providers.values())}")
+    print(f"          {json.dumps({k: {s: v[s] for s in ('requests', 'errors', 'hedges', 'hedge_wins', 'cancelled')} for k, v in router.get_stats().items()})}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--scale", type=float, default=0.05, help="time compression factor")
+    args = parser.parse_args()
+
+    # Rolling window, cooldown and EWMA reset in compressed time
+    llm_router_module.WINDOW_SECONDS *= args.scale
+    llm_router_module.COOLDOWN_SECONDS *= args.scale
+    llm_router_module.EWMA_RESET_SECONDS *= args.scale
+    llm_router_module.UNKNOWN_TTFT_SECONDS *= args.scale
+
+    calls = plan_calls(args.calls)
+    print(f"{args.calls} calls, concurrency {args.concurrency}, primary bad minute on calls "
+          f"{int(args.calls * 0.4)}-{int(args.calls * 0.6)}")
+    await run("single", [PRIMARY], False, calls, args.concurrency, args.scale)
+    await run("routed", [PRIMARY, ALTERNATE], False, calls, args.concurrency, args.scale)
+    await run("hedged", [PRIMARY, ALTERNATE], True, calls, args.concurrency, args.scale)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
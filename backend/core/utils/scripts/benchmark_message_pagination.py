@@ -0,0 +1,160 @@
+"""
+Benchmark full-thread LLM message reads: LIMIT/OFFSET vs keyset + projection pushdown.
+
+Builds a session-local TEMP copy of the messages table (with the same
+idx_messages_thread_llm_keyset partial index), fills one thread with N messages
+(about 10% compressed, 2% omitted) and reads the whole thread in pages of 1000
+with both query shapes, reporting time and bytes shipped from Postgres.
+
+Nothing is written to the real messages table.
+
+Usage:
+    uv run python core/utils/scripts/benchmark_message_pagination.py [--sizes 500,5000,50000] [--runs 3]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from sqlalchemy import text
+
+from core.services.db import get_session, close_db
+
+BATCH = 1000
+
+OFFSET_SQL = """
+SELECT message_id, type, content, metadata
+FROM bench_messages
+WHERE thread_id = :thread_id
+  AND is_llm_message = true
+  AND (metadata->>'omitted' IS NULL OR metadata->>'omitted' != 'true')
+ORDER BY created_at ASC
+LIMIT :limit OFFSET :offset
+"""
+
+KEYSET_SQL = """
+SELECT message_id, type, created_at,
+       CASE WHEN metadata->>'compressed' = 'true'
+            THEN COALESCE(metadata->>'compressed_content', content::text)
+            ELSE content::text
+       END AS content,
+       COALESCE(metadata->>'compressed' = 'true' AND metadata->>'compressed_content' IS NOT NULL, false) AS is_compressed
+FROM bench_messages
+WHERE thread_id = :thread_id
+  AND is_llm_message = true
+  AND (metadata->>'omitted' IS NULL OR metadata->>'omitted' != 'true')
+  {keyset}
+ORDER BY created_at ASC, message_id ASC
+LIMIT :limit
+"""
+
+
+def _row_bytes(row) -> int:
+    return sum(len(str(value)) for value in row)
+
+
+async def setup(session, thread_id: str, other_threads: int, size: int):
+    await session.execute(text("DROP TABLE IF EXISTS bench_messages"))
+    await session.execute(text("""
+        CREATE TEMP TABLE bench_messages (
+            message_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            thread_id UUID NOT NULL,
+            type TEXT NOT NULL,
+            is_llm_message BOOLEAN NOT NULL DEFAULT TRUE,
+            content JSONB NOT NULL,
+            metadata JSONB DEFAULT '{}'::jsonb,
+            created_at TIMESTAMPTZ NOT NULL
+        )
+    """))
+    # The benchmarked thread plus noise from other threads, like a real table
+    await session.execute(text("""
+        INSERT INTO bench_messages (thread_id, type, content, metadata, created_at)
+        SELECT CASE WHEN g % (:others + 1) = 0 THEN CAST(:thread_id AS uuid) ELSE gen_random_uuid() END,
+               CASE WHEN g % 3 = 0 THEN 'tool' ELSE 'assistant' END,
+               jsonb_build_object('role', 'assistant', 'content', repeat('lorem ipsum dolor sit amet ', 40 + g % 200)),
+               CASE
+                   WHEN g % 50 = 7 THEN jsonb_build_object('omitted', 'true')
+                   WHEN g % 10 = 3 THEN jsonb_build_object(
+                       'compressed', true,
+                       'compressed_content', '{"role": "assistant", "content": "summary"}',
+                       'agent_trace', repeat('x', 2000))
+                   ELSE jsonb_build_object('agent_trace', repeat('x', 2000))
+               END,
+               now() - make_interval(secs => :total - g)
+        FROM generate_series(1, :total) AS g
+    """), {"thread_id": thread_id, "others": other_threads, "total": size * (other_threads + 1)})
+    await session.execute(text("""
+        CREATE INDEX ON bench_messages(thread_id, created_at DESC)
+    """))
+    await session.execute(text("""
+        CREATE INDEX ON bench_messages(thread_id, created_at, message_id)
+        WHERE is_llm_message = true
+          AND (metadata->>'omitted' IS NULL OR metadata->>'omitted' != 'true')
+    """))
+    await session.execute(text("ANALYZE bench_messages"))
+
+
+async def read_offset(session, thread_id: str):
+    offset, rows, shipped = 0, 0, 0
+    while True:
+        result = await session.execute(text(OFFSET_SQL), {"thread_id": thread_id, "limit": BATCH, "offset": offset})
+        batch = result.fetchall()
+        rows += len(batch)
+        shipped += sum(_row_bytes(row) for row in batch)
+        if len(batch) < BATCH:
+            return rows, shipped
+        offset += BATCH
+
+
+async def read_keyset(session, thread_id: str):
+    cursor, rows, shipped = None, 0, 0
+    while True:
+        params = {"thread_id": thread_id, "limit": BATCH}
+        keyset = ""
+        if cursor:
+            keyset = "AND (created_at, message_id) > (:after_created_at, :after_message_id)"
+            params["after_created_at"], params["after_message_id"] = cursor
+        result = await session.execute(text(KEYSET_SQL.format(keyset=keyset)), params)
+        batch = result.fetchall()
+        rows += len(batch)
+        shipped += sum(_row_bytes(row) for row in batch)
+        if len(batch) < BATCH:
+            return rows, shipped
+        cursor = (batch[-1].created_at, batch[-1].message_id)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="500,5000,50000", help="messages per thread, comma separated")
+    parser.add_argument("--other-threads", type=int, default=3, help="noise threads of the same size")
+    parser.add_argument("--runs", type=int, default=3, help="timed runs per implementation (median reported)")
+    args = parser.parse_args()
+
+    try:
+        async with get_session() as session:
+            for size in [int(s) for s in args.sizes.split(",")]:
+                thread_id = str(uuid.uuid4())
+                await setup(session, thread_id, args.other_threads, size)
+                print(f"Thread with {size} messages")
+                for name, reader in (("offset", read_offset), ("keyset", read_keyset)):
+                    timings = []
+                    for _ in range(args.runs):
+                        start = time.perf_counter()
+                        rows, shipped = await reader(session, thread_id)
+                        timings.append(time.perf_counter() - start)
+                    print(f"  {name:7s} {statistics.median(timings) * 1000:9.1f} ms  "
+                          f"rows={rows}  shipped={shipped / 1024 / 1024:.1f} MB")
+                print("-" * 40)
+            await session.rollback()
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,178 @@
+"""
+Load benchmark for StreamHub: Redis connections and CPU per 1k watched streams.
+
+Watches N streams (one SSE-style subscriber each), publishes entries to all of them
+at a fixed rate, and reports reader connections, process CPU time and delivery
+latency. Runs the sharded hub and, with --legacy, the previous design of one
+blocking XREAD pump per stream for comparison.
+
+Requires a reachable Redis (REDIS_HOST / REDIS_PORT / ...).
+
+Usage:
+    uv run python core/utils/scripts/benchmark_stream_hub.py [--streams 1000] [--seconds 10] [--rate 2] [--legacy]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from redis.asyncio import ConnectionPool, Redis
+
+from core.services import redis as redis_service
+
+
+class LegacyPerStreamHub:
+    """The previous StreamHub read path: one pump task (and blocked connection) per stream."""
+
+    def __init__(self, client: Redis, queue_maxsize: int = 256):
+        self._redis = client
+        self._queue_maxsize = queue_maxsize
+        self._pumps = {}
+        self._subs = {}
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, stream_key: str, last_id: str = "$"):
+        queue = asyncio.Queue(maxsize=self._queue_maxsize)
+        async with self._lock:
+            self._subs.setdefault(stream_key, []).append(queue)
+            if stream_key not in self._pumps:
+                self._pumps[stream_key] = asyncio.create_task(self._pump(stream_key, last_id))
+        return queue
+
+    async def _pump(self, stream_key: str, last_id: str):
+        while True:
+            result = await self._redis.xread({stream_key: last_id}, block=500, count=100)
+            for _, entries in result or []:
+                for msg_id, fields in entries:
+                    last_id = msg_id
+                    async with self._lock:
+                        subs = list(self._subs.get(stream_key, []))
+                    for queue in subs:
+                        try:
+                            queue.put_nowait((msg_id, fields))
+                        except asyncio.QueueFull:
+                            pass
+
+    async def close(self):
+        for task in self._pumps.values():
+            task.cancel()
+        await asyncio.gather(*self._pumps.values(), return_exceptions=True)
+
+
+async def _client_count(admin: Redis) -> int:
+    return len(await admin.client_list())
+
+
+async def run(mode: str, streams: int, seconds: float, rate: float, url: str) -> dict:
+    prefix = f"bench:hub:{uuid.uuid4().hex[:8]}"
+    keys = [f"{prefix}:{i}" for i in range(streams)]
+
+    admin = Redis.from_url(url, decode_responses=True)
+    writer = Redis.from_url(url, decode_responses=True)
+    reader_pool = ConnectionPool.from_url(url, decode_responses=True, max_connections=streams + 16)
+    reader = Redis(connection_pool=reader_pool)
+
+    # Seed streams so every subscriber starts from a concrete ID
+    async with writer.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.xadd(key, {"data": "seed", "ts": str(time.time())})
+        seeded = await pipe.execute()
+    start_ids = dict(zip(keys, seeded))
+
+    baseline_clients = await _client_count(admin)
+
+    if mode == "sharded":
+        hub = redis_service.StreamHub(reader)
+    else:
+        hub = LegacyPerStreamHub(reader)
+
+    latencies = []
+    received = 0
+
+    async def consume(key):
+        nonlocal received
+        queue = await hub.subscribe(key, start_ids[key])
+        while True:
+            msg_id, fields = await queue.get()
+            latencies.append(time.time() - float(fields["ts"]))
+            received += 1
+
+    consumers = [asyncio.create_task(consume(key)) for key in keys]
+    await asyncio.sleep(1.0)  # let readers settle
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    sent = 0
+    interval = 1.0 / rate
+    while time.perf_counter() - wall_start < seconds:
+        tick = time.perf_counter()
+        async with writer.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.xadd(key, {"data": "x" * 64, "ts": str(time.time())})
+            await pipe.execute()
+        sent += len(keys)
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - tick)))
+    await asyncio.sleep(1.0)  # drain
+
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    reader_clients = await _client_count(admin) - baseline_clients
+
+    for task in consumers:
+        task.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+    await hub.close()
+
+    async with writer.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.delete(key)
+        await pipe.execute()
+    await reader.aclose()
+    await reader_pool.aclose()
+    await writer.aclose()
+    await admin.aclose()
+
+    latencies.sort()
+    per_1k = 1000 / streams
+    return {
+        "mode": mode,
+        "reader_connections": reader_clients,
+        "reader_connections_per_1k_streams": round(reader_clients * per_1k, 1),
+        "cpu_seconds": round(cpu, 2),
+        "cpu_pct_per_1k_streams": round(100 * cpu / wall * per_1k, 1),
+        "sent": sent,
+        "received": received,
+        "p50_ms": round(1000 * statistics.median(latencies), 1) if latencies else None,
+        "p99_ms": round(1000 * latencies[int(len(latencies) * 0.99) - 1], 1) if latencies else None,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=1000, help="number of watched streams")
+    parser.add_argument("--seconds", type=float, default=10.0, help="publish duration")
+    parser.add_argument("--rate", type=float, default=2.0, help="entries per stream per second")
+    parser.add_argument("--legacy", action="store_true", help="also run the per-stream pump design")
+    args = parser.parse_args()
+
+    url = redis_service.get_redis_config()["url"]
+    print(f"Watching {args.streams} streams for {args.seconds}s at {args.rate} entries/stream/s "
+          f"(shards={redis_service.HUB_SHARDS}, block={redis_service.HUB_BLOCK_MS}ms)")
+    print("-" * 40)
+
+    modes = ["sharded"] + (["legacy"] if args.legacy else [])
+    for mode in modes:
+        result = await run(mode, args.streams, args.seconds, args.rate, url)
+        for key, value in result.items():
+            print(f"  {key}: {value}")
+        print("-" * 40)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,189 @@
+"""
+Benchmark system prompt assembly: the former single-string build vs segmented, memoized segments.
+
+Reports:
+  - build time per run (both warmed up, so tool guide registry init is excluded)
+  - system prompt cache-read ratio: the share of system prompt tokens a run reads
+    from Anthropic's prompt cache, simulated over a stream of runs of one agent
+    by several users across a day boundary
+
+The former build put the date in the middle and cached the whole string, so a
+run only hit the cache when an identical prompt (same user, same day) had been
+written within the cache TTL. The segmented build caches up to the end of the
+stable prefix (core prompt, tool guides, MCP info, tool schemas, KB), which is
+shared by every user and every day.
+
+KB, user context, memory and file fetches are stubbed with fixed text - they are
+Redis-cached fetches and identical in both builds.
+
+Usage:
+    uv run python core/utils/scripts/benchmark_system_prompt.py [--runs 400] [--users 20] [--gap 90] [--tools 40]
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from core.agents.runner.prompt_manager import PromptManager
+from core.agentpress.prompt_segments import prompt_segment_cache, split_at_breakpoints
+from core.agentpress.token_accounting import token_accountant
+
+MODEL = "kortix/basic"
+CACHE_TTL_SECONDS = 300
+START = datetime.datetime(2026, 3, 2, 22, 0, tzinfo=datetime.timezone.utc)
+KB_TEXT = "\n\n=== AGENT KNOWLEDGE BASE ===\n" + "Pricing tiers, refund policy and escalation contacts. " * 60
+AGENT_CONFIG = {
+    "agent_id": "agent-1",
+    "configured_mcps": [
+        {"name": "Notion", "toolkit_slug": "notion", "enabledTools": ["NOTION_SEARCH", "NOTION_CREATE_PAGE"]},
+        {"name": "Gmail", "toolkit_slug": "gmail", "enabledTools": ["GMAIL_SEND_EMAIL", "GMAIL_FETCH_EMAILS"]},
+    ],
+}
+
+
+class FakeRegistry:
+    """Tool registry stand-in exposing `tools` and get_openapi_schemas()."""
+
+    def __init__(self, n_tools: int):
+        self.tools = {f"tool_{i}": None for i in range(n_tools)}
+        self._schemas = [
+            {"type": "function", "function": {
+                "name": name,
+                "description": f"Does {name} things. " * 8,
+                "parameters": {"type": "object", "properties": {
+                    f"arg_{j}": {"type": "string", "description": f"Argument {j} of {name}"} for j in range(6)
+                }, "required": ["arg_0"]},
+            }}
+            for name in self.tools
+        ]
+
+    def get_openapi_schemas(self):
+        return self._schemas
+
+
+class Clock:
+    now = START
+
+
+def datetime_info_at_clock() -> str:
+    now = Clock.now
+    return (f"\n\n=== CURRENT DATE/TIME INFORMATION ===\nToday's date: {now.strftime('%A, %B %d, %Y')}\n"
+            f"Current year: {now.strftime('%Y')}\nCurrent month: {now.strftime('%B')}\n"
+            f"Current day: {now.strftime('%A')}\n")
+
+
+def patch_fetches():
+    async def kb(agent_config, client):
+        return KB_TEXT
+
+    async def user_context(user_id, client):
+        return f"\n\n=== USER INFORMATION ===\nThe user's name is: {user_id}\n"
+
+    async def nothing(*args, **kwargs):
+        return None
+
+    PromptManager._fetch_knowledge_base = staticmethod(kb)
+    PromptManager._fetch_user_context_data = staticmethod(user_context)
+    PromptManager._fetch_user_memories = staticmethod(nothing)
+    PromptManager._fetch_file_context = staticmethod(nothing)
+    PromptManager._datetime_info = staticmethod(datetime_info_at_clock)
+
+
+async def legacy_build(registry, user_id: str) -> dict:
+    """The order and caching of build_system_prompt before segmentation."""
+    from core.prompts.core_prompt import get_core_system_prompt
+
+    fresh_mcp_config = {"custom_mcp": [], "configured_mcps": AGENT_CONFIG["configured_mcps"], "account_id": user_id}
+    content = PromptManager._build_base_prompt(get_core_system_prompt())
+    content += await PromptManager._mcp_tools_info(AGENT_CONFIG, None, fresh_mcp_config)
+    content += await PromptManager._jit_mcp_info(None, fresh_mcp_config)
+    content += PromptManager._xml_tool_calling_instructions(True, registry)
+    content += PromptManager._datetime_info()
+    content += await PromptManager._fetch_knowledge_base(AGENT_CONFIG, None)
+    content += await PromptManager._fetch_user_context_data(user_id, None)
+    return {"role": "system", "content": content}
+
+
+async def segmented_build(registry, user_id: str) -> dict:
+    message, _ = await PromptManager.build_system_prompt(
+        MODEL, AGENT_CONFIG, "", None, tool_registry=registry, xml_tool_calling=True, user_id=user_id
+    )
+    return message
+
+
+def tokens(text: str) -> int:
+    return token_accountant.estimate_message({"role": "system", "content": text}, MODEL)
+
+
+class PrefixCache:
+    """Anthropic-style prompt cache: entries at breakpoints, TTL refreshed on read."""
+
+    def __init__(self):
+        self.expires = {}
+
+    def request(self, cached_prefix: str, total_tokens: int, at: float):
+        """Returns (read_tokens, written_tokens) for one request caching `cached_prefix`."""
+        prefix_tokens = tokens(cached_prefix)
+        hit = self.expires.get(cached_prefix, 0) > at
+        self.expires[cached_prefix] = at + CACHE_TTL_SECONDS
+        return (prefix_tokens, 0) if hit else (0, prefix_tokens)
+
+
+async def run(label, build, registry, schedule):
+    cache = PrefixCache()
+    build_ms, read, written, total = [], 0, 0, 0
+    for at, user_id in schedule:
+        Clock.now = START + datetime.timedelta(seconds=at)
+        start = time.perf_counter()
+        message = await build(registry, user_id)
+        build_ms.append((time.perf_counter() - start) * 1000)
+
+        parts = split_at_breakpoints(message)
+        cached_prefix = parts[0] if parts else message["content"]
+        message_tokens = tokens(message["content"])
+        r, w = cache.request(cached_prefix, message_tokens, at)
+        read, written, total = read + r, written + w, total + message_tokens
+
+    print(f"  {label:10s} build mean {statistics.mean(build_ms):6.2f} ms  p95 {sorted(build_ms)[int(len(build_ms) * 0.95)]:6.2f} ms  "
+          f"cache-read ratio {read / total:6.1%}  (read {read:,}, written {written:,} of {total:,} tokens)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=400)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--gap", type=float, default=90.0, help="mean seconds between runs (all users)")
+    parser.add_argument("--tools", type=int, default=40, help="tools in the registry (XML schema segment)")
+    args = parser.parse_args()
+
+    patch_fetches()
+    registry = FakeRegistry(args.tools)
+    rng = random.Random(3)
+    at, schedule = 0.0, []
+    for _ in range(args.runs):
+        at += rng.expovariate(1 / args.gap)
+        schedule.append((at, f"user-{rng.randrange(args.users)}"))
+
+    # Warm the tool guide registry for both
+    await legacy_build(registry, "warmup")
+    await segmented_build(registry, "warmup")
+    prompt_segment_cache.clear()
+
+    hours = schedule[-1][0] / 3600
+    print(f"{args.runs} runs by {args.users} users over {hours:.1f}h from {START:%a %H:%M} UTC "
+          f"(crosses midnight), {args.tools} tools, cache TTL {CACHE_TTL_SECONDS}s")
+    await run("legacy", legacy_build, registry, schedule)
+    await run("segmented", segmented_build, registry, schedule)
+    print(f"  segment cache: {json.dumps(prompt_segment_cache.get_stats())}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
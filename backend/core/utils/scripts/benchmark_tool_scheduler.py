@@ -0,0 +1,115 @@
+"""
+Benchmark tool execution strategies: sequential vs asyncio.gather vs ToolScheduler.
+
+Simulates one agent turn against fake backends:
+  - web_search:    an external API that allows 3 concurrent requests and answers
+                   429 beyond that (the tool retries after a backoff)
+  - execute_command: sandbox commands with a fixed duration
+  - read_file / str_replace: read-modify-write on an in-memory workspace, so two
+                   concurrent edits of the same file can lose an update
+
+For each strategy it reports wall time, API 429s and how many edits survived.
+
+Usage:
+    uv run python core/utils/scripts/benchmark_tool_scheduler.py [--searches 10] [--commands 3] [--edits 6]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from core.agentpress.tool_scheduler import ToolScheduler, normalize_path, tool_scheduler_stats
+
+API_CAPACITY = 3
+API_LATENCY = 0.15
+RETRY_BACKOFF = 0.3
+COMMAND_TIME = 0.4
+FILE_IO = 0.02
+
+
+class FakeBackends:
+    def __init__(self):
+        self.api_in_flight = 0
+        self.throttled = 0
+        self.files = {"app.py": ""}
+
+    async def execute(self, tool_call):
+        name = tool_call["function_name"]
+        args = tool_call["arguments"]
+        if name == "web_search":
+            while True:
+                if self.api_in_flight >= API_CAPACITY:
+                    self.throttled += 1
+                    await asyncio.sleep(RETRY_BACKOFF)
+                    continue
+                self.api_in_flight += 1
+                try:
+                    await asyncio.sleep(API_LATENCY)
+                    return f"results for {args['query']}"
+                finally:
+                    self.api_in_flight -= 1
+        if name == "execute_command":
+            await asyncio.sleep(COMMAND_TIME)
+            return "ok"
+        if name == "read_file":
+            await asyncio.sleep(FILE_IO)
+            return self.files.get(normalize_path(args["file_path"]), "")
+        if name == "str_replace":
+            path = normalize_path(args["file_path"])
+            content = self.files.get(path, "")
+            await asyncio.sleep(FILE_IO)
+            self.files[path] = content + args["new_str"]
+            return "ok"
+        raise ValueError(name)
+
+
+def build_turn(searches: int, commands: int, edits: int):
+    calls = []
+    for i in range(searches):
+        calls.append({"function_name": "web_search", "arguments": {"query": f"topic {i}"}})
+    for i in range(commands):
+        calls.append({"function_name": "execute_command", "arguments": {"command": f"job {i}"}})
+    for i in range(edits):
+        calls.append({"function_name": "read_file", "arguments": {"file_path": "app.py"}})
+        calls.append({"function_name": "str_replace", "arguments": {"file_path": "/workspace/app.py", "old_str": "", "new_str": f"<{i}>"}})
+    return calls
+
+
+async def run(label: str, calls, strategy: str, edits: int):
+    backends = FakeBackends()
+    start = time.perf_counter()
+    if strategy == "sequential":
+        for tool_call in calls:
+            await backends.execute(tool_call)
+    elif strategy == "gather":
+        await asyncio.gather(*(backends.execute(tool_call) for tool_call in calls))
+    else:
+        scheduler = ToolScheduler()
+        await asyncio.gather(*(scheduler.submit(tool_call, backends.execute) for tool_call in calls))
+    elapsed = time.perf_counter() - start
+    kept = sum(1 for i in range(edits) if f"<{i}>" in backends.files["app.py"])
+    print(f"  {label:10s} {elapsed * 1000:8.0f} ms  429s={backends.throttled:3d}  edits kept={kept}/{edits}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=10)
+    parser.add_argument("--commands", type=int, default=3)
+    parser.add_argument("--edits", type=int, default=6)
+    args = parser.parse_args()
+
+    calls = build_turn(args.searches, args.commands, args.edits)
+    print(f"{len(calls)} tool calls ({args.searches} web_search, {args.commands} execute_command, "
+          f"{args.edits} read_file + str_replace on one file)")
+    await run("sequential", calls, "sequential", args.edits)
+    await run("gather", calls, "gather", args.edits)
+    await run("scheduler", calls, "scheduler", args.edits)
+    print(f"scheduler stats: {tool_scheduler_stats.get_stats()['tools']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
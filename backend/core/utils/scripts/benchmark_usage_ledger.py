@@ -0,0 +1,125 @@
+"""
+Load test for LLM usage billing: inline deduction vs the usage ledger.
+
+Simulates many concurrent agent runs. Every turn is an LLM call followed by the
+billing step in ThreadManager._handle_billing, then the next turn starts:
+  - inline: atomic_use_credits (a transaction that row-locks the account, on a
+            shared DB connection pool) plus two cache invalidations
+  - ledger: one Redis round trip (UsageLedger.record); a settlement worker
+            deducts each account's usage in batches on the same DB pool
+
+Latencies are modelled (lognormal DB, fixed Redis RTT), so the numbers show how
+queueing on the pool and the account row lock reach the agent loop, not real
+database speed. Reports p50/p95/p99/max of the billing step and of a full turn,
+plus the DB transactions each mode issued.
+
+Usage:
+    uv run python core/utils/scripts/benchmark_usage_ledger.py [--runs 30] [--accounts 20] [--turns 40]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict
+
+DB_POOL_SIZE = 10
+DB_TX_MEDIAN = 0.012
+DB_TX_SIGMA = 0.6
+REDIS_RTT = 0.0008
+LLM_CALL = 0.05
+
+
+class FakeBackends:
+    def __init__(self, seed: int):
+        self.random = random.Random(seed)
+        self.pool = asyncio.Semaphore(DB_POOL_SIZE)
+        self.row_locks = defaultdict(asyncio.Lock)
+        self.transactions = 0
+        self.pending = defaultdict(list)
+
+    def tx_time(self) -> float:
+        return self.random.lognormvariate(0, DB_TX_SIGMA) * DB_TX_MEDIAN
+
+    async def atomic_use_credits(self, account_id: str):
+        async with self.pool:
+            async with self.row_locks[account_id]:
+                self.transactions += 1
+                await asyncio.sleep(self.tx_time())
+
+    async def redis_call(self):
+        await asyncio.sleep(REDIS_RTT)
+
+
+async def inline_billing(backends: FakeBackends, account_id: str, message_id: str):
+    await backends.atomic_use_credits(account_id)
+    await backends.redis_call()  # Cache.invalidate credit_balance
+    await backends.redis_call()  # Cache.invalidate credit_summary
+
+
+async def ledger_billing(backends: FakeBackends, account_id: str, message_id: str):
+    await backends.redis_call()  # UsageLedger.record: SET NX + XADD + INCRBY in one script
+    backends.pending[account_id].append(message_id)
+
+
+async def settlement_worker(backends: FakeBackends, stop: asyncio.Event, interval: float):
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        batch = {account: ids for account, ids in backends.pending.items() if ids}
+        backends.pending = defaultdict(list)
+        await asyncio.gather(*(backends.atomic_use_credits(account) for account in batch))
+        await asyncio.gather(*(backends.redis_call() for _ in batch))  # cache invalidation + ack
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return f"p50={pick(0.50):7.1f}  p95={pick(0.95):7.1f}  p99={pick(0.99):7.1f}  max={ordered[-1] * 1000:7.1f} ms"
+
+
+async def run_mode(mode: str, args) -> None:
+    backends = FakeBackends(args.seed)
+    bill = inline_billing if mode == "inline" else ledger_billing
+    billing_times, turn_times = [], []
+    stop = asyncio.Event()
+    worker = asyncio.create_task(settlement_worker(backends, stop, args.settle_interval)) if mode == "ledger" else None
+
+    async def agent_run(run: int):
+        account_id = f"acct-{run % args.accounts}"
+        for turn in range(args.turns):
+            turn_start = time.perf_counter()
+            await asyncio.sleep(LLM_CALL * backends.random.uniform(0.5, 1.5))
+            billing_start = time.perf_counter()
+            await bill(backends, account_id, f"{run}-{turn}")
+            now = time.perf_counter()
+            billing_times.append(now - billing_start)
+            turn_times.append(now - turn_start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(agent_run(run) for run in range(args.runs)))
+    elapsed = time.perf_counter() - start
+    if worker:
+        stop.set()
+        await worker
+
+    print(f"{mode}: {len(turn_times)} turns in {elapsed:.1f}s, {backends.transactions} DB transactions")
+    print(f"  billing step  {percentiles(billing_times)}")
+    print(f"  full turn     {percentiles(turn_times)}  (mean {statistics.mean(turn_times) * 1000:.1f} ms)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=30, help="concurrent agent runs")
+    parser.add_argument("--accounts", type=int, default=20, help="accounts the runs are spread over")
+    parser.add_argument("--turns", type=int, default=40, help="LLM calls per run")
+    parser.add_argument("--settle-interval", type=float, default=0.5, help="seconds between settlements")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    await run_mode("inline", args)
+    await run_mode("ledger", args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""
+Benchmark the streaming XML tool-call parser against the previous per-chunk path.
+
+The previous ResponseProcessor path appended every chunk to a growing string and,
+on each processing step, re-ran extract_xml_chunks over it, removed found blocks
+with str.replace and re-parsed them (compiling one regex per invoke). That is
+quadratic in response size. The streaming parser scans each chunk once.
+
+--invoke-mb adds one large create_file invoke (markup-heavy, e.g. a generated
+HTML page) to the response; the streaming parser must not re-copy it per chunk.
+
+Usage:
+    uv run python core/utils/scripts/benchmark_xml_tool_parser.py [--mb 2] [--calls 200] [--chunk 40] [--invoke-mb 3]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+
+from core.agentpress.xml_tool_parser import (
+    StreamingXMLToolCallParser,
+    _PARAMETER_PATTERN,
+    _parse_parameter_value,
+    extract_xml_chunks,
+)
+
+_LEGACY_FUNCTION_CALLS = re.compile(r'<function_calls>(.*?)</function_calls>', re.DOTALL | re.IGNORECASE)
+_LEGACY_INVOKE = re.compile(r'<invoke\s+name=["\']([^"\']+)["\']>(.*?)</invoke>', re.DOTALL | re.IGNORECASE)
+
+
+def legacy_parse(xml_chunk: str):
+    """Copy of the pre-streaming parse: findall per block, one regex compile per invoke for raw_xml."""
+    calls = []
+    for block in _LEGACY_FUNCTION_CALLS.findall(xml_chunk):
+        for name, body in _LEGACY_INVOKE.findall(block):
+            params = {k: _parse_parameter_value(v.strip()) for k, v in _PARAMETER_PATTERN.findall(body)}
+            raw = re.search(
+                rf'<invoke\s+name=["\']{re.escape(name)}["\']>.*?</invoke>',
+                xml_chunk, re.DOTALL | re.IGNORECASE
+            )
+            calls.append((name, params, raw.group(0) if raw else ""))
+    return calls
+
+
+def legacy_stream(chunks):
+    current = ""
+    found = []
+    for chunk in chunks:
+        current += chunk
+        for xml_chunk in extract_xml_chunks(current):
+            current = current.replace(xml_chunk, "", 1)
+            found.extend(legacy_parse(xml_chunk))
+    return found
+
+
+def streaming(chunks):
+    parser = StreamingXMLToolCallParser()
+    found = []
+    for chunk in chunks:
+        found.extend(parser.feed(chunk))
+    return found
+
+
+def build_response(target_bytes: int, calls: int, invoke_bytes: int = 0) -> str:
+    filler_per_call = max(target_bytes // max(calls, 1), 64)
+    words = ["analysis", "result", "the", "file", "function", "context", "value", "update"]
+    rng = random.Random(7)
+    parts = []
+    for i in range(calls):
+        prose = " ".join(rng.choice(words) for _ in range(filler_per_call // 8))
+        parts.append(prose)
+        parts.append(
+            f'\n<function_calls>\n<invoke name="edit_file">\n'
+            f'<parameter name="target_file">src/module_{i}.py</parameter>\n'
+            f'<parameter name="code_edit">def f_{i}():\n    return {i}\n</parameter>\n'
+            f'<parameter name="options">{{"index": {i}, "dry_run": false}}</parameter>\n'
+            f'</invoke>\n</function_calls>\n'
+        )
+    if invoke_bytes:
+        page = "<div class='row'><span>cell</span></div>\n" * (invoke_bytes // 40)
+        parts.append(
+            f'\n<function_calls>\n<invoke name="create_file">\n'
+            f'<parameter name="file_path">index.html</parameter>\n'
+            f'<parameter name="file_contents">{page}</parameter>\n'
+            f'</invoke>\n</function_calls>\n'
+        )
+    return "".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=2.0, help="approximate response size in MB")
+    parser.add_argument("--calls", type=int, default=200, help="number of tool calls in the response")
+    parser.add_argument("--chunk", type=int, default=40, help="stream chunk size in characters")
+    parser.add_argument("--invoke-mb", type=float, default=0.0, help="size of one extra large invoke in MB")
+    args = parser.parse_args()
+
+    content = build_response(int(args.mb * 1024 * 1024), args.calls, int(args.invoke_mb * 1024 * 1024))
+    chunks = [content[i:i + args.chunk] for i in range(0, len(content), args.chunk)]
+    print(f"Response: {len(content) / 1024 / 1024:.2f} MB, {args.calls} tool calls, {len(chunks)} chunks"
+          + (f", one {args.invoke_mb:g} MB invoke" if args.invoke_mb else ""))
+    print("-" * 40)
+
+    start = time.perf_counter()
+    new_calls = streaming(chunks)
+    new_time = time.perf_counter() - start
+    print(f"streaming parser:  {new_time * 1000:10.1f} ms  ({len(new_calls)} calls)")
+
+    start = time.perf_counter()
+    old_calls = legacy_stream(chunks)
+    old_time = time.perf_counter() - start
+    print(f"legacy per-chunk:  {old_time * 1000:10.1f} ms  ({len(old_calls)} calls)")
+
+    same = [(c.function_name, c.parameters, c.raw_xml) for c in new_calls] == old_calls
+    print("-" * 40)
+    print(f"Speedup: {old_time / max(new_time, 1e-9):.1f}x  |  identical results: {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,9 +7,12 @@ Provides context for streaming tool outputs back to the frontend in real-time.
 import json
 import asyncio
 from contextvars import ContextVar
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, TYPE_CHECKING
 from dataclasses import dataclass
 
+if TYPE_CHECKING:
+    from core.services.redis import StreamWriter
+
 from core.utils.logger import logger
 
 
@@ -18,6 +21,8 @@ class ToolOutputStreamingContext:
     agent_run_id: str
     stream_key: str
     tool_call_id: Optional[str] = None
+    # Per-run batched writer; when set, tool output shares the run's ordering and pipeline
+    writer: Optional['StreamWriter'] = None
 
 
 _tool_output_streaming_context: ContextVar[Optional[ToolOutputStreamingContext]] = ContextVar(
@@ -29,12 +34,14 @@ _tool_output_streaming_context: ContextVar[Optional[ToolOutputStreamingContext]]
 def set_tool_output_streaming_context(
     agent_run_id: str,
     stream_key: str,
-    tool_call_id: Optional[str] = None
+    tool_call_id: Optional[str] = None,
+    writer: Optional['StreamWriter'] = None
 ) -> None:
     ctx = ToolOutputStreamingContext(
         agent_run_id=agent_run_id,
         stream_key=stream_key,
-        tool_call_id=tool_call_id
+        tool_call_id=tool_call_id,
+        writer=writer
     )
     _tool_output_streaming_context.set(ctx)
 
@@ -85,6 +92,10 @@ async def stream_tool_output(
         
         logger.debug(f"[TOOL OUTPUT] Writing to stream {ctx.stream_key}: tool_call_id={tool_call_id}, chunk_len={len(output_chunk)}, is_final={is_final}")
         
+        if ctx.writer is not None:
+            await ctx.writer.add(message_json, flush=is_final)
+            return
+        
         await redis.stream_add(
             ctx.stream_key,
             {"data": message_json},
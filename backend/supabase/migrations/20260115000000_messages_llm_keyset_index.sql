@@ -0,0 +1,12 @@
+-- ==============================================
+-- Keyset pagination for LLM message history
+-- iter_llm_messages pages a thread's LLM messages with a
+-- (created_at, message_id) cursor instead of LIMIT/OFFSET. This partial
+-- index matches its WHERE clause exactly, so every page is a single
+-- index range scan that skips omitted and non-LLM rows.
+-- ==============================================
+
+CREATE INDEX IF NOT EXISTS idx_messages_thread_llm_keyset
+ON public.messages(thread_id, created_at, message_id)
+WHERE is_llm_message = true
+  AND (metadata->>'omitted' IS NULL OR metadata->>'omitted' != 'true');
@@ -0,0 +1,18 @@
+-- ==============================================
+-- File versions behind diff-encoded edit results
+-- Edit tools return a unified diff plus the sha256 of the file before and
+-- after the edit. The full versions are stored here once per project
+-- (zlib-compressed, deduplicated by hash) and are served on demand by
+-- GET /threads/{thread_id}/file-edits. Only the backend reads this table.
+-- ==============================================
+
+CREATE TABLE IF NOT EXISTS file_edit_snapshots (
+    project_id UUID NOT NULL REFERENCES projects(project_id) ON DELETE CASCADE,
+    content_sha256 TEXT NOT NULL,
+    content_zlib BYTEA NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (project_id, content_sha256)
+);
+
+ALTER TABLE file_edit_snapshots ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,154 @@
+-- ==============================================
+-- Batched settlement of LLM usage
+-- The agent loop appends each LLM call's cost to a Redis stream (the usage
+-- ledger) instead of running atomic_use_credits inline. A settlement worker
+-- drains the stream and calls atomic_settle_usage once per account per batch.
+-- usage_settlements makes settlement idempotent on message_id, so a batch
+-- that is redelivered after a crash is never charged twice.
+-- ==============================================
+
+CREATE TABLE IF NOT EXISTS usage_settlements (
+    message_id TEXT PRIMARY KEY,
+    account_id UUID NOT NULL,
+    thread_id TEXT,
+    model TEXT,
+    amount NUMERIC(12, 6) NOT NULL,
+    ledger_id UUID,
+    settled_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_settlements_account_settled
+    ON usage_settlements(account_id, settled_at DESC);
+
+ALTER TABLE usage_settlements ENABLE ROW LEVEL SECURITY;
+
+-- p_entries: [{"message_id": ..., "thread_id": ..., "model": ..., "amount": ...}, ...]
+-- Deducts the sum of entries not settled before, in the same order as
+-- atomic_use_credits (daily -> monthly -> extra), and writes one ledger row.
+CREATE OR REPLACE FUNCTION atomic_settle_usage(
+    p_account_id UUID,
+    p_entries JSONB
+) RETURNS JSONB AS $$
+DECLARE
+    v_daily_balance NUMERIC(10, 2);
+    v_expiring_balance NUMERIC(10, 2);
+    v_non_expiring_balance NUMERIC(10, 2);
+    v_amount NUMERIC(10, 2);
+    v_raw_amount NUMERIC(12, 6);
+    v_settled_count INTEGER;
+    v_message_ids JSONB;
+    v_amount_from_daily NUMERIC(10, 2) := 0;
+    v_amount_from_expiring NUMERIC(10, 2) := 0;
+    v_amount_from_non_expiring NUMERIC(10, 2) := 0;
+    v_remaining NUMERIC(10, 2);
+    v_new_total NUMERIC(10, 2);
+    v_transaction_id UUID;
+BEGIN
+    SELECT
+        COALESCE(daily_credits_balance, 0),
+        COALESCE(expiring_credits, 0),
+        COALESCE(non_expiring_credits, 0)
+    INTO
+        v_daily_balance,
+        v_expiring_balance,
+        v_non_expiring_balance
+    FROM public.credit_accounts
+    WHERE account_id = p_account_id
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('success', false, 'error', 'No credit account found');
+    END IF;
+
+    WITH inserted AS (
+        INSERT INTO public.usage_settlements (message_id, account_id, thread_id, model, amount)
+        SELECT e.message_id, p_account_id, e.thread_id, e.model, e.amount
+        FROM jsonb_to_recordset(p_entries) AS e(message_id TEXT, thread_id TEXT, model TEXT, amount NUMERIC)
+        ON CONFLICT (message_id) DO NOTHING
+        RETURNING message_id, amount
+    )
+    SELECT COUNT(*), COALESCE(SUM(amount), 0), COALESCE(jsonb_agg(message_id), '[]'::jsonb)
+    INTO v_settled_count, v_raw_amount, v_message_ids
+    FROM inserted;
+
+    v_amount := ROUND(v_raw_amount, 2);
+
+    IF v_settled_count = 0 OR v_amount <= 0 THEN
+        RETURN jsonb_build_object(
+            'success', true,
+            'settled', v_settled_count,
+            'amount_deducted', 0,
+            'new_total', v_daily_balance + v_expiring_balance + v_non_expiring_balance
+        );
+    END IF;
+
+    v_remaining := v_amount;
+
+    IF v_remaining > 0 AND v_daily_balance > 0 THEN
+        v_amount_from_daily := LEAST(v_daily_balance, v_remaining);
+        v_remaining := v_remaining - v_amount_from_daily;
+    END IF;
+
+    IF v_remaining > 0 AND v_expiring_balance > 0 THEN
+        v_amount_from_expiring := LEAST(v_expiring_balance, v_remaining);
+        v_remaining := v_remaining - v_amount_from_expiring;
+    END IF;
+
+    -- Extra credits can go negative, as in atomic_use_credits
+    v_amount_from_non_expiring := v_remaining;
+
+    v_new_total := (v_daily_balance - v_amount_from_daily)
+        + (v_expiring_balance - v_amount_from_expiring)
+        + (v_non_expiring_balance - v_amount_from_non_expiring);
+
+    UPDATE public.credit_accounts
+    SET
+        daily_credits_balance = v_daily_balance - v_amount_from_daily,
+        expiring_credits = v_expiring_balance - v_amount_from_expiring,
+        non_expiring_credits = v_non_expiring_balance - v_amount_from_non_expiring,
+        balance = v_new_total,
+        updated_at = NOW()
+    WHERE account_id = p_account_id;
+
+    INSERT INTO public.credit_ledger (
+        account_id,
+        amount,
+        balance_after,
+        type,
+        description,
+        metadata
+    ) VALUES (
+        p_account_id,
+        -v_amount,
+        v_new_total,
+        'usage',
+        'LLM usage (' || v_settled_count || ' calls)',
+        jsonb_build_object(
+            'from_daily', v_amount_from_daily,
+            'from_monthly', v_amount_from_expiring,
+            'from_extra', v_amount_from_non_expiring,
+            'settled_calls', v_settled_count,
+            'unrounded_amount', v_raw_amount,
+            'message_ids', v_message_ids
+        )
+    )
+    RETURNING id INTO v_transaction_id;
+
+    UPDATE public.usage_settlements
+    SET ledger_id = v_transaction_id
+    WHERE message_id IN (SELECT jsonb_array_elements_text(v_message_ids));
+
+    RETURN jsonb_build_object(
+        'success', true,
+        'settled', v_settled_count,
+        'amount_deducted', v_amount,
+        'new_total', v_new_total,
+        'from_daily', v_amount_from_daily,
+        'from_expiring', v_amount_from_expiring,
+        'from_non_expiring', v_amount_from_non_expiring,
+        'transaction_id', v_transaction_id
+    );
+END;
+$$ LANGUAGE plpgsql SET search_path = public;
+
+GRANT EXECUTE ON FUNCTION atomic_settle_usage(UUID, JSONB) TO service_role;
@@ -0,0 +1,191 @@
+-- ==============================================
+-- One credit_ledger row per settled LLM call
+-- atomic_settle_usage wrote a single "LLM usage (N calls)" row per batch with
+-- no thread, message or model, so per-thread usage (get_credit_usage_by_thread*)
+-- and the per-call /credit-usage listing lost all settled LLM spend. Each
+-- settled call now gets its own usage row, shaped like the rows
+-- atomic_use_credits writes (thread_id / message_id in metadata and
+-- reference_id), plus the model. The batch is still deducted as one rounded
+-- amount, shared out over its rows in proportion to their cost (largest
+-- remainder, to 0.0001) so the rows add up to the deduction and none is
+-- negative.
+-- Calls that round to less than a cent are not charged as 0: they stay
+-- pending in usage_settlements (ledger_id IS NULL) and are settled with the
+-- account's next batch.
+-- ==============================================
+
+CREATE INDEX IF NOT EXISTS idx_usage_settlements_account_pending
+    ON usage_settlements(account_id)
+    WHERE ledger_id IS NULL;
+
+CREATE OR REPLACE FUNCTION atomic_settle_usage(
+    p_account_id UUID,
+    p_entries JSONB
+) RETURNS JSONB AS $$
+DECLARE
+    v_daily_balance NUMERIC(10, 2);
+    v_expiring_balance NUMERIC(10, 2);
+    v_non_expiring_balance NUMERIC(10, 2);
+    v_amount NUMERIC(10, 2);
+    v_raw_amount NUMERIC(12, 6);
+    v_settled_count INTEGER;
+    v_message_ids JSONB;
+    v_amount_from_daily NUMERIC(10, 2) := 0;
+    v_amount_from_expiring NUMERIC(10, 2) := 0;
+    v_amount_from_non_expiring NUMERIC(10, 2) := 0;
+    v_remaining NUMERIC(10, 2);
+    v_new_total NUMERIC(10, 2);
+    v_running_total NUMERIC(12, 4);
+    v_entry RECORD;
+    v_transaction_id UUID;
+BEGIN
+    SELECT
+        COALESCE(daily_credits_balance, 0),
+        COALESCE(expiring_credits, 0),
+        COALESCE(non_expiring_credits, 0)
+    INTO
+        v_daily_balance,
+        v_expiring_balance,
+        v_non_expiring_balance
+    FROM public.credit_accounts
+    WHERE account_id = p_account_id
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('success', false, 'error', 'No credit account found');
+    END IF;
+
+    INSERT INTO public.usage_settlements (message_id, account_id, thread_id, model, amount)
+    SELECT e.message_id, p_account_id, e.thread_id, e.model, e.amount
+    FROM jsonb_to_recordset(p_entries) AS e(message_id TEXT, thread_id TEXT, model TEXT, amount NUMERIC)
+    ON CONFLICT (message_id) DO NOTHING;
+
+    -- This batch plus any earlier calls left pending below a cent
+    SELECT COUNT(*), COALESCE(SUM(amount), 0), COALESCE(jsonb_agg(message_id), '[]'::jsonb)
+    INTO v_settled_count, v_raw_amount, v_message_ids
+    FROM public.usage_settlements
+    WHERE account_id = p_account_id
+      AND ledger_id IS NULL;
+
+    v_amount := ROUND(v_raw_amount, 2);
+
+    IF v_settled_count = 0 OR v_amount <= 0 THEN
+        RETURN jsonb_build_object(
+            'success', true,
+            'settled', 0,
+            'pending', v_settled_count,
+            'amount_deducted', 0,
+            'new_total', v_daily_balance + v_expiring_balance + v_non_expiring_balance
+        );
+    END IF;
+
+    v_remaining := v_amount;
+
+    IF v_remaining > 0 AND v_daily_balance > 0 THEN
+        v_amount_from_daily := LEAST(v_daily_balance, v_remaining);
+        v_remaining := v_remaining - v_amount_from_daily;
+    END IF;
+
+    IF v_remaining > 0 AND v_expiring_balance > 0 THEN
+        v_amount_from_expiring := LEAST(v_expiring_balance, v_remaining);
+        v_remaining := v_remaining - v_amount_from_expiring;
+    END IF;
+
+    -- Extra credits can go negative, as in atomic_use_credits
+    v_amount_from_non_expiring := v_remaining;
+
+    v_new_total := (v_daily_balance - v_amount_from_daily)
+        + (v_expiring_balance - v_amount_from_expiring)
+        + (v_non_expiring_balance - v_amount_from_non_expiring);
+
+    UPDATE public.credit_accounts
+    SET
+        daily_credits_balance = v_daily_balance - v_amount_from_daily,
+        expiring_credits = v_expiring_balance - v_amount_from_expiring,
+        non_expiring_credits = v_non_expiring_balance - v_amount_from_non_expiring,
+        balance = v_new_total,
+        updated_at = NOW()
+    WHERE account_id = p_account_id;
+
+    v_running_total := v_daily_balance + v_expiring_balance + v_non_expiring_balance;
+
+    -- Share v_amount out in 0.0001 units: each row gets the floor of its
+    -- proportional share, the rows with the largest remainders one unit more
+    FOR v_entry IN
+        WITH shares AS (
+            SELECT s.message_id, s.thread_id, s.model, s.amount,
+                   s.amount * v_amount * 10000 / v_raw_amount AS units
+            FROM public.usage_settlements s
+            WHERE s.message_id IN (SELECT jsonb_array_elements_text(v_message_ids))
+        ), floored AS (
+            SELECT shares.*,
+                   FLOOR(units) AS base_units,
+                   ROW_NUMBER() OVER (ORDER BY units - FLOOR(units) DESC, message_id) AS remainder_rank
+            FROM shares
+        )
+        SELECT f.message_id, f.thread_id, f.model, f.amount,
+               ((f.base_units + CASE
+                    WHEN f.remainder_rank <= v_amount * 10000 - SUM(f.base_units) OVER () THEN 1
+                    ELSE 0
+                END) / 10000)::NUMERIC(12, 4) AS booked_amount
+        FROM floored f
+        ORDER BY f.message_id
+    LOOP
+        v_running_total := v_running_total - v_entry.booked_amount;
+
+        INSERT INTO public.credit_ledger (
+            account_id,
+            amount,
+            balance_after,
+            type,
+            description,
+            reference_id,
+            thread_id,
+            metadata,
+            processing_source
+        ) VALUES (
+            p_account_id,
+            -v_entry.booked_amount,
+            v_running_total,
+            'usage',
+            COALESCE(v_entry.model, 'LLM') || ' usage',
+            CASE
+                WHEN v_entry.thread_id ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+                THEN v_entry.thread_id::uuid
+                ELSE NULL
+            END,
+            CASE
+                WHEN v_entry.thread_id ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+                THEN v_entry.thread_id::uuid
+                ELSE NULL
+            END,
+            jsonb_build_object(
+                'thread_id', v_entry.thread_id,
+                'message_id', v_entry.message_id,
+                'model', v_entry.model,
+                'unrounded_amount', v_entry.amount,
+                'settled_calls', v_settled_count
+            ),
+            'usage_settlement'
+        )
+        RETURNING id INTO v_transaction_id;
+
+        UPDATE public.usage_settlements
+        SET ledger_id = v_transaction_id
+        WHERE message_id = v_entry.message_id;
+    END LOOP;
+
+    RETURN jsonb_build_object(
+        'success', true,
+        'settled', v_settled_count,
+        'amount_deducted', v_amount,
+        'new_total', v_new_total,
+        'from_daily', v_amount_from_daily,
+        'from_expiring', v_amount_from_expiring,
+        'from_non_expiring', v_amount_from_non_expiring,
+        'transaction_id', v_transaction_id
+    );
+END;
+$$ LANGUAGE plpgsql SET search_path = public;
+
+GRANT EXECUTE ON FUNCTION atomic_settle_usage(UUID, JSONB) TO service_role;
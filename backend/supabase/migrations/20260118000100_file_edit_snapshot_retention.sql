@@ -0,0 +1,33 @@
+-- ==============================================
+-- Retention for file_edit_snapshots
+-- Snapshots back the on-demand before/after view of edit tool results and
+-- were never removed. Each save now refreshes last_used_at (versions are
+-- deduplicated by hash, so a live file keeps being touched) and a daily job
+-- deletes versions unused for 30 days. Expired versions are reported as not
+-- found by GET /threads/{thread_id}/file-edits; the clients then show the
+-- edit's diff and arguments only.
+-- ==============================================
+
+ALTER TABLE file_edit_snapshots
+    ADD COLUMN IF NOT EXISTS last_used_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+
+CREATE INDEX IF NOT EXISTS idx_file_edit_snapshots_last_used
+    ON file_edit_snapshots(last_used_at);
+
+CREATE OR REPLACE FUNCTION cleanup_expired_file_edit_snapshots()
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    DELETE FROM public.file_edit_snapshots
+    WHERE last_used_at < NOW() - INTERVAL '30 days';
+END;
+$$;
+
+SELECT cron.schedule(
+    'cleanup-expired-file-edit-snapshots',
+    '30 3 * * *',
+    $$SELECT cleanup_expired_file_edit_snapshots()$$
+);
@@ -0,0 +1,58 @@
+-- atomic_settle_usage: sub-cent batches and per-call ledger rows
+-- Run with: supabase test db
+BEGIN;
+CREATE EXTENSION IF NOT EXISTS pgtap WITH SCHEMA extensions;
+SELECT plan(7);
+
+-- Credit accounts reference auth users; this test only needs the balances
+SET LOCAL session_replication_role = replica;
+
+INSERT INTO public.credit_accounts (account_id, balance, daily_credits_balance, expiring_credits, non_expiring_credits)
+VALUES ('00000000-0000-0000-0000-0000000000a1', 10.00, 0, 10.00, 0);
+
+-- 1. A batch that rounds to 0.00 is not charged, and not marked settled either
+SELECT is(
+    (atomic_settle_usage('00000000-0000-0000-0000-0000000000a1',
+        '[{"message_id": "m-0", "thread_id": null, "model": "m", "amount": "0.004"}]'::jsonb)->>'amount_deducted')::numeric,
+    0::numeric,
+    'sub-cent batch deducts nothing'
+);
+SELECT ok(
+    (SELECT ledger_id IS NULL FROM public.usage_settlements WHERE message_id = 'm-0'),
+    'sub-cent call stays pending'
+);
+
+-- 2. Ten calls of 0.0014 settle together with the pending one: 0.018 -> 0.02
+SELECT is(
+    (atomic_settle_usage('00000000-0000-0000-0000-0000000000a1',
+        (SELECT jsonb_agg(jsonb_build_object('message_id', 'm-' || i, 'thread_id', NULL, 'model', 'm', 'amount', '0.0014'))
+         FROM generate_series(1, 10) AS i))->>'amount_deducted')::numeric,
+    0.02::numeric,
+    'pending sub-cent call is carried into the next batch'
+);
+SELECT is(
+    (SELECT COUNT(*) FROM public.usage_settlements
+     WHERE account_id = '00000000-0000-0000-0000-0000000000a1' AND ledger_id IS NULL),
+    0::bigint,
+    'every call is settled'
+);
+SELECT is(
+    (SELECT -SUM(amount) FROM public.credit_ledger
+     WHERE account_id = '00000000-0000-0000-0000-0000000000a1' AND processing_source = 'usage_settlement'),
+    0.02::numeric,
+    'ledger rows add up to the deduction'
+);
+SELECT is(
+    (SELECT COUNT(*) FROM public.credit_ledger
+     WHERE account_id = '00000000-0000-0000-0000-0000000000a1' AND processing_source = 'usage_settlement' AND amount > 0),
+    0::bigint,
+    'no ledger row is a credit'
+);
+SELECT is(
+    (SELECT expiring_credits FROM public.credit_accounts WHERE account_id = '00000000-0000-0000-0000-0000000000a1'),
+    9.98::numeric,
+    'balance is charged once'
+);
+
+SELECT * FROM finish();
+ROLLBACK;
@@ -0,0 +1,20 @@
+"""
+Shared fixtures for AgentPress tests
+"""
+import os
+import sys
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+@pytest.fixture(autouse=True)
+def reset_token_accountant():
+    """Every test starts with an empty process-wide token cache and no calibration."""
+    from core.agentpress.token_accounting import token_accountant
+
+    token_accountant.reset()
+    yield
+    token_accountant.reset()
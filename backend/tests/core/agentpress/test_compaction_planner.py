@@ -0,0 +1,135 @@
+"""
+Compaction Planner Tests
+
+Verifies the single-pass compaction plan used by ContextManager.compress_messages:
+1. Actions are taken cheapest-first (old tool outputs before anything else) and
+   planning stops once the budget is met
+2. Omission drops whole tool-call groups from the middle, keeping pairing valid
+3. The plan is deterministic for the same input, whatever the process has
+   counted before
+4. Omission lands close to the budget (the last group is stubbed rather than
+   dropped when that is enough) and honours the message cap
+
+Run with: pytest tests/core/agentpress/test_compaction_planner.py -v
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+def cost(msg):
+    # 1 token per 4 characters, plus framing
+    return len(str(msg.get('content', ''))) // 4 + 4
+
+
+def build_thread(turns=12, tool_chars=8000, text_chars=400):
+    messages = [{"role": "user", "content": "Build the report. " * 20, "message_id": "task"}]
+    for i in range(turns):
+        call_id = f"call_{i}"
+        messages.append({
+            "role": "assistant",
+            "content": f"Step {i}. " + "x" * text_chars,
+            "message_id": f"a{i}",
+            "tool_calls": [{"id": call_id, "type": "function", "function": {"name": "web_search", "arguments": "{}"}}],
+        })
+        messages.append({"role": "tool", "tool_call_id": call_id, "content": "r" * tool_chars, "message_id": f"t{i}"})
+        messages.append({"role": "user", "content": f"Continue {i}", "message_id": f"u{i}"})
+    return messages
+
+
+@pytest.fixture
+def planner():
+    from core.agentpress.context_manager import ContextManager
+    from core.agentpress.compaction_planner import CompactionPlanner
+
+    return CompactionPlanner(ContextManager(db=object()), cost_fn=cost, keep_recent_tool_outputs=3)
+
+
+def test_stubs_oldest_tool_outputs_first_and_stops_at_budget(planner):
+    from core.agentpress.compaction_planner import STUB
+
+    messages = build_thread()
+    total = sum(cost(m) for m in messages)
+    plan = planner.plan(messages, target_tokens=total - 5000)
+
+    assert plan.fits
+    changed = plan.describe()
+    # Each tool output saves ~2000 tokens: three stubs are enough, taken from the oldest
+    assert [(i, action) for i, action, _, _ in changed] == [(2, STUB), (5, STUB), (8, STUB)]
+    assert plan.counts.get("omit", 0) == 0
+
+
+def test_omission_keeps_pairing_and_recent_groups(planner):
+    messages = build_thread()
+    plan = planner.plan(messages, target_tokens=2000)
+    result, omitted = plan.apply(messages)
+
+    assert plan.groups_omitted > 0
+    assert omitted
+    assert result[0]["message_id"] == "task"
+    assert result[-1]["message_id"] == messages[-1]["message_id"]
+    is_valid, _, _ = planner.context_manager.validate_tool_call_pairing(result)
+    assert is_valid
+    # Stubbed rows keep their structure
+    for msg in result:
+        if msg["role"] == "tool":
+            assert msg["tool_call_id"]
+
+
+def test_plan_is_deterministic(planner):
+    first = planner.plan(build_thread(), target_tokens=6000)
+    second = planner.plan(build_thread(), target_tokens=6000)
+
+    assert first.describe() == second.describe()
+    assert first.tokens_after == second.tokens_after
+
+
+def test_plan_ignores_estimator_calibration():
+    from core.agentpress.context_manager import ContextManager
+    from core.agentpress.token_accounting import token_accountant
+
+    cm = ContextManager(db=object())
+    messages = build_thread()
+    first = cm.plan_compaction(messages, "gpt-4", target_tokens=6000, measured_total=30000)
+    # Another thread's exact count moves the process-wide calibration
+    token_accountant.observe_exact("gpt-4", messages, 90000)
+    second = cm.plan_compaction(build_thread(), "gpt-4", target_tokens=6000, measured_total=30000)
+
+    assert first.describe() == second.describe()
+    assert first.budget == second.budget
+
+
+def test_last_group_is_stubbed_instead_of_overshooting(planner):
+    from core.agentpress.compaction_planner import STUB
+
+    # Large assistant text in every turn: stubbing tool outputs alone can't reach the budget
+    messages = build_thread(text_chars=12000)
+    plan = planner.plan(messages, target_tokens=sum(cost(m) for m in messages) // 2)
+
+    assert plan.fits
+    assert plan.groups_omitted > 0
+    # Undershoot is at most one message, not a whole group
+    assert plan.budget - plan.tokens_after < max(cost(m) for m in messages)
+    # The group next in line for omission was stubbed instead, keeping its tool call pair
+    assert any(a.action == STUB and a.content.startswith("[Message omitted") for a in plan.actions)
+    result, _ = plan.apply(messages)
+    is_valid, _, _ = planner.context_manager.validate_tool_call_pairing(result)
+    assert is_valid
+
+
+def test_message_cap_is_planned_before_tokens(planner):
+    planner.max_messages = 20
+    messages = build_thread(turns=30, tool_chars=400)
+    plan = planner.plan(messages, target_tokens=10 ** 6)
+    result, omitted = plan.apply(messages)
+
+    assert len(result) <= 20
+    assert plan.counts.get("stub", 0) == 0
+    assert result[0]["message_id"] == "task"
+    is_valid, _, _ = planner.context_manager.validate_tool_call_pairing(result)
+    assert is_valid
@@ -0,0 +1,176 @@
+"""
+Message Persister Tests
+
+Verifies the write-behind persister used while a turn streams:
+1. Updates of one message are coalesced into a single write
+2. Queued tool results go out in one batched insert, flagged visible if marked so
+3. A failed flush keeps its writes queued and the next flush re-sends them
+4. Retries back off and stop after MAX_FLUSH_FAILURES; explicit flushes then raise
+5. Queued rows sort in queue order, after the assistant message they follow,
+   even when that message's created_at is ahead of the local clock
+6. Every flush attempt, failed inserts included, invalidates the cached history
+   from the earliest created_at it wrote, after the write
+
+Run with: pytest tests/core/agentpress/test_message_persister.py -v
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+@pytest.fixture
+def fake_repo(monkeypatch):
+    from core.threads import repo as threads_repo
+    import core.cache.runtime_cache as runtime_cache
+
+    calls = {"inserts": [], "updates": [], "fail_inserts": 0, "events": []}
+
+    async def insert_messages_batch(messages, batch_size=200):
+        calls["events"].append(("insert", [m["message_id"] for m in messages]))
+        if calls["fail_inserts"]:
+            calls["fail_inserts"] -= 1
+            raise RuntimeError("connection reset")
+        calls["inserts"].append([dict(m) for m in messages])
+        return len(messages)
+
+    async def update_message_content(message_id, content, metadata=None):
+        calls["updates"].append((message_id, content, metadata))
+        return {"message_id": message_id, "content": content, "metadata": metadata}
+
+    async def invalidate_message_history_suffix(thread_id, message_ids=None, tool_call_ids=None, since=None):
+        calls["events"].append(("invalidate", thread_id, list(message_ids or []), since))
+
+    monkeypatch.setattr(threads_repo, "insert_messages_batch", insert_messages_batch)
+    monkeypatch.setattr(threads_repo, "update_message_content", update_message_content)
+    monkeypatch.setattr(runtime_cache, "invalidate_message_history_suffix", invalidate_message_history_suffix)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_updates_coalesce_per_message(fake_repo):
+    from core.agentpress.message_persister import MessagePersister
+
+    persister = MessagePersister(flush_delay=60)
+    persister.track({"message_id": "a1", "thread_id": "t1", "type": "assistant", "created_at": "2026-01-01T00:00:00+00:00"})
+    for i in range(5):
+        row = persister.update("a1", "t1", {"role": "assistant", "content": f"v{i}"}, {"tool_calls": [i]})
+
+    assert row["type"] == "assistant"
+    assert row["content"]["content"] == "v4"
+    await persister.flush()
+
+    assert fake_repo["updates"] == [("a1", {"role": "assistant", "content": "v4"}, {"tool_calls": [4]})]
+    assert not persister.has_pending()
+
+
+@pytest.mark.asyncio
+async def test_tool_results_batched_and_marked_visible(fake_repo):
+    from core.agentpress.message_persister import MessagePersister
+
+    persister = MessagePersister(flush_delay=60)
+    rows = [
+        persister.insert("t1", "tool", {"role": "tool", "content": str(i)}, is_llm_message=False)
+        for i in range(4)
+    ]
+    ids = [row["message_id"] for row in rows]
+    assert len(set(ids)) == 4
+
+    still_needs_update = persister.mark_llm_visible(ids + ["written-earlier"])
+    await persister.flush()
+
+    assert still_needs_update == ["written-earlier"]
+    assert len(fake_repo["inserts"]) == 1
+    batch = fake_repo["inserts"][0]
+    assert [m["message_id"] for m in batch] == ids
+    assert all(m["is_llm_message"] for m in batch)
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_writes_queued(fake_repo):
+    from core.agentpress.message_persister import MessagePersister
+
+    fake_repo["fail_inserts"] = 1
+    persister = MessagePersister(flush_delay=60)
+    row = persister.insert("t1", "tool", {"role": "tool", "content": "x"})
+
+    await persister.flush()
+    assert persister.has_pending()
+    assert fake_repo["inserts"] == []
+
+    await persister.flush()
+    assert not persister.has_pending()
+    assert [m["message_id"] for m in fake_repo["inserts"][0]] == [row["message_id"]]
+
+
+@pytest.mark.asyncio
+async def test_retries_back_off_then_surface_the_failure(fake_repo, monkeypatch):
+    from core.agentpress import message_persister as module
+
+    delays = []
+
+    async def fake_sleep(seconds):
+        delays.append(seconds)
+
+    fake_repo["fail_inserts"] = 100
+    monkeypatch.setattr(module.asyncio, "sleep", fake_sleep)
+    persister = module.MessagePersister(flush_delay=2)
+    persister.insert("t1", "tool", {"role": "tool", "content": "x"})
+
+    # The first timer and every retry run back to back with the fake sleep
+    while persister._flush_task is not None and not persister._flush_task.done():
+        await persister._flush_task
+
+    assert delays == [2, 4, 8, 16, 30]
+    assert isinstance(persister.error, module.MessagePersistenceError)
+    assert persister.has_pending()
+    with pytest.raises(module.MessagePersistenceError):
+        await persister.flush()
+
+    # The database is back: an explicit flush writes the held rows and clears the error
+    fake_repo["fail_inserts"] = 0
+    await persister.flush()
+    assert persister.error is None
+    assert not persister.has_pending()
+
+
+@pytest.mark.asyncio
+async def test_queued_rows_sort_after_tracked_rows(fake_repo):
+    from datetime import datetime, timedelta, timezone
+
+    from core.agentpress.message_persister import MessagePersister
+
+    persister = MessagePersister(flush_delay=60)
+    ahead = datetime.now(timezone.utc) + timedelta(hours=1)
+    persister.track({"message_id": "a1", "thread_id": "t1", "type": "assistant", "created_at": ahead.isoformat()})
+    rows = [persister.insert("t1", "tool", {"role": "tool", "content": str(i)}) for i in range(3)]
+
+    created = [row["created_at"] for row in rows]
+    assert ahead < created[0] < created[1] < created[2]
+    await persister.flush()
+    assert [m["created_at"] for m in fake_repo["inserts"][0]] == created
+
+
+@pytest.mark.asyncio
+async def test_every_flush_attempt_invalidates_history(fake_repo):
+    from core.agentpress.message_persister import MessagePersister
+
+    fake_repo["fail_inserts"] = 1
+    persister = MessagePersister(flush_delay=60)
+    first = persister.insert("t1", "tool", {"role": "tool", "content": "a"})
+    second = persister.insert("t1", "tool", {"role": "tool", "content": "b"})
+    ids = [first["message_id"], second["message_id"]]
+
+    # The failed insert may have committed before the error reached us
+    await persister.flush()
+    await persister.flush()
+    assert fake_repo["events"] == [
+        ("insert", ids),
+        ("invalidate", "t1", ids, first["created_at"]),
+        ("insert", ids),
+        ("invalidate", "t1", ids, first["created_at"]),
+    ]
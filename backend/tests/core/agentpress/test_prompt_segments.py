@@ -0,0 +1,88 @@
+"""
+Prompt Segments Tests
+
+Verifies segmented system prompt assembly:
+1. Volatile segments always follow stable ones and the stable prefix end is
+   emitted as the cache breakpoint
+2. Segments are memoized by fingerprint and rebuilt when their inputs change
+3. apply_anthropic_caching_strategy caches the stable prefix, not the volatile tail
+
+Run with: pytest tests/core/agentpress/test_prompt_segments.py -v
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+def build_prompt(date: str, user: str):
+    from core.agentpress.prompt_segments import PromptSegment, SegmentedPrompt
+
+    prompt = SegmentedPrompt()
+    prompt.add(PromptSegment("base", "You are an agent. " * 400))
+    prompt.add(PromptSegment("datetime", f"\nToday's date: {date}\n", volatile=True))
+    # Added after a volatile segment, still placed in the stable prefix
+    prompt.add(PromptSegment("knowledge_base", "\nKB: quarterly numbers\n"))
+    prompt.add(PromptSegment("user_context", f"\nThe user's name is: {user}\n", volatile=True))
+    return prompt
+
+
+def test_stable_prefix_is_identical_across_dates_and_users():
+    from core.agentpress.prompt_segments import CACHE_BREAKPOINTS_KEY, split_at_breakpoints
+
+    monday = build_prompt("Monday", "ada")
+    tuesday = build_prompt("Tuesday", "grace")
+
+    assert [s.name for s in monday.segments] == ["base", "knowledge_base", "datetime", "user_context"]
+    assert monday.stable_prefix == tuesday.stable_prefix
+    assert monday.text != tuesday.text
+
+    message = monday.to_message()
+    assert message[CACHE_BREAKPOINTS_KEY] == [len(monday.stable_prefix)]
+    parts = split_at_breakpoints(message)
+    assert parts[0] == monday.stable_prefix
+    assert "".join(parts) == message["content"]
+
+
+def test_segments_memoized_by_fingerprint():
+    from core.agentpress.prompt_segments import PromptSegmentCache, fingerprint
+
+    cache = PromptSegmentCache()
+    builds = []
+
+    def build(tools):
+        builds.append(tools)
+        return "tools: " + ",".join(tools)
+
+    tools = ["web_search", "edit_file"]
+    first = cache.get_or_build("xml_tools", fingerprint(sorted(tools)), lambda: build(tools))
+    second = cache.get_or_build("xml_tools", fingerprint(sorted(reversed(tools))), lambda: build(tools))
+    assert first == second
+    assert len(builds) == 1
+
+    cache.get_or_build("xml_tools", fingerprint(sorted(tools + ["browser"])), lambda: build(tools + ["browser"]))
+    assert len(builds) == 2
+    assert cache.get_stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_caching_strategy_breaks_after_stable_prefix():
+    from core.agentpress.prompt_caching import apply_anthropic_caching_strategy
+
+    prompt = build_prompt("Monday", "ada")
+    prepared = await apply_anthropic_caching_strategy(
+        prompt.to_message(), [], "kortix/basic",
+        context_window_tokens=200_000, cache_threshold_tokens=2_000
+    )
+
+    system = prepared[0]
+    assert "cache_breakpoints" not in system
+    blocks = system["content"]
+    assert blocks[0]["text"] == prompt.stable_prefix
+    assert blocks[0]["cache_control"] == {"type": "ephemeral"}
+    assert all("cache_control" not in block for block in blocks[1:])
+    assert "".join(block["text"] for block in blocks) == prompt.text
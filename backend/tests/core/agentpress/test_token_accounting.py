@@ -0,0 +1,118 @@
+"""
+Token Accounting Tests
+
+Verifies the per-message token cache and the offline estimator:
+1. Exact thread totals only tokenize messages that were not counted before
+2. cache_control markers don't change a message's fingerprint
+3. Exact counts calibrate the estimator; a ContextManager can be given its own
+   accountant so its estimates don't move with other threads' counts
+4. Fingerprints are remembered per message object until its content changes
+
+Run with: pytest tests/core/agentpress/test_token_accounting.py -v
+"""
+
+import os
+import sys
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+MODEL = "anthropic/claude-sonnet-4-5"
+
+
+@pytest.fixture
+def accountant():
+    from core.agentpress.token_accounting import TokenAccountant
+
+    acct = TokenAccountant(max_entries=1000)
+    calls = []
+
+    def fake_tokenize(message, model):
+        calls.append(message)
+        return len(str(message.get('content'))) // 4 + 3
+
+    acct._tokenize_message = fake_tokenize
+    acct.calls = calls
+    with patch('core.services.redis.mget', new=AsyncMock(side_effect=lambda keys, timeout=None: [None] * len(keys))), \
+         patch('core.services.redis.set_multiple', new=AsyncMock(return_value=0)):
+        yield acct
+
+
+def _conversation(n):
+    return [
+        {'role': 'user' if i % 2 == 0 else 'assistant', 'content': f"message {i} " + "lorem ipsum dolor " * 40}
+        for i in range(n)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_exact_total_only_tokenizes_new_messages(accountant):
+    messages = _conversation(10)
+    first = await accountant.count_messages_exact(messages, MODEL)
+    assert len(accountant.calls) == 10
+
+    messages.append({'role': 'user', 'content': 'one more question'})
+    second = await accountant.count_messages_exact(messages, MODEL)
+
+    assert len(accountant.calls) == 11
+    assert second > first
+
+
+@pytest.mark.asyncio
+async def test_cache_control_does_not_change_fingerprint(accountant):
+    from core.agentpress.token_accounting import message_fingerprint
+
+    plain = {'role': 'user', 'content': [{'type': 'text', 'text': 'hello ' * 50}]}
+    cached = {'role': 'user', 'content': [{'type': 'text', 'text': 'hello ' * 50, 'cache_control': {'type': 'ephemeral'}}]}
+
+    assert message_fingerprint(plain) == message_fingerprint(cached)
+    await accountant.count_messages_exact([plain], MODEL)
+    await accountant.count_messages_exact([cached], MODEL)
+    assert len(accountant.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_exact_counts_calibrate_estimator(accountant):
+    messages = _conversation(20)
+    assert accountant.calibration_factor(MODEL) == 1.0
+
+    exact = await accountant.count_messages_exact(messages, MODEL)
+    estimate = accountant.estimate_messages(messages, MODEL)
+
+    assert accountant.calibration_factor(MODEL) != 1.0
+    assert abs(estimate - exact) / exact < 0.05
+
+
+@pytest.mark.asyncio
+async def test_injected_accountant_is_isolated(accountant):
+    from core.agentpress.context_manager import ContextManager
+    from core.agentpress.token_accounting import token_accountant
+
+    messages = _conversation(20)
+    isolated = ContextManager(db=object(), accountant=accountant)
+    before = isolated.estimate_tokens(MODEL, messages)
+
+    token_accountant.observe_exact(MODEL, messages, before * 2)
+
+    assert isolated.estimate_tokens(MODEL, messages) == before
+    assert ContextManager(db=object()).estimate_tokens(MODEL, messages) > before
+
+
+def test_fingerprint_is_remembered_until_content_changes(accountant, monkeypatch):
+    from core.agentpress import token_accounting
+
+    hashed = []
+    real = token_accounting.message_fingerprint
+    monkeypatch.setattr(token_accounting, "message_fingerprint", lambda m: hashed.append(m) or real(m))
+
+    messages = _conversation(10)
+    first = accountant.estimate_messages(messages, MODEL)
+    assert accountant.estimate_messages(messages, MODEL) == first
+    assert len(hashed) == 10
+
+    messages[3]["content"] = "short"
+    assert accountant.estimate_messages(messages, MODEL) < first
+    assert len(hashed) == 11
@@ -0,0 +1,91 @@
+"""
+Tool Scheduler Tests
+
+Verifies how the scheduler admits concurrent tool calls:
+1. Writes to the same file run in call order; reads of a file overlap
+2. Per-tool budgets cap concurrency
+3. Unrelated calls complete in the order they finish, not the order submitted
+
+Run with: pytest tests/core/agentpress/test_tool_scheduler.py -v
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+def make_executor(durations=None):
+    log = []
+    running = {"now": 0, "peak": 0}
+
+    async def execute(tool_call):
+        name = tool_call["function_name"]
+        log.append(("start", tool_call["id"]))
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep((durations or {}).get(tool_call["id"], 0.01))
+        running["now"] -= 1
+        log.append(("end", tool_call["id"]))
+        return name
+
+    return execute, log, running
+
+
+def call(call_id, function_name, **arguments):
+    return {"id": call_id, "function_name": function_name, "arguments": arguments}
+
+
+@pytest.mark.asyncio
+async def test_writes_to_same_path_keep_call_order():
+    from core.agentpress.tool_scheduler import ToolScheduler
+
+    scheduler = ToolScheduler()
+    execute, log, _ = make_executor({"w1": 0.05})
+    tasks = [
+        scheduler.submit(call("w1", "str_replace", file_path="/workspace/app.py"), execute),
+        scheduler.submit(call("r1", "read_file", file_path="app.py"), execute),
+        scheduler.submit(call("r2", "read_file", file_paths=["./app.py"]), execute),
+        scheduler.submit(call("w2", "edit_file", target_file="app.py"), execute),
+    ]
+    await asyncio.gather(*tasks)
+
+    assert log.index(("end", "w1")) < log.index(("start", "r1"))
+    # The two reads overlap
+    assert log.index(("start", "r2")) < log.index(("end", "r1"))
+    assert log.index(("end", "r2")) < log.index(("start", "w2"))
+    assert not scheduler._path_queues
+
+
+@pytest.mark.asyncio
+async def test_tool_budget_limits_concurrency():
+    from core.agentpress.tool_scheduler import ToolScheduler, TOOL_LIMITS
+
+    scheduler = ToolScheduler()
+    execute, _, running = make_executor()
+    tasks = [scheduler.submit(call(f"s{i}", "web_search", query=str(i)), execute) for i in range(10)]
+    await asyncio.gather(*tasks)
+
+    assert running["peak"] == TOOL_LIMITS["web_search"]
+
+
+@pytest.mark.asyncio
+async def test_independent_calls_complete_in_finish_order():
+    from core.agentpress.tool_scheduler import ToolScheduler, tool_scheduler_stats
+
+    scheduler = ToolScheduler()
+    execute, log, _ = make_executor({"slow": 0.05, "fast": 0.01})
+    slow = scheduler.submit(call("slow", "create_file", file_path="a.txt"), execute)
+    fast = scheduler.submit(call("fast", "create_file", file_path="b.txt"), execute)
+
+    done, _ = await asyncio.wait([slow, fast], return_when=asyncio.FIRST_COMPLETED)
+    assert done == {fast}
+    await slow
+
+    stats = tool_scheduler_stats.get_stats()
+    assert stats["tools"]["create_file"]["calls"] >= 2
+    assert stats["running"] == 0 and stats["queued"] == 0
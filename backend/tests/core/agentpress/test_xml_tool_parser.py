@@ -0,0 +1,84 @@
+"""
+Streaming XML Tool Parser Tests
+
+Verifies StreamingXMLToolCallParser against the one-shot parse:
+1. Arbitrary chunk boundaries (including split tags) yield the same calls with correct offsets
+2. An invoke left open when its block closes is dropped, later calls still parse
+3. A multi-megabyte invoke fed in small chunks is parked, not re-copied per chunk
+
+Run with: pytest tests/core/agentpress/test_xml_tool_parser.py -v
+"""
+
+import os
+import random
+import sys
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from core.agentpress.xml_tool_parser import StreamingXMLToolCallParser, parse_xml_tool_calls_to_objects
+
+
+def _response(n):
+    parts = []
+    for i in range(n):
+        parts.append(
+            f'Step {i}.\n<function_calls>\n<Invoke name="tool_{i}">\n'
+            f'<parameter name="path">file_{i}.txt</parameter>\n'
+            f'<parameter name="options">{{"index": {i}}}</parameter>\n'
+            f'</Invoke>\n</FUNCTION_CALLS>\n'
+        )
+    return "".join(parts)
+
+
+def test_chunked_feed_matches_one_shot_parse():
+    content = _response(25)
+    expected = parse_xml_tool_calls_to_objects(content)
+    assert [c.function_name for c in expected] == [f"tool_{i}" for i in range(25)]
+
+    rng = random.Random(1)
+    for _ in range(10):
+        parser = StreamingXMLToolCallParser()
+        calls = []
+        pos = 0
+        while pos < len(content):
+            size = rng.randint(1, 30)
+            calls.extend(parser.feed(content[pos:pos + size]))
+            pos += size
+
+        assert [(c.function_name, c.parameters) for c in calls] == [(c.function_name, c.parameters) for c in expected]
+        for call in calls:
+            assert content[call.start:call.end] == call.raw_xml
+        assert calls[3].parameters == {"path": "file_3.txt", "options": {"index": 3}}
+
+
+def test_unterminated_invoke_is_dropped():
+    content = (
+        '<function_calls><invoke name="broken"><parameter name="a">1</parameter></function_calls>'
+        '<function_calls><invoke name="ok"><parameter name="a">2</parameter></invoke></function_calls>'
+    )
+    calls = parse_xml_tool_calls_to_objects(content)
+    assert [(c.function_name, c.parameters) for c in calls] == [("ok", {"a": 2})]
+
+
+def test_large_invoke_is_not_recopied_per_chunk():
+    body = "<div class='row'>cell</div>\n" * 80000  # ~2.2 MB, a '<' every 14 chars
+    content = (
+        f'Writing it.\n<function_calls><invoke name="create_file">'
+        f'<parameter name="file_contents">{body}</parameter></INVOKE></function_calls>\nDone.'
+    )
+    parser = StreamingXMLToolCallParser()
+    calls = []
+    buffered = 0
+    for pos in range(0, len(content), 40):
+        calls.extend(parser.feed(content[pos:pos + 40]))
+        buffered = max(buffered, len(parser._buf))
+
+    # Only the invoke head and a chunk stay in the contiguous buffer until </invoke> arrives
+    assert buffered < len(body) // 100
+    assert parser.offset == len(content)
+    assert [(c.function_name, c.raw_xml) for c in calls] == [
+        (c.function_name, c.raw_xml) for c in parse_xml_tool_calls_to_objects(content)
+    ]
+    assert calls[0].parameters["file_contents"] == body.strip()
+    assert content[calls[0].start:calls[0].end] == calls[0].raw_xml
@@ -0,0 +1,3 @@
+"""
+Agents tests
+"""
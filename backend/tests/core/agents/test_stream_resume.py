@@ -0,0 +1,107 @@
+"""
+Agent Run Stream Tests
+
+Verifies resuming GET /agent-run/{id}/stream from a Last-Event-ID:
+1. A resume whose position was trimmed from the Redis stream gets a resync
+   event and the stream from its oldest remaining entry
+2. A resume that receives no new entries still runs the dead-worker check
+
+Run with: pytest tests/core/agents/test_stream_resume.py -v
+"""
+
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+@pytest.fixture
+def stream_env(monkeypatch):
+    """Patch auth, the Redis stream and the hub; returns the stream entries and repo calls."""
+    from core.agents import api as agents_api
+    from core.agents import repo as agents_repo
+    from core.services import redis as redis_service
+
+    env = SimpleNamespace(entries=[], live=[], failed=[])
+
+    async def stream_range(stream_key, start="-", end="+", count=None, timeout=None):
+        def key(entry_id):
+            ms, _, seq = entry_id.partition('-')
+            return int(ms), int(seq)
+        found = [e for e in env.entries if start == "-" or key(e[0]) >= key(start)]
+        return found[:count] if count else found
+
+    class FakeHub:
+        @asynccontextmanager
+        async def subscription(self, stream_key, last_id="0"):
+            yield None
+
+        async def iter_queue(self, queue, timeout=1.0):
+            for msg in env.live:
+                yield msg
+            while True:
+                yield None
+
+    async def get_agent_run_status(agent_run_id):
+        return {"status": "running"}
+
+    async def update_agent_run_status(agent_run_id, status, error=None, **kwargs):
+        env.failed.append((status, error))
+
+    async def user_id(request, token):
+        return "user-1"
+
+    async def run_with_access(agent_run_id, user_id):
+        return {"id": agent_run_id, "status": "running"}
+
+    monkeypatch.setattr(redis_service, "stream_range", stream_range)
+    monkeypatch.setattr(redis_service, "redis", SimpleNamespace(hub=FakeHub()))
+    monkeypatch.setattr(agents_repo, "get_agent_run_status", get_agent_run_status)
+    monkeypatch.setattr(agents_repo, "update_agent_run_status", update_agent_run_status)
+    monkeypatch.setattr(agents_api, "get_user_id_from_stream_auth", user_id)
+    monkeypatch.setattr(agents_api, "_get_agent_run_with_access_check", run_with_access)
+    return env
+
+
+async def collect(last_event_id, limit=100):
+    from core.agents.api import stream_agent_run
+
+    response = await stream_agent_run("run-1", last_event_id=last_event_id)
+    events = []
+    async for chunk in response.body_iterator:
+        lines = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+        events.append((lines.get("id"), json.loads(lines["data"])))
+        if len(events) >= limit:
+            break
+    return events
+
+
+@pytest.mark.asyncio
+async def test_trimmed_resume_point_triggers_resync(stream_env):
+    # Entries up to 40-0 were trimmed; the client last saw 20-0
+    stream_env.entries = [
+        ("50-0", {"data": json.dumps({"type": "assistant", "content": "a"})}),
+        ("60-0", {"data": json.dumps({"type": "status", "status": "completed"})}),
+    ]
+
+    events = await collect("20-0")
+
+    assert events[0] == (None, {"type": "resync", "reason": "trimmed"})
+    assert [entry_id for entry_id, _ in events[1:]] == ["50-0", "60-0"]
+
+
+@pytest.mark.asyncio
+async def test_resume_without_data_detects_dead_worker(stream_env):
+    stream_env.entries = [("50-0", {"data": json.dumps({"type": "assistant", "content": "a"})})]
+
+    events = await collect("50-0")
+
+    assert events[-1] == (None, {"type": "status", "status": "error", "message": "Worker timeout"})
+    assert stream_env.failed == [("failed", "Worker timeout")]
+    assert not any(event.get("type") == "resync" for _, event in events)
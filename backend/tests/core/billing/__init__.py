@@ -0,0 +1,3 @@
+"""
+Billing tests
+"""
@@ -0,0 +1,155 @@
+"""
+Usage Ledger Tests
+
+Verifies deferred LLM usage billing through the usage ledger, with an
+in-memory stand-in for the Redis stream and for atomic_settle_usage:
+1. An append that times out after Redis ran it is settled inline keyed on
+   message_id, and the stream entry is then skipped: the call is billed once
+2. The settlement worker sends each call (message, thread, model) to
+   atomic_settle_usage per account, and clears the pending amount
+
+Run with: pytest tests/core/billing/test_usage_ledger.py -v
+"""
+
+import asyncio
+import importlib
+import os
+import sys
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+class FakeLedgerRedis:
+    """Just enough of the Redis client for UsageLedger: the two scripts and one consumer."""
+
+    def __init__(self, append_delay: float = 0.0):
+        self.append_script = importlib.import_module("core.billing.credits.usage_ledger")._APPEND_SCRIPT
+        self.append_delay = append_delay
+        self.kv = {}
+        self.stream = []
+        self.delivered = set()
+
+    async def eval(self, script, numkeys, *args):
+        keys, argv = args[:numkeys], args[numkeys:]
+        if script == self.append_script:
+            seen, _, pending = keys
+            if seen in self.kv:
+                return 0
+            self.kv[seen] = "1"
+            fields = dict(zip(["account_id", "message_id", "thread_id", "model", "amount_micros"], map(str, argv[2:7])))
+            self.stream.append((f"{len(self.stream) + 1}-0", fields))
+            self.kv[pending] = self.kv.get(pending, 0) + int(argv[6])
+            # Applied, but the caller gives up before the reply arrives
+            await asyncio.sleep(self.append_delay)
+            return 1
+        pending, ids = keys[0], set(argv[2:])
+        if pending in self.kv:
+            self.kv[pending] -= int(argv[1])
+            if self.kv[pending] <= 0:
+                del self.kv[pending]
+        self.stream = [entry for entry in self.stream if entry[0] not in ids]
+        return len(ids)
+
+    async def get(self, key):
+        return self.kv.get(key)
+
+    async def xgroup_create(self, *args, **kwargs):
+        pass
+
+    async def xautoclaim(self, *args, **kwargs):
+        return ["0-0", [], []]
+
+    async def xreadgroup(self, group, consumer, streams, count):
+        entries = [entry for entry in self.stream if entry[0] not in self.delivered][:count]
+        self.delivered.update(entry_id for entry_id, _ in entries)
+        return [["stream", entries]] if entries else []
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    from core.billing import repo as billing_repo
+    from core.billing.credits import integration
+    from core.billing.shared import cache_utils
+    from core.services import redis as redis_service
+    from core.utils.config import EnvMode, config
+
+    # The package re-exports the usage_ledger instance under the module's name
+    usage_ledger_module = importlib.import_module("core.billing.credits.usage_ledger")
+    ledger = usage_ledger_module.UsageLedger()
+    client = FakeLedgerRedis()
+    settled = {}
+    calls = []
+
+    async def get_client():
+        return client
+
+    async def atomic_settle_usage(account_id, entries):
+        # usage_settlements: message_id primary key, ON CONFLICT DO NOTHING
+        calls.append((account_id, entries))
+        new = [entry for entry in entries if entry["message_id"] not in settled]
+        for entry in new:
+            settled[entry["message_id"]] = Decimal(entry["amount"])
+        return {"success": True, "settled": len(new), "new_total": 10}
+
+    async def deduct_credits(**kwargs):
+        raise AssertionError("usage must not be deducted outside atomic_settle_usage")
+
+    async def noop(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(redis_service, "get_client", get_client)
+    monkeypatch.setattr(billing_repo, "atomic_settle_usage", atomic_settle_usage)
+    monkeypatch.setattr(integration, "usage_ledger", ledger)
+    monkeypatch.setattr(integration.credit_manager, "deduct_credits", deduct_credits)
+    monkeypatch.setattr(integration, "calculate_token_cost", lambda *args: Decimal("0.0125"))
+    monkeypatch.setattr(integration, "invalidate_account_state_cache", noop)
+    monkeypatch.setattr(cache_utils, "invalidate_all_billing_caches", noop)
+    # Wrapped config stand-in; unset attributes still read as None
+    monkeypatch.setattr(config, "_config", SimpleNamespace(ENV_MODE=EnvMode.PRODUCTION, USAGE_LEDGER_ENABLED=True))
+    return SimpleNamespace(ledger=ledger, client=client, settled=settled, calls=calls, module=usage_ledger_module)
+
+
+@pytest.mark.asyncio
+async def test_timed_out_append_is_billed_once(ledger, monkeypatch):
+    from core.billing.credits.integration import BillingIntegration
+
+    monkeypatch.setattr(ledger.module, "REDIS_TIMEOUT", 0.05)
+    ledger.client.append_delay = 0.2
+
+    result = await BillingIntegration.deduct_usage("acct-1", 1000, 200, "test-model", message_id="msg-1", thread_id="thread-1")
+
+    assert result["success"] and not result.get("deferred")
+    assert ledger.settled == {"msg-1": Decimal("0.0125")}
+    # The append did land in the stream; settling it must not charge again
+    assert len(ledger.client.stream) == 1
+    assert await ledger.ledger.settle_once("worker-1") == 1
+    assert ledger.calls[-1][1][0]["message_id"] == "msg-1"
+    assert sum(ledger.settled.values()) == Decimal("0.0125")
+    assert ledger.ledger.get_stats()["direct_fallbacks"] == 1
+    assert await ledger.ledger.pending_amount("acct-1") == 0
+
+
+@pytest.mark.asyncio
+async def test_settlement_sends_each_call_per_account(ledger):
+    from core.billing.credits.integration import BillingIntegration
+
+    for account_id, message_id in [("acct-1", "m1"), ("acct-1", "m2"), ("acct-2", "m3"), ("acct-1", "m1")]:
+        result = await BillingIntegration.deduct_usage(account_id, 1000, 200, "test-model", message_id=message_id, thread_id=f"t-{message_id}")
+        assert result["deferred"]
+    assert ledger.ledger.get_stats()["duplicates"] == 1
+    assert await ledger.ledger.pending_amount("acct-1") == Decimal("0.025")
+
+    assert await ledger.ledger.settle_once("worker-1") == 3
+
+    by_account = {account_id: entries for account_id, entries in ledger.calls}
+    assert [(e["message_id"], e["thread_id"], e["model"], e["amount"]) for e in by_account["acct-1"]] == [
+        ("m1", "t-m1", "test-model", "0.0125"), ("m2", "t-m2", "test-model", "0.0125")
+    ]
+    assert [e["message_id"] for e in by_account["acct-2"]] == ["m3"]
+    assert await ledger.ledger.pending_amount("acct-1") == 0
+    assert not ledger.client.stream
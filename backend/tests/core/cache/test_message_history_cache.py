@@ -0,0 +1,268 @@
+"""
+Message History Cache Tests
+
+Runs ThreadManager.get_llm_messages against an in-memory messages table and a
+fake Redis client:
+1. A row that commits late, below a row already read, is picked up
+2. A reader that raced an invalidation does not store what it read
+3. A suffix invalidation truncates at the first affected message
+4. An entry is rebuilt after MESSAGE_HISTORY_MAX_AGE, however often it was extended
+5. A write-behind row that commits far below the high-water mark (past the
+   overlap window) is picked up once the persister flushes
+
+Run with: pytest tests/core/cache/test_message_history_cache.py -v
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+THREAD_ID = "thread-1"
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeWatchPipeline:
+    """WATCH/MULTI/EXEC over FakeRedis: execute raises WatchError if a watched key changed."""
+
+    def __init__(self, client):
+        self.client = client
+        self.watched = {}
+        self.queued = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def watch(self, key):
+        self.watched[key] = self.client.versions.get(key, 0)
+
+    async def get(self, key):
+        return self.client.data.get(key)
+
+    def multi(self):
+        self.queued = []
+
+    def set(self, key, value, ex=None):
+        self.queued.append(("set", key, value))
+
+    def delete(self, key):
+        self.queued.append(("delete", key))
+
+    def incr(self, key):
+        self.queued.append(("incr", key))
+
+    def expire(self, key, seconds):
+        pass
+
+    async def execute(self):
+        from redis.exceptions import WatchError
+
+        if self.client.before_exec:
+            hook, self.client.before_exec = self.client.before_exec, None
+            hook()
+        watched, self.watched = self.watched, {}
+        if any(self.client.versions.get(key, 0) != version for key, version in watched.items()):
+            raise WatchError("watched key changed")
+        for op in self.queued:
+            if op[0] == "set":
+                self.client.write(op[1], op[2])
+            elif op[0] == "delete":
+                self.client.write(op[1], None)
+            else:
+                self.client.write(op[1], str(int(self.client.data.get(op[1]) or 0) + 1))
+        return []
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.versions = {}
+        self.before_exec = None
+
+    def write(self, key, value):
+        if value is None:
+            self.data.pop(key, None)
+        else:
+            self.data[key] = value
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def pipeline(self, transaction=True):
+        return FakeWatchPipeline(self)
+
+    async def eval(self, script, numkeys, history_key, generation_key, generation, payload, ttl):
+        if (self.data.get(generation_key) or "") != generation:
+            return 0
+        self.write(history_key, payload)
+        return 1
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Fake Redis plus an in-memory messages table served by a fake iter_llm_messages."""
+    from core.services import redis as redis_service
+    from core.threads import repo as threads_repo
+
+    client = FakeRedis()
+    rows = []
+    state = {"during_fetch": None}
+
+    async def get_client():
+        return client
+
+    async def mget(keys, timeout=None):
+        return [client.data.get(key) for key in keys]
+
+    async def iter_llm_messages(thread_id, after_created_at=None, after_message_id=None, batch_size=1000, batch_timeout=None):
+        ordered = sorted(rows, key=lambda r: (r["created_at"], r["message_id"]))
+        if after_created_at is not None:
+            mark = (datetime.fromisoformat(str(after_created_at)), str(after_message_id))
+            ordered = [r for r in ordered if (r["created_at"], r["message_id"]) > mark]
+        for row in ordered:
+            yield dict(row)
+        if state["during_fetch"]:
+            hook, state["during_fetch"] = state["during_fetch"], None
+            await hook()
+
+    monkeypatch.setattr(redis_service, "get_client", get_client)
+    monkeypatch.setattr(redis_service, "mget", mget)
+    monkeypatch.setattr(threads_repo, "iter_llm_messages", iter_llm_messages)
+    return {"client": client, "rows": rows, "state": state}
+
+
+def add_row(rows, seconds, text):
+    row = {
+        "message_id": str(uuid.uuid4()),
+        "created_at": T0 + timedelta(seconds=seconds),
+        "content": json.dumps({"role": "user", "content": text}),
+        "is_compressed": False,
+    }
+    rows.append(row)
+    return row
+
+
+async def read_history():
+    from core.agentpress.thread_manager import ThreadManager
+
+    manager = ThreadManager.__new__(ThreadManager)
+    return [m["content"] for m in await manager.get_llm_messages(THREAD_ID)]
+
+
+@pytest.mark.asyncio
+async def test_late_committed_row_is_picked_up(backend):
+    rows = backend["rows"]
+    add_row(rows, 0, "a")
+    add_row(rows, 20, "c")
+    assert await read_history() == ["a", "c"]
+
+    # Committed after "c" was read, with an earlier created_at
+    add_row(rows, 15, "b")
+    add_row(rows, 21, "d")
+    assert await read_history() == ["a", "b", "c", "d"]
+    assert await read_history() == ["a", "b", "c", "d"]
+
+
+@pytest.mark.asyncio
+async def test_reader_racing_invalidation_does_not_store(backend):
+    from core.cache import runtime_cache
+
+    rows = backend["rows"]
+    first = add_row(rows, 0, "a")
+    add_row(rows, 1, "b")
+
+    async def edit_during_fetch():
+        first["content"] = json.dumps({"role": "user", "content": "a edited"})
+        await runtime_cache.invalidate_message_history_suffix(THREAD_ID, message_ids=[first["message_id"]])
+
+    backend["state"]["during_fetch"] = edit_during_fetch
+    assert await read_history() == ["a", "b"]
+    assert runtime_cache._get_message_history_key(THREAD_ID) not in backend["client"].data
+
+    assert await read_history() == ["a edited", "b"]
+
+
+@pytest.mark.asyncio
+async def test_suffix_invalidation_truncates_atomically(backend):
+    from core.cache import runtime_cache
+
+    rows = backend["rows"]
+    add_row(rows, 0, "a")
+    second = add_row(rows, 100, "b")
+    add_row(rows, 200, "c")
+    await read_history()
+    key = runtime_cache._get_message_history_key(THREAD_ID)
+
+    # A concurrent writer lands between WATCH and EXEC - the truncation is retried on the new value
+    client = backend["client"]
+    stored = client.data[key]
+    client.before_exec = lambda: client.write(key, stored)
+    await runtime_cache.invalidate_message_history_suffix(THREAD_ID, message_ids=[second["message_id"]])
+
+    cached, _ = await runtime_cache.get_cached_message_history(THREAD_ID)
+    assert [m["content"] for m in cached["messages"]] == ["a"]
+
+    second["content"] = json.dumps({"role": "user", "content": "b edited"})
+    assert await read_history() == ["a", "b edited", "c"]
+
+
+@pytest.mark.asyncio
+async def test_entry_rebuilt_after_max_age(backend):
+    from core.cache import runtime_cache
+
+    rows = backend["rows"]
+    old = add_row(rows, 0, "a")
+    await read_history()
+    add_row(rows, 100, "b")
+    await read_history()  # extends the entry, keeps its built_at
+
+    old["content"] = json.dumps({"role": "user", "content": "a changed behind the cache"})
+    assert await read_history() == ["a", "b"]
+
+    client = backend["client"]
+    key = runtime_cache._get_message_history_key(THREAD_ID)
+    entry = json.loads(client.data[key])
+    entry["built_at"] = time.time() - runtime_cache.MESSAGE_HISTORY_MAX_AGE - 1
+    client.data[key] = json.dumps(entry)
+    assert await read_history() == ["a changed behind the cache", "b"]
+
+
+@pytest.mark.asyncio
+async def test_write_behind_row_below_overlap_is_picked_up(backend, monkeypatch):
+    from core.agentpress.message_persister import MessagePersister
+    from core.cache import runtime_cache
+    from core.threads import repo as threads_repo
+
+    rows = backend["rows"]
+
+    async def insert_messages_batch(messages, batch_size=200):
+        for m in messages:
+            rows.append({
+                "message_id": m["message_id"],
+                "created_at": m["created_at"],
+                "content": json.dumps(m["content"]),
+                "is_compressed": False,
+            })
+        return len(messages)
+
+    monkeypatch.setattr(threads_repo, "insert_messages_batch", insert_messages_batch)
+
+    add_row(rows, 0, "a")
+    persister = MessagePersister(flush_delay=60)
+    queued = persister.insert(THREAD_ID, "tool", {"role": "user", "content": "tool result"}, is_llm_message=True)
+
+    # A direct write lands well after the queued row's created_at and is cached first
+    lag = (queued["created_at"] - T0).total_seconds() + runtime_cache.MESSAGE_HISTORY_OVERLAP * 6
+    add_row(rows, lag, "later")
+    assert await read_history() == ["a", "later"]
+
+    await persister.flush()
+    assert await read_history() == ["a", "tool result", "later"]
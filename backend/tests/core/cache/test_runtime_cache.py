@@ -0,0 +1,145 @@
+"""
+Runtime Cache Tests
+
+Verifies the process-local L1 tier in front of Redis:
+1. Another instance's invalidation drops the local L1 copy
+2. An L2 read that races an invalidation of the same key does not refill L1
+   with the value it replaced
+3. L1 hits return private copies
+4. Another instance's invalidation drops the key from a run's prefetch snapshot
+5. A prefetch that races an invalidation does not snapshot the old value
+
+Run with: pytest tests/core/cache/test_runtime_cache.py -v
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+@pytest.fixture
+def l1_cache(monkeypatch):
+    """L1 enabled (listener 'connected') over a dict standing in for Redis; counts GETs."""
+    from core.cache import runtime_cache
+    from core.services import redis as redis_service
+
+    store = {"gets": 0, "gate": None}
+
+    async def get(key, timeout=None):
+        store["gets"] += 1
+        value = store.get(key)
+        if store["gate"] is not None:
+            await store["gate"].wait()
+        return value
+
+    async def mget(keys, timeout=None):
+        values = [store.get(key) for key in keys]
+        if store["gate"] is not None:
+            await store["gate"].wait()
+        return values
+
+    monkeypatch.setattr(redis_service, "get", get)
+    monkeypatch.setattr(redis_service, "mget", mget)
+    monkeypatch.setitem(runtime_cache._invalidation_state, "connected", True)
+    runtime_cache._l1.clear()
+    yield store
+    runtime_cache._l1.clear()
+    runtime_cache._live_snapshots.clear()
+
+
+def peer_invalidation(*keys):
+    return json.dumps({"src": "another-instance", "keys": list(keys)})
+
+
+@pytest.mark.asyncio
+async def test_peer_invalidation_drops_l1(l1_cache):
+    from core.cache import runtime_cache
+
+    l1_cache["project_meta:p1"] = json.dumps({"project_id": "p1", "sandbox": {"id": "old"}})
+    assert (await runtime_cache.get_cached_project_metadata("p1"))["sandbox"]["id"] == "old"
+    await runtime_cache.get_cached_project_metadata("p1")
+    assert l1_cache["gets"] == 1
+
+    l1_cache["project_meta:p1"] = json.dumps({"project_id": "p1", "sandbox": {"id": "new"}})
+    runtime_cache._apply_invalidation_message(peer_invalidation("project_meta:p1"))
+
+    assert (await runtime_cache.get_cached_project_metadata("p1"))["sandbox"]["id"] == "new"
+    assert l1_cache["gets"] == 2
+
+
+@pytest.mark.asyncio
+async def test_read_racing_invalidation_does_not_fill_l1(l1_cache):
+    from core.cache import runtime_cache
+
+    l1_cache["project_meta:p1"] = json.dumps({"project_id": "p1", "sandbox": {"id": "old"}})
+    l1_cache["gate"] = asyncio.Event()
+    read = asyncio.create_task(runtime_cache.get_cached_project_metadata("p1"))
+    await asyncio.sleep(0)  # the read has fetched "old" and is in flight
+
+    l1_cache["project_meta:p1"] = json.dumps({"project_id": "p1", "sandbox": {"id": "new"}})
+    runtime_cache._apply_invalidation_message(peer_invalidation("project_meta:p1"))
+    l1_cache["gate"].set()
+
+    assert (await read)["sandbox"]["id"] == "old"
+    assert "project_meta:p1" not in runtime_cache._l1
+    assert (await runtime_cache.get_cached_project_metadata("p1"))["sandbox"]["id"] == "new"
+
+
+@pytest.mark.asyncio
+async def test_l1_hits_are_private_copies(l1_cache):
+    from core.cache import runtime_cache
+
+    l1_cache["project_meta:p1"] = json.dumps({"project_id": "p1", "sandbox": {"id": "s1"}})
+    first = await runtime_cache.get_cached_project_metadata("p1")
+    first["sandbox"]["id"] = "mutated"
+
+    second = await runtime_cache.get_cached_project_metadata("p1")
+    assert second["sandbox"]["id"] == "s1"
+    assert l1_cache["gets"] == 1
+
+
+@pytest.mark.asyncio
+async def test_peer_invalidation_drops_prefetched_key(l1_cache):
+    from core.cache import runtime_cache
+
+    l1_cache["project_meta:p1"] = json.dumps({"project_id": "p1", "sandbox": {"id": "old"}})
+
+    async def run():
+        assert await runtime_cache.prefetch_agent_run_cache(project_id="p1") == 1
+        assert (await runtime_cache.get_cached_project_metadata("p1"))["sandbox"]["id"] == "old"
+        assert l1_cache["gets"] == 0  # served from the snapshot
+
+        l1_cache["project_meta:p1"] = json.dumps({"project_id": "p1", "sandbox": {"id": "new"}})
+        runtime_cache._apply_invalidation_message(peer_invalidation("project_meta:p1"))
+        assert (await runtime_cache.get_cached_project_metadata("p1"))["sandbox"]["id"] == "new"
+
+    # Runs own their snapshot via a context variable, like a real agent run task
+    await asyncio.create_task(run())
+
+
+@pytest.mark.asyncio
+async def test_prefetch_racing_invalidation_does_not_snapshot(l1_cache):
+    from core.cache import runtime_cache
+
+    l1_cache["project_meta:p1"] = json.dumps({"project_id": "p1", "sandbox": {"id": "old"}})
+    l1_cache["gate"] = asyncio.Event()
+
+    async def run():
+        await runtime_cache.prefetch_agent_run_cache(project_id="p1", account_id="a1")
+        values = runtime_cache._prefetch_snapshot.get()["values"]
+        assert "project_meta:p1" not in values and "tier_info:a1" in values
+        return await runtime_cache.get_cached_project_metadata("p1")
+
+    task = asyncio.create_task(run())
+    await asyncio.sleep(0)  # the MGET has fetched "old" and is in flight
+
+    l1_cache["project_meta:p1"] = json.dumps({"project_id": "p1", "sandbox": {"id": "new"}})
+    runtime_cache._apply_invalidation_message(peer_invalidation("project_meta:p1"))
+    l1_cache["gate"].set()
+    assert (await task)["sandbox"]["id"] == "new"
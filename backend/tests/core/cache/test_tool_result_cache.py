@@ -0,0 +1,130 @@
+"""
+Tool Result Cache Tests
+
+Verifies the shared search/scrape tool result cache:
+1. Concurrent identical calls share one upstream call and are reported as
+   miss + shared in the tool cache report
+2. Results are stored compressed and served to later calls; unsuccessful
+   results are not stored
+3. Queries and URLs are normalized into the same key, and the cache is
+   bypassed when disabled
+
+Run with: pytest tests/core/cache/test_tool_result_cache.py -v
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+@pytest.fixture
+def redis_store(monkeypatch):
+    from core.services import redis as redis_service
+    from core.utils.config import config
+
+    store = {}
+
+    async def get(key, timeout=None):
+        return store.get(key)
+
+    async def setex(key, seconds, value, timeout=None):
+        store[key] = value
+
+    monkeypatch.setattr(redis_service, "get", get)
+    monkeypatch.setattr(redis_service, "setex", setex)
+    # Wrapped config stand-in; unset attributes still read as None
+    monkeypatch.setattr(config, "_config", SimpleNamespace(TOOL_RESULT_CACHE_ENABLED=True))
+    return store
+
+
+def make_tool():
+    from core.cache.tool_result_cache import cached_tool_call, normalize_query
+
+    class FakeSearchTool:
+        """Stands in for a search tool; counts upstream calls."""
+
+        upstream_calls = 0
+
+        @cached_tool_call(
+            "fake_search", ttl=60,
+            key=lambda self, query, num_results: (normalize_query(query), num_results),
+            cacheable=lambda result: bool(result.get("success"))
+        )
+        async def search(self, query, num_results):
+            self.upstream_calls += 1
+            await asyncio.sleep(0.05)
+            return {"success": "nothing" not in query, "results": [f"{query} result"] * 50}
+
+    return FakeSearchTool()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_upstream_call(redis_store):
+    from core.cache.tool_result_cache import begin_tool_cache_report, tool_cache_report
+
+    tool = make_tool()
+
+    begin_tool_cache_report()
+    results = await asyncio.gather(*(
+        tool.search(query, 5) for query in ["Tesla news", "tesla  news", " TESLA news ", "Tesla news"]
+    ))
+
+    assert tool.upstream_calls == 1
+    assert all(result == results[0] for result in results)
+    # Waiters get their own copy
+    results[1]["results"].clear()
+    assert results[2]["results"]
+
+    report = tool_cache_report()
+    assert (report["misses"], report["shared"], report["hits"]) == (1, 3, 0)
+    assert {lookup["namespace"] for lookup in report["lookups"]} == {"fake_search"}
+
+
+@pytest.mark.asyncio
+async def test_results_stored_compressed_and_failures_not_stored(redis_store):
+    from core.cache.tool_result_cache import begin_tool_cache_report, tool_cache_report
+
+    tool = make_tool()
+
+    first = await tool.search("Tesla news", 5)
+    assert len(redis_store) == 1
+    stored = next(iter(redis_store.values()))
+    assert stored.startswith("z1:")
+    assert len(stored) < len(str(first))
+
+    begin_tool_cache_report()
+    assert await tool.search("tesla news", 5) == first
+    await tool.search("tesla news", 10)
+    await tool.search("nothing found", 5)
+    await tool.search("nothing found", 5)
+
+    assert tool.upstream_calls == 4
+    assert len(redis_store) == 2
+    report = tool_cache_report()
+    assert (report["hits"], report["misses"]) == (1, 3)
+
+
+@pytest.mark.asyncio
+async def test_normalized_keys_and_disabled_cache(redis_store, monkeypatch):
+    from core.cache.tool_result_cache import normalize_url, tool_result_cache
+    from core.utils.config import config
+
+    assert normalize_url("HTTPS://WWW.Example.com:443/docs?b=2&a=1&utm_source=x#intro") == \
+        normalize_url("https://www.example.com/docs?a=1&b=2")
+    assert normalize_url("https://example.com") == "https://example.com/"
+    assert normalize_url("https://example.com/a") != normalize_url("https://example.com/b")
+    assert tool_result_cache.make_key("firecrawl_scrape", "https://example.com/", False) != \
+        tool_result_cache.make_key("firecrawl_scrape", "https://example.com/", True)
+
+    monkeypatch.setattr(config, "_config", SimpleNamespace(TOOL_RESULT_CACHE_ENABLED=False))
+    tool = make_tool()
+    await tool.search("Tesla news", 5)
+    await tool.search("Tesla news", 5)
+    assert tool.upstream_calls == 2
+    assert not redis_store
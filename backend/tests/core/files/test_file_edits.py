@@ -0,0 +1,162 @@
+"""
+File Edit Result Tests
+
+Checks the unified diffs edit tools return instead of full file copies:
+1. Applying diff(a, b) to a gives back b, for empty, whitespace-only, CRLF,
+   no-final-newline, multi-hunk and randomly edited inputs
+2. The same holds when a rewrite is too large to match line by line
+3. The prefix/suffix-trimmed opcodes group into the same hunks as difflib
+4. Snapshots are saved in the background, off the edit tool's path
+
+Run with: pytest tests/core/files/test_file_edits.py -v
+"""
+
+import asyncio
+import difflib
+import os
+import random
+import re
+import sys
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+NO_NEWLINE = "\\ No newline at end of file\n"
+HUNK = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@\n$")
+
+
+def split_keepends(text):
+    lines = text.split("\n")
+    return [line + "\n" for line in lines[:-1]] + ([lines[-1]] if lines[-1] else [])
+
+
+def apply_diff(original, diff):
+    """Minimal `patch`: applies a unified diff, checking every context and removed line."""
+    if not diff:
+        return original
+    source = split_keepends(original)
+    lines = split_keepends(diff)
+    assert lines[0].startswith("--- ") and lines[1].startswith("+++ ")
+    out, pos, i = [], 0, 2
+    while i < len(lines):
+        match = HUNK.match(lines[i])
+        assert match, lines[i]
+        start, length = int(match.group(1)), int(match.group(2) or 1)
+        hunk_start = start - 1 if length else start
+        out.extend(source[pos:hunk_start])
+        pos = hunk_start
+        i += 1
+        while i < len(lines) and not lines[i].startswith("@@"):
+            tag, text = lines[i][0], lines[i][1:]
+            if i + 1 < len(lines) and lines[i + 1] == NO_NEWLINE:
+                text = text[:-1]
+                i += 1
+            if tag in " -":
+                assert source[pos] == text, (source[pos], text)
+                pos += 1
+            if tag in " +":
+                out.append(text)
+            i += 1
+    out.extend(source[pos:])
+    return "".join(out)
+
+
+def random_edit(rng, lines):
+    lines = list(lines)
+    for _ in range(rng.randint(1, 6)):
+        op = rng.choice(["insert", "delete", "replace"])
+        at = rng.randint(0, len(lines))
+        if op == "insert" or not lines:
+            lines[at:at] = [f"new {rng.random()}\n" for _ in range(rng.randint(1, 3))]
+        elif op == "delete":
+            del lines[at:at + rng.randint(1, 3)]
+        else:
+            lines[at:at + 1] = [f"changed {rng.random()}\n"]
+    return lines
+
+
+BASE = "".join(f"line {i}\n" for i in range(40))
+CASES = {
+    "empty_to_text": ("", "hello\nworld\n"),
+    "text_to_empty": ("hello\nworld\n", ""),
+    "empty_to_empty": ("", ""),
+    "whitespace_only": ("  \n\t\n\n", "  \n\n \t \n"),
+    "crlf": ("a\r\nb\r\nc\r\n", "a\r\nB\r\nc\r\nd\r\n"),
+    "crlf_to_lf": ("a\r\nb\r\n", "a\nb\n"),
+    "lone_cr_and_form_feed": ("a\rb\nc\x0cd\n", "a\rB\nc\x0cd\n"),
+    "add_final_newline": ("a\nb", "a\nb\n"),
+    "remove_final_newline": ("a\nb\n", "a\nb"),
+    "unchanged": (BASE, BASE),
+    "two_hunks": (BASE, BASE.replace("line 2\n", "two\n").replace("line 35\n", "")),
+}
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_diff_round_trip(name):
+    from core.files.file_edits import unified_diff
+
+    original, updated = CASES[name]
+    diff, _, _, _ = unified_diff(original, updated, "f.txt")
+    assert apply_diff(original, diff) == updated
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_random_edits_round_trip(seed):
+    from core.files.file_edits import unified_diff
+
+    rng = random.Random(seed)
+    original = split_keepends(BASE)
+    updated = "".join(random_edit(rng, original))
+    if rng.random() < 0.3:
+        updated = updated.rstrip("\n")
+    diff, _, _, _ = unified_diff(BASE, updated, "f.txt")
+    assert apply_diff(BASE, diff) == updated
+
+
+def test_large_rewrite_round_trip(monkeypatch):
+    from core.files import file_edits
+
+    monkeypatch.setattr(file_edits, "MAX_MATCH_CELLS", 10)
+    updated = "".join(f"rewritten {i}\n" for i in range(30))
+    diff, ranges, _, _ = file_edits.unified_diff(BASE, updated, "f.txt")
+    assert apply_diff(BASE, diff) == updated
+    assert ranges == [[1, 30]]
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_grouped_opcodes_match_difflib(seed):
+    from core.files.file_edits import CONTEXT_LINES, _grouped_opcodes, _opcodes
+
+    rng = random.Random(seed)
+    a = split_keepends(BASE)
+    b = random_edit(rng, a)
+    expected = list(difflib.SequenceMatcher(None, a, b, autojunk=False).get_grouped_opcodes(CONTEXT_LINES))
+    ours = list(_grouped_opcodes(_opcodes(a, b), CONTEXT_LINES))
+    # Ties between equally short edit scripts may be broken differently; the hunks must cover the same lines
+    assert [(g[0][1], g[-1][2], g[0][3], g[-1][4]) for g in ours] == \
+        [(g[0][1], g[-1][2], g[0][3], g[-1][4]) for g in expected]
+
+
+@pytest.mark.asyncio
+async def test_snapshots_saved_in_background(monkeypatch):
+    from core.files import file_edits
+    from core.services import db
+
+    saved = []
+    release = asyncio.Event()
+
+    async def execute_mutate(sql, params):
+        await release.wait()
+        saved.append(sorted(k for k in params if k.startswith("sha_")))
+
+    monkeypatch.setattr(db, "execute_mutate", execute_mutate)
+    task = file_edits.save_snapshots_in_background("p1", "before", "after", "after")
+    await asyncio.sleep(0.05)
+    assert not saved and task in file_edits._pending_saves
+
+    release.set()
+    await task
+    assert saved == [["sha_0", "sha_1"]]
+    assert task not in file_edits._pending_saves
@@ -0,0 +1,80 @@
+"""
+MCP Server Schema Cache Tests
+
+Verifies MCPServerSchemaCache against a fake Redis and MCP session pool:
+1. Callers get copies: mutating a returned tool list doesn't change later lookups
+2. invalidate_custom_mcp drops an agent custom_mcp entry, so the next lookup
+   lists the server's tools again
+
+Run with: pytest tests/core/jit/test_mcp_schema_cache.py -v
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+@pytest.fixture
+def server(monkeypatch):
+    from core.jit import mcp_schema_cache as module
+    from core.services import redis as redis_service
+
+    store = {}
+    state = SimpleNamespace(tools=["search"], list_calls=0, store=store)
+
+    async def get(key, timeout=None):
+        return store.get(key)
+
+    async def setex(key, seconds, value, timeout=None):
+        store[key] = value
+
+    async def delete(key, timeout=None):
+        store.pop(key, None)
+
+    async def list_tools(transport, config):
+        state.list_calls += 1
+        return [SimpleNamespace(name=name, description=f"{name} tool", inputSchema={"type": "object"}) for name in state.tools]
+
+    monkeypatch.setattr(redis_service, "get", get)
+    monkeypatch.setattr(redis_service, "setex", setex)
+    monkeypatch.setattr(redis_service, "delete", delete)
+    monkeypatch.setattr(module.mcp_session_pool, "list_tools", list_tools)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_returned_tool_lists_are_copies(server):
+    from core.jit.mcp_schema_cache import MCPServerSchemaCache
+
+    cache = MCPServerSchemaCache()
+    config = {"url": "https://mcp.example.com/mcp"}
+
+    first = await cache.get_tools("http", config)
+    first[0]["input_schema"]["type"] = "mutated"
+    first.append({"name": "injected"})
+
+    second = await cache.get_tools("http", config)
+    assert second == [{"name": "search", "description": "search tool", "input_schema": {"type": "object"}}]
+    assert server.list_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_saving_a_custom_mcp_refreshes_its_tools(server):
+    from core.jit.mcp_schema_cache import MCPServerSchemaCache
+
+    cache = MCPServerSchemaCache()
+    mcp = {"name": "Docs", "customType": "http", "type": "http", "config": {"url": "https://mcp.example.com/mcp"}}
+
+    assert [tool["name"] for tool in await cache.get_tools("http", mcp["config"])] == ["search"]
+    server.tools = ["search", "fetch"]
+    assert [tool["name"] for tool in await cache.get_tools("http", mcp["config"])] == ["search"]
+
+    await cache.invalidate_custom_mcp(mcp)
+    assert server.store == {}
+    assert [tool["name"] for tool in await cache.get_tools("http", mcp["config"])] == ["search", "fetch"]
+    assert server.list_calls == 2
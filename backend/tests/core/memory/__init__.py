@@ -0,0 +1,3 @@
+"""
+Memory tests
+"""
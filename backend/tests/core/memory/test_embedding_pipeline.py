@@ -0,0 +1,72 @@
+"""
+Embedding Pipeline Tests
+
+Runs the embedding micro-batcher against a fake provider (no Redis):
+1. Concurrent embed_single calls are sent as one provider batch
+2. A batch rejected because of one text fails only that text's caller;
+   the others are retried individually and get their vectors
+
+Run with: pytest tests/core/memory/test_embedding_pipeline.py -v
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+class FakeProvider:
+    """Embeds text as [len(text)]; rejects the whole request if any text is "bad"."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(0)
+        if "bad" in texts:
+            raise ValueError("invalid input")
+        return [[float(len(text))] for text in texts]
+
+    async def embed_single(self, text):
+        return (await self.embed([text]))[0]
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    from core.memory import embedding_service
+    from core.services import redis as redis_service
+
+    async def redis_down(*args, **kwargs):
+        raise ConnectionError("no redis in tests")
+
+    monkeypatch.setattr(redis_service, "mget", redis_down)
+    monkeypatch.setattr(redis_service, "set_multiple", redis_down)
+    return embedding_service.EmbeddingPipeline(FakeProvider(), "fake-model", max_batch=8, linger_ms=5)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_batch(pipeline):
+    vectors = await asyncio.gather(*(pipeline.embed_single(text) for text in ["a", "bb", "ccc"]))
+
+    assert vectors == [[1.0], [2.0], [3.0]]
+    assert pipeline.provider.calls == [["a", "bb", "ccc"]]
+    assert not pipeline._batches
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_only_fails_the_offending_text(pipeline):
+    results = await asyncio.gather(
+        *(pipeline.embed_single(text) for text in ["good", "bad", "fine"]),
+        return_exceptions=True,
+    )
+
+    assert results[0] == [4.0] and results[2] == [4.0]
+    assert isinstance(results[1], ValueError)
+    assert pipeline.provider.calls[0] == ["good", "bad", "fine"]
+    assert sorted(map(tuple, pipeline.provider.calls[1:])) == [("bad",), ("fine",), ("good",)]
+    assert pipeline.get_stats()["batch_failures"] == 1
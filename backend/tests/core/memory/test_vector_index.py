@@ -0,0 +1,140 @@
+"""
+Memory Vector Index Tests
+
+Verifies the in-process memory index and its Redis version counter:
+1. A memory created through POST /memories is returned by the next search,
+   applied incrementally to the live index
+2. A failed version read is a miss: search falls back to the RPC instead of
+   serving an index that may be stale
+
+Run with: pytest tests/core/memory/test_vector_index.py -v
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+ACCOUNT_ID = "acct-1"
+
+
+class FakeTable:
+    def __init__(self, store):
+        self.store = store
+        self._insert = None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def insert(self, row):
+        self._insert = row
+        return self
+
+    async def execute(self):
+        if self._insert is None:
+            return SimpleNamespace(count=len(self.store), data=None)
+        row = {**self._insert, "memory_id": f"m{len(self.store) + 1}", "created_at": "2026-01-01T00:00:00+00:00"}
+        self.store.append(row)
+        return SimpleNamespace(data=[row])
+
+
+class FakeDB:
+    def __init__(self, store):
+        self.store = store
+
+    @property
+    async def client(self):
+        return SimpleNamespace(table=lambda name: FakeTable(self.store))
+
+
+@pytest.fixture
+def memory_env(monkeypatch):
+    from core.memory import repo as memory_repo
+    from core.memory import vector_index as vector_index_module
+    from core.services import redis as redis_service
+
+    redis_store = {}
+    rows = [{
+        "memory_id": "m0", "content": "Prefers dark mode", "memory_type": "preference",
+        "confidence_score": 0.9, "metadata": {}, "created_at": "2025-12-01T00:00:00+00:00",
+        "embedding": "[0,1,0]",
+    }]
+
+    async def get(key, timeout=None):
+        return redis_store.get(key)
+
+    async def incr(key, timeout=None):
+        redis_store[key] = int(redis_store.get(key, 0)) + 1
+        return redis_store[key]
+
+    async def expire(key, seconds, timeout=None):
+        return True
+
+    async def get_memories_with_embeddings(account_id, limit=5000):
+        return [dict(row) for row in rows]
+
+    index = vector_index_module.MemoryVectorIndex(snapshot_dir=None)
+    monkeypatch.setattr(redis_service, "get", get)
+    monkeypatch.setattr(redis_service, "incr", incr)
+    monkeypatch.setattr(redis_service, "expire", expire)
+    monkeypatch.setattr(memory_repo, "get_memories_with_embeddings", get_memories_with_embeddings)
+    monkeypatch.setattr(vector_index_module, "memory_vector_index", index)
+    return SimpleNamespace(index=index, rows=rows, redis=redis_store)
+
+
+@pytest.mark.asyncio
+async def test_created_memory_is_searchable(memory_env, monkeypatch):
+    from core.memory import api as memory_api
+    from core.memory.embedding_service import embedding_service
+    from core.utils.config import config
+
+    async def get_user_subscription_tier(user_id):
+        return {"name": "pro"}
+
+    async def embed_text(text):
+        return [1.0, 0.0, 0.0]
+
+    # Wrapped config stand-in; unset attributes still read as None
+    monkeypatch.setattr(config, "_config", SimpleNamespace(ENABLE_MEMORY=True))
+    monkeypatch.setattr(memory_api.subscription_service, "get_user_subscription_tier", get_user_subscription_tier)
+    monkeypatch.setattr(memory_api, "is_memory_enabled", lambda tier: True)
+    monkeypatch.setattr(memory_api, "get_memory_config", lambda tier: {"max_memories": 10})
+    monkeypatch.setattr(memory_api, "db", FakeDB(memory_env.rows))
+    monkeypatch.setattr(embedding_service, "embed_text", embed_text)
+
+    index = memory_env.index
+    before = await index.search(ACCOUNT_ID, [1.0, 0.0, 0.0], limit=5, similarity_threshold=0.5)
+    assert before == []
+
+    created = await memory_api.create_memory(
+        memory_api.CreateMemoryRequest(content="Lives in Lisbon"), user_id=ACCOUNT_ID
+    )
+
+    after = await index.search(ACCOUNT_ID, [1.0, 0.0, 0.0], limit=5, similarity_threshold=0.5)
+    assert [row["memory_id"] for row in after] == [created.memory_id]
+    assert after[0]["similarity"] == pytest.approx(1.0)
+    stats = index.get_stats()
+    assert (stats["builds"], stats["incremental_updates"]) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_version_read_failure_is_a_miss(memory_env, monkeypatch):
+    from core.services import redis as redis_service
+
+    index = memory_env.index
+    assert len(await index.search(ACCOUNT_ID, [0.0, 1.0, 0.0], limit=5, similarity_threshold=0.5)) == 1
+
+    async def failing_get(key, timeout=None):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(redis_service, "get", failing_get)
+    assert await index.get_version(ACCOUNT_ID) is None
+    assert await index.search(ACCOUNT_ID, [0.0, 1.0, 0.0], limit=5, similarity_threshold=0.5) is None
+    assert index.get_stats()["fallbacks"] == 1
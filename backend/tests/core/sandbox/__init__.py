@@ -0,0 +1,3 @@
+"""
+Sandbox tests
+"""
@@ -0,0 +1,108 @@
+"""
+Workspace State Cache Tests
+
+Runs WorkspaceStateCache against a fake sandbox (manifest command + downloads):
+1. Only files with a new content hash are downloaded on the next call
+2. A file that changed between the manifest and its download is cached under
+   the hash of the bytes actually downloaded, not the stale manifest hash
+3. Projects are evicted to stay within the byte budget, and their locks with
+   them; a project larger than the budget is not kept
+
+Run with: pytest tests/core/sandbox/test_workspace_state.py -v
+"""
+
+import hashlib
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+def sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+class FakeSandbox:
+    """files: rel_path -> bytes. manifest_override: rel_path -> digest reported instead of the real one."""
+
+    def __init__(self, files):
+        self.files = dict(files)
+        self.manifest_override = {}
+        self.downloads = []
+        self.process = SimpleNamespace(exec=self._exec)
+        self.fs = SimpleNamespace(download_file=self._download)
+
+    async def _exec(self, command, timeout=None):
+        entries = [
+            [path, len(data), 1_700_000_000.0, self.manifest_override.get(path, sha1(data))]
+            for path, data in self.files.items()
+        ]
+        return SimpleNamespace(exit_code=0, result=json.dumps(entries))
+
+    async def _download(self, path):
+        rel_path = path.split("/workspace/", 1)[1]
+        self.downloads.append(rel_path)
+        return self.files[rel_path]
+
+
+@pytest.mark.asyncio
+async def test_only_new_hashes_are_downloaded():
+    from core.sandbox.workspace_state import WorkspaceStateCache
+
+    cache = WorkspaceStateCache()
+    sandbox = FakeSandbox({"a.py": b"print(1)", "b.py": b"print(2)", "copy.py": b"print(2)"})
+    state = await cache.get_workspace_state(sandbox, "p1")
+    assert {path: f["content"] for path, f in state.items()} == {
+        "a.py": "print(1)", "b.py": "print(2)", "copy.py": "print(2)"
+    }
+    assert len(sandbox.downloads) == 2
+
+    sandbox.downloads.clear()
+    sandbox.files["a.py"] = b"print(3)"
+    state = await cache.get_workspace_state(sandbox, "p1")
+    assert state["a.py"]["content"] == "print(3)"
+    assert sandbox.downloads == ["a.py"]
+
+
+@pytest.mark.asyncio
+async def test_stale_manifest_hash_is_not_trusted():
+    from core.sandbox.workspace_state import WorkspaceStateCache
+
+    cache = WorkspaceStateCache()
+    sandbox = FakeSandbox({"a.py": b"new", "b.py": b"old"})
+    # a.py was rewritten after the manifest hashed it: both report the hash of b"old"
+    sandbox.manifest_override["a.py"] = sha1(b"old")
+    state = await cache.get_workspace_state(sandbox, "p1")
+    assert state["a.py"]["content"] == "new"
+    assert state["b.py"]["content"] == "old"
+
+    # The next manifest is correct; nothing is served from a wrongly keyed entry
+    sandbox.manifest_override.clear()
+    sandbox.downloads.clear()
+    state = await cache.get_workspace_state(sandbox, "p1")
+    assert (state["a.py"]["content"], state["b.py"]["content"]) == ("new", "old")
+    assert sandbox.downloads == []
+    assert cache.get_stats()["stale_hashes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_byte_budget_evicts_projects_and_locks():
+    from core.sandbox.workspace_state import WorkspaceStateCache
+
+    cache = WorkspaceStateCache(max_bytes=150)
+    for project_id in ("p1", "p2", "p3"):
+        await cache.get_workspace_state(FakeSandbox({"f.txt": project_id.encode() * 30}), project_id)
+
+    stats = cache.get_stats()
+    assert stats["projects"] == 2 and stats["cached_bytes"] == 120
+    assert stats["locks"] == 2
+
+    await cache.get_workspace_state(FakeSandbox({"big.txt": b"x" * 500}), "huge")
+    # Bigger than the whole budget: not kept, and nothing else is evicted for it
+    stats = cache.get_stats()
+    assert stats["projects"] == 2 and stats["cached_bytes"] == 120 and stats["locks"] == 2
@@ -0,0 +1,140 @@
+"""
+StreamWriter Tests
+
+Runs the writer against an in-memory pipeline whose execute can fail or stall:
+1. A failed flush re-queues its entries ahead of newer ones, and the next
+   flush writes them in order, with boundaries still on the right entries
+2. Past max_buffer the oldest entries are dropped and counted
+3. While a flush is in flight, producers wait at max_batch instead of
+   growing the buffer
+
+Run with: pytest tests/core/services/test_stream_writer.py -v
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+STREAM = "agent_run:r1:stream"
+
+
+class FakePipeline:
+    def __init__(self, server):
+        self.server = server
+        self.ops = []
+
+    def xadd(self, key, fields, **kwargs):
+        self.ops.append(("xadd", fields["data"]))
+
+    def expire(self, key, seconds):
+        self.ops.append(("expire", seconds))
+
+    def xtrim(self, key, minid=None, approximate=True):
+        self.ops.append(("xtrim", minid))
+
+    async def execute(self):
+        self.server.max_batch_seen = max(self.server.max_batch_seen, sum(op[0] == "xadd" for op in self.ops))
+        if self.server.stall is not None:
+            await self.server.stall.wait()
+        if self.server.fail:
+            raise ConnectionError("connection reset")
+        results = []
+        for op in self.ops:
+            if op[0] == "xadd":
+                self.server.seq += 1
+                entry_id = f"{self.server.seq}-0"
+                self.server.entries.append((entry_id, op[1]))
+                results.append(entry_id)
+            else:
+                if op[0] == "xtrim":
+                    self.server.trims.append(op[1])
+                results.append(True)
+        return results
+
+
+class FakeServer:
+    def __init__(self):
+        self.entries = []
+        self.trims = []
+        self.seq = 0
+        self.fail = False
+        self.stall = None
+        self.max_batch_seen = 0
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+
+def make_writer(server, **kwargs):
+    from core.services.redis import RedisClient, StreamWriter
+
+    client = RedisClient()
+
+    async def get_client():
+        return server
+
+    client.get_client = get_client
+    return StreamWriter(client, STREAM, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_requeued():
+    server = FakeServer()
+    writer = make_writer(server, max_batch=8, linger_ms=1000)
+
+    await writer.add("a", boundary=True)
+    await writer.add("b")
+    server.fail = True
+    assert await writer.flush() is False
+
+    await writer.add("c", boundary=True)
+    server.fail = False
+    await writer.add("d", flush=True)
+    assert [data for _, data in server.entries] == ["a", "b", "c", "d"]
+    assert writer.get_stats()["dropped_entries"] == 0
+
+    # Both boundaries were recorded against their own entries: the next flush trims up to "c"
+    await writer.add("e", flush=True)
+    assert server.trims == ["1-1"]
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_requeue_is_bounded():
+    server = FakeServer()
+    writer = make_writer(server, max_batch=4, max_buffer=6, linger_ms=1000)
+    server.fail = True
+
+    for i in range(10):
+        await writer.add(str(i), boundary=(i == 1))
+    assert len(writer._buffer) <= 6
+    assert writer._boundaries == []  # its entry was dropped
+
+    server.fail = False
+    await writer.close()
+    written = [data for _, data in server.entries]
+    assert written == [str(i) for i in range(10 - len(written), 10)]
+    assert writer.dropped_entries == 10 - len(written)
+
+
+@pytest.mark.asyncio
+async def test_producers_wait_at_max_batch():
+    server = FakeServer()
+    writer = make_writer(server, max_batch=4, linger_ms=1000)
+    server.stall = asyncio.Event()
+
+    producers = [asyncio.create_task(writer.add(str(i))) for i in range(20)]
+    await asyncio.sleep(0.05)
+    assert len(writer._buffer) <= 4
+    assert sum(p.done() for p in producers) < 20
+
+    server.stall.set()
+    await asyncio.gather(*producers)
+    await writer.close()
+    assert sorted(int(data) for _, data in server.entries) == list(range(20))
+    assert server.max_batch_seen <= 4
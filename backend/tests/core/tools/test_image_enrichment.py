@@ -0,0 +1,133 @@
+"""
+Image Enrichment Tests
+
+Verifies header-only image probing for web search image enrichment, against
+the local image fixture server:
+1. Dimensions are parsed from PNG, JPEG (baseline and progressive), GIF and
+   WebP (lossy and lossless) headers
+2. Probing a large image reads only a few KB, with or without Range support;
+   a JPEG header behind a large EXIF block is found with a second range
+3. Enrichment without a describer skips the full download, reports the bytes
+   transferred, and is served from the URL-keyed cache on the next search
+
+Run with: pytest tests/core/tools/test_image_enrichment.py -v
+"""
+
+import os
+import sys
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+@pytest.fixture
+def redis_store(monkeypatch):
+    from core.services import redis as redis_service
+    from core.utils.config import config
+
+    store = {}
+
+    async def get(key, timeout=None):
+        return store.get(key)
+
+    async def setex(key, seconds, value, timeout=None):
+        store[key] = value
+
+    monkeypatch.setattr(redis_service, "get", get)
+    monkeypatch.setattr(redis_service, "setex", setex)
+    # Wrapped config stand-in; unset attributes (REPLICATE_API_TOKEN) still read as None
+    monkeypatch.setattr(config, "_config", SimpleNamespace(TOOL_RESULT_CACHE_ENABLED=True))
+    return store
+
+
+def test_parse_image_size_from_headers():
+    from PIL import Image
+    from core.test_harness.image_server import make_image
+    from core.tools.utils.image_probe import parse_image_size
+
+    for image_format, name in [("PNG", "png"), ("JPEG", "jpeg"), ("GIF", "gif"), ("WEBP", "webp")]:
+        body = make_image(image_format, (321, 123))
+        assert parse_image_size(body[:1024]) == (name, 321, 123)
+
+    for options in [{"progressive": True}, {"exif": Image.Exif()}]:
+        buffer = BytesIO()
+        Image.new("RGB", (640, 480)).save(buffer, format="JPEG", **options)
+        assert parse_image_size(buffer.getvalue()[:1024]) == ("jpeg", 640, 480)
+    buffer = BytesIO()
+    Image.new("RGBA", (300, 200)).save(buffer, format="WEBP", lossless=True)
+    assert parse_image_size(buffer.getvalue()) == ("webp", 300, 200)
+
+    # Too short or not an image: no answer
+    assert parse_image_size(make_image("PNG", (10, 10))[:20]) is None
+    assert parse_image_size(b"<svg xmlns='http://www.w3.org/2000/svg'></svg>") is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("honor_range", [True, False])
+async def test_probe_reads_only_the_header(honor_range):
+    import httpx
+    from PIL import Image
+    from core.test_harness.image_server import ImageFixtureServer
+    from core.tools.utils.image_probe import probe_image
+
+    # JPEG whose frame header sits behind a 20 KB EXIF block
+    exif = Image.Exif()
+    exif[0x010E] = "x" * 20_000
+    buffer = BytesIO()
+    Image.new("RGB", (640, 480)).save(buffer, format="JPEG", exif=exif)
+
+    with ImageFixtureServer(honor_range=honor_range) as server:
+        url = server.add_image("large.png", "PNG", (1200, 900))
+        exif_url = server.add_file("exif.jpg", buffer.getvalue(), "image/jpeg")
+        size = len(server.files["/large.png"][0])
+        async with httpx.AsyncClient() as client:
+            probe = await probe_image(client, url)
+            exif_probe = await probe_image(client, exif_url)
+        exif_requests = server.requests["/exif.jpg"]
+
+    assert (probe.format, probe.width, probe.height) == ("png", 1200, 900)
+    assert probe.status_code == (206 if honor_range else 200)
+    assert size > 2_000_000
+    assert probe.bytes_read < 128 * 1024
+    assert (exif_probe.format, exif_probe.width, exif_probe.height) == ("jpeg", 640, 480)
+    assert exif_requests == (2 if honor_range else 1)
+
+
+@pytest.mark.asyncio
+async def test_enrichment_probes_caches_and_reports_bytes(redis_store):
+    from core.test_harness.image_server import ImageFixtureServer
+    from core.tools.utils.image_enrichment import enrich_images
+    from core.tools.utils.image_probe import ImageTransferStats
+
+    with ImageFixtureServer() as server:
+        urls = [
+            server.add_image("a.jpg", "JPEG", (800, 600)),
+            server.add_image("b.webp", "WEBP", (640, 360)),
+            server.add_image("c.gif", "GIF", (200, 100)),
+            server.add_file("d.svg", b"<svg xmlns='http://www.w3.org/2000/svg'/>", "image/svg+xml"),
+        ]
+        image_bytes = sum(len(body) for body, _ in server.files.values())
+
+        transfer = ImageTransferStats()
+        images = await enrich_images(urls + [{"url": urls[0] + "#top"}], transfer)
+        requests_after_first = sum(server.requests.values())
+
+        cached = ImageTransferStats()
+        assert await enrich_images(urls, cached) == images[:4]
+
+    assert images[4]["url"] == urls[0] + "#top"
+    assert [(image["width"], image["height"]) for image in images] == [
+        (800, 600), (640, 360), (200, 100), (0, 0), (800, 600)
+    ]
+    assert (transfer.images, transfer.full_downloads) == (5, 0)
+    assert 0 < transfer.bytes_transferred < image_bytes / 10
+    # Same image behind a different fragment is shared, not fetched twice
+    assert requests_after_first == 4
+    # Second search: everything but the SVG comes from the cache
+    assert sum(server.requests.values()) == requests_after_first + 1
+    assert (cached.probed, cached.full_downloads) == (1, 0)
+    assert len(redis_store) == 3
@@ -0,0 +1,128 @@
+"""
+MCP Session Pool Tests
+
+Runs the pool against an in-process fake MCP session:
+1. A call that times out fails alone; another caller's in-flight call on the
+   same session completes and the session stays pooled
+2. A transport failure closes the session and the next call reconnects
+3. The timeout covers connecting and the call together
+
+Run with: pytest tests/core/tools/test_mcp_session_pool.py -v
+"""
+
+import asyncio
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import anyio
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+CONFIG = {"url": "https://mcp.example.com/sse", "headers": {}}
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    """Patch the pool's transport and ClientSession; tools sleep for arguments["sleep"]."""
+    from core.tools.utils import mcp_session_pool as pool_module
+
+    server = {"connects": 0, "connect_delay": 0.0, "fail_next": None}
+
+    @asynccontextmanager
+    async def fake_transport(transport, config):
+        server["connects"] += 1
+        await asyncio.sleep(server["connect_delay"])
+        yield None, None
+
+    class FakeSession:
+        def __init__(self, read_stream, write_stream):
+            pass
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def initialize(self):
+            pass
+
+        async def send_ping(self):
+            pass
+
+        async def call_tool(self, tool_name, arguments):
+            error, server["fail_next"] = server["fail_next"], None
+            if error is not None:
+                raise error
+            await asyncio.sleep(arguments.get("sleep", 0))
+            return f"{tool_name} done"
+
+    monkeypatch.setattr(pool_module, "_open_transport", fake_transport)
+    monkeypatch.setattr(pool_module, "ClientSession", FakeSession)
+    return server
+
+
+@pytest.mark.asyncio
+async def test_timeout_fails_only_its_own_call(fake_server):
+    from core.tools.utils.mcp_session_pool import MCPSessionPool
+
+    pool = MCPSessionPool()
+    try:
+        await pool.call_tool("sse", CONFIG, "warmup", {})
+        slow = asyncio.create_task(pool.call_tool("sse", CONFIG, "slow", {"sleep": 1.0}, timeout=0.1))
+        other = asyncio.create_task(pool.call_tool("sse", CONFIG, "other", {"sleep": 0.3}))
+
+        with pytest.raises(TimeoutError):
+            await slow
+        assert await other == "other done"
+        assert await pool.call_tool("sse", CONFIG, "after", {}) == "after done"
+        assert fake_server["connects"] == 1
+        assert pool.get_stats()["open_sessions"] == 1
+    finally:
+        await pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_transport_failure_replaces_session(fake_server):
+    from core.tools.utils.mcp_session_pool import MCPSessionPool
+
+    pool = MCPSessionPool()
+    try:
+        await pool.call_tool("sse", CONFIG, "warmup", {})
+        fake_server["fail_next"] = anyio.BrokenResourceError()
+        # Never sent, so it is replayed on a fresh session
+        assert await pool.call_tool("sse", CONFIG, "retried", {}) == "retried done"
+        assert fake_server["connects"] == 2
+
+        fake_server["fail_next"] = ValueError("bad result")
+        with pytest.raises(ValueError):
+            await pool.call_tool("sse", CONFIG, "invalid", {})
+        assert await pool.call_tool("sse", CONFIG, "after", {}) == "after done"
+        assert fake_server["connects"] == 2
+    finally:
+        await pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_timeout_covers_connect_and_call(fake_server):
+    from core.tools.utils.mcp_session_pool import MCPSessionPool
+
+    pool = MCPSessionPool()
+    fake_server["connect_delay"] = 0.3
+    try:
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            await pool.call_tool("sse", CONFIG, "slow", {"sleep": 0.3}, timeout=0.4)
+        assert time.monotonic() - start < 0.55
+
+        # A connect that outlives the budget is abandoned, not pooled
+        other_server = {"url": "https://other.example.com/sse", "headers": {}}
+        with pytest.raises(TimeoutError):
+            await pool.call_tool("sse", other_server, "slow", {}, timeout=0.1)
+        assert pool.get_stats()["open_sessions"] == 1
+    finally:
+        await pool.close_all()
@@ -0,0 +1,103 @@
+"""
+Fast Parse Streaming Tests
+
+Checks that the streaming paths return the same text as parse():
+1. "".join(iter_parse chunks) == parse().content, per supported format
+2. parse_stream() == parse().content, and with max_chars it is a prefix of it
+3. ParseEngine.parse(max_chars=...) (what read_file uses) matches parse_stream
+
+Run with: pytest tests/core/utils/test_fast_parse_streaming.py -v
+"""
+
+import io
+import os
+import sys
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+def make_docx():
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    document.add_heading("Quarterly report", 1)
+    document.add_paragraph("Revenue grew in every region.")
+    table = document.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "region"
+    table.cell(1, 1).text = "12%"
+    document.add_paragraph("End of report")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def make_xlsx():
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Sales"
+    sheet.append(["region", "q1", "q2"])
+    for row in range(50):
+        sheet.append([f"r{row}", row, row * 1.5])
+    workbook.create_sheet("Notes").append(["note", None, "last"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def make_pptx():
+    pptx = pytest.importorskip("pptx")
+    presentation = pptx.Presentation()
+    slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+    slide.shapes.title.text = "Roadmap"
+    slide.placeholders[1].text = "Ship the parser"
+    presentation.slides.add_slide(presentation.slide_layouts[5]).shapes.title.text = "Questions"
+    buffer = io.BytesIO()
+    presentation.save(buffer)
+    return buffer.getvalue()
+
+
+DOCUMENTS = {
+    "notes.txt": lambda: "first line\nsecond line\nété\n".encode() * 200,
+    "windows.txt": lambda: b"one\r\ntwo\r\n\r\nthree\r\n",
+    "blank.txt": lambda: b"  \n\t\n",
+    "data.csv": lambda: b'h1,h2\n1,2\n"quoted, value",3\n',
+    "report.docx": make_docx,
+    "sales.xlsx": make_xlsx,
+    "deck.pptx": make_pptx,
+}
+
+
+@pytest.mark.parametrize("filename", sorted(DOCUMENTS))
+def test_iter_parse_and_parse_stream_match_parse(filename):
+    from core.utils.fast_parse import FastParse
+
+    data = DOCUMENTS[filename]()
+    parser = FastParse()
+    full = parser.parse(data, filename)
+    assert full.success
+
+    assert "".join(chunk.content for chunk in parser.iter_parse(data, filename)) == full.content
+    assert parser.parse_stream(data, filename).content == full.content
+
+    limit = max(1, len(full.content) // 3)
+    streamed = parser.parse_stream(data, filename, max_chars=limit)
+    assert streamed.content == full.content[:limit]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("filename", ["report.docx", "notes.txt"])
+async def test_engine_parse_with_max_chars_matches_parse_stream(filename):
+    from core.utils.fast_parse import FastParse, ParseEngine
+
+    data = DOCUMENTS[filename]()
+    engine = ParseEngine(max_workers=1, use_redis=False)
+    try:
+        result = await engine.parse(data, filename, max_chars=40)
+    finally:
+        engine.shutdown()
+
+    assert result.success
+    assert result.content == FastParse().parse_stream(data, filename, max_chars=40).content
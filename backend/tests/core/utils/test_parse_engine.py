@@ -0,0 +1,78 @@
+"""
+Parse Engine Tests
+
+Runs ParseEngine's worker pool with a job that sleeps for the time named in the
+filename (e.g. "sleep-0.5.docx"):
+1. A job that times out fails alone: a job running on another worker of the
+   same pool still completes, new jobs go to a fresh pool, and the retired
+   pool's workers (the hung one included) are killed once it has drained
+
+Run with: pytest tests/core/utils/test_parse_engine.py -v
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+
+def sleeping_job(file_bytes, filename, mime_type, config, max_chars=None):
+    from core.utils.fast_parse import FileType, ParseResult
+
+    time.sleep(float(filename.split("-")[1].rsplit(".", 1)[0]))
+    return ParseResult(
+        success=True,
+        content=f"parsed {filename}",
+        file_type=FileType.WORD,
+        filename=filename,
+        mime_type=mime_type,
+        file_size=len(file_bytes),
+    )
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    from core.utils.fast_parse import engine as engine_module
+
+    monkeypatch.setattr(engine_module, "_parse_job", sleeping_job)
+    engine = engine_module.ParseEngine(max_workers=2, use_redis=False)
+    yield engine
+    engine.shutdown()
+
+
+async def parse(engine, name, config):
+    return await engine.parse(name.encode(), name, config=config)
+
+
+@pytest.mark.asyncio
+async def test_timeout_does_not_kill_other_jobs(engine):
+    from core.utils.fast_parse import FastParseConfig
+
+    config = FastParseConfig(process_job_timeout=1.0)
+    # Start both workers before timing anything
+    await asyncio.gather(parse(engine, "sleep-0.01.docx", config), parse(engine, "sleep-0.02.docx", config))
+    pool = engine._pool
+    workers = list(pool._processes.values())
+
+    hung = asyncio.create_task(parse(engine, "sleep-30.docx", config))
+    await asyncio.sleep(0.5)
+    other = asyncio.create_task(parse(engine, "sleep-0.8.docx", config))
+
+    result = await hung
+    assert not result.success and "timed out" in result.error
+    assert engine._pool is None
+    # Still running on the retired pool: not killed with the hung worker
+    assert (await other).content == "parsed sleep-0.8.docx"
+
+    after = await parse(engine, "sleep-0.03.docx", config)
+    assert after.success and engine._pool is not pool
+
+    await asyncio.gather(*engine._draining)
+    await asyncio.sleep(0.2)
+    assert not any(worker.is_alive() for worker in workers)
+    assert engine.get_stats()["pools_retired"] == 1